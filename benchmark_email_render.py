@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+邮件渲染基准测试
+生成与每日合并报告结构相同的大型摘要，比较首次渲染、不使用缓存、只有一个小节变化和命中缓存时的耗时。
+
+用法: python benchmark_email_render.py [仓库数] [重复次数]
+"""
+
+import os
+import sys
+import time
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.abspath(__file__))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.email_renderer import EmailRenderer
+
+
+def build_digest(repo_count: int) -> str:
+    """构造一份包含 repo_count 个仓库和 Hacker News 部分的日报"""
+    parts = ["# 每日资讯摘要 (2025-06-13)\n", "## 1. GitHub 仓库订阅更新\n", "# GitHub Subscriptions Update\n"]
+    for i in range(repo_count):
+        parts.append(f"\n---\n## owner{i}/repo{i} 项目更新 (过去 1 天: 2025-06-13 至 2025-06-13)\n")
+        parts.append("### 📝 Commits:\n")
+        parts.extend(f"- [`{j:07x}`](https://github.com/owner{i}/repo{i}/commit/{j}) Fix edge case {j} (by dev{j})"
+                     for j in range(10))
+        parts.append("\n### 🛠 Issues (Closed):\n")
+        parts.extend(f"- #{j} [Crash when loading config {j}](https://github.com/owner{i}/repo{i}/issues/{j})"
+                     for j in range(10))
+        parts.append("\n### 🤖 AI 总结\n")
+        parts.append("本周期内项目主要修复了配置加载相关的问题，并改进了文档。" * 8)
+        parts.append("\n```python\ndef load_config(path):\n    with open(path) as f:\n        return json.load(f)\n```\n")
+    parts.append("\n---\n## 2. Hacker News 每日热点\n")
+    for j in range(20):
+        parts.append(f"### Top {j + 1}：热门话题 {j}\n\n讨论内容摘要。" * 1 + "\n- https://example.com/story\n")
+    return "\n".join(parts)
+
+
+def timed(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    repo_count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    digest = build_digest(repo_count)
+    print(f"报告: {repo_count} 个仓库, {len(digest)} 字符, 重复 {repeat} 次")
+
+    for highlight in (True, False):
+        label = "语法高亮" if highlight else "无高亮"
+        cold = timed(lambda: EmailRenderer(highlight_code=highlight).render("日报", digest), repeat)
+        renderer = EmailRenderer(highlight_code=highlight, cache_size=0, section_cache_size=0)
+        uncached = timed(lambda: renderer.render("日报", digest), repeat)
+
+        # 只有一个小节变化（如同一天的报告重新生成了一个仓库）时，其余小节命中缓存
+        renderer = EmailRenderer(highlight_code=highlight)
+        renderer.render("日报", digest)
+        counter = iter(range(repeat))
+        partial = timed(lambda: renderer.render("日报", digest.replace("owner0/repo0", f"owner0/repo0-{next(counter)}")),
+                        repeat)
+        renderer.render("日报", digest)
+        cached = timed(lambda: renderer.render("日报", digest), repeat)
+        print(f"[{label}] 首次渲染 {cold:8.2f} ms | 无缓存 {uncached:8.2f} ms | "
+              f"一个小节变化 {partial:8.2f} ms | 命中缓存 {cached:8.4f} ms")
+
+
+if __name__ == '__main__':
+    main()
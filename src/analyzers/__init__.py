@@ -3,4 +3,23 @@
 用于分析各种信息源的主题和趋势
 """
 
-__version__ = "0.1.0" 
\ No newline at end of file
+__version__ = "0.1.0" 
+
+def create_topic_analyzer(backend='tfidf', **kwargs):
+    """
+    创建话题分析器
+
+    Args:
+        backend: 分析后端，"tfidf"（默认）或 "semantic"
+        **kwargs: 传给分析器构造函数的参数
+
+    Returns:
+        话题分析器实例
+    """
+    # 延迟导入，避免未使用的后端拖慢启动
+    if backend == 'semantic':
+        from .semantic_analyzer import SemanticTopicAnalyzer
+        return SemanticTopicAnalyzer(**kwargs)
+
+    from .topic_analyzer import HackerNewsTopicAnalyzer
+    return HackerNewsTopicAnalyzer(cache_dir=kwargs.get('cache_dir', 'cache/topic_analysis'))
@@ -0,0 +1,241 @@
+"""
+话题分析进程池
+在常驻的工作进程中运行 CPU 密集的话题分析，避免占用导出线程所在进程的 GIL 或阻塞异步导出的事件循环
+"""
+
+import os
+import asyncio
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# 导入日志
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+try:
+    from src.utils.search_index import index_report_file
+except ImportError:
+    from utils.search_index import index_report_file
+
+
+def analyze_and_write_report(analyzer, stories: List[Dict], date: Optional[str] = None,
+                             hour: Optional[str] = None, base_dir: str = 'hacker_news') -> str:
+    """
+    分析话题并写入 <base_dir>/<date>/<HH>_topics.md，写入后更新报告检索索引
+
+    Args:
+        analyzer: 话题分析器实例
+        stories: HN故事列表
+        date: 日期字符串 (YYYY-MM-DD)
+        hour: 小时字符串 (HH)
+        base_dir: 报告根目录
+
+    Returns:
+        话题报告文件路径
+    """
+    if date is None:
+        date = datetime.now().strftime('%Y-%m-%d')
+    if hour is None:
+        hour = datetime.now().strftime('%H')
+
+    result = analyzer.analyze_topics(stories, date, hour)
+    report = analyzer.generate_report(result)
+
+    dir_path = os.path.join(base_dir, date)
+    os.makedirs(dir_path, exist_ok=True)
+    topics_file_path = os.path.join(dir_path, f'{hour}_topics.md')
+
+    # 先写临时文件再替换，读取方不会看到写了一半的报告
+    fd, tmp_path = tempfile.mkstemp(dir=dir_path, suffix='.md.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(report)
+        os.replace(tmp_path, topics_file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    index_report_file(topics_file_path)
+    return topics_file_path
+
+
+# ---- 以下函数在工作进程中执行 ----
+
+_worker_analyzer = None
+
+
+def _init_worker(backend: str, analyzer_kwargs: Dict):
+    """工作进程初始化：预加载 NLTK/sklearn 并创建可复用的分析器"""
+    global _worker_analyzer
+    try:
+        from src.analyzers import create_topic_analyzer
+    except ImportError:
+        from analyzers import create_topic_analyzer
+    _worker_analyzer = create_topic_analyzer(backend, **analyzer_kwargs)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _run_analysis(stories: List[Dict], date: Optional[str], hour: Optional[str], base_dir: str) -> str:
+    return analyze_and_write_report(_worker_analyzer, stories, date, hour, base_dir)
+
+
+class TopicAnalysisPool:
+    """
+    常驻的话题分析进程池
+
+    默认只有一个工作进程：话题趋势历史保存在工作进程的分析器中，
+    单进程可以保证各小时的分析按提交顺序串行写入历史。
+    """
+
+    def __init__(self, backend: str = 'tfidf', analyzer_kwargs: Optional[Dict] = None,
+                 max_workers: int = 1, base_dir: str = 'hacker_news'):
+        """
+        初始化进程池
+
+        Args:
+            backend: 话题分析后端
+            analyzer_kwargs: 传给分析器构造函数的参数
+            max_workers: 工作进程数量
+            base_dir: 话题报告根目录
+        """
+        self.backend = backend
+        self.analyzer_kwargs = analyzer_kwargs or {}
+        self.max_workers = max_workers
+        self.base_dir = base_dir
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self) -> 'TopicAnalysisPool':
+        """启动工作进程并等待其完成预加载（预热）"""
+        with self._lock:
+            if self._executor is None:
+                self._start_executor()
+        return self
+
+    def _start_executor(self):
+        # 使用 spawn：调用方（如 Streamlit）本身是多线程的，fork 可能继承到被占用的锁
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.backend, self.analyzer_kwargs)
+        )
+        try:
+            pid = executor.submit(_ping).result()
+        except BrokenProcessPool:
+            # 初始化失败（例如缺少依赖），不保留损坏的进程池
+            executor.shutdown(wait=False)
+            raise
+        self._executor = executor
+        LOG.info(f"话题分析工作进程已就绪 (pid={pid}, backend={self.backend})")
+
+    async def analyze(self, stories: List[Dict], date: Optional[str] = None,
+                      hour: Optional[str] = None, timeout: float = 300) -> Optional[str]:
+        """
+        在工作进程中分析话题并写入报告
+
+        Args:
+            stories: HN故事列表
+            date: 日期字符串 (YYYY-MM-DD)
+            hour: 小时字符串 (HH)
+            timeout: 等待超时（秒）。超时后不再等待，但工作进程仍会完成并写入报告
+
+        Returns:
+            话题报告文件路径，失败或超时返回None
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            if self._executor is None:
+                await loop.run_in_executor(None, self.start)
+            future = loop.run_in_executor(self._executor, _run_analysis, stories, date, hour, self.base_dir)
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            LOG.warning(f"话题分析超过 {timeout} 秒未完成，不再等待")
+        except BrokenProcessPool:
+            LOG.error("话题分析工作进程异常退出或初始化失败，将在下次调用时重建")
+            self.shutdown(wait=False)
+        except Exception as e:
+            LOG.error(f"话题分析失败: {e}")
+        return None
+
+    def run(self, stories: List[Dict], date: Optional[str] = None,
+            hour: Optional[str] = None, timeout: float = 300) -> Optional[str]:
+        """
+        analyze 的同步版本，供在线程中执行的导出任务调用
+
+        Args:
+            stories: HN故事列表
+            date: 日期字符串 (YYYY-MM-DD)
+            hour: 小时字符串 (HH)
+            timeout: 等待超时（秒）。超时后不再等待，但工作进程仍会完成并写入报告
+
+        Returns:
+            话题报告文件路径，失败或超时返回None
+        """
+        try:
+            self.start()
+            future = self._executor.submit(_run_analysis, stories, date, hour, self.base_dir)
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            LOG.warning(f"话题分析超过 {timeout} 秒未完成，不再等待")
+        except BrokenProcessPool:
+            LOG.error("话题分析工作进程异常退出或初始化失败，将在下次调用时重建")
+            self.shutdown(wait=False)
+        except Exception as e:
+            LOG.error(f"话题分析失败: {e}")
+        return None
+
+    def submit(self, stories: List[Dict], date: Optional[str] = None,
+               hour: Optional[str] = None) -> Optional[Future]:
+        """
+        提交话题分析后立即返回，报告由工作进程在完成时写入；结果和错误在完成时记录到日志
+
+        Args:
+            stories: HN故事列表
+            date: 日期字符串 (YYYY-MM-DD)
+            hour: 小时字符串 (HH)
+
+        Returns:
+            结果为话题报告文件路径的 Future，提交失败返回None
+        """
+        try:
+            self.start()
+            future = self._executor.submit(_run_analysis, stories, date, hour, self.base_dir)
+        except BrokenProcessPool:
+            LOG.error("话题分析工作进程异常退出或初始化失败，将在下次调用时重建")
+            self.shutdown(wait=False)
+            return None
+        except Exception as e:
+            LOG.error(f"提交话题分析失败: {e}")
+            return None
+        future.add_done_callback(self._log_outcome)
+        return future
+
+    def _log_outcome(self, future: Future):
+        """后台分析完成时记录结果；工作进程崩溃时丢弃进程池，下次调用时重建"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            LOG.info(f"Hacker News主题分析报告已生成: {future.result()}")
+        elif isinstance(error, BrokenProcessPool):
+            LOG.error("话题分析工作进程异常退出，将在下次调用时重建")
+            self.shutdown(wait=False)
+        else:
+            LOG.error(f"话题分析失败: {error}")
+
+    def shutdown(self, wait: bool = True):
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,281 @@
+"""
+文本嵌入模块
+提供本地 CPU 嵌入模型、基于内存映射的嵌入缓存以及文章正文抓取
+"""
+
+import os
+import re
+import json
+import hashlib
+import tempfile
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 导入日志
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+DEFAULT_EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.\-]*")
+_STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how', 'in',
+    'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was',
+    'what', 'when', 'why', 'with', 'you', 'your', 'show', 'hn', 'ask'
+}
+
+
+class HashingEmbedder:
+    """
+    特征哈希嵌入器
+
+    不依赖任何模型文件，把单词、双词组合和词内字符三元组哈希到固定维度。
+    在没有安装 sentence-transformers 时作为兜底实现。
+    """
+
+    # 构建近邻图时判定为相关的相似度阈值
+    link_threshold = 0.3
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.model_id = f"hashing-{dim}"
+
+    def _features(self, text: str) -> Dict[str, float]:
+        tokens = [t.strip('.-') for t in _TOKEN_RE.findall(text.lower())]
+        tokens = [t for t in tokens if t and t not in _STOP_WORDS]
+        features = {}
+        for token in tokens:
+            features[token] = features.get(token, 0.0) + 1.0
+            padded = f"<{token}>"
+            for i in range(len(padded) - 2):
+                gram = '#' + padded[i:i + 3]
+                features[gram] = features.get(gram, 0.0) + 0.2
+        for left, right in zip(tokens, tokens[1:]):
+            bigram = f"{left} {right}"
+            features[bigram] = features.get(bigram, 0.0) + 1.0
+        return features
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+                value = int.from_bytes(digest, 'little')
+                sign = 1.0 if (value >> 63) & 1 else -1.0
+                weight = 1.0 + np.log(count) if count > 1 else count
+                vectors[row, value % self.dim] += sign * weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerEmbedder:
+    """基于 sentence-transformers 的本地 CPU 嵌入模型"""
+
+    link_threshold = 0.45
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device='cpu')
+        self.dim = int(self.model.get_sentence_embedding_dimension())
+        self.model_id = model_name.replace('/', '_')
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self.model.encode(list(texts), batch_size=32, convert_to_numpy=True,
+                                    normalize_embeddings=True, show_progress_bar=False)
+        return vectors.astype(np.float32)
+
+
+def create_embedder(model_name: Optional[str] = None):
+    """
+    创建嵌入器
+
+    Args:
+        model_name: sentence-transformers 模型名称，为 "hashing" 时直接使用特征哈希
+
+    Returns:
+        嵌入器实例；模型不可用时退回到 HashingEmbedder
+    """
+    if model_name == 'hashing':
+        return HashingEmbedder()
+    try:
+        return SentenceTransformerEmbedder(model_name or DEFAULT_EMBEDDING_MODEL)
+    except ImportError:
+        LOG.info("未安装 sentence-transformers，使用特征哈希嵌入")
+    except Exception as e:
+        LOG.warning(f"无法加载嵌入模型 {model_name or DEFAULT_EMBEDDING_MODEL}，使用特征哈希嵌入: {e}")
+    return HashingEmbedder()
+
+
+_embedders: Dict[str, object] = {}
+_embedders_lock = threading.Lock()
+
+
+def get_embedder(model_name: Optional[str] = None):
+    """
+    返回进程内共享的嵌入器，同一模型只加载一次（话题分析器和历史故事索引共用）
+
+    Args:
+        model_name: sentence-transformers 模型名称，为 "hashing" 时使用特征哈希
+
+    Returns:
+        嵌入器实例
+    """
+    key = model_name or DEFAULT_EMBEDDING_MODEL
+    with _embedders_lock:
+        embedder = _embedders.get(key)
+        if embedder is None:
+            embedder = _embedders[key] = create_embedder(model_name)
+        return embedder
+
+
+class EmbeddingCache:
+    """
+    按故事 ID 缓存嵌入向量
+
+    向量保存在一个内存映射的 float32 文件中，行号索引保存在旁边的 JSON 文件里。
+    每个故事在整个生命周期内只需要嵌入一次。
+    """
+
+    def __init__(self, cache_dir: str, dim: int, model_id: str, initial_capacity: int = 1024):
+        """
+        初始化嵌入缓存
+
+        Args:
+            cache_dir: 缓存根目录，不同模型使用各自的子目录
+            dim: 向量维度
+            model_id: 模型标识
+            initial_capacity: 初始行数
+        """
+        self.cache_dir = os.path.join(cache_dir, model_id)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.dim = dim
+        self.vectors_path = os.path.join(self.cache_dir, 'vectors.f32')
+        self.index_path = os.path.join(self.cache_dir, 'index.json')
+
+        self.rows: Dict[str, int] = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get('dim') == dim:
+                    self.rows = {str(k): int(v) for k, v in index.get('rows', {}).items()}
+                else:
+                    LOG.warning(f"嵌入缓存维度不匹配，重新建立：{self.cache_dir}")
+            except Exception as e:
+                LOG.warning(f"无法加载嵌入缓存索引：{self.index_path}，{e}")
+
+        row_bytes = dim * 4
+        existing = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        if existing < len(self.rows):
+            # 向量文件比索引短，说明缓存已损坏
+            LOG.warning(f"嵌入缓存文件不完整，重新建立：{self.cache_dir}")
+            self.rows = {}
+            existing = 0
+        self._open(max(existing, initial_capacity))
+
+    def _open(self, capacity: int):
+        """以指定容量打开（必要时扩展）内存映射文件"""
+        row_bytes = self.dim * 4
+        mode = 'r+b' if os.path.exists(self.vectors_path) else 'w+b'
+        with open(self.vectors_path, mode) as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < capacity * row_bytes:
+                f.truncate(capacity * row_bytes)
+        self.capacity = capacity
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r+',
+                                 shape=(capacity, self.dim))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, story_id) -> bool:
+        return str(story_id) in self.rows
+
+    def get_many(self, story_ids: Sequence) -> Tuple[np.ndarray, List]:
+        """
+        批量读取向量
+
+        Returns:
+            (向量矩阵, 未命中的故事ID列表)；未命中的行为全零
+        """
+        result = np.zeros((len(story_ids), self.dim), dtype=np.float32)
+        missing = []
+        for i, story_id in enumerate(story_ids):
+            row = self.rows.get(str(story_id))
+            if row is None:
+                missing.append(story_id)
+            else:
+                result[i] = self.vectors[row]
+        return result, missing
+
+    def put_many(self, story_ids: Sequence, vectors: np.ndarray):
+        """批量写入向量并持久化索引"""
+        if not len(story_ids):
+            return
+        new_ids = [str(s) for s in story_ids if str(s) not in self.rows]
+        needed = len(self.rows) + len(new_ids)
+        if needed > self.capacity:
+            self.vectors.flush()
+            del self.vectors
+            self._open(max(needed, self.capacity * 2))
+
+        for story_id, vector in zip(story_ids, vectors):
+            key = str(story_id)
+            row = self.rows.get(key)
+            if row is None:
+                row = len(self.rows)
+                self.rows[key] = row
+            self.vectors[row] = vector
+        self.vectors.flush()
+        self._save_index()
+
+    def _save_index(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.json.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'dim': self.dim, 'rows': self.rows}, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            LOG.warning(f"无法保存嵌入缓存索引：{self.index_path}，{e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def fetch_article_text(url: str, timeout: float = 5.0, max_chars: int = 2000) -> str:
+    """
+    抓取文章正文的前若干字符
+
+    Args:
+        url: 文章链接
+        timeout: 请求超时（秒）
+        max_chars: 返回的最大字符数
+
+    Returns:
+        正文文本，失败时返回空字符串
+    """
+    if not url or not url.startswith(('http://', 'https://')):
+        return ''
+    try:
+        import requests
+        from bs4 import BeautifulSoup
+
+        response = requests.get(url, timeout=timeout, headers={'User-Agent': 'Mozilla/5.0 (0xScout)'})
+        if response.status_code != 200 or 'html' not in response.headers.get('Content-Type', ''):
+            return ''
+        soup = BeautifulSoup(response.text[:500000], 'html.parser')
+        for tag in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
+            tag.decompose()
+        paragraphs = [p.get_text(' ', strip=True) for p in soup.find_all('p')]
+        text = ' '.join(p for p in paragraphs if len(p) > 40)
+        return text[:max_chars]
+    except Exception as e:
+        LOG.debug(f"抓取文章正文失败 {url}: {e}")
+        return ''
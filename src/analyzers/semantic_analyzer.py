@@ -0,0 +1,195 @@
+"""
+语义话题分析模块
+使用本地嵌入模型对 Hacker News 文章进行语义聚类，作为 TF-IDF 聚类的替代后端
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from urllib.parse import urlparse
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from .topic_analyzer import HackerNewsTopicAnalyzer, dedup_stories
+from .embeddings import get_embedder, EmbeddingCache, fetch_article_text
+
+try:
+    from src.utils.ann_index import IVFIndex
+    from src.logger import LOG
+except ImportError:
+    from utils.ann_index import IVFIndex
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+class SemanticTopicAnalyzer(HackerNewsTopicAnalyzer):
+    """
+    基于嵌入向量的 Hacker News 话题分析器
+
+    标题（加上抓取到的正文）经本地 CPU 模型嵌入后按故事 ID 缓存，
+    聚类在互为近邻的相似度图上求连通分量，不再依赖 DBSCAN/KMeans 的参数。
+    话题关键词、趋势分析和报告生成沿用 HackerNewsTopicAnalyzer。
+    """
+
+    def __init__(self, cache_dir='cache/topic_analysis', embedding_model=None,
+                 embedding_cache_dir='cache/embeddings', fetch_articles=True,
+                 n_neighbors=5, fetch_workers=8):
+        """
+        初始化语义话题分析器
+
+        Args:
+            cache_dir: 话题历史缓存目录
+            embedding_model: sentence-transformers 模型名称，为None时使用默认模型
+            embedding_cache_dir: 嵌入向量缓存目录
+            fetch_articles: 是否抓取文章正文参与嵌入
+            n_neighbors: 近邻图中每个故事的近邻数量
+            fetch_workers: 抓取正文的并发数
+        """
+        super().__init__(cache_dir)
+
+        self.embedder = get_embedder(embedding_model)
+        self.embedding_cache = EmbeddingCache(embedding_cache_dir, self.embedder.dim, self.embedder.model_id)
+        self.link_threshold = self.embedder.link_threshold
+        self.fetch_articles = fetch_articles
+        self.n_neighbors = n_neighbors
+        self.fetch_workers = fetch_workers
+
+        # 关键词只在已聚好的话题内提取，不需要 min_df 过滤
+        self.vectorizer = TfidfVectorizer(max_features=1000, min_df=1, ngram_range=(1, 2))
+
+    def preprocess_stories(self, stories):
+        """预处理故事，并在元数据中保留原始正文供嵌入使用"""
+        # 先折叠重复故事，使元数据与故事一一对应（父类中再次折叠不会改变结果）
+        stories = dedup_stories(stories)
+        processed_texts, metadata = super().preprocess_stories(stories)
+        for story, meta in zip(stories, metadata):
+            meta['text'] = story.get('text', '')
+        return processed_texts, metadata
+
+    def _embedding_input(self, meta: Dict, article: str = '') -> str:
+        """组合用于嵌入的文本：标题、域名、正文"""
+        title = meta.get('title', '')
+        domain = urlparse(meta.get('url') or '').netloc
+        body = article or meta.get('text', '')
+        parts = [title]
+        if domain:
+            parts.append(f"({domain})")
+        if body:
+            parts.append(body)
+        return ' '.join(parts)
+
+    def embed_stories(self, metadata: List[Dict]) -> np.ndarray:
+        """
+        获取故事的嵌入向量，只对缓存中没有的故事调用模型
+
+        Args:
+            metadata: 故事元数据列表
+
+        Returns:
+            (n, dim) 的单位向量矩阵
+        """
+        ids = [meta.get('id') for meta in metadata]
+        vectors, missing = self.embedding_cache.get_many(ids)
+        missing_set = {str(story_id) for story_id in missing}
+        pending = [i for i, story_id in enumerate(ids) if story_id is None or str(story_id) in missing_set]
+        if not pending:
+            return vectors
+
+        articles = [''] * len(pending)
+        if self.fetch_articles:
+            urls = [metadata[i].get('url', '') for i in pending]
+            with ThreadPoolExecutor(max_workers=self.fetch_workers) as executor:
+                articles = list(executor.map(fetch_article_text, urls))
+
+        texts = [self._embedding_input(metadata[i], article) for i, article in zip(pending, articles)]
+        new_vectors = self.embedder.embed(texts)
+        vectors[pending] = new_vectors
+
+        cacheable = [(ids[i], new_vectors[k]) for k, i in enumerate(pending) if ids[i] is not None]
+        if cacheable:
+            self.embedding_cache.put_many([c[0] for c in cacheable], np.vstack([c[1] for c in cacheable]))
+        LOG.debug(f"新嵌入 {len(pending)} 个故事，缓存命中 {len(ids) - len(pending)} 个")
+        return vectors
+
+    def _cluster_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        在互为近邻的相似度图上求连通分量
+
+        孤立的故事如果与某个近邻足够相似则并入其所在话题，否则标记为噪声 (-1)。
+        """
+        n = len(vectors)
+        k = min(self.n_neighbors, n - 1)
+        if k <= 0:
+            return np.full(n, -1, dtype=int)
+
+        index = IVFIndex().build(vectors)
+        sims, neighbors = index.search(vectors, k + 1)
+
+        linked = [set() for _ in range(n)]
+        for i in range(n):
+            for sim, j in zip(sims[i], neighbors[i]):
+                if j >= 0 and j != i and sim >= self.link_threshold:
+                    linked[i].add(int(j))
+
+        parent = list(range(n))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for i in range(n):
+            for j in linked[i]:
+                if i in linked[j]:
+                    parent[find(i)] = find(j)
+
+        roots = np.array([find(i) for i in range(n)])
+        sizes = np.bincount(roots, minlength=n)
+
+        # 孤立点并入最相似近邻所在的话题
+        for i in range(n):
+            if sizes[roots[i]] == 1 and linked[i]:
+                best = max(linked[i], key=lambda j: float(vectors[i] @ vectors[j]))
+                roots[i] = roots[best]
+        sizes = np.bincount(roots, minlength=n)
+
+        # 按话题大小从大到小分配连续的标签
+        labels = np.full(n, -1, dtype=int)
+        components = sorted({r for r in roots if sizes[r] > 1}, key=lambda r: (-sizes[r], r))
+        for label, root in enumerate(components):
+            labels[roots == root] = label
+        return labels
+
+    def cluster_topics(self, processed_texts, metadata, n_clusters=None):
+        """
+        基于嵌入向量聚类话题
+
+        Args:
+            processed_texts: 预处理后的文本列表（用于提取关键词）
+            metadata: 故事元数据
+            n_clusters: 聚类数量，指定时使用 K-Means，否则使用近邻图
+
+        Returns:
+            聚类标签和话题列表
+        """
+        if not processed_texts:
+            return [], []
+
+        vectors = self.embed_stories(metadata)
+        if n_clusters:
+            labels = KMeans(n_clusters=min(n_clusters, len(vectors)), random_state=42, n_init=10).fit_predict(vectors)
+        else:
+            labels = self._cluster_vectors(vectors)
+
+        unique_labels = sorted(set(labels) - {-1})
+        try:
+            X = self.vectorizer.fit_transform(processed_texts)
+        except ValueError:
+            LOG.warning("无法向量化文本，话题将不包含关键词")
+            return labels, [{'id': label, 'keywords': [], 'size': int((labels == label).sum())}
+                            for label in unique_labels]
+
+        topics = [self.extract_topic_keywords(X, labels, label) for label in unique_labels]
+        return labels, topics
@@ -0,0 +1,226 @@
+"""
+Hacker News 故事分类器
+把各分类的关键词一次性编译为带词边界的正则自动机，整批标题拼接后一次扫描完成匹配，
+输出每个故事在各分类上的加权得分（多标签），并据此确定主分类
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+FALLBACK_CATEGORY = 'others'
+
+# 分类 -> {关键词: 权重}。分类的顺序也是同分时的优先顺序。
+# 招聘、Show HN、Ask HN 权重远高于普通关键词，保证它们优先成为主分类
+DEFAULT_CATEGORY_RULES = {
+    'business_jobs': {
+        'category': 'business',
+        'keywords': {'hiring': 12, 'job': 12, 'jobs': 12},
+    },
+    'show_hn': {'keywords': {'show hn': 10}},
+    'ask_hn': {'keywords': {'ask hn': 10}},
+    'tech': {
+        'keywords': {
+            'programming': 1, 'code': 1, 'software': 1, 'developer': 1, 'developers': 1, 'web': 1,
+            'app': 1, 'apps': 1, 'python': 1, 'javascript': 1, 'rust': 1, 'go': 1, 'golang': 1,
+            'java': 1, 'c++': 1, 'typescript': 1, 'database': 1, 'databases': 1, 'api': 1,
+            'apis': 1, 'framework': 1, 'library': 1, 'algorithm': 1, 'algorithms': 1,
+            'github': 1, 'git': 1, 'docker': 1, 'kubernetes': 1, 'aws': 1, 'cloud': 1,
+            'devops': 1, 'ai': 1.5, 'ml': 1.5, 'machine learning': 2, 'deep learning': 2,
+            'neural': 1, 'llm': 2, 'llms': 2, 'compiler': 1, 'linux': 1, 'open source': 1,
+        },
+    },
+    'science': {
+        'keywords': {
+            'science': 1, 'research': 1, 'researchers': 1, 'study': 1, 'physics': 1,
+            'chemistry': 1, 'biology': 1, 'astronomy': 1, 'space': 1, 'mars': 1, 'nasa': 1,
+            'quantum': 1, 'medicine': 1, 'climate': 1, 'energy': 1, 'environment': 1,
+            'genome': 1, 'brain': 1,
+        },
+    },
+    'business': {
+        'keywords': {
+            'startup': 1, 'startups': 1, 'business': 1, 'company': 1, 'founder': 1, 'founders': 1,
+            'investor': 1, 'investors': 1, 'venture': 1, 'vc': 1, 'funding': 1, 'acquisition': 1,
+            'acquires': 1, 'market': 1, 'finance': 1, 'economy': 1, 'stock': 1, 'crypto': 1,
+            'blockchain': 1,
+        },
+    },
+}
+
+# 关键词两侧不能紧挨字母或数字，避免 "go" 匹配 "google"、"ai" 匹配 "said"
+_BOUNDARY_BEFORE = r'(?<![a-z0-9])'
+_BOUNDARY_AFTER = r'(?![a-z0-9])'
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    把关键词集合编译为按公共前缀分解的正则（字符级 trie），
+    匹配时每个位置只需沿 trie 走一条路径，而不是逐个尝试全部候选词
+    """
+    trie: Dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node: Dict) -> str:
+        terminal = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # 贪婪匹配，较长的关键词优先；后缀可选时当前位置也是一个完整关键词
+        return f'(?:{body})?' if terminal else body
+
+    return build(trie)
+
+
+class StoryCategorizer:
+    """
+    基于编译正则的多标签故事分类器
+
+    规则格式（可在 config.json 的 story_categories 中覆盖）::
+
+        {
+            "<规则名>": {
+                "category": "<分类名，默认与规则名相同>",
+                "keywords": {"<关键词>": <权重>, ...}
+            },
+            ...
+        }
+
+    多条规则可以指向同一个分类，得分累加。
+    """
+
+    def __init__(self, rules: Optional[Dict[str, Dict]] = None, min_score: float = 1.0):
+        """
+        初始化分类器并编译规则
+
+        Args:
+            rules: 分类规则，None 时使用 DEFAULT_CATEGORY_RULES
+            min_score: 成为主分类所需的最低得分，低于该值归入 others
+        """
+        self.rules = rules or DEFAULT_CATEGORY_RULES
+        self.min_score = min_score
+
+        # 关键词 -> [(分类序号, 权重)]
+        self.categories: List[str] = []
+        self._keyword_weights: Dict[str, List[tuple]] = {}
+        for rule_name, rule in self.rules.items():
+            category = rule.get('category', rule_name)
+            if category not in self.categories:
+                self.categories.append(category)
+            category_idx = self.categories.index(category)
+            for keyword, weight in rule.get('keywords', {}).items():
+                keyword = keyword.lower().strip()
+                if keyword:
+                    self._keyword_weights.setdefault(keyword, []).append((category_idx, float(weight)))
+
+        # 关键词 -> 序号，以及 (关键词数, 分类数) 的权重矩阵
+        self._keywords = list(self._keyword_weights)
+        self._keyword_ids = {keyword: idx for idx, keyword in enumerate(self._keywords)}
+        self._weights = np.zeros((len(self._keywords), len(self.categories)))
+        for keyword, entries in self._keyword_weights.items():
+            for category_idx, weight in entries:
+                self._weights[self._keyword_ids[keyword], category_idx] += weight
+
+        # 长关键词优先，"machine learning" 不会被拆成 "learning"；
+        # 贪婪匹配在边界检查失败时会回溯到较短的关键词
+        self._pattern = re.compile(
+            _BOUNDARY_BEFORE + '(' + _trie_pattern(self._keywords) + ')' + _BOUNDARY_AFTER
+        ) if self._keywords else None
+        LOG.debug(f"故事分类器已编译 {len(self._keywords)} 个关键词，{len(self.categories)} 个分类")
+
+    def score_titles(self, titles: Sequence[str]) -> np.ndarray:
+        """
+        计算一批标题在各分类上的得分
+
+        全部标题用换行拼接后只扫描一次，再按偏移量把匹配归回各自的标题。
+
+        Args:
+            titles: 标题列表
+
+        Returns:
+            形状为 (len(titles), len(self.categories)) 的得分矩阵
+        """
+        if not titles or self._pattern is None:
+            return np.zeros((len(titles), len(self.categories)))
+
+        # 同一故事会出现在多个小时的快照中，相同标题只扫描一次
+        cleaned = [(title or '').lower().replace('\n', ' ') for title in titles]
+        unique_ids = {}
+        inverse = np.array([unique_ids.setdefault(title, len(unique_ids)) for title in cleaned])
+        unique_titles = list(unique_ids)
+        scores = np.zeros((len(unique_titles), len(self.categories)))
+
+        text = '\n'.join(unique_titles)
+        # 每个标题在拼接文本中的起始偏移
+        starts = np.cumsum([0] + [len(title) + 1 for title in unique_titles[:-1]])
+
+        positions, keyword_ids = [], []
+        for match in self._pattern.finditer(text):
+            positions.append(match.start())
+            keyword_ids.append(self._keyword_ids[match.group(1)])
+        if positions:
+            rows = np.searchsorted(starts, positions, side='right') - 1
+            match_weights = self._weights[keyword_ids]
+            for category_idx in range(len(self.categories)):
+                scores[:, category_idx] = np.bincount(rows, weights=match_weights[:, category_idx],
+                                                      minlength=len(unique_titles))
+        return scores[inverse]
+
+    def classify(self, stories: Sequence[Dict]) -> List[Dict[str, float]]:
+        """
+        多标签分类
+
+        Args:
+            stories: 故事列表
+
+        Returns:
+            与 stories 一一对应的 {分类: 得分}，只包含得分大于0的分类，按得分从高到低排列
+        """
+        scores = self.score_titles([story.get('title', '') for story in stories])
+        for row, story in enumerate(stories):
+            # 招聘帖子由类型而不是标题决定
+            if story.get('type') == 'job' and 'business' in self.categories:
+                scores[row, self.categories.index('business')] += 12
+        # 稳定排序：同分时保持规则顺序
+        orders = np.argsort(-scores, axis=1, kind='stable')
+        matched = (scores > 0).sum(axis=1)
+        results = []
+        for row, order, count in zip(scores.tolist(), orders.tolist(), matched.tolist()):
+            results.append({self.categories[idx]: row[idx] for idx in order[:count]})
+        return results
+
+    def primary_category(self, labels: Dict[str, float]) -> str:
+        """返回得分最高的分类（同分时按规则顺序），得分不足 min_score 时返回 others"""
+        for category, score in labels.items():
+            return category if score >= self.min_score else FALLBACK_CATEGORY
+        return FALLBACK_CATEGORY
+
+    def categorize(self, stories: Sequence[Dict], extra_categories: Iterable[str] = ()) -> Dict[str, List[Dict]]:
+        """
+        按主分类分组，并在每个故事上添加 categories 字段（多标签得分）
+
+        Args:
+            stories: 故事列表
+            extra_categories: 即使没有故事也要出现在结果中的分类
+
+        Returns:
+            {分类: [故事, ...]}，始终包含全部已知分类和 others
+        """
+        grouped = {category: [] for category in (*self.categories, *extra_categories, FALLBACK_CATEGORY)}
+        for story, labels in zip(stories, self.classify(stories)):
+            story['categories'] = labels
+            grouped.setdefault(self.primary_category(labels), []).append(story)
+        return grouped
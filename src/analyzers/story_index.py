@@ -0,0 +1,196 @@
+"""
+历史故事索引
+对 Hacker News 客户端见过的所有故事建立持久化的近似最近邻索引，
+用于查找相关旧闻和跨小时的重复故事
+"""
+
+import os
+import json
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import urlparse
+
+import numpy as np
+
+from .embeddings import get_embedder, EmbeddingCache
+
+try:
+    from src.utils.ann_index import IVFIndex
+    from src.logger import LOG
+except ImportError:
+    from utils.ann_index import IVFIndex
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+class StoryIndex:
+    """
+    持久化的历史故事向量索引
+
+    向量保存在内存映射的 EmbeddingCache 中，元数据以追加方式写入 stories.jsonl，
+    IVF 簇中心和分配结果保存在 ivf.npz。插入是增量的，查询只扫描少量簇。
+    """
+
+    # 元数据中保留的字段
+    META_FIELDS = ('id', 'title', 'url', 'score', 'by', 'time')
+
+    def __init__(self, index_dir='cache/story_index', embedder=None, embedding_model=None, nprobe=4):
+        """
+        初始化故事索引
+
+        Args:
+            index_dir: 索引目录
+            embedder: 嵌入器实例，为None时使用 embedding_model 对应的共享嵌入器
+            embedding_model: sentence-transformers 模型名称
+            nprobe: 查询时探查的簇数量
+        """
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+        self.embedder = embedder or get_embedder(embedding_model)
+        self.vectors = EmbeddingCache(os.path.join(index_dir, 'vectors'), self.embedder.dim, self.embedder.model_id)
+        self.meta_path = os.path.join(index_dir, self.embedder.model_id, 'stories.jsonl')
+        self.ivf_path = os.path.join(index_dir, self.embedder.model_id, 'ivf.npz')
+        os.makedirs(os.path.dirname(self.meta_path), exist_ok=True)
+
+        # 行号 -> 元数据
+        self.meta: Dict[int, Dict] = {}
+        self._load_meta()
+
+        self.index = IVFIndex(nprobe=nprobe)
+        if os.path.exists(self.ivf_path):
+            try:
+                self.index.load(self.ivf_path, self._indexed_vectors())
+            except Exception as e:
+                LOG.warning(f"无法加载故事索引，重新构建：{e}")
+                self.index.build(self._indexed_vectors())
+        else:
+            self.index.build(self._indexed_vectors())
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def __contains__(self, story_id) -> bool:
+        return story_id in self.vectors
+
+    def _load_meta(self):
+        if not os.path.exists(self.meta_path):
+            return
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 写入中断导致的半行，忽略
+                    continue
+                row = self.vectors.rows.get(str(record.get('id')))
+                if row is not None:
+                    self.meta[row] = record
+
+    def _indexed_vectors(self) -> np.ndarray:
+        return self.vectors.vectors[:len(self.vectors)]
+
+    @staticmethod
+    def _embedding_input(story: Dict) -> str:
+        title = story.get('title', '')
+        domain = urlparse(story.get('url') or '').netloc
+        return f"{title} ({domain})" if domain else title
+
+    def insert(self, stories: Sequence[Dict], date: Optional[str] = None, hour: Optional[str] = None) -> int:
+        """
+        增量插入故事，已索引过的故事会被跳过
+
+        Args:
+            stories: 故事列表
+            date: 首次出现的日期 (YYYY-MM-DD)
+            hour: 首次出现的小时 (HH)
+
+        Returns:
+            新插入的故事数量
+        """
+        new_stories = []
+        seen = set()
+        for story in stories:
+            story_id = story.get('id')
+            if story_id is None or story_id in self.vectors or story_id in seen or not story.get('title'):
+                continue
+            seen.add(story_id)
+            new_stories.append(story)
+        if not new_stories:
+            return 0
+
+        embeddings = self.embedder.embed([self._embedding_input(s) for s in new_stories])
+        self.vectors.put_many([s['id'] for s in new_stories], embeddings)
+
+        first_seen = f"{date} {hour}:00" if date and hour else None
+        with open(self.meta_path, 'a', encoding='utf-8') as f:
+            for story in new_stories:
+                record = {field: story.get(field) for field in self.META_FIELDS}
+                record['first_seen'] = first_seen
+                self.meta[self.vectors.rows[str(story['id'])]] = record
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+        self.index.update(self._indexed_vectors())
+        self.index.save(self.ivf_path)
+        LOG.debug(f"故事索引新增 {len(new_stories)} 条，共 {len(self)} 条")
+        return len(new_stories)
+
+    def _search(self, query: np.ndarray, k: int, exclude_id=None, min_similarity: float = 0.0) -> List[Dict]:
+        sims, rows = self.index.search(query, k + 1)
+        results = []
+        for sim, row in zip(sims[0], rows[0]):
+            if row < 0 or sim < min_similarity:
+                continue
+            record = self.meta.get(int(row))
+            if record is None or (exclude_id is not None and record.get('id') == exclude_id):
+                continue
+            results.append(dict(record, similarity=float(sim)))
+            if len(results) >= k:
+                break
+        return results
+
+    def query(self, story_id=None, text: Optional[str] = None, k: int = 5, min_similarity: float = 0.0) -> List[Dict]:
+        """
+        查询相似的历史故事
+
+        Args:
+            story_id: 已索引故事的ID（结果中排除其自身）
+            text: 自由文本查询
+            k: 返回数量
+            min_similarity: 最低相似度
+
+        Returns:
+            故事元数据列表，附带 similarity 字段
+        """
+        if story_id is not None:
+            query, missing = self.vectors.get_many([story_id])
+            if missing:
+                return []
+        elif text:
+            query = self.embedder.embed([text])
+        else:
+            raise ValueError("必须提供 story_id 或 text")
+        return self._search(query, k, exclude_id=story_id, min_similarity=min_similarity)
+
+    def related(self, story: Dict, k: int = 3, min_similarity: float = 0.5) -> List[Dict]:
+        """返回与给定故事相关的其他历史故事"""
+        if story.get('id') in self.vectors:
+            return self.query(story_id=story['id'], k=k, min_similarity=min_similarity)
+        return self._search(self.embedder.embed([self._embedding_input(story)]), k,
+                            exclude_id=story.get('id'), min_similarity=min_similarity)
+
+    def find_duplicates(self, stories: Sequence[Dict], threshold: float = 0.9) -> Dict:
+        """
+        查找与历史故事（不同ID）高度相似的故事，例如重复提交
+
+        Args:
+            stories: 故事列表
+            threshold: 判定为重复的相似度阈值
+
+        Returns:
+            {故事ID: 最相似的历史故事元数据}
+        """
+        duplicates = {}
+        for story in stories:
+            matches = self.related(story, k=1, min_similarity=threshold)
+            if matches:
+                duplicates[story.get('id')] = matches[0]
+        return duplicates
@@ -26,6 +26,8 @@ from sklearn.cluster import DBSCAN, KMeans
 from sklearn.decomposition import TruncatedSVD, LatentDirichletAllocation
 from sklearn.metrics.pairwise import cosine_similarity
 
+from .trend_engine import TopicTrendEngine
+
 # 导入日志
 try:
     from src.logger import LOG
@@ -33,6 +35,11 @@ except ImportError:
     import logging
     LOG = logging.getLogger(__name__)
 
+try:
+    from src.utils.dedup import dedup_stories
+except ImportError:
+    from utils.dedup import dedup_stories
+
 # 确保NLTK数据已下载
 def ensure_nltk_data():
     """确保NLTK必要的数据包已下载"""
@@ -111,8 +118,12 @@ class HackerNewsTopicAnalyzer:
             ngram_range=(1, 2)  # 同时考虑单词和双词组合
         )
         
-        # 历史话题数据
-        self.historical_topics = {}
+        # 话题趋势历史
+        self.trend_engine = TopicTrendEngine(cache_dir)
+        if not len(self.trend_engine):
+            imported = self.trend_engine.import_legacy_snapshots(self._load_legacy_topics)
+            if imported:
+                LOG.info(f"已将 {imported} 个小时的旧版话题数据导入趋势历史")
     
     def preprocess_text(self, text):
         """
@@ -171,7 +182,8 @@ class HackerNewsTopicAnalyzer:
         processed_texts = []
         metadata = []
         
-        for story in stories:
+        # 折叠近重复的故事，避免同一新闻的多次提交单独成簇
+        for story in dedup_stories(stories):
             # 提取相关字段
             story_id = story.get('id')
             title = story.get('title', '')
@@ -329,7 +341,8 @@ class HackerNewsTopicAnalyzer:
                 'trends': {
                     'emerging': [],
                     'continuing': [],
-                    'fading': []
+                    'fading': [],
+                    'horizons': {}
                 }
             }
         
@@ -355,16 +368,9 @@ class HackerNewsTopicAnalyzer:
                 if topic_idx >= 0 and topic_idx < len(topics):
                     stories_by_topic[topic_idx].append(metadata[i])
         
-        # 加载历史话题用于趋势分析
-        prev_hour_key = self._get_previous_hour_key(date, hour)
-        historical_topics = self._load_historical_topics(prev_hour_key)
-        
-        # 趋势分析
-        trends = self._analyze_trends(topics, historical_topics)
-        
-        # 保存当前话题
-        current_key = f"{date}_{hour}"
-        self._save_topics(current_key, topics)
+        # 多时间窗口趋势分析，并将当前话题写入滚动历史
+        trends = self.trend_engine.analyze(topics, date, hour)
+        self.trend_engine.record(topics, date, hour)
         
         return {
             'topics': topics,
@@ -374,115 +380,15 @@ class HackerNewsTopicAnalyzer:
             'hour': hour
         }
     
-    def _get_previous_hour_key(self, date, hour):
-        """获取前一小时的键"""
-        dt = datetime.strptime(f"{date} {hour}:00:00", "%Y-%m-%d %H:%M:%S")
-        prev_dt = dt - timedelta(hours=1)
-        return f"{prev_dt.strftime('%Y-%m-%d')}_{prev_dt.strftime('%H')}"
-    
-    def _load_historical_topics(self, key):
-        """加载历史话题数据"""
-        file_path = os.path.join(self.cache_dir, f"{key}.json")
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r') as f:
-                    return json.load(f)
-            except:
-                LOG.warning(f"无法加载历史话题数据：{file_path}")
-        return []
-    
-    def _save_topics(self, key, topics):
-        """保存当前话题数据"""
-        file_path = os.path.join(self.cache_dir, f"{key}.json") 
+    def _load_legacy_topics(self, date, hour):
+        """加载旧版按小时保存的话题 JSON（仅用于向趋势历史迁移）"""
+        file_path = os.path.join(self.cache_dir, f"{date}_{hour}.json")
         try:
-            with open(file_path, 'w') as f:
-                json.dump(topics, f)
-        except:
-            LOG.warning(f"无法保存话题数据：{file_path}")
-    
-    def _analyze_trends(self, current_topics, historical_topics):
-        """分析话题趋势"""
-        if not historical_topics or not current_topics:
-            # 没有历史数据或当前话题为空，所有话题都是新兴的
-            return {
-                'emerging': list(range(len(current_topics))),
-                'continuing': [],
-                'fading': []
-            }
-        
-        # 计算话题相似度
-        similarity_matrix = self._compute_topic_similarity(current_topics, historical_topics)
-        
-        # 识别趋势
-        emerging = []
-        continuing = []
-        fading_hist_indices = list(range(len(historical_topics)))
-        
-        threshold = 0.3  # 话题相似度阈值
-        
-        # 对每个当前话题
-        for i, topic in enumerate(current_topics):
-            max_sim = 0
-            max_idx = -1
-            
-            # 查找最相似的历史话题
-            for j, hist_topic in enumerate(historical_topics):
-                if similarity_matrix[i][j] > max_sim:
-                    max_sim = similarity_matrix[i][j]
-                    max_idx = j
-            
-            if max_sim >= threshold:
-                # 话题持续
-                continuing.append({
-                    'current_idx': i,
-                    'historical_idx': max_idx,
-                    'similarity': max_sim
-                })
-                if max_idx in fading_hist_indices:
-                    fading_hist_indices.remove(max_idx)
-            else:
-                # 新话题
-                emerging.append(i)
-        
-        return {
-            'emerging': emerging,
-            'continuing': continuing,
-            'fading': fading_hist_indices
-        }
-    
-    def _compute_topic_similarity(self, topics1, topics2):
-        """计算两组话题间的相似度"""
-        similarity_matrix = []
-        
-        for topic1 in topics1:
-            row = []
-            keywords1 = dict(topic1.get('keywords', []))
-            
-            for topic2 in topics2:
-                keywords2 = dict(topic2.get('keywords', []))
-                
-                # 计算共同关键词的相似度
-                common_keywords = set(keywords1.keys()) & set(keywords2.keys())
-                if not common_keywords:
-                    row.append(0)
-                    continue
-                
-                # 计算共同关键词的权重相似度
-                similarity = 0
-                for keyword in common_keywords:
-                    similarity += min(keywords1.get(keyword, 0), keywords2.get(keyword, 0))
-                
-                # 归一化
-                norm1 = sum(keywords1.values())
-                norm2 = sum(keywords2.values())
-                if norm1 and norm2:
-                    similarity /= (norm1 * norm2) ** 0.5
-                
-                row.append(similarity)
-            
-            similarity_matrix.append(row)
-        
-        return similarity_matrix
+            with open(file_path, 'r') as f:
+                return json.load(f)
+        except Exception:
+            LOG.warning(f"无法加载历史话题数据：{file_path}")
+        return []
     
     def generate_report(self, analysis_result):
         """
@@ -514,6 +420,18 @@ class HackerNewsTopicAnalyzer:
             report.append(f"- 新兴话题: **{len(trends['emerging'])}** 个\n")
         if trends['continuing']:
             report.append(f"- 持续话题: **{len(trends['continuing'])}** 个\n")
+        if trends.get('fading'):
+            report.append(f"- 降温话题: **{len(trends['fading'])}** 个\n")
+        
+        # 各时间窗口的新兴/持续话题数量
+        horizons = trends.get('horizons', {})
+        if horizons:
+            report.append("\n| 时间窗口 | 新兴 | 持续 | 降温 |")
+            report.append("| --- | --- | --- | --- |")
+            for name, horizon in horizons.items():
+                report.append(f"| {name} | {len(horizon['emerging'])} | "
+                              f"{len(horizon['continuing'])} | {len(horizon['fading'])} |")
+            report.append("")
         
         # 每个话题详情
         report.append(f"\n## 话题详情\n")
@@ -533,11 +451,19 @@ class HackerNewsTopicAnalyzer:
                 topic_idx = cont['current_idx']
                 if topic_idx < len(topics):
                     topic = topics[topic_idx]
-                    report.append(self._format_topic_section(topic, stories_by_topic.get(topic_idx, []), is_continuing=True))
+                    report.append(self._format_topic_section(topic, stories_by_topic.get(topic_idx, []), is_continuing=True,
+                                                             age_hours=cont.get('age_hours')))
+        
+        # 最后列出降温话题
+        if trends.get('fading'):
+            report.append(f"### 降温话题\n")
+            for fading in trends['fading']:
+                report.append(f"- {fading['keywords']} (最后出现: {fading['last_seen']})")
+            report.append("")
         
         return '\n'.join(report)
     
-    def _format_topic_section(self, topic, stories, is_new=False, is_continuing=False):
+    def _format_topic_section(self, topic, stories, is_new=False, is_continuing=False, age_hours=None):
         """格式化单个话题的报告部分"""
         # 获取关键词
         keywords = topic.get('keywords', [])
@@ -545,6 +471,8 @@ class HackerNewsTopicAnalyzer:
         
         topic_title = "🔥 " if is_new else "📌 " if is_continuing else ""
         topic_title += f"**{keyword_text}**"
+        if is_continuing and age_hours:
+            topic_title += f" (已持续约 {age_hours} 小时)"
         
         section = [f"#### {topic_title}\n"]
         
@@ -596,6 +524,8 @@ if __name__ == "__main__":
         os.makedirs(f"hacker_news/{date}", exist_ok=True)
         with open(f"hacker_news/{date}/{hour}_topics.md", 'w') as f:
             f.write(report)
+        from src.utils.search_index import index_report_file
+        index_report_file(f"hacker_news/{date}/{hour}_topics.md")
     else:
         print("无法获取Hacker News故事")
 
@@ -0,0 +1,386 @@
+"""
+话题趋势引擎
+维护一个紧凑的滚动话题向量历史（7 天小时粒度 + 90 天日粒度），
+并在一次向量化计算中给出 1h / 24h / 7d / 30d 多个时间窗口的话题趋势
+"""
+
+import os
+import calendar
+import hashlib
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# 导入日志
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+# 存储层级
+TIER_HOURLY = 0
+TIER_DAILY = 1
+
+
+class TopicTrendEngine:
+    """
+    多时间窗口话题趋势引擎
+
+    每个话题的关键词通过特征哈希映射为固定维度的单位向量，全部历史记录保存在
+    同一个按时间排序的 npz 文件中。趋势分析时只需对当前话题与窗口内历史做一次
+    矩阵乘法，再按各时间窗口的起点切分即可得到所有窗口的结果。
+    """
+
+    # 时间窗口名称 -> 小时数；超出小时保留期的 30d 窗口读取日粒度记录
+    HORIZONS = {'1h': 1, '24h': 24, '7d': 24 * 7, '30d': 24 * 30}
+
+    def __init__(self, cache_dir='cache/topic_analysis', dim=512,
+                 similarity_threshold=0.3, hourly_retention_hours=24 * 7,
+                 daily_retention_days=90, primary_horizon='24h',
+                 merge_threshold=0.8):
+        """
+        初始化趋势引擎
+
+        Args:
+            cache_dir: 历史存储目录
+            dim: 话题向量维度
+            similarity_threshold: 判定为同一话题的余弦相似度阈值
+            hourly_retention_hours: 小时粒度记录的保留时长（小时）
+            daily_retention_days: 日粒度记录的保留时长（天）
+            primary_horizon: 兼容旧接口的 emerging/continuing/fading 所使用的窗口
+            merge_threshold: 压缩为日粒度时合并相似话题的阈值
+        """
+        if primary_horizon not in self.HORIZONS:
+            raise ValueError(f"未知的时间窗口: {primary_horizon}")
+
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.store_path = os.path.join(cache_dir, 'trend_history.npz')
+
+        self.dim = dim
+        self.similarity_threshold = similarity_threshold
+        self.hourly_retention_hours = hourly_retention_hours
+        self.daily_retention_days = daily_retention_days
+        self.primary_horizon = primary_horizon
+        self.merge_threshold = merge_threshold
+
+        self._load()
+
+    # ------------------------------------------------------------------
+    # 向量化
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def hour_index(date, hour):
+        """将日期和小时字符串转换为自纪元以来的小时序号"""
+        dt = datetime.strptime(f"{date} {int(hour):02d}", "%Y-%m-%d %H")
+        return calendar.timegm(dt.timetuple()) // 3600
+
+    @staticmethod
+    def format_hour_index(index):
+        """将小时序号格式化为 'YYYY-MM-DD HH:00'"""
+        return (datetime(1970, 1, 1) + timedelta(hours=int(index))).strftime('%Y-%m-%d %H:00')
+
+    def _hash_token(self, token) -> Tuple[int, float]:
+        """稳定的特征哈希，返回 (桶下标, 符号)"""
+        digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+        value = int.from_bytes(digest, 'little')
+        return value % self.dim, (1.0 if (value >> 63) & 1 else -1.0)
+
+    def topic_vector(self, topic) -> np.ndarray:
+        """
+        将话题关键词映射为单位向量
+
+        多词关键词（如 "syntax highlighting"）除整体外，每个单词按一半权重计入，
+        这样相邻小时里关键词组合略有不同的同一话题依然可以匹配上。
+        """
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for keyword, weight in topic.get('keywords', []):
+            weight = float(weight)
+            idx, sign = self._hash_token(keyword)
+            vector[idx] += sign * weight
+            parts = keyword.split()
+            if len(parts) > 1:
+                for part in parts:
+                    idx, sign = self._hash_token(part)
+                    vector[idx] += sign * weight * 0.5
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def _topic_matrix(self, topics) -> np.ndarray:
+        if not topics:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack([self.topic_vector(topic) for topic in topics])
+
+    @staticmethod
+    def _topic_label(topic) -> str:
+        return ', '.join(kw for kw, _ in topic.get('keywords', []))
+
+    # ------------------------------------------------------------------
+    # 存储
+    # ------------------------------------------------------------------
+
+    def _reset(self):
+        self.timestamps = np.zeros(0, dtype=np.int64)
+        self.tiers = np.zeros(0, dtype=np.int8)
+        self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self.labels = np.zeros(0, dtype='<U256')
+
+    def _load(self):
+        """加载历史存储；不存在或损坏时从空历史开始"""
+        self._reset()
+        if not os.path.exists(self.store_path):
+            return
+
+        try:
+            with np.load(self.store_path, allow_pickle=False) as data:
+                vectors = data['vectors'].astype(np.float32)
+                if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+                    LOG.warning(f"话题趋势历史维度不匹配，忽略旧数据：{self.store_path}")
+                    return
+                self.timestamps = data['timestamps'].astype(np.int64)
+                self.tiers = data['tiers'].astype(np.int8)
+                self.vectors = vectors
+                self.labels = data['labels'].astype('<U256')
+        except Exception as e:
+            LOG.warning(f"无法加载话题趋势历史：{self.store_path}，{e}")
+            self._reset()
+
+    def _save(self):
+        """原子写入历史存储（先写临时文件再替换）"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.npz.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, timestamps=self.timestamps, tiers=self.tiers,
+                         vectors=self.vectors, labels=self.labels)
+            os.replace(tmp_path, self.store_path)
+        except Exception as e:
+            LOG.warning(f"无法保存话题趋势历史：{self.store_path}，{e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    # ------------------------------------------------------------------
+    # 趋势分析
+    # ------------------------------------------------------------------
+
+    def analyze(self, current_topics, date, hour) -> Dict:
+        """
+        计算当前话题在各时间窗口下的趋势
+
+        Args:
+            current_topics: 当前话题列表（extract_topic_keywords 的输出）
+            date: 日期字符串 (YYYY-MM-DD)
+            hour: 小时字符串 (HH)
+
+        Returns:
+            趋势字典。顶层的 emerging/continuing/fading 对应 primary_horizon，
+            与旧版接口保持一致；horizons 中包含每个时间窗口的完整结果。
+        """
+        now = self.hour_index(date, hour)
+        names = list(self.HORIZONS)
+        spans = np.array([self.HORIZONS[name] for name in names], dtype=np.int64)
+
+        # 只取最大窗口内、当前小时之前的历史（当前小时的旧记录会被本次结果覆盖）
+        lo = int(np.searchsorted(self.timestamps, now - spans.max(), side='left'))
+        hi = int(np.searchsorted(self.timestamps, now, side='left'))
+        window_ts = self.timestamps[lo:hi]
+        window_labels = self.labels[lo:hi]
+
+        current = self._topic_matrix(current_topics)
+        # (话题数, 历史数) 一次矩阵乘法得到全部相似度
+        sims = current @ self.vectors[lo:hi].T
+
+        # (窗口数, 历史数)：每条历史记录是否落在各窗口内
+        in_horizon = window_ts[None, :] >= (now - spans)[:, None]
+        # (窗口数, 话题数, 历史数)：窗口外的相似度置为 -1
+        masked = np.where(in_horizon[:, None, :], sims[None, :, :], -1.0)
+
+        if sims.shape[1]:
+            best_sim = masked.max(axis=2)
+            best_idx = masked.argmax(axis=2)
+            # 话题在窗口内首次被匹配到的时间，用于计算持续时长
+            matched = masked >= self.similarity_threshold
+            first_seen = np.where(matched, window_ts[None, None, :], now).min(axis=2)
+            # 每条历史记录与当前任一话题的最大相似度
+            hist_best = sims.max(axis=0) if sims.shape[0] else np.full(sims.shape[1], -1.0)
+        else:
+            best_sim = np.full((len(names), len(current_topics)), -1.0)
+            best_idx = np.zeros((len(names), len(current_topics)), dtype=np.int64)
+            first_seen = np.full((len(names), len(current_topics)), now)
+            hist_best = np.zeros(0)
+
+        horizons = {}
+        for h, name in enumerate(names):
+            emerging = []
+            continuing = []
+            for i in range(len(current_topics)):
+                sim = float(best_sim[h, i])
+                if sim >= self.similarity_threshold:
+                    continuing.append({
+                        'current_idx': i,
+                        'historical_idx': int(lo + best_idx[h, i]),
+                        'similarity': sim,
+                        'age_hours': int(now - first_seen[h, i]),
+                    })
+                else:
+                    emerging.append(i)
+
+            horizons[name] = {
+                'emerging': emerging,
+                'continuing': continuing,
+                'fading': self._fading(window_ts, window_labels, hist_best, in_horizon[h]),
+            }
+
+        primary = horizons[self.primary_horizon]
+        return {
+            'emerging': primary['emerging'],
+            'continuing': primary['continuing'],
+            'fading': primary['fading'],
+            'horizons': horizons,
+        }
+
+    def _fading(self, window_ts, window_labels, hist_best, in_horizon) -> List[Dict]:
+        """
+        降温话题：窗口内最近一次快照中出现过、但当前已无相似话题的记录
+        """
+        candidates = np.nonzero(in_horizon)[0]
+        if not len(candidates):
+            return []
+
+        latest = window_ts[candidates].max()
+        fading = []
+        for j in candidates:
+            if window_ts[j] == latest and hist_best[j] < self.similarity_threshold:
+                fading.append({
+                    'keywords': str(window_labels[j]),
+                    'last_seen': self.format_hour_index(window_ts[j]),
+                })
+        return fading
+
+    # ------------------------------------------------------------------
+    # 记录与压缩
+    # ------------------------------------------------------------------
+
+    def record(self, topics, date, hour, save=True):
+        """
+        记录当前小时的话题并保存
+
+        同一小时重复运行时会替换之前的记录；超过小时保留期的记录压缩为日粒度，
+        超过日保留期的记录被丢弃。
+
+        Args:
+            topics: 话题列表
+            date: 日期字符串 (YYYY-MM-DD)
+            hour: 小时字符串 (HH)
+            save: 是否立即写入磁盘，批量记录时可在最后统一保存
+        """
+        now = self.hour_index(date, hour)
+
+        keep = ~((self.timestamps == now) & (self.tiers == TIER_HOURLY))
+        timestamps = np.concatenate([self.timestamps[keep], np.full(len(topics), now, dtype=np.int64)])
+        tiers = np.concatenate([self.tiers[keep], np.full(len(topics), TIER_HOURLY, dtype=np.int8)])
+        vectors = np.vstack([self.vectors[keep], self._topic_matrix(topics)])
+        labels = np.concatenate([self.labels[keep],
+                                 np.array([self._topic_label(t) for t in topics], dtype='<U256')])
+
+        order = np.argsort(timestamps, kind='stable')
+        self.timestamps = timestamps[order]
+        self.tiers = tiers[order]
+        self.vectors = vectors[order]
+        self.labels = labels[order]
+
+        self._compact(now)
+        if save:
+            self._save()
+
+    def _compact(self, now):
+        """将过期的小时记录按天合并，并丢弃超出日保留期的记录"""
+        hourly_cutoff = now - self.hourly_retention_hours
+        daily_cutoff = now - self.daily_retention_days * 24
+
+        alive = self.timestamps >= daily_cutoff
+        expired = alive & (self.tiers == TIER_HOURLY) & (self.timestamps < hourly_cutoff)
+        if not expired.any() and alive.all():
+            return
+
+        keep = alive & ~expired
+        days = self.timestamps[expired] // 24 * 24
+        exp_vectors = self.vectors[expired]
+        exp_labels = self.labels[expired]
+
+        new_ts, new_vectors, new_labels = [], [], []
+        for day in np.unique(days):
+            rows = np.nonzero(days == day)[0]
+            merged, merged_labels = self._merge_similar(exp_vectors[rows], exp_labels[rows])
+            new_ts.extend([day] * len(merged))
+            new_vectors.extend(merged)
+            new_labels.extend(merged_labels)
+
+        timestamps = np.concatenate([self.timestamps[keep], np.array(new_ts, dtype=np.int64)])
+        tiers = np.concatenate([self.tiers[keep], np.full(len(new_ts), TIER_DAILY, dtype=np.int8)])
+        vectors = np.vstack([self.vectors[keep]] + ([np.vstack(new_vectors)] if new_vectors else []))
+        labels = np.concatenate([self.labels[keep], np.array(new_labels, dtype='<U256')])
+
+        order = np.argsort(timestamps, kind='stable')
+        self.timestamps = timestamps[order]
+        self.tiers = tiers[order]
+        self.vectors = vectors[order].astype(np.float32)
+        self.labels = labels[order]
+
+    def _merge_similar(self, vectors, labels):
+        """贪心合并同一天内相似的话题向量"""
+        merged, merged_labels, counts = [], [], []
+        for vector, label in zip(vectors, labels):
+            if merged:
+                sims = np.vstack(merged) @ vector
+                k = int(sims.argmax())
+                if sims[k] >= self.merge_threshold:
+                    total = merged[k] * counts[k] + vector
+                    counts[k] += 1
+                    norm = np.linalg.norm(total)
+                    merged[k] = total / norm if norm > 0 else total
+                    continue
+            merged.append(vector.copy())
+            merged_labels.append(label)
+            counts.append(1)
+        return merged, merged_labels
+
+    def import_legacy_snapshots(self, load_topics) -> int:
+        """
+        从旧版按小时保存的 JSON 文件导入历史
+
+        Args:
+            load_topics: 可调用对象，参数为 (date, hour)，返回该小时的话题列表
+
+        Returns:
+            导入的小时数
+        """
+        imported = 0
+        for name in sorted(os.listdir(self.cache_dir)):
+            stem, ext = os.path.splitext(name)
+            if ext != '.json' or '_' not in stem:
+                continue
+            date, hour = stem.rsplit('_', 1)
+            try:
+                now = self.hour_index(date, hour)
+            except ValueError:
+                continue
+            if (self.timestamps == now).any():
+                continue
+            topics = load_topics(date, hour)
+            if topics:
+                self.record(topics, date, hour, save=False)
+                imported += 1
+        if imported:
+            self._save()
+        return imported
@@ -6,21 +6,25 @@ import asyncio   # 导入asyncio库用于异步编程
 from datetime import datetime, date, timedelta, timezone  # 导入日期处理模块, 添加timezone
 import os  # 导入os模块用于文件和目录操作
 import json # Added for json.JSONDecodeError handling in get_recent_releases
+from contextlib import asynccontextmanager
 from typing import Dict, List, Any, Optional, Union
 
 # 导入缓存管理器和日志
 try:
     from src.utils.cache_manager import CacheManager
+    from src.utils.search_index import index_report_file
     from src.logger import LOG
 except ImportError:
     try:
         from utils.cache_manager import CacheManager
+        from utils.search_index import index_report_file
         from logger import LOG
     except ImportError:
         import logging
         LOG = logging.getLogger(__name__)
         LOG.error("无法导入CacheManager，将不使用缓存功能")
         CacheManager = None
+        index_report_file = lambda path: None
 
 class GitHubClient:
     def __init__(self, token, use_cache=True, cache_ttl=3600):
@@ -36,6 +40,15 @@ class GitHubClient:
             self.cache = None
             LOG.info("未启用GitHub API缓存")
 
+    @asynccontextmanager
+    async def _session_scope(self, session=None):
+        """复用调用方传入的会话；未传入时创建一个仅用于本次请求的会话"""
+        if session is not None:
+            yield session
+        else:
+            async with aiohttp.ClientSession() as own_session:
+                yield own_session
+
     def fetch_updates(self, repo, since=None, until=None):
         # 获取指定仓库的更新，可以指定开始和结束日期
         updates = {
@@ -45,7 +58,7 @@ class GitHubClient:
         }
         return updates
     
-    async def async_fetch_updates(self, repo, since=None, until=None):
+    async def async_fetch_updates(self, repo, since=None, until=None, session=None):
         """
         异步获取指定仓库的更新
         
@@ -53,14 +66,15 @@ class GitHubClient:
             repo: 仓库名称 (格式: owner/repo)
             since: 开始日期
             until: 结束日期
+            session: 可选的共享 aiohttp 会话，未提供时每个请求各自创建
             
         Returns:
             包含commits, issues, pull_requests的字典
         """
         # 使用asyncio.gather并行执行多个异步任务
-        commits_task = self.async_fetch_commits(repo, since, until)
-        issues_task = self.async_fetch_issues(repo, since, until)
-        prs_task = self.async_fetch_pull_requests(repo, since, until)
+        commits_task = self.async_fetch_commits(repo, since, until, session=session)
+        issues_task = self.async_fetch_issues(repo, since, until, session=session)
+        prs_task = self.async_fetch_pull_requests(repo, since, until, session=session)
         
         # 等待所有任务完成
         commits, issues, prs = await asyncio.gather(
@@ -109,7 +123,7 @@ class GitHubClient:
                  LOG.error("无响应数据可用")
             return []  # Handle failure case
     
-    async def async_fetch_commits(self, repo, since=None, until=None):
+    async def async_fetch_commits(self, repo, since=None, until=None, session=None):
         """异步获取提交记录"""
         LOG.debug(f"准备异步获取 {repo} 的 Commits")
         
@@ -128,7 +142,7 @@ class GitHubClient:
             params['until'] = until
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._session_scope(session) as session:
                 async with session.get(url, headers=self.headers, params=params, timeout=10) as response:
                     if response.status == 200:
                         result = await response.json()
@@ -177,7 +191,7 @@ class GitHubClient:
                  LOG.error("无响应数据可用")
             return []
     
-    async def async_fetch_issues(self, repo, since=None, until=None):
+    async def async_fetch_issues(self, repo, since=None, until=None, session=None):
         """异步获取问题"""
         LOG.debug(f"准备异步获取 {repo} 的 Issues")
         
@@ -190,9 +204,11 @@ class GitHubClient:
         
         url = f'https://api.github.com/repos/{repo}/issues'
         params = {'state': 'closed', 'since': since, 'until': until}
+        # 与 requests 不同，aiohttp 不接受值为 None 的查询参数
+        params = {k: v for k, v in params.items() if v is not None}
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._session_scope(session) as session:
                 async with session.get(url, headers=self.headers, params=params, timeout=10) as response:
                     if response.status == 200:
                         result = await response.json()
@@ -241,7 +257,7 @@ class GitHubClient:
                  LOG.error("无响应数据可用")
             return []
     
-    async def async_fetch_pull_requests(self, repo, since=None, until=None):
+    async def async_fetch_pull_requests(self, repo, since=None, until=None, session=None):
         """异步获取拉取请求"""
         LOG.debug(f"准备异步获取 {repo} 的 Pull Requests")
         
@@ -254,9 +270,11 @@ class GitHubClient:
         
         url = f'https://api.github.com/repos/{repo}/pulls'
         params = {'state': 'closed', 'since': since, 'until': until}
+        # 与 requests 不同，aiohttp 不接受值为 None 的查询参数
+        params = {k: v for k, v in params.items() if v is not None}
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._session_scope(session) as session:
                 async with session.get(url, headers=self.headers, params=params, timeout=10) as response:
                     if response.status == 200:
                         result = await response.json()
@@ -365,7 +383,8 @@ class GitHubClient:
         
         return recent_releases
     
-    async def async_get_recent_releases(self, owner: str, repo_name: str, days_limit: int = 7, count_limit: int = 5):
+    async def async_get_recent_releases(self, owner: str, repo_name: str, days_limit: int = 7, count_limit: int = 5,
+                                        session: Optional[aiohttp.ClientSession] = None):
         """异步获取最近的发布版本"""
         repo_full_name = f"{owner}/{repo_name}"
         LOG.debug(f"准备异步获取 {repo_full_name} 的最新 Releases (最近 {days_limit} 天, 最多 {count_limit} 条)")
@@ -380,7 +399,7 @@ class GitHubClient:
         url = f"https://api.github.com/repos/{owner}/{repo_name}/releases"
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._session_scope(session) as session:
                 async with session.get(url, headers=self.headers, timeout=10) as response:
                     if response.status == 200:
                         releases_data = await response.json()
@@ -461,6 +480,7 @@ class GitHubClient:
                 file.write("No issues closed today.\n")
         
         LOG.info(f"[{repo}]项目每日进展文件生成： {file_path}")
+        index_report_file(file_path)
         return file_path
 
     def export_progress_by_date_range(self, repo, days):
@@ -505,6 +525,7 @@ class GitHubClient:
                 file.write("No pull requests merged in this period.\n")
         
         LOG.info(f"[{repo}]项目进展文件生成： {file_path}")
+        index_report_file(file_path)
         return file_path
     
     async def async_export_progress_by_date_range(self, repo, days):
@@ -550,6 +571,7 @@ class GitHubClient:
                 file.write("No pull requests merged in this period.\n")
         
         LOG.info(f"[{repo}]项目进展文件异步生成： {file_path}")
+        await asyncio.to_thread(index_report_file, file_path)
         return file_path
     
     async def async_batch_fetch_updates(self, repos, since=None, until=None):
@@ -589,3 +611,68 @@ class GitHubClient:
                 updates_by_repo[repo] = result
         
         return updates_by_repo
+
+    async def async_batch_fetch_project_data(self, repos, since=None, days_limit: int = 1,
+                                             release_count_limit: int = 5, max_connections: int = 8):
+        """
+        批量异步获取多个仓库生成报告所需的全部数据（提交、问题、拉取请求、发布版本）
+
+        所有请求共用一个 aiohttp 会话及其连接池，并发数由 max_connections 限制。
+
+        Args:
+            repos: 仓库名称列表 (格式: ["owner1/repo1", "owner2/repo2", ...])
+            since: 开始时间 (ISO 8601)
+            days_limit: 发布版本的时间范围（天）
+            release_count_limit: 每个仓库最多返回的发布版本数量
+            max_connections: 同时打开的最大连接数
+
+        Returns:
+            字典，键为仓库名称，值为包含commits, issues, pull_requests, releases的字典；
+            获取失败的仓库不在结果中
+        """
+        LOG.info(f"批量异步获取 {len(repos)} 个仓库的报告数据")
+
+        connector = aiohttp.TCPConnector(limit=max_connections)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async def fetch_one(repo):
+                owner, repo_name = repo.split('/', 1)
+                updates, releases = await asyncio.gather(
+                    self.async_fetch_updates(repo, since, session=session),
+                    self.async_get_recent_releases(owner, repo_name, days_limit=days_limit,
+                                                   count_limit=release_count_limit, session=session)
+                )
+                return {**updates, 'releases': releases}
+
+            results = await asyncio.gather(*(fetch_one(repo) for repo in repos), return_exceptions=True)
+
+        data_by_repo = {}
+        for repo, result in zip(repos, results):
+            if isinstance(result, Exception):
+                LOG.error(f"获取仓库 {repo} 的报告数据时发生错误: {result}")
+            else:
+                data_by_repo[repo] = result
+        return data_by_repo
+
+    def batch_fetch_project_data(self, repos, since=None, days_limit: int = 1,
+                                 release_count_limit: int = 5, timeout: Optional[float] = 120):
+        """
+        async_batch_fetch_project_data 的同步封装，在共享的事件循环线程上运行
+
+        Args:
+            repos: 仓库名称列表 (格式: ["owner1/repo1", "owner2/repo2", ...])
+            since: 开始时间 (ISO 8601)
+            days_limit: 发布版本的时间范围（天）
+            release_count_limit: 每个仓库最多返回的发布版本数量
+            timeout: 整批请求的超时时间（秒）
+
+        Returns:
+            同 async_batch_fetch_project_data
+        """
+        try:
+            from src.utils.async_runner import run_sync
+        except ImportError:
+            from utils.async_runner import run_sync
+        return run_sync(
+            self.async_batch_fetch_project_data(repos, since, days_limit, release_count_limit),
+            timeout=timeout
+        )
@@ -8,20 +8,39 @@ import os  # 导入os模块用于文件和目录操作
 from typing import List, Dict, Any, Optional, Union
 import traceback
 import json
+import copy
 
 # 导入缓存管理器和日志
 try:
     from src.utils.cache_manager import CacheManager
+    from src.utils.dedup import dedup_stories
+    from src.utils.hn_snapshots import HNSnapshotStore
+    from src.utils.story_timeseries import StoryTimeSeries, velocity_sort_key
+    from src.utils.search_index import index_report_file
+    from src.analyzers.story_categorizer import StoryCategorizer
+    from src.utils.hn_renderer import StoryView, write_report
     from src.logger import LOG
 except ImportError:
     try:
         from utils.cache_manager import CacheManager
+        from utils.dedup import dedup_stories
+        from utils.hn_snapshots import HNSnapshotStore
+        from utils.story_timeseries import StoryTimeSeries, velocity_sort_key
+        from utils.search_index import index_report_file
+        from analyzers.story_categorizer import StoryCategorizer
+        from utils.hn_renderer import StoryView, write_report
         from logger import LOG
     except ImportError:
         import logging
         LOG = logging.getLogger(__name__)
         LOG.error("无法导入CacheManager，将不使用缓存功能")
         CacheManager = None
+        dedup_stories = list
+        HNSnapshotStore = None
+        StoryTimeSeries = None
+        velocity_sort_key = lambda story: story.get('score', 0)
+        index_report_file = lambda path: None
+        StoryCategorizer = None
 
 import httpx
 
@@ -30,7 +49,7 @@ import httpx
 
 try:
     from src.llm import LLM
-    from src.config import Settings
+    from src.config import Settings, get_settings_service
 except ImportError:
     LOG.warning("未能导入LLM或Settings模块，AI总结功能将不可用")
 
@@ -40,15 +59,42 @@ class HackerNewsClient:
     用于获取HackerNews上的热门文章、评论等信息
     """
     
-    def __init__(self, use_cache=True, cache_ttl=3600):
+    # 导出 Markdown 中按顺序渲染的分类分区（others 始终最后）
+    SECTION_CATEGORIES = ('show_hn', 'ask_hn', 'tech', 'science', 'business')
+    
+    def __init__(self, use_cache=True, cache_ttl=3600, topic_analysis_config=None, category_rules=None,
+                 sample_interval_hours=1.0):
         """
         初始化HackerNews客户端
         
         Args:
             use_cache: 是否使用缓存
             cache_ttl: 缓存有效期（秒）
+            topic_analysis_config: 话题分析配置（见 Settings.get_topic_analysis_config），
+                为None时从 config.json 读取
+            category_rules: 故事分类规则（见 Settings.get_story_category_rules），
+                为None时从 config.json 读取，未配置则使用内置规则
+            sample_interval_hours: 两次导出之间的预期间隔（小时），用于计算上升速度
         """
         self.base_url = "https://hacker-news.firebaseio.com/v0"
+        self.topic_analysis_config = topic_analysis_config
+        self.category_rules = category_rules
+        # 分类器在首次使用时编译，之后复用
+        self._categorizer = None
+        # 话题分析器和历史故事索引在首次使用时创建，之后复用（可能需要加载模型）
+        self._topic_analyzer = None
+        self._story_index = None
+        # 生成 AI 摘要的 LLM 客户端及创建它时的 llm 配置段，该配置段变化后重建
+        self._summary_llm = None
+        self._summary_llm_section = None
+        # 异步导出使用的话题分析进程池及进行中的分析任务
+        self._analysis_pool = None
+        self.pending_analyses = set()
+        # 每小时的结构化快照，日报/周报直接在快照上聚合
+        self.snapshot_store = HNSnapshotStore('hacker_news') if HNSnapshotStore else None
+        # 每次抓取的分数/评论/排名采样，用于计算上升速度
+        self.timeseries = (StoryTimeSeries('hacker_news/timeseries', sample_interval_hours=sample_interval_hours)
+                           if StoryTimeSeries else None)
         
         # 初始化缓存管理器
         self.use_cache = use_cache and CacheManager is not None
@@ -404,14 +450,20 @@ class HackerNewsClient:
         
         return comments
 
-    def export_top_stories(self, date=None, hour=None, enable_ai_summary=True):
+    def export_top_stories(self, date=None, hour=None, enable_ai_summary=True, formats=('md',),
+                           wait_for_analysis=False, analysis_timeout=300):
         """
         导出当前 Hacker News 热门故事列表到 Markdown 文件
         
+        话题分析提交到工作进程后即返回，<HH>_topics.md 在分析完成时由工作进程写入。
+        
         Args:
             date: 日期字符串 (YYYY-MM-DD 格式)，如果未提供则使用当前日期
             hour: 小时字符串 (HH 格式)，如果未提供则使用当前小时
             enable_ai_summary: 是否启用AI摘要功能，默认为True
+            formats: 同时输出的格式（md / html / json），Markdown 总会输出
+            wait_for_analysis: 是否等待话题分析完成后再返回（交互式导出需要立即展示话题报告）
+            analysis_timeout: 话题分析的等待超时（秒）
             
         Returns:
             生成的 Markdown 文件路径，如果发生错误则返回 None
@@ -426,83 +478,39 @@ class HackerNewsClient:
                 LOG.warning("未找到任何Hacker News的新闻。")
                 return None
             
+            # 折叠重复提交的故事，避免重复列出和重复生成摘要
+            stories_details = dedup_stories(stories_details)
+            
             # 如果未提供 date 和 hour 参数，使用当前日期和时间
             if date is None:
                 date = datetime.now().strftime('%Y-%m-%d')
             if hour is None:
                 hour = datetime.now().strftime('%H')
 
-            # 构建存储路径
-            dir_path = os.path.join('hacker_news', date)
-            os.makedirs(dir_path, exist_ok=True)  # 确保目录存在
+            # 更新历史故事索引，关联重复提交和相关旧闻
+            self._link_related_stories(stories_details, date, hour)
+            
+            # 记录本次采样并计算上升速度
+            self._track_velocity(stories_details)
             
-            # 对故事进行分类
-            categorized_stories = self._categorize_stories(stories_details)
+            # 排序、分类各一次，AI摘要选择和报告渲染共用同一个视图
+            view = self._build_story_view(stories_details, date, hour)
             
             # 尝试为热门故事添加AI摘要
             if enable_ai_summary:
                 LOG.info("AI摘要功能已启用，正在为热门文章生成摘要...")
-                top_stories = sorted(stories_details, key=lambda x: x.get('score', 0), reverse=True)[:10]
-                self._add_ai_summaries(top_stories)
+                self._add_ai_summaries(view.by_heat[:10])
             else:
                 LOG.info("AI摘要功能已禁用，跳过摘要生成")
             
-            # 保存原始列表
-            stories_file_path = os.path.join(dir_path, f'{hour}.md')  # 定义文件路径
-            with open(stories_file_path, 'w', encoding='utf-8') as file:
-                file.write(f"# Hacker News 热门新闻 ({date} {hour}:00)\n\n")
-                file.write("本报告收集了最近一小时内Hacker News平台上的热门讨论内容。\"分数\"代表用户的投票数量，反映了文章的热度与受欢迎程度。\n\n")
-                
-                # 首先显示最热门的故事
-                file.write("## 🔥 最热门讨论\n\n")
-                # 按分数排序，取前3个
-                top_stories = sorted(stories_details, key=lambda x: x.get('score', 0), reverse=True)[:3]
-                for idx, story in enumerate(top_stories, start=1):
-                    self._write_story_entry(file, idx, story)
-                
-                # 添加展示类内容
-                if categorized_stories['show_hn']:
-                    file.write("\n## 👀 展示与分享\n\n")
-                    file.write("用户分享的项目、产品和创造。\n\n")
-                    for idx, story in enumerate(categorized_stories['show_hn'], start=1):
-                        self._write_story_entry(file, idx, story)
-                
-                # 添加问答类内容
-                if categorized_stories['ask_hn']:
-                    file.write("\n## ❓ 问答与讨论\n\n")
-                    file.write("社区成员提出的问题和讨论。\n\n")
-                    for idx, story in enumerate(categorized_stories['ask_hn'], start=1):
-                        self._write_story_entry(file, idx, story)
-                
-                # 添加技术类内容
-                if categorized_stories['tech']:
-                    file.write("\n## 💻 技术与工程\n\n")
-                    file.write("编程、开发和技术相关的热门话题。\n\n")
-                    for idx, story in enumerate(categorized_stories['tech'], start=1):
-                        self._write_story_entry(file, idx, story)
-                
-                # 添加科学类内容
-                if categorized_stories['science']:
-                    file.write("\n## 🔬 科学研究\n\n")
-                    file.write("科学发现、研究和相关讨论。\n\n")
-                    for idx, story in enumerate(categorized_stories['science'], start=1):
-                        self._write_story_entry(file, idx, story)
-                
-                # 添加商业类内容
-                if categorized_stories['business']:
-                    file.write("\n## 💼 商业与创业\n\n")
-                    file.write("商业新闻、创业和行业动态。\n\n")
-                    for idx, story in enumerate(categorized_stories['business'], start=1):
-                        self._write_story_entry(file, idx, story)
-                
-                # 添加其他类内容
-                if categorized_stories['others']:
-                    file.write("\n## 📚 其他热门内容\n\n")
-                    for idx, story in enumerate(categorized_stories['others'], start=1):
-                        self._write_story_entry(file, idx, story)
+            # 在内存中渲染后原子写入，日报聚合不会读到写了一半的文件
+            stories_file_path = write_report(view, os.path.join('hacker_news', date), self._export_formats(formats))['md']
             
-            # 执行主题分析
-            topics_file_path = self._analyze_topics(stories_details, date, hour)
+            self._save_snapshot(stories_details, date, hour, view.categories)
+            index_report_file(stories_file_path)
+            
+            # 在话题分析工作进程中执行主题分析，默认不等待其完成
+            self._run_topic_analysis(stories_details, date, hour, wait=wait_for_analysis, timeout=analysis_timeout)
             
             LOG.info(f"Hacker News热门新闻文件生成：{stories_file_path}")
             return stories_file_path
@@ -512,113 +520,237 @@ class HackerNewsClient:
             LOG.error(traceback.format_exc())
             return None
     
+    def _track_velocity(self, stories):
+        """记录本次抓取的采样，并为故事添加 points_per_hour / comments_per_hour 字段"""
+        if self.timeseries is None:
+            return
+        try:
+            self.timeseries.annotate(stories)
+        except Exception as e:
+            LOG.warning(f"计算Hacker News故事上升速度时发生错误: {e}")
+    
+    def _save_snapshot(self, stories, date, hour, categorized_stories):
+        """保存本小时的结构化快照，失败不影响 Markdown 导出"""
+        if self.snapshot_store is None:
+            return
+        try:
+            self.snapshot_store.write(stories, date, hour, categorized_stories)
+        except Exception as e:
+            LOG.error(f"保存Hacker News小时快照失败: {e}")
+    
+    @staticmethod
+    def _current_settings():
+        """
+        当前的配置快照；不触发重新加载，配置变化回调不会在导出线程中执行
+        （由守护进程的配置监视或 Streamlit 脚本线程负责重新加载）
+        """
+        return get_settings_service("config.json").current()
+    
+    def _get_categorizer(self):
+        """创建（或复用）编译好的故事分类器"""
+        if self._categorizer is None:
+            rules = self.category_rules
+            if rules is None:
+                try:
+                    rules = self._current_settings().get_story_category_rules()
+                except Exception as e:
+                    LOG.warning(f"无法读取故事分类规则，使用内置规则: {e}")
+            self._categorizer = StoryCategorizer(rules)
+        return self._categorizer
+    
     def _categorize_stories(self, stories):
         """
         对Hacker News故事进行分类
         
+        每个故事按主分类放入一个分组，并添加 categories 字段记录全部匹配分类的得分。
+        
         Args:
             stories: 故事列表
             
         Returns:
-            分类后的故事字典
-        """
-        categories = {
-            'show_hn': [],
-            'ask_hn': [],
-            'tech': [],
-            'science': [],
-            'business': [],
-            'others': []
-        }
-        
-        # 技术相关关键词
-        tech_keywords = ['programming', 'code', 'software', 'developer', 'web', 'app', 
-                         'python', 'javascript', 'rust', 'go', 'java', 'c++', 'typescript',
-                         'database', 'api', 'framework', 'library', 'algorithm', 'github',
-                         'git', 'docker', 'kubernetes', 'aws', 'cloud', 'devops', 'ai',
-                         'ml', 'machine learning', 'deep learning', 'neural', 'llm']
-        
-        # 科学相关关键词
-        science_keywords = ['science', 'research', 'study', 'physics', 'chemistry', 'biology',
-                           'astronomy', 'space', 'mars', 'nasa', 'quantum', 'medicine',
-                           'climate', 'energy', 'environment', 'genome', 'brain']
-        
-        # 商业相关关键词
-        business_keywords = ['startup', 'business', 'company', 'founder', 'investor',
-                            'venture', 'vc', 'funding', 'acquisition', 'market',
-                            'finance', 'economy', 'stock', 'crypto', 'blockchain']
-        
-        for story in stories:
-            title = story.get('title', '').lower()
-            
-            if story.get('type') == 'job' or 'hiring' in title or 'job' in title:
-                categories['business'].append(story)
-            elif 'show hn' in title or 'show hn:' in title:
-                categories['show_hn'].append(story)
-            elif 'ask hn' in title or 'ask hn:' in title:
-                categories['ask_hn'].append(story)
-            elif any(keyword in title for keyword in tech_keywords):
-                categories['tech'].append(story)
-            elif any(keyword in title for keyword in science_keywords):
-                categories['science'].append(story)
-            elif any(keyword in title for keyword in business_keywords):
-                categories['business'].append(story)
-            else:
-                categories['others'].append(story)
+            分类后的故事字典，至少包含 show_hn、ask_hn、tech、science、business、others
+        """
+        # 调用方可能传入未去重的列表；对已折叠的列表再次调用结果不变
+        grouped = self._get_categorizer().categorize(dedup_stories(stories), extra_categories=self.SECTION_CATEGORIES)
         
+        # 导出的 Markdown 只有固定的几个分区，自定义规则产生的其他分类归入 others
+        categories = {category: grouped.pop(category) for category in self.SECTION_CATEGORIES}
+        categories['others'] = grouped.pop('others')
+        for extra in grouped.values():
+            categories['others'].extend(extra)
         return categories
     
-    def _write_story_entry(self, file, idx, story):
+    def _build_story_view(self, stories, date, hour):
+        """分类并按上升速度排序，生成渲染和AI摘要选择共用的视图"""
+        return StoryView(stories, date, hour, self._categorize_stories(stories), heat_key=velocity_sort_key)
+    
+    @staticmethod
+    def _export_formats(formats):
+        """Markdown 是日报聚合和检索的输入，总是输出"""
+        return ('md',) + tuple(fmt for fmt in formats if fmt != 'md')
+    
+    def _load_topic_analysis_config(self):
+        """读取话题分析配置，未在构造时提供则从 config.json 读取"""
+        if self.topic_analysis_config is None:
+            try:
+                self.topic_analysis_config = self._current_settings().get_topic_analysis_config()
+            except Exception as e:
+                LOG.warning(f"无法读取话题分析配置，使用默认配置: {e}")
+                self.topic_analysis_config = {}
+        return self.topic_analysis_config
+    
+    def _get_story_index(self):
+        """创建（或复用）历史故事索引，不可用时返回None"""
+        if self._story_index is None:
+            try:
+                try:
+                    from src.analyzers.story_index import StoryIndex
+                except ImportError:
+                    from analyzers.story_index import StoryIndex
+                config = self._load_topic_analysis_config()
+                # 嵌入器由 get_embedder 在进程内共享，与线程内的语义话题分析器共用同一个模型
+                self._story_index = StoryIndex(embedding_model=config.get('embedding_model'))
+            except Exception as e:
+                LOG.warning(f"无法初始化历史故事索引，跳过相关故事: {e}")
+                return None
+        return self._story_index
+    
+    def _link_related_stories(self, stories, date, hour, top_n=3):
         """
-        将故事条目写入文件
+        将故事加入历史索引，标记重复提交，并为最热门的故事关联相关旧闻
         
         Args:
-            file: 文件对象
-            idx: 索引
-            story: 故事对象
+            stories: 故事列表（原地添加 duplicate_of / related 字段）
+            date: 日期字符串 (YYYY-MM-DD)
+            hour: 小时字符串 (HH)
+            top_n: 关联相关旧闻的热门故事数量
         """
-        if not story:
+        # 需要加载嵌入模型，只在配置开启（默认为 semantic 后端）时执行
+        if not self._load_topic_analysis_config().get('related_stories'):
+            return
+        story_index = self._get_story_index()
+        if story_index is None:
             return
+        
+        try:
+            duplicates = story_index.find_duplicates(stories)
+            story_index.insert(stories, date, hour)
             
-        title = story.get('title', '无标题')
-        story_type = story.get('type', 'unknown')
-        
-        # 根据不同类型添加不同的图标
-        icon = "📰"
-        if "show hn" in title.lower():
-            icon = "🔍"
-        elif "ask hn" in title.lower():
-            icon = "❓"
-        elif story_type == "job":
-            icon = "💼"
-        
-        # 处理不同类型的故事
-        if 'url' in story:
-            # 普通的带外部链接的故事
-            url = story['url']
-            file.write(f"{icon} **[{title}]({url})**\n")
-        else:
-            # Ask HN, Show HN 或其他没有外部URL的故事类型
-            hn_item_url = f"https://news.ycombinator.com/item?id={story.get('id', '')}"
-            file.write(f"{icon} **[{title}]({hn_item_url})**\n")
-        
-        # 添加AI摘要（如果有）
-        if 'ai_summary' in story and story['ai_summary']:
-            file.write(f"  📝 {story['ai_summary']}\n")
-        
-        # 添加额外信息（分数、发布者、时间等）
-        extra_info = []
-        if 'score' in story:
-            extra_info.append(f"👍 **{story['score']}** 分")
-        if 'by' in story:
-            extra_info.append(f"👤 作者: {story['by']}")
-        if 'descendants' in story and story['descendants'] > 0:
-            extra_info.append(f"💬 {story['descendants']} 条评论")
-            
-        if extra_info:
-            file.write(f"  {' | '.join(extra_info)}\n\n")
-        else:
-            file.write("\n")
+            for story in stories:
+                if story.get('id') in duplicates:
+                    story['duplicate_of'] = duplicates[story['id']]
+            
+            top_stories = sorted(stories, key=lambda x: x.get('score', 0), reverse=True)[:top_n]
+            for story in top_stories:
+                story['related'] = story_index.related(story, k=3)
+        except Exception as e:
+            LOG.warning(f"查询历史故事索引时发生错误: {e}")
+    
+    def _topic_analyzer_args(self):
+        """根据配置返回 (分析后端, 分析器构造参数)"""
+        config = self._load_topic_analysis_config()
+        backend = config.get('backend', 'tfidf')
+        if backend == 'semantic':
+            return backend, {
+                'embedding_model': config.get('embedding_model'),
+                'fetch_articles': config.get('fetch_articles', True)
+            }
+        return backend, {}
+    
+    def _get_topic_analyzer(self):
+        """按配置创建（或复用）话题分析器"""
+        if self._topic_analyzer is not None:
+            return self._topic_analyzer
+        
+        # 延迟导入，确保即使没有安装分析器依赖也能运行基本功能
+        try:
+            from src.analyzers import create_topic_analyzer
+        except ImportError:
+            from analyzers import create_topic_analyzer
+        
+        backend, kwargs = self._topic_analyzer_args()
+        self._topic_analyzer = create_topic_analyzer(backend, **kwargs)
+        LOG.info(f"话题分析后端: {backend}")
+        return self._topic_analyzer
+    
+    def _get_analysis_pool(self):
+        """创建（或复用）话题分析进程池"""
+        if self._analysis_pool is None:
+            try:
+                from src.analyzers.analysis_pool import TopicAnalysisPool
+            except ImportError:
+                from analyzers.analysis_pool import TopicAnalysisPool
+            backend, kwargs = self._topic_analyzer_args()
+            self._analysis_pool = TopicAnalysisPool(backend, kwargs)
+        return self._analysis_pool
+    
+    def _run_topic_analysis(self, stories, date, hour, wait=False, timeout=300):
+        """
+        在工作进程中分析话题，进程池不可用时在当前线程中分析
+        
+        Args:
+            wait: 是否等待分析完成；不等待时提交后立即返回，报告由工作进程写入
+            timeout: 等待超时（秒）
+        
+        Returns:
+            等待时返回生成的主题报告文件路径（失败或超时返回None）；不等待时返回None
+        """
+        try:
+            pool = self._get_analysis_pool()
+        except ImportError as e:
+            LOG.warning(f"无法创建话题分析进程池，改为线程内分析: {e}")
+            return self._analyze_topics(stories, date, hour)
+        
+        if not wait:
+            # 故事在提交后才被序列化发送给工作进程，传入副本避免调用方之后的修改混入分析
+            pool.submit(copy.deepcopy(stories), date, hour)
+            return None
+        topics_file_path = pool.run(stories, date, hour, timeout=timeout)
+        if topics_file_path:
+            LOG.info(f"Hacker News主题分析报告已生成: {topics_file_path}")
+        return topics_file_path
+    
+    async def _async_analyze_topics(self, stories, date, hour, timeout=300):
+        """
+        在工作进程中分析话题，进程池不可用时退回到线程中同步分析
+        
+        Returns:
+            生成的主题报告文件路径，失败或超时返回None
+        """
+        try:
+            pool = self._get_analysis_pool()
+        except ImportError as e:
+            LOG.warning(f"无法创建话题分析进程池，改为线程内分析: {e}")
+            return await asyncio.to_thread(self._analyze_topics, stories, date, hour)
+        
+        topics_file_path = await pool.analyze(stories, date, hour, timeout=timeout)
+        if topics_file_path:
+            LOG.info(f"Hacker News主题分析报告已生成: {topics_file_path}")
+        return topics_file_path
+    
+    async def wait_for_pending_analyses(self, timeout=None):
+        """
+        等待后台进行中的话题分析完成
+        
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+            
+        Returns:
+            已完成的主题报告文件路径列表
+        """
+        if not self.pending_analyses:
+            return []
+        done, _ = await asyncio.wait(set(self.pending_analyses), timeout=timeout)
+        return [task.result() for task in done if not task.cancelled() and task.result()]
+    
+    def close(self):
+        """释放话题分析进程池、LLM 客户端等后台资源"""
+        if self._analysis_pool is not None:
+            self._analysis_pool.shutdown()
+            self._analysis_pool = None
+        if self._summary_llm is not None:
+            self._summary_llm.close()
+            self._summary_llm = None
     
     def _analyze_topics(self, stories, date=None, hour=None):
         """
@@ -644,30 +776,14 @@ class HackerNewsClient:
                     LOG.info(f"下载NLTK数据: {nltk_dir}...")
                     nltk.download(nltk_dir.split('/')[-1])
             
-            # 延迟导入，确保即使没有安装分析器依赖也能运行基本功能
-            from src.analyzers.topic_analyzer import HackerNewsTopicAnalyzer
-            
             LOG.info("开始分析Hacker News主题...")
-            analyzer = HackerNewsTopicAnalyzer()
-            
-            # 分析话题
-            result = analyzer.analyze_topics(stories, date, hour)
-            
-            # 生成报告
-            report = analyzer.generate_report(result)
-            
-            # 保存报告
-            if date is None:
-                date = datetime.now().strftime('%Y-%m-%d')
-            if hour is None:
-                hour = datetime.now().strftime('%H')
-                
-            dir_path = os.path.join('hacker_news', date)
-            os.makedirs(dir_path, exist_ok=True)
+            try:
+                from src.analyzers.analysis_pool import analyze_and_write_report
+            except ImportError:
+                from analyzers.analysis_pool import analyze_and_write_report
             
-            topics_file_path = os.path.join(dir_path, f'{hour}_topics.md')
-            with open(topics_file_path, 'w', encoding='utf-8') as f:
-                f.write(report)
+            # 分析话题并保存报告
+            topics_file_path = analyze_and_write_report(self._get_topic_analyzer(), stories, date, hour)
                 
             LOG.info(f"Hacker News主题分析报告已生成: {topics_file_path}")
             return topics_file_path
@@ -694,15 +810,18 @@ class HackerNewsClient:
             # 检查是否可以导入LLM
             try:
                 from src.llm import LLM
-                from src.config import Settings
             except ImportError:
                 LOG.warning("未能导入LLM或Settings模块，跳过AI总结")
                 return False
                 
-            # 初始化LLM
+            # 初始化LLM：llm 配置段不变时复用上次创建的客户端，其他配置段变化不重建
             try:
-                settings = Settings(config_file="config.json")
-                llm = LLM(settings=settings)
+                settings = self._current_settings()
+                llm_section = settings.raw.get('llm')
+                if self._summary_llm is None or llm_section != self._summary_llm_section:
+                    self._summary_llm = LLM(settings=settings)
+                    self._summary_llm_section = llm_section
+                llm = self._summary_llm
             except Exception as e:
                 LOG.warning(f"初始化LLM失败，跳过AI总结: {e}")
                 return False
@@ -757,14 +876,21 @@ class HackerNewsClient:
             LOG.error(traceback.format_exc())
             return False
     
-    async def async_export_top_stories(self, date=None, hour=None, enable_ai_summary=True):
+    async def async_export_top_stories(self, date=None, hour=None, enable_ai_summary=True,
+                                       wait_for_analysis=False, analysis_timeout=300, formats=('md',)):
         """
         异步导出当前 Hacker News 热门故事列表到 Markdown 文件
         
+        话题分析在后台工作进程中进行，故事列表文件写完即返回；分析完成后
+        <HH>_topics.md 由工作进程写入。可用 wait_for_pending_analyses 等待其完成。
+        
         Args:
             date: 日期字符串 (YYYY-MM-DD 格式)，如果未提供则使用当前日期
             hour: 小时字符串 (HH 格式)，如果未提供则使用当前小时
             enable_ai_summary: 是否启用AI摘要功能，默认为True
+            wait_for_analysis: 是否等待话题分析完成后再返回
+            analysis_timeout: 话题分析的等待超时（秒）
+            formats: 同时输出的格式（md / html / json），Markdown 总会输出
             
         Returns:
             生成的 Markdown 文件路径，如果发生错误则返回 None
@@ -779,85 +905,48 @@ class HackerNewsClient:
                 LOG.warning("异步获取未找到任何Hacker News的新闻。")
                 return None
             
+            # 折叠重复提交的故事，避免重复列出和重复生成摘要
+            stories_details = dedup_stories(stories_details)
+            
             # 如果未提供 date 和 hour 参数，使用当前日期和时间
             if date is None:
                 date = datetime.now().strftime('%Y-%m-%d')
             if hour is None:
                 hour = datetime.now().strftime('%H')
             
-            # 构建存储路径
-            dir_path = os.path.join('hacker_news', date)
-            os.makedirs(dir_path, exist_ok=True)
+            # 更新历史故事索引，关联重复提交和相关旧闻
+            await asyncio.to_thread(self._link_related_stories, stories_details, date, hour)
+            await asyncio.to_thread(self._track_velocity, stories_details)
+            
+            # 立即在后台进程中开始话题分析（传入快照，后续的AI摘要不会影响它）
+            analysis_task = asyncio.create_task(
+                self._async_analyze_topics(copy.deepcopy(stories_details), date, hour, analysis_timeout)
+            )
+            self.pending_analyses.add(analysis_task)
+            analysis_task.add_done_callback(self.pending_analyses.discard)
             
-            # 对故事进行分类
-            categorized_stories = self._categorize_stories(stories_details)
+            # 排序、分类各一次，AI摘要选择和报告渲染共用同一个视图
+            view = self._build_story_view(stories_details, date, hour)
             
             # 尝试为热门故事添加AI摘要
             if enable_ai_summary:
                 LOG.info("AI摘要功能已启用，正在为热门文章生成摘要...")
-                top_stories = sorted(stories_details, key=lambda x: x.get('score', 0), reverse=True)[:10]
-                self._add_ai_summaries(top_stories)
+                # LLM调用是阻塞的，放到线程中执行，不占用事件循环
+                await asyncio.to_thread(self._add_ai_summaries, view.by_heat[:10])
             else:
                 LOG.info("AI摘要功能已禁用，跳过摘要生成")
             
-            # 保存原始列表
-            stories_file_path = os.path.join(dir_path, f'{hour}.md')
-            with open(stories_file_path, 'w', encoding='utf-8') as file:
-                file.write(f"# Hacker News 热门新闻 ({date} {hour}:00)\n\n")
-                file.write("本报告收集了最近一小时内Hacker News平台上的热门讨论内容。\"分数\"代表用户的投票数量，反映了文章的热度与受欢迎程度。\n\n")
-                
-                # 首先显示最热门的故事
-                file.write("## 🔥 最热门讨论\n\n")
-                # 按分数排序，取前3个
-                top_stories = sorted(stories_details, key=lambda x: x.get('score', 0), reverse=True)[:3]
-                for idx, story in enumerate(top_stories, start=1):
-                    self._write_story_entry(file, idx, story)
-                
-                # 添加展示类内容
-                if categorized_stories['show_hn']:
-                    file.write("\n## 👀 展示与分享\n\n")
-                    file.write("用户分享的项目、产品和创造。\n\n")
-                    for idx, story in enumerate(categorized_stories['show_hn'], start=1):
-                        self._write_story_entry(file, idx, story)
-                
-                # 添加问答类内容
-                if categorized_stories['ask_hn']:
-                    file.write("\n## ❓ 问答与讨论\n\n")
-                    file.write("社区成员提出的问题和讨论。\n\n")
-                    for idx, story in enumerate(categorized_stories['ask_hn'], start=1):
-                        self._write_story_entry(file, idx, story)
-                
-                # 添加技术类内容
-                if categorized_stories['tech']:
-                    file.write("\n## 💻 技术与工程\n\n")
-                    file.write("编程、开发和技术相关的热门话题。\n\n")
-                    for idx, story in enumerate(categorized_stories['tech'], start=1):
-                        self._write_story_entry(file, idx, story)
-                
-                # 添加科学类内容
-                if categorized_stories['science']:
-                    file.write("\n## 🔬 科学研究\n\n")
-                    file.write("科学发现、研究和相关讨论。\n\n")
-                    for idx, story in enumerate(categorized_stories['science'], start=1):
-                        self._write_story_entry(file, idx, story)
-                
-                # 添加商业类内容
-                if categorized_stories['business']:
-                    file.write("\n## 💼 商业与创业\n\n")
-                    file.write("商业新闻、创业和行业动态。\n\n")
-                    for idx, story in enumerate(categorized_stories['business'], start=1):
-                        self._write_story_entry(file, idx, story)
-                
-                # 添加其他类内容
-                if categorized_stories['others']:
-                    file.write("\n## 📚 其他热门内容\n\n")
-                    for idx, story in enumerate(categorized_stories['others'], start=1):
-                        self._write_story_entry(file, idx, story)
-            
-            # 执行主题分析 (使用同步版本，因为分析器尚未异步化)
-            topics_file_path = self._analyze_topics(stories_details, date, hour)
+            # 在内存中渲染后原子写入，日报聚合不会读到写了一半的文件
+            paths = await asyncio.to_thread(write_report, view, os.path.join('hacker_news', date),
+                                            self._export_formats(formats))
+            stories_file_path = paths['md']
             
+            await asyncio.to_thread(self._save_snapshot, stories_details, date, hour, view.categories)
+            await asyncio.to_thread(index_report_file, stories_file_path)
             LOG.info(f"Hacker News热门新闻文件异步生成：{stories_file_path}")
+            
+            if wait_for_analysis:
+                await analysis_task
             return stories_file_path
             
         except Exception as e:
@@ -876,4 +965,4 @@ class HackerNewsClient:
 
 if __name__ == "__main__":
     client = HackerNewsClient()
-    client.export_top_stories()  # 默认情况下使用当前日期和时间
+    client.export_top_stories(wait_for_analysis=True)  # 默认情况下使用当前日期和时间
@@ -15,7 +15,7 @@ def main():
     hacker_news_client = HackerNewsClient() # Added
     llm = LLM(config)  # 创建语言模型实例
     report_generator = ReportGenerator(llm, config, github_client)  # Updated
-    subscription_manager = SubscriptionManager(config.subscriptions_file)  # 创建订阅管理器实例
+    subscription_manager = SubscriptionManager(config.subscriptions_file, store=config.get_subscription_store())  # 创建订阅管理器实例
     command_handler = CommandHandler(github_client, subscription_manager, report_generator, hacker_news_client)  # Updated
     
     parser = command_handler.parser  # 获取命令解析器
@@ -1,12 +1,69 @@
+import copy
 import json
 import os
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
 from logger import LOG # Added LOG import
 
+try:
+    from src.utils.subscription_store import DEFAULT_SUBSCRIPTIONS_DB, SubscriptionStore, get_subscription_store
+except ImportError:
+    from utils.subscription_store import DEFAULT_SUBSCRIPTIONS_DB, SubscriptionStore, get_subscription_store
+
+def prompts_signature() -> tuple:
+    """
+    prompts 目录下各提示文件的 (文件名, mtime, 大小)，只做 stat，不读取内容
+
+    Returns:
+        按文件名排序的元组
+    """
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    prompts_dir = os.path.join(project_root, "prompts")
+    if not os.path.isdir(prompts_dir):
+        return ()
+    signature = []
+    for entry in sorted(os.scandir(prompts_dir), key=lambda e: e.name):
+        if entry.is_file():
+            stat = entry.stat()
+            signature.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
 class Settings: # Renamed from Config
-    def __init__(self, config_file='config.json'): # Added config_file parameter
+    def __init__(self, config_file='config.json', config_data: Optional[dict] = None): # Added config_file parameter
+        """
+        Args:
+            config_file: 配置文件路径
+            config_data: 已解析的配置内容；提供时不再读取 config_file（SettingsService 生成快照时使用）
+        """
+        self._frozen = False
         self.config_file = config_file # Store config_file path
-        self.load_config()
-    
+        if config_data is None:
+            self.load_config()
+        else:
+            self._apply_config(config_data)
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError(f"Settings 快照是只读的，不能修改 '{name}'；请修改 config.json 后重新加载")
+        super().__setattr__(name, value)
+
+    def freeze(self) -> 'Settings':
+        """冻结为只读快照，之后不能再修改属性"""
+        self._frozen = True
+        return self
+
+    @property
+    def raw(self) -> dict:
+        """原始配置内容的副本，修改副本不影响共享的快照"""
+        return copy.deepcopy(self._raw)
+
+    @property
+    def email(self) -> dict:
+        """邮件配置的副本（含环境变量覆盖后的密码）"""
+        return copy.deepcopy(self._email)
+
     def load_config(self):
         if not os.path.exists(self.config_file):
             # This basic error handling can be refined later if needed,
@@ -17,41 +74,56 @@ class Settings: # Renamed from Config
             raise FileNotFoundError(f"Configuration file '{self.config_file}' not found. CWD: {cwd}")
 
         with open(self.config_file, 'r', encoding='utf-8') as f: # Use self.config_file, added encoding
-            config = json.load(f)
-            
-            self.email = config.get('email', {})
-            self.email['password'] = os.getenv('EMAIL_PASSWORD', self.email.get('password', ''))
-
-            # 加载 GitHub 相关配置
-            github_config = config.get('github', {})
-            self.github_token = os.getenv('GITHUB_TOKEN', github_config.get('token'))
-            self.subscriptions_file = github_config.get('subscriptions_file', 'subscriptions.json') # Added default
-            self.freq_days = github_config.get('progress_frequency_days', 1)
-            self.exec_time = github_config.get('progress_execution_time', "08:00")
-
-            # 加载 LLM 相关配置
-            llm_config = config.get('llm', {})
-            self.llm_model_type = llm_config.get('model_type', 'openai')
-            self.openai_model_name = llm_config.get('openai_model_name', 'gpt-4o-mini')
-            # Load OpenAI API Key, prioritizing environment variable
-            self.llm_openai_api_key = os.getenv('OPENAI_API_KEY', llm_config.get('openai_api_key'))
-            # Load OpenAI Base URL, prioritizing environment variable
-            openai_base_url_from_config = llm_config.get('openai_base_url')
-            effective_config_url = openai_base_url_from_config if openai_base_url_from_config else 'https://api.openai.com/v1'
-            self.llm_openai_base_url = os.getenv('OPENAI_BASE_URL', effective_config_url)
-            if not self.llm_openai_base_url: # Ensure it's not empty string if env var was empty
-                self.llm_openai_base_url = 'https://api.openai.com/v1'
-
-            self.ollama_model_name = llm_config.get('ollama_model_name', 'llama3')
-            self.ollama_api_url = llm_config.get('ollama_api_url', 'http://localhost:11434/api/chat')
-            
-            # 加载报告类型配置
-            # Default report types updated to match Streamlit app's expectation if not in config
-            self.report_types = config.get('report_types', ["github", "hacker_news_hours_topic", "hacker_news_daily_report"])
-            
-            # 加载 Slack 配置
-            slack_config = config.get('slack', {})
-            self.slack_webhook_url = slack_config.get('webhook_url')
+            self._apply_config(json.load(f))
+
+    def _apply_config(self, config: dict):
+        # 原始配置内容，用于比较两个快照之间变化的配置段
+        self._raw = config
+
+        # 复制一份再填入密码，原始配置保持文件中的内容
+        self._email = dict(config.get('email', {}))
+        self._email['password'] = os.getenv('EMAIL_PASSWORD', self._email.get('password', ''))
+
+        # 加载 GitHub 相关配置
+        github_config = config.get('github', {})
+        self.github_token = os.getenv('GITHUB_TOKEN', github_config.get('token'))
+        self.subscriptions_file = github_config.get('subscriptions_file', 'subscriptions.json') # Added default
+        self.subscriptions_db = github_config.get('subscriptions_db', DEFAULT_SUBSCRIPTIONS_DB)
+        self.freq_days = github_config.get('progress_frequency_days', 1)
+        self.exec_time = github_config.get('progress_execution_time', "08:00")
+
+        # 加载 LLM 相关配置
+        llm_config = config.get('llm', {})
+        self.llm_model_type = llm_config.get('model_type', 'openai')
+        self.openai_model_name = llm_config.get('openai_model_name', 'gpt-4o-mini')
+        # Load OpenAI API Key, prioritizing environment variable
+        self.llm_openai_api_key = os.getenv('OPENAI_API_KEY', llm_config.get('openai_api_key'))
+        # Load OpenAI Base URL, prioritizing environment variable
+        openai_base_url_from_config = llm_config.get('openai_base_url')
+        effective_config_url = openai_base_url_from_config if openai_base_url_from_config else 'https://api.openai.com/v1'
+        self.llm_openai_base_url = os.getenv('OPENAI_BASE_URL', effective_config_url)
+        if not self.llm_openai_base_url: # Ensure it's not empty string if env var was empty
+            self.llm_openai_base_url = 'https://api.openai.com/v1'
+
+        self.ollama_model_name = llm_config.get('ollama_model_name', 'llama3')
+        self.ollama_api_url = llm_config.get('ollama_api_url', 'http://localhost:11434/api/chat')
+        
+        # 加载报告类型配置
+        # Default report types updated to match Streamlit app's expectation if not in config
+        self.report_types = config.get('report_types', ["github", "hacker_news_hours_topic", "hacker_news_daily_report"])
+        
+        # 加载 Slack 配置
+        slack_config = config.get('slack', {})
+        self.slack_webhook_url = slack_config.get('webhook_url')
+
+        # 加载话题分析配置
+        self.topic_analysis = config.get('topic_analysis', {})
+
+        # 加载故事分类规则（未配置时使用内置规则）
+        self.story_categories = config.get('story_categories')
+
+        # 加载守护进程配置（多进程模式等）
+        self.daemon = config.get('daemon', {})
 
     # --- Getter methods for various configurations ---
 
@@ -70,7 +142,8 @@ class Settings: # Renamed from Config
         return self.exec_time if hasattr(self, 'exec_time') else "08:00"
 
     def get_email_config(self) -> dict:
-        return self.email if hasattr(self, 'email') else {}
+        # 返回副本，调用方修改不会影响共享的配置快照
+        return self.email if hasattr(self, '_email') else {}
 
     def get_llm_model_type(self) -> str:
         return self.llm_model_type if hasattr(self, 'llm_model_type') else "openai"
@@ -91,11 +164,46 @@ class Settings: # Renamed from Config
         return getattr(self, 'llm_openai_base_url', 'https://api.openai.com/v1')
 
     def get_report_types(self) -> list:
-        return self.report_types if hasattr(self, 'report_types') else ["github", "hacker_news_hours_topic", "hacker_news_daily_report"]
+        return list(self.report_types) if hasattr(self, 'report_types') else ["github", "hacker_news_hours_topic", "hacker_news_daily_report"]
 
     def get_slack_webhook_url(self) -> str | None:
         return self.slack_webhook_url if hasattr(self, 'slack_webhook_url') else None
 
+    def get_topic_analysis_config(self) -> dict:
+        """
+        返回话题分析配置，包含 backend ("tfidf" 或 "semantic")、
+        embedding_model、fetch_articles 和 related_stories
+        （是否用嵌入模型关联相关旧闻和重复提交，默认只在 semantic 后端下开启）。
+        """
+        topic_config = getattr(self, 'topic_analysis', {}) or {}
+        backend = topic_config.get('backend', 'tfidf')
+        return {
+            'backend': backend,
+            'embedding_model': topic_config.get('embedding_model'),
+            'fetch_articles': topic_config.get('fetch_articles', True),
+            'related_stories': bool(topic_config.get('related_stories', backend == 'semantic')),
+        }
+
+    def get_story_category_rules(self) -> dict | None:
+        """
+        返回 Hacker News 故事分类规则，格式见 StoryCategorizer；
+        未配置时返回None，使用内置规则。
+        """
+        return copy.deepcopy(getattr(self, 'story_categories', None)) or None
+
+    def get_daemon_config(self) -> dict:
+        """
+        返回守护进程配置：distributed 为 True 时多个守护进程通过 cluster_db 中的租约协调，
+        lease_ttl 为租约时长（秒）。
+        """
+        daemon_config = getattr(self, 'daemon', {}) or {}
+        return {
+            'distributed': bool(daemon_config.get('distributed', False)),
+            'cluster_db': daemon_config.get('cluster_db', 'cache/jobs/cluster.db'),
+            'lease_ttl': float(daemon_config.get('lease_ttl', 60)),
+            'worker_poll_seconds': float(daemon_config.get('worker_poll_seconds', 5)),
+        }
+
     def get_prompt_file_path(self, prompt_key: str) -> str | None:
         """
         Constructs and returns the path to a prompt file.
@@ -129,27 +237,42 @@ class Settings: # Renamed from Config
         # If neither specific nor generic prompt file is found
         return None
 
+    def _resolve_path(self, path: str) -> str:
+        # Path handling: Assume the path is relative to config_file or CWD
+        # If config_file has a path, make it relative to it
+        # Otherwise, assume it's relative to CWD (which is project root for streamlit_app.py)
+        if self.config_file and os.path.dirname(self.config_file) and not os.path.isabs(path):
+            return os.path.join(os.path.dirname(self.config_file), path)
+        return path
+
+    def get_subscription_store(self) -> SubscriptionStore:
+        """
+        返回 GitHub 订阅存储（进程内共享）；首次打开时从旧的订阅文件导入
+        """
+        subscriptions_file_path = self.get_subscriptions_file()
+        return get_subscription_store(
+            self._resolve_path(getattr(self, 'subscriptions_db', None) or DEFAULT_SUBSCRIPTIONS_DB),
+            legacy_file=self._resolve_path(subscriptions_file_path) if subscriptions_file_path else None)
+
     def get_github_subscriptions(self) -> list:
         """
-        从指定的订阅文件中加载并返回 GitHub 订阅列表。
-        如果文件不存在、为空或格式不正确，则返回空列表。
+        返回 GitHub 订阅列表（按优先级和添加顺序），每项为包含 repo_url、owner、repo_name 和元数据的字典。
+        订阅存储不可用时退回读取订阅文件；文件不存在、为空或格式不正确时返回空列表。
         """
-        # Ensure LOG is available or import it if not already at file top
-        # from logger import LOG # Assuming LOG is globally available or passed if not module level
+        try:
+            return self.get_subscription_store().list()
+        except Exception as e:
+            LOG.error(f"Settings.get_github_subscriptions: 读取订阅存储失败，改为读取订阅文件: {e}", exc_info=True)
+        return self._load_github_subscriptions_file()
 
+    def _load_github_subscriptions_file(self) -> list:
+        """从订阅文件中加载 GitHub 订阅列表"""
         subscriptions_file_path = self.get_subscriptions_file() # Use getter to ensure default
         if not subscriptions_file_path: # Should always return a path due to default in getter
             LOG.warning("Settings.get_github_subscriptions: subscriptions_file 属性未配置。返回空列表。")
             return []
 
-        # Path handling: Assume subscriptions_file is relative to config_file or CWD
-        # If config_file has a path, make subscriptions_file relative to it
-        # Otherwise, assume it's relative to CWD (which is project root for streamlit_app.py)
-        if self.config_file and os.path.dirname(self.config_file):
-            base_dir = os.path.dirname(self.config_file)
-            actual_subscriptions_file_path = os.path.join(base_dir, subscriptions_file_path)
-        else:
-            actual_subscriptions_file_path = subscriptions_file_path
+        actual_subscriptions_file_path = self._resolve_path(subscriptions_file_path)
 
         if not os.path.exists(actual_subscriptions_file_path):
             LOG.warning(f"Settings.get_github_subscriptions: 订阅文件 '{actual_subscriptions_file_path}' 未找到。返回空列表。")
@@ -200,3 +323,125 @@ class Settings: # Renamed from Config
         except Exception as e:
             LOG.error(f"Settings.get_github_subscriptions: 加载订阅文件 '{actual_subscriptions_file_path}' 时发生未知错误: {e}。返回空列表。", exc_info=True)
             return []
+
+
+def _stat_signature(path: str):
+    """文件的 (mtime, 大小)，不存在时为None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SettingsService:
+    """
+    进程内共享的配置服务
+
+    config.json 只在变化时解析一次，生成只读的 Settings 快照；读取配置只是取当前快照的引用，
+    一次任务内始终使用同一个快照，不会读到修改了一半的配置。
+    reload() 先比较文件的 mtime 和大小，变化时完整解析出新快照后再替换，解析失败时保留旧快照；
+    替换后按变化的配置段（config.json 的顶层键，如 llm、email、github）通知订阅者，
+    订阅者只重建受影响的组件。
+    """
+
+    def __init__(self, config_file: str = 'config.json', check_interval: float = 5.0):
+        """
+        初始化配置服务并加载第一个快照
+
+        Args:
+            config_file: 配置文件路径
+            check_interval: 访问 snapshot 时检查文件变化的最短间隔（秒），0 表示每次都检查，
+                None 表示只在显式调用 reload() 时重新加载（订阅回调只在调用 reload 的线程中执行）
+
+        Raises:
+            FileNotFoundError: 配置文件不存在
+        """
+        self.config_file = config_file
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._subscribers: List[tuple] = []
+        self._signature = _stat_signature(config_file)
+        self._snapshot = Settings(config_file).freeze()
+        self._checked_at = time.monotonic()
+        self.version = 1
+
+    @property
+    def snapshot(self) -> Settings:
+        """当前的配置快照；距上次检查超过 check_interval 时先检查文件是否变化"""
+        if self.check_interval is not None and time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+        return self._snapshot
+
+    def current(self) -> Settings:
+        """当前的配置快照，不检查文件"""
+        return self._snapshot
+
+    def subscribe(self, callback: Callable[[Settings, Set[str], Settings], None],
+                  sections: Optional[Iterable[str]] = None):
+        """
+        订阅配置变化
+
+        Args:
+            callback: callback(新快照, 变化的配置段, 旧快照)，在执行 reload 的线程中调用；
+                需要固定在某个线程中执行时，将 check_interval 设为 None 并只在该线程中调用 reload
+            sections: 只关心的配置段，None 表示任何变化都通知
+        """
+        with self._lock:
+            self._subscribers.append((callback, frozenset(sections) if sections is not None else None))
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        重新加载配置
+
+        Args:
+            force: 为 True 时不比较 mtime 和大小，直接重新解析
+
+        Returns:
+            配置内容是否发生变化（快照被替换）
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            signature = _stat_signature(self.config_file)
+            if not force and signature == self._signature:
+                return False
+            try:
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                new = Settings(self.config_file, config_data=data).freeze()
+            except Exception as e:
+                # 文件正在写入或格式错误时继续使用旧快照，下次检查再试
+                LOG.error(f"重新加载配置 {self.config_file} 失败，继续使用当前配置: {e}")
+                return False
+            self._signature = signature
+            old = self._snapshot
+            changed = {key for key in set(old._raw) | set(new._raw) if old._raw.get(key) != new._raw.get(key)}
+            if not changed:
+                return False
+            self._snapshot = new
+            self.version += 1
+            subscribers = list(self._subscribers)
+
+        LOG.info(f"配置已重新加载（版本 {self.version}），变化的配置段: {sorted(changed)}")
+        for callback, sections in subscribers:
+            if sections is not None and not sections & changed:
+                continue
+            try:
+                callback(new, changed, old)
+            except Exception as e:
+                LOG.error(f"配置变化回调执行失败: {e}", exc_info=True)
+        return True
+
+
+_services: Dict[str, SettingsService] = {}
+_services_lock = threading.Lock()
+
+
+def get_settings_service(config_file: str = 'config.json') -> SettingsService:
+    """返回进程内共享的配置服务，同一配置文件只解析一次"""
+    key = os.path.abspath(config_file)
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = _services[key] = SettingsService(config_file)
+        return service
@@ -13,91 +13,214 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 # Now, the rest of the original imports can follow
-import schedule
-import time
+import asyncio
+import hashlib
 import signal # Already imported sys and os
 from datetime import datetime, timedelta # Ensure timedelta is available
 import pytz
 
-from config import Settings as Config # This import should now work reliably
+from config import get_settings_service # 配置只解析一次，文件变化时重新加载并通知各组件
 from github_client import GitHubClient  # 导入GitHub客户端类，处理GitHub API请求
 from hacker_news_client import HackerNewsClient
 from notifier import Notifier  # 导入通知器类，用于发送通知
 from report_generator import ReportGenerator  # 导入报告生成器类
 from llm import LLM  # 导入语言模型类，可能用于生成报告内容
 from subscription_manager import SubscriptionManager  # 导入订阅管理器类，管理GitHub仓库订阅
+from src.utils.artifact_store import ReportArtifactStore  # 预生成报告的存储，仪表盘直接读取
+from src.utils.search_index import get_search_index  # 报告全文索引，保存报告时同步更新
+from src.utils.async_scheduler import (AsyncScheduler, DailyTrigger, OVERLAP_COALESCE, OVERLAP_SKIP,
+                                      CATCHUP_ALL, CATCHUP_LATEST, watch_file)  # 事件驱动的任务调度
+from src.utils.job_ledger import JobRunLedger  # 任务执行台账，重启后据此补跑
+from src.utils.leases import LeaseStore, WorkItemQueue  # 多进程模式的租约和工作项
+from src.utils.task_graph import FileTaskCache, TaskGraph  # 日报任务按仓库拆分并行执行
+from src.utils.outbox import NotificationOutbox, OutboxSender  # 通知发件箱，投递不阻塞任务
+from src.utils.digest import DigestComposer, parse_digest_recipients  # 按收件人组合日报
 from logger import LOG  # 导入日志记录器
 
 
-def graceful_shutdown(signum, frame):
-    # 优雅关闭程序的函数，处理信号时调用
-    LOG.info("[优雅退出]守护进程接收到终止信号")
-    sys.exit(0)  # 安全退出程序
+# hn_topic_job refreshes the daily summary every 4 hours; older artifacts are regenerated for the email
+HN_DAILY_SUMMARY_MAX_AGE_SECONDS = 5 * 3600
+
+BEIJING_TZ = 'Asia/Shanghai'
+
+
+# 日报任务拆分后的各步骤：仓库之间并行，单个仓库失败只影响它自己的部分
+DAILY_REPORT_MAX_WORKERS = 4
+REPO_FETCH_TIMEOUT_SECONDS = 120
+REPO_SUMMARIZE_TIMEOUT_SECONDS = 300
+HN_SUMMARY_TIMEOUT_SECONDS = 300
+DAILY_REPORT_TASK_RETRIES = 2
+# 中间结果缓存，补跑或失败重跑时已完成的仓库不再请求 GitHub 和 LLM
+DAILY_REPORT_TASK_CACHE_DIR = os.path.join(PROJECT_ROOT, 'cache', 'tasks')
+# 待投递的邮件和 Slack 通知
+OUTBOX_DB_PATH = os.path.join(PROJECT_ROOT, 'cache', 'outbox', 'outbox.db')
+
+
+def _github_report_tasks(graph, report_generator, days_frequency, cache_prefix, work_queue=None, batch=None):
+    """
+    向任务图中添加 GitHub 部分的任务，返回汇总任务名
+
+    汇总任务的结果为 {'report': 完整的 GitHub 部分, 'sections': {"owner/repo": 该仓库的部分}}。
+    本地模式下每个仓库一个 fetch 和一个 summarize 任务，combine 汇总；
+    多进程模式下各仓库作为工作项分给所有守护进程，只添加一个汇总任务。
+    """
+    try:
+        parsed_subscriptions, valid_repos = report_generator.parse_github_subscriptions()
+    except Exception as e:
+        LOG.error(f"Failed to get GitHub subscriptions from settings: {e}", exc_info=True)
+        return graph.add('github', lambda inputs: {'report': "错误：无法从设置中获取GitHub订阅列表。", 'sections': {}})
+    if not parsed_subscriptions:
+        LOG.warning("No GitHub subscriptions found.")
+        return graph.add('github', lambda inputs: {
+            'report': "注意：未找到任何GitHub仓库订阅，无法生成GitHub报告部分。", 'sections': {}})
+
+    # 订阅可以单独设置统计周期
+    repo_days = report_generator.github_subscription_days(parsed_subscriptions, days_frequency)
+
+    def combined(sections):
+        # 按订阅顺序排列，供按仓库筛选的收件人挑选
+        ordered = {f"{owner}/{repo}": sections[f"{owner}/{repo}"] for owner, repo in valid_repos
+                   if f"{owner}/{repo}" in sections}
+        return {'report': report_generator.combine_github_sections(parsed_subscriptions, sections),
+                'sections': ordered}
+
+    if work_queue is not None:
+        return graph.add('github', lambda inputs: combined(report_generator.run_github_project_work_items(
+            valid_repos, days_frequency, work_queue, batch, repo_days=repo_days)))
+
+    summarize_tasks = {}
+    for owner, repo_name in dict.fromkeys(valid_repos):
+        repo_full_name = f"{owner}/{repo_name}"
+        days = repo_days.get(repo_full_name, days_frequency)
+        fetch = graph.add(
+            f"fetch:{repo_full_name}",
+            lambda inputs, owner=owner, repo_name=repo_name, days=days:
+                report_generator.fetch_github_project_data(owner, repo_name, days),
+            timeout=REPO_FETCH_TIMEOUT_SECONDS, retries=DAILY_REPORT_TASK_RETRIES,
+            cache_key=f"{cache_prefix}:fetch:{repo_full_name}:{days}")
+
+        def summarize(inputs, owner=owner, repo_name=repo_name, days=days, fetch=fetch):
+            report = "".join(str(chunk) for chunk in report_generator.generate_github_project_report(
+                owner=owner, repo_name=repo_name, days=days, prefetched=inputs[fetch]))
+            return report_generator.format_github_project_section(owner, repo_name, report)
+
+        summarize_tasks[repo_full_name] = graph.add(
+            f"summarize:{repo_full_name}", summarize, deps=[fetch],
+            timeout=REPO_SUMMARIZE_TIMEOUT_SECONDS, retries=DAILY_REPORT_TASK_RETRIES,
+            cache_key=f"{cache_prefix}:summarize:{repo_full_name}:{days}")
+
+    def combine(inputs):
+        sections = {}
+        for repo_full_name, task_name in summarize_tasks.items():
+            if task_name in inputs:
+                sections[repo_full_name] = inputs[task_name]
+                continue
+            # combine 执行时各仓库的任务都已结束；summarize 被跳过时报告 fetch 的失败原因
+            fetch_result = graph.results[f"fetch:{repo_full_name}"]
+            error = graph.results[task_name].error if fetch_result.ok else fetch_result.error
+            sections[repo_full_name] = report_generator.format_github_project_error(repo_full_name, error)
+        return combined(sections)
+
+    return graph.add('github', combine, deps=list(summarize_tasks.values()), tolerate_failures=True)
+
 
 # Renamed from github_job, new logic implemented
-def send_daily_reports_job(subscription_manager, github_client, report_generator, notifier, days_frequency):
+def send_daily_reports_job(subscription_manager, github_client, report_generator, notifier, days_frequency,
+                           scheduled_for=None, work_queue=None):
     LOG.info(f"定时任务 send_daily_reports_job 启动。执行频率: 每 {days_frequency} 天。")
     LOG.info("[开始执行每日合并报告任务]")
 
-    github_report_string = "_GitHub仓库更新: 未能生成或无内容。_"
-    hn_summary_string = "_Hacker News每日摘要: 未能生成或无内容。_"
-
-    beijing_time_now = datetime.now(pytz.timezone('Asia/Shanghai'))
+    # 补跑错过的日报时按计划日期生成 Hacker News 摘要，而不是当天
+    beijing_time_now = (scheduled_for or datetime.now(pytz.utc)).astimezone(pytz.timezone('Asia/Shanghai'))
     current_date_str_for_reports = beijing_time_now.strftime('%Y-%m-%d')
+    cache_prefix = f"{DAILY_REPORTS_JOB}:{current_date_str_for_reports}:{days_frequency}"
+
+    graph = TaskGraph(cache=FileTaskCache(DAILY_REPORT_TASK_CACHE_DIR), max_workers=DAILY_REPORT_MAX_WORKERS)
 
-    # --- Generate Consolidated GitHub Report ---
+    # --- GitHub: per-repo fetch -> summarize -> combine ---
     LOG.info(f"Generating consolidated GitHub report for last {days_frequency} days...")
-    try:
-        temp_github_report = report_generator.get_consolidated_github_report_for_email(days=days_frequency)
-        if temp_github_report and temp_github_report.strip() and \
-           not temp_github_report.startswith("错误：") and \
-           not temp_github_report.startswith("注意："):
-            github_report_string = temp_github_report
-        elif temp_github_report and temp_github_report.strip():
-            github_report_string = temp_github_report
-        LOG.info("Consolidated GitHub report generation attempt complete.")
-    except Exception as e_gh:
-        LOG.error(f"Error generating consolidated GitHub report: {e_gh}", exc_info=True)
-        github_report_string = f"_GitHub仓库更新: 生成时发生错误 - {e_gh}_"
-
-    # --- Generate Hacker News Daily Summary ---
-    LOG.info(f"Generating Hacker News daily summary for {current_date_str_for_reports}...")
-    try:
-        hn_summary_stream = report_generator.get_hacker_news_daily_summary(current_date_str_for_reports)
-        hn_report_chunks = []
-        for chunk in hn_summary_stream:
-            hn_report_chunks.append(str(chunk))
-        temp_hn_summary = "".join(hn_report_chunks)
-
-        if temp_hn_summary and temp_hn_summary.strip() and \
-           not temp_hn_summary.startswith("错误：") and \
-           not temp_hn_summary.startswith("未能获取") and \
-           not temp_hn_summary.startswith("注意："):
-            hn_summary_string = temp_hn_summary
-        elif temp_hn_summary and temp_hn_summary.strip():
-             hn_summary_string = temp_hn_summary
-        LOG.info("Hacker News daily summary generation attempt complete.")
-    except Exception as e_hn:
-        LOG.error(f"Error generating Hacker News daily summary: {e_hn}", exc_info=True)
-        hn_summary_string = f"_Hacker News每日摘要: 生成时发生错误 - {e_hn}_"
-
-    # --- Combine Reports & Send Email ---
+    # 多进程模式下各仓库的报告分给所有守护进程；批次按计划时间区分，接手时复用已完成的部分
+    batch = f"{DAILY_REPORTS_JOB}@{scheduled_for.isoformat()}" if work_queue is not None and scheduled_for else None
+    github_task = _github_report_tasks(graph, report_generator, days_frequency, cache_prefix,
+                                       work_queue=work_queue if batch else None, batch=batch)
+
+    # --- Hacker News daily summary, independent of the GitHub part ---
+    def hn_summary(inputs):
+        # hn_topic_job keeps today's summary artifact fresh; only regenerate if it is missing or stale
+        hn_summary_stream = report_generator.get_or_generate_hacker_news_daily_summary(
+            current_date_str_for_reports, max_age=HN_DAILY_SUMMARY_MAX_AGE_SECONDS)
+        return "".join(str(chunk) for chunk in hn_summary_stream)
+
+    hn_task = graph.add('hn_summary', hn_summary, timeout=HN_SUMMARY_TIMEOUT_SECONDS,
+                        retries=DAILY_REPORT_TASK_RETRIES)
+
+    # --- Per-category Hacker News story lists, only when some recipient filters by category ---
+    recipients = parse_digest_recipients(notifier.email_settings)
+    hn_categories_task = None
+    if any(recipient.hn_categories is not None for recipient in recipients):
+        hn_categories_task = graph.add(
+            'hn_categories', lambda inputs: report_generator.get_hacker_news_category_sections(
+                current_date_str_for_reports))
+
+    # --- Compose: one digest per distinct recipient filter, from fragments generated once ---
+    # A failed part becomes an error note instead of failing the email
+    def compose(inputs):
+        github_result = inputs.get(github_task)
+        if github_result and github_result['report'].strip():
+            github_report_string = github_result['report']
+        elif github_result is not None:
+            github_report_string = "_GitHub仓库更新: 未能生成或无内容。_"
+        else:
+            github_report_string = f"_GitHub仓库更新: 生成时发生错误 - {graph.results[github_task].error}_"
+
+        if inputs.get(hn_task, '').strip():
+            hn_summary_string = inputs[hn_task]
+        elif hn_task in inputs:
+            hn_summary_string = "_Hacker News每日摘要: 未能生成或无内容。_"
+        else:
+            hn_summary_string = f"_Hacker News每日摘要: 生成时发生错误 - {graph.results[hn_task].error}_"
+
+        composer = DigestComposer(current_date_str_for_reports, github_report_string, hn_summary_string,
+                                  github_sections=(github_result or {}).get('sections'),
+                                  hn_category_sections=inputs.get(hn_categories_task))
+        return {'full': composer.compose(), 'groups': composer.compose_all(recipients)}
+
+    compose_deps = [github_task, hn_task] + ([hn_categories_task] if hn_categories_task else [])
+    compose_task = graph.add('compose', compose, deps=compose_deps, tolerate_failures=True)
+
+    # --- Send ---
     email_subject = f"每日资讯摘要 ({current_date_str_for_reports}): GitHub仓库 & Hacker News"
 
-    combined_report_markdown = (
-        f"# 每日资讯摘要 ({current_date_str_for_reports})\n\n"
-        f"## 1. GitHub 仓库订阅更新\n\n{github_report_string}\n\n"
-        f"---\n"
-        f"## 2. Hacker News 每日热点\n\n{hn_summary_string}"
-    )
-
-    try:
-        LOG.info(f"Attempting to send combined daily email. Subject: {email_subject}")
-        notifier.send_email(email_subject, combined_report_markdown)
-        LOG.info("Combined daily email sent successfully.")
-    except Exception as e_email:
-        LOG.error(f"Failed to send combined daily email: {e_email}", exc_info=True)
-
+    # 同一计划时间的日报只投递一次（补跑或失败重跑时不重复发送）
+    dedup_key = f"{DAILY_REPORTS_JOB}@{scheduled_for.isoformat()}" if scheduled_for else None
+
+    def send(inputs):
+        digests = inputs[compose_task]
+        # 没有个性化订阅时只有一组，收件人与配置中的 to 相同
+        groups = digests['groups'] or [(None, digests['full'])]
+        LOG.info(f"Attempting to send combined daily email to {len(groups)} recipient group(s). Subject: {email_subject}")
+        failed = 0
+        for addresses, markdown in groups:
+            group_key = dedup_key
+            if dedup_key and len(groups) > 1:
+                group_key = f"{dedup_key}:{hashlib.sha1(','.join(sorted(addresses)).encode('utf-8')).hexdigest()[:12]}"
+            # 配置了发件箱时这里只是入队，投递和重试由后台发送器完成
+            if notifier.send_email(email_subject, markdown, dedup_key=group_key, recipients=addresses) is False:
+                failed += 1
+        notifier.send_slack(email_subject, digests['full'],
+                            dedup_key=f"{dedup_key}:slack" if dedup_key else None)
+        if failed:
+            raise RuntimeError(f"{failed}/{len(groups)} 组收件人的邮件发送失败，详见日志")
+
+    send_task = graph.add('send', send, deps=[compose_task])
+
+    results = graph.run()
+    if not results[send_task].ok:
+        LOG.error(f"Failed to send combined daily email: {results[send_task].error}")
+        # 让台账记为失败，下次启动时补发；已完成的仓库报告在缓存中，重跑时不再生成
+        raise RuntimeError(f"每日合并报告发送失败: {results[send_task].error}")
+
+    LOG.info("Combined daily email handed off for delivery.")
     LOG.info("[每日合并报告任务执行完毕]")
 
 def hn_topic_job(hacker_news_client, report_generator):
@@ -107,7 +230,8 @@ def hn_topic_job(hacker_news_client, report_generator):
     if markdown_file_path is None:
         LOG.error("未能获取 Hacker News 的热门报道，无法生成小时报告。")
         LOG.info(f"[定时任务执行完毕] Hacker News 热点话题跟踪 - 无数据")
-        return
+        # 让台账记为失败，下次启动时补跑
+        raise RuntimeError("未能获取 Hacker News 的热门报道")
 
     try:
         # 从路径 hacker_news/YYYY-MM-DD/HH.md 解析日期和小时
@@ -126,125 +250,216 @@ def hn_topic_job(hacker_news_client, report_generator):
             return
 
         LOG.debug(f"从路径 {markdown_file_path} 解析得到日期: {target_date}, 小时: {target_hour}")
-        report = report_generator.get_hacker_news_hourly_report(target_date, target_hour)
-        LOG.debug(f"Generated HN hourly report (daemon): {report}")
+        report = "".join(report_generator.get_or_generate_hacker_news_hourly_report(target_date, target_hour, refresh=True))
+        LOG.debug(f"Generated HN hourly report (daemon): {report[:200]}")
     except Exception as e:
         LOG.error(f"处理 Hacker News 小时报告时发生错误 (路径: {markdown_file_path}): {e}", exc_info=True)
+        target_date = None
+
+    # Regenerate today's daily summary now that new hourly data exists, so the dashboard can serve it directly
+    if target_date:
+        try:
+            "".join(report_generator.get_or_generate_hacker_news_daily_summary(target_date, refresh=True))
+        except Exception as e:
+            LOG.error(f"预生成 Hacker News 每日摘要时发生错误 ({target_date}): {e}", exc_info=True)
 
     LOG.info(f"[定时任务执行完毕] Hacker News 热点话题跟踪")
 
 
 # Old hn_daily_job is removed.
 
-# Placeholder for where other components are initialized in main()
-# This function will be called from main() and when rescheduling.
-def setup_schedules(current_config, schedule_lib, beijing_timezone, local_timezone,
-                    job_send_daily_reports, job_hn_topic, # Pass job functions
-                    components): # Pass dict of components like notifier, report_generator etc.
-
-    LOG.info("Setting up scheduled jobs...")
-    schedule_lib.clear() # Clear any existing schedules before setting new ones
-
-    # --- Schedule Daily Combined Report Job ---
-    # Note: current_config.get_github_progress_frequency_days() is used for freq,
-    # this corresponds to the old github_job's frequency.
-    daily_report_exec_time_str_bj = current_config.get_github_progress_execution_time()
-    daily_report_freq_days = current_config.get_github_progress_frequency_days()
-
+DAILY_REPORTS_JOB = 'send_daily_reports'
+HN_TOPIC_JOB = 'hn_topic'
+BJ_HOURS_FOR_HN_TOPIC = ["00:00", "04:00", "08:00", "12:00", "16:00", "20:00"]
+# config.json 的检查间隔（秒），每次只做一次 stat，文件变化后才重新加载
+CONFIG_WATCH_INTERVAL_SECONDS = 5
+# 收到终止信号后等待执行中任务结束的最长时间（秒）
+SHUTDOWN_TIMEOUT_SECONDS = 60
+# 重启后最多补发最近几次错过的日报，更早的只记入台账
+DAILY_REPORTS_CATCHUP_LIMIT = 2
+DAILY_REPORTS_CATCHUP_WINDOW = timedelta(days=3)
+# 同时进行的补跑执行数
+MAX_CATCHUP_PARALLEL = 2
+
+
+def _daily_report_schedule(current_config):
+    return (current_config.get_github_progress_execution_time(),
+            current_config.get_github_progress_frequency_days())
+
+
+def schedule_daily_reports(scheduler, current_config, components):
+    """
+    按配置安排每日合并报告任务（北京时间），已存在时替换触发器
+
+    Returns:
+        是否安排成功
+    """
+    exec_time_bj, freq_days = _daily_report_schedule(current_config)
     try:
-        parsed_time_bj = datetime.strptime(daily_report_exec_time_str_bj, "%H:%M").time()
-
-        now_for_date_bj = datetime.now(beijing_timezone)
-        target_dt_bj = now_for_date_bj.replace(hour=parsed_time_bj.hour, minute=parsed_time_bj.minute, second=0, microsecond=0)
-
-        local_target_dt = target_dt_bj.astimezone(local_timezone)
-        local_daily_report_time_str = local_target_dt.strftime("%H:%M")
-
-        LOG.info(f"Daily Combined Report job: Configured for Beijing Time {daily_report_exec_time_str_bj} (every {daily_report_freq_days} days).")
-        LOG.info(f"Calculated server local time for scheduling Daily Combined Report job: {local_daily_report_time_str} (Timezone: {local_timezone}).")
+        trigger = DailyTrigger([exec_time_bj], BEIJING_TZ, interval_days=freq_days)
+    except ValueError:
+        LOG.error(f"Invalid format for 'progress_execution_time' ('{exec_time_bj}'). Daily Combined Report job NOT scheduled.")
+        scheduler.remove_job(DAILY_REPORTS_JOB)
+        return False
+
+    LOG.info(f"Daily Combined Report job: Configured for Beijing Time {exec_time_bj} (every {freq_days} days).")
+    # 日报耗时较长，上一次未结束时跳过本次；重新安排时同名任务被替换，执行频率参数随之更新。
+    # 错过的日报按各自的计划日期补发
+    scheduler.add_job(
+        DAILY_REPORTS_JOB, send_daily_reports_job, trigger,
+        components['subscription_manager'],
+        components['github_client'],
+        components['report_generator'],
+        components['notifier'],
+        freq_days,
+        overlap=OVERLAP_SKIP,
+        catchup=CATCHUP_ALL,
+        catchup_limit=DAILY_REPORTS_CATCHUP_LIMIT,
+        catchup_window=DAILY_REPORTS_CATCHUP_WINDOW,
+        pass_scheduled_time=True,
+        work_queue=components.get('work_queue'),
+    )
+    return True
 
-        schedule_lib.every(daily_report_freq_days).days.at(local_daily_report_time_str).do(
-            job_send_daily_reports, # This is the renamed github_job
-            components['subscription_manager'],
-            components['github_client'],
-            components['report_generator'],
-            components['notifier'],
-            daily_report_freq_days
-        )
-        LOG.info(f"Daily Combined Report job successfully scheduled at {local_daily_report_time_str} server local time.")
 
-    except ValueError:
-        LOG.error(f"Invalid format for 'progress_execution_time' ('{daily_report_exec_time_str_bj}'). Daily Combined Report job NOT scheduled.")
-    except Exception as e_sched_daily:
-        LOG.error(f"Error during Daily Combined Report job scheduling: {e_sched_daily}", exc_info=True)
+def setup_schedules(scheduler, current_config, components):
+    """在调度器中安排全部定时任务"""
+    LOG.info("Setting up scheduled jobs...")
+    schedule_daily_reports(scheduler, current_config, components)
 
-    # --- Schedule HN Topic Job (Beijing Time based) ---
-    BJ_HOURS_FOR_HN_TOPIC = ["00:00", "04:00", "08:00", "12:00", "16:00", "20:00"]
+    # HN 热点跟踪：上一次仍在执行时合并为一次补跑，保证新数据最终会被处理。
+    # 抓取的是当前热榜，错过的计划时间无法回溯，重启后立即执行一次
     LOG.info(f"Hacker News Topic job: Will be scheduled for these Beijing Times: {BJ_HOURS_FOR_HN_TOPIC}.")
+    scheduler.add_job(
+        HN_TOPIC_JOB, hn_topic_job, DailyTrigger(BJ_HOURS_FOR_HN_TOPIC, BEIJING_TZ),
+        components['hacker_news_client'],
+        components['report_generator'],
+        overlap=OVERLAP_COALESCE,
+        catchup=CATCHUP_LATEST,
+    )
+    LOG.info("All job scheduling setup completed.")
+
 
-    for bj_hour_str in BJ_HOURS_FOR_HN_TOPIC:
-        local_hn_topic_time_str = "ERROR" # Default in case of error before assignment
+async def work_loop(work_queue, handlers, interval, stop_event):
+    """多进程模式下持续领取其他守护进程发布的工作项"""
+    while not stop_event.is_set():
         try:
-            parsed_hn_time_bj = datetime.strptime(bj_hour_str, "%H:%M").time()
+            processed = await asyncio.to_thread(work_queue.process, handlers)
+            if processed:
+                LOG.info(f"本进程处理了 {processed} 个工作项")
+        except Exception as e:
+            LOG.error(f"处理工作项时出错: {e}", exc_info=True)
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
 
-            now_for_date_bj_hn = datetime.now(beijing_timezone)
-            target_dt_bj_hn = now_for_date_bj_hn.replace(
-                hour=parsed_hn_time_bj.hour, minute=parsed_hn_time_bj.minute, second=0, microsecond=0
-            )
 
-            local_target_dt_hn = target_dt_bj_hn.astimezone(local_timezone)
-            local_hn_topic_time_str = local_target_dt_hn.strftime("%H:%M")
+def _rebuild_llm(report_generator):
+    """llm 配置段变化时按新配置重建 LLM 客户端"""
+    def on_llm_change(latest_config, changed, previous_config):
+        LOG.info("LLM 配置已变化，重建 LLM 客户端。")
+        # 正在执行的任务仍持有旧客户端，不主动关闭，其连接池随对象回收释放
+        report_generator.llm = LLM(settings=latest_config)
+    return on_llm_change
 
-            LOG.info(f"  Scheduling HN Topic job for Beijing Time {bj_hour_str} at server local time {local_hn_topic_time_str} (Timezone: {local_timezone}).")
-            schedule_lib.every().day.at(local_hn_topic_time_str).do(
-                job_hn_topic,
-                components['hacker_news_client'],
-                components['report_generator']
-            )
-        except Exception as e_sched_hn_topic:
-            LOG.error(f"Error scheduling HN Topic job for Beijing Time {bj_hour_str} (calculated local: {local_hn_topic_time_str}): {e_sched_hn_topic}", exc_info=True)
 
-    LOG.info("All job scheduling setup completed.")
+def _rebuild_github_client(components):
+    """github.token 变化时按新令牌重建 GitHub 客户端"""
+    def on_github_change(latest_config, changed, previous_config):
+        token = latest_config.get_github_token()
+        if token == previous_config.get_github_token():
+            return
+        LOG.info("GitHub 令牌已变化，重建 GitHub 客户端。")
+        # 与 LLM 相同，正在执行的任务继续使用旧客户端；之后的报告和重新安排的任务使用新客户端
+        github_client = GitHubClient(token)
+        components['github_client'] = github_client
+        components['report_generator'].github_client = github_client
+    return on_github_change
+
+
+async def run_daemon(settings_service, components):
+    """运行调度器和配置监视，直到收到 SIGTERM / SIGINT"""
+    config = settings_service.current()
+    daemon_config = config.get_daemon_config()
+    lease_store = components.get('lease_store')
+    ledger = components.get('ledger') or JobRunLedger()
+    scheduler = AsyncScheduler(ledger=ledger, max_catchup_parallel=MAX_CATCHUP_PARALLEL,
+                               lease_store=lease_store)
+    setup_schedules(scheduler, config, components)
+    scheduled = {'daily': _daily_report_schedule(config)}
+    LOG.info(f"Initial daily report execution time (Beijing Time): {scheduled['daily'][0]}")
+
+    def on_schedule_change(latest_config, changed, previous_config):
+        new_schedule = _daily_report_schedule(latest_config)
+        if new_schedule == scheduled['daily']:
+            LOG.debug("No change detected in daily report schedule.")
+            return
+        LOG.info(f"Detected change in daily report schedule from {scheduled['daily']} to {new_schedule}. Rescheduling.")
+        schedule_daily_reports(scheduler, latest_config, components)
+        scheduled['daily'] = new_schedule
+
+    # 各组件只在自己依赖的配置段变化时更新
+    report_generator = components['report_generator']
+    notifier = components['notifier']
+    settings_service.subscribe(lambda latest_config, changed, previous_config:
+                               setattr(report_generator, 'settings', latest_config))
+    settings_service.subscribe(_rebuild_llm(report_generator), sections=['llm'])
+    settings_service.subscribe(_rebuild_github_client(components), sections=['github'])
+    settings_service.subscribe(lambda latest_config, changed, previous_config: notifier.apply_settings(
+        latest_config.get_email_config(), latest_config.get_slack_webhook_url()), sections=['email', 'slack'])
+    settings_service.subscribe(on_schedule_change, sections=['github'])
+
+    stop_watching = asyncio.Event()
+
+    def request_shutdown():
+        LOG.info("[优雅退出]守护进程接收到终止信号")
+        stop_watching.set()
+        scheduler.stop()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, request_shutdown)
+
+    background = [asyncio.create_task(watch_file(settings_service.config_file, settings_service.reload,
+                                                 interval=CONFIG_WATCH_INTERVAL_SECONDS, stop_event=stop_watching))]
+    if components.get('outbox') is not None:
+        sender = OutboxSender(components['outbox'], components['notifier'].outbox_channels())
+        background.append(asyncio.create_task(sender.run(stop_watching)))
+    if components.get('work_queue') is not None:
+        report_generator = components['report_generator']
+        handlers = {report_generator.GITHUB_PROJECT_WORK_KIND: report_generator.handle_github_project_work_item}
+        background.append(asyncio.create_task(work_loop(components['work_queue'], handlers,
+                                                        daemon_config['worker_poll_seconds'], stop_watching)))
+        LOG.info(f"多进程模式已启用，本进程标识: {lease_store.owner}")
+    LOG.info("计划任务设置完毕。进入调度循环...")
+    try:
+        await scheduler.run(shutdown_timeout=SHUTDOWN_TIMEOUT_SECONDS)
+    finally:
+        stop_watching.set()
+        await asyncio.gather(*background)
+        # 释放话题分析工作进程
+        if components.get('hacker_news_client') is not None:
+            await asyncio.to_thread(components['hacker_news_client'].close)
 
 
 def main():
-    # 设置信号处理器
-    signal.signal(signal.SIGTERM, graceful_shutdown)
-
-    config = Config()
+    settings_service = get_settings_service()
+    # 只由事件循环中的 watch_file 重新加载，配置变化回调不会在任务线程中执行
+    settings_service.check_interval = None
+    config = settings_service.current()
     github_client = GitHubClient(config.get_github_token()) # Use getter
-    hacker_news_client = HackerNewsClient()
-    notifier = Notifier(config.get_email_config()) # Use getter
+    # 上升速度与上一次定时抓取的采样比较
+    hacker_news_client = HackerNewsClient(sample_interval_hours=24 / len(BJ_HOURS_FOR_HN_TOPIC))
+    # 报告任务只把通知写入发件箱，由 run_daemon 中的发送器异步投递
+    outbox = NotificationOutbox(OUTBOX_DB_PATH)
+    notifier = Notifier(config.get_email_config(), outbox=outbox, slack_webhook_url=config.get_slack_webhook_url())
     llm = LLM(settings=config)
-    report_generator = ReportGenerator(llm=llm, settings=config, github_client=github_client)
-    subscription_manager = SubscriptionManager(config.get_subscriptions_file()) # Use positional argument
-
-    beijing_tz = pytz.timezone('Asia/Shanghai')
-    try:
-        # Attempt to get local timezone robustly
-        # Using tzlocal library is a more robust way if available, but sticking to pytz for now.
-        local_tz_name_from_system = time.tzname[0] if time.daylight == 0 else time.tzname[1]
-        # Check if tzname is specific enough, pytz might not recognize all system names directly
-        # For common ones like 'CST', 'EST', it might be okay, but can be ambiguous.
-        # A more direct way with pytz if system is well-configured for Python:
-        local_tz = datetime.now().astimezone().tzinfo
-        if local_tz is None or local_tz.tzname(None) is None or local_tz.tzname(None) in ['LMT', 'zzz']: # Check for minimal/ambiguous tzinfo
-             LOG.warning(f"System local timezone name '{local_tz_name_from_system}' or resolved tzinfo '{local_tz}' is ambiguous or not specific. Falling back to offset-based local time. Scheduling might be less robust to DST changes if server's zone info is not fully recognized by pytz without tzlocal.")
-             local_tz = datetime.now(pytz.utc).astimezone().tzinfo # This gets an offset-aware tz
-        # else:
-            # Attempt to make it a pytz timezone object if it's just a simple name from datetime.now().astimezone().tzinfo
-            # This can be tricky. If local_tz is already a pytz object, this is fine.
-            # If it's a simple string from tzinfo.tzname(), we might need to look it up.
-            # For now, the above .astimezone().tzinfo should provide a usable tzinfo object.
-            # If it's a string, it would need pytz.timezone(str(local_tz))
-            # but tzinfo objects from datetime.now().astimezone().tzinfo are usually sufficient for astimezone() calls.
-
-    except Exception as e_tz:
-        LOG.error(f"Error determining local system timezone: {e_tz}. Defaulting to UTC for safety, this may not match server's actual local time behavior if server is not UTC.", exc_info=True)
-        local_tz = pytz.utc
+    report_generator = ReportGenerator(llm=llm, settings=config, github_client=github_client,
+                                       artifact_store=ReportArtifactStore(search_index=get_search_index()))
+    subscription_manager = SubscriptionManager(config.get_subscriptions_file(), store=config.get_subscription_store())
 
     LOG.info("守护进程已启动。")
-    LOG.info(f"Configured server's determined local timezone for scheduling: {local_tz}")
 
     # Store components in a dictionary to pass to setup_schedules
     job_components = {
@@ -252,78 +467,25 @@ def main():
         'github_client': github_client,
         'report_generator': report_generator,
         'notifier': notifier,
-        'hacker_news_client': hacker_news_client
+        'hacker_news_client': hacker_news_client,
+        'outbox': outbox,
     }
 
-    # Initial scheduling
-    # Note: github_job is passed as job_send_daily_reports.
-    # hn_daily_job is removed from direct scheduling here.
-    # All previous schedule.every(...) lines are removed and handled by setup_schedules.
-    current_config_for_scheduling = config
-    setup_schedules(current_config_for_scheduling, schedule, beijing_tz, local_tz,
-                    send_daily_reports_job, hn_topic_job,
-                    job_components)
-    last_scheduled_daily_exec_time_bj = current_config_for_scheduling.get_github_progress_execution_time()
-
-    LOG.info(f"Initial daily report execution time (Beijing Time): {last_scheduled_daily_exec_time_bj}")
-    LOG.info(f"计划任务设置完毕。进入主循环...")
-
-    loop_counter = 0
-    check_config_interval_seconds = 60
-    loops_per_config_check = check_config_interval_seconds // 1
+    # 多进程模式：多个守护进程共享租约库，每次计划执行只由一个进程完成，仓库报告由各进程分担
+    # 执行台账与租约放在同一个数据库中，各进程看到相同的执行状态
+    daemon_config = config.get_daemon_config()
+    if daemon_config['distributed']:
+        lease_store = LeaseStore(daemon_config['cluster_db'], ttl=daemon_config['lease_ttl'])
+        job_components['ledger'] = JobRunLedger(daemon_config['cluster_db'])
+        job_components['lease_store'] = lease_store
+        job_components['work_queue'] = WorkItemQueue(lease_store)
 
     try:
-        while True:
-            now_utc = datetime.now(pytz.utc)
-            now_beijing = now_utc.astimezone(beijing_tz)
-            now_local_server = now_utc.astimezone(local_tz)
-
-            # --- Configuration Reload Check ---
-            if loop_counter % loops_per_config_check == 0:
-                LOG.debug(f"Loop iteration {loop_counter}. Checking for configuration changes...")
-                try:
-                    latest_config = Config() # Re-load config
-                    new_daily_exec_time_bj = latest_config.get_github_progress_execution_time()
-
-                    if new_daily_exec_time_bj != last_scheduled_daily_exec_time_bj:
-                        LOG.info(f"Detected change in 'github.progress_execution_time' from '{last_scheduled_daily_exec_time_bj}' to '{new_daily_exec_time_bj}'. Rescheduling all jobs.")
-
-                        setup_schedules(latest_config, schedule, beijing_tz, local_tz,
-                                        send_daily_reports_job, hn_topic_job,
-                                        job_components)
-
-                        last_scheduled_daily_exec_time_bj = new_daily_exec_time_bj
-                        current_config_for_scheduling = latest_config
-                        LOG.info(f"Jobs rescheduled for new daily execution time (Beijing Time): {new_daily_exec_time_bj}")
-                    else:
-                        LOG.debug("No change detected in 'github.progress_execution_time'.")
-                except Exception as e_conf_reload:
-                    LOG.error(f"Error during configuration reload and check: {e_conf_reload}", exc_info=True)
-
-            # --- Heartbeat Logging ---
-            if loop_counter % 300 == 0:
-                LOG.debug(f"Daemon heartbeat. Current loop count: {loop_counter}")
-                LOG.debug(f"Current time: UTC: {now_utc.strftime('%Y-%m-%d %H:%M:%S %Z')}, Beijing: {now_beijing.strftime('%Y-%m-%d %H:%M:%S %Z')}, ServerLocal ({local_tz}): {now_local_server.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-                if schedule.jobs:
-                    job_details = []
-                    for job in schedule.jobs:
-                        job_details.append(f"  - Job: {job!r}, Next Run (local server time): {job.next_run}")
-                    LOG.debug(f"Current scheduled jobs ({len(schedule.jobs)}):\n" + "\n".join(job_details))
-                else:
-                    LOG.debug("No jobs currently scheduled.")
-
-            schedule.run_pending()
-
-            loop_counter += 1
-            if loop_counter >= 86400 * max(1, loops_per_config_check // 300 if loops_per_config_check > 0 and 300 % loops_per_config_check == 0 else 1) : # Reset loop_counter to avoid excessive growth
-                loop_counter = 0
-
-            time.sleep(1)
+        asyncio.run(run_daemon(settings_service, job_components))
     except Exception as e:
         LOG.error(f"主进程发生异常: {str(e)}", exc_info=True)
         sys.exit(1)
 
 
-
 if __name__ == '__main__':
     main()
@@ -7,17 +7,23 @@ import glob
 try:
     from src.core.base_report_generator import BaseReportGenerator
     from src.clients.hacker_news_client import HackerNewsClient
+    from src.utils.dedup import dedup_markdown_stories
+    from src.utils.hn_snapshots import HNSnapshotStore, render_aggregated_stories
     from src.logger import LOG
 except ImportError:
     try:
         from core.base_report_generator import BaseReportGenerator
         from clients.hacker_news_client import HackerNewsClient
+        from utils.dedup import dedup_markdown_stories
+        from utils.hn_snapshots import HNSnapshotStore, render_aggregated_stories
         from logger import LOG
     except ImportError:
         import logging
         LOG = logging.getLogger(__name__)
         from base_report_generator import BaseReportGenerator
         from hacker_news_client import HackerNewsClient
+        from dedup import dedup_markdown_stories
+        from hn_snapshots import HNSnapshotStore, render_aggregated_stories
 
 class HackerNewsReportGenerator(BaseReportGenerator):
     """
@@ -130,6 +136,11 @@ class HackerNewsReportGenerator(BaseReportGenerator):
             LOG.warning(f"Hacker News数据目录{data_dir}不存在")
             return f"# Hacker News {date_str}数据\n\n未找到该日期的数据。"
         
+        # 优先使用结构化的小时快照，没有快照时（旧数据）再拼接Markdown文件
+        stories = HNSnapshotStore("hacker_news").aggregate([date_str])
+        if stories:
+            return render_aggregated_stories(stories, f"Hacker News {date_str}全天数据")
+        
         # 获取所有小时文件
         hour_files = glob.glob(os.path.join(data_dir, "*.md"))
         if not hour_files:
@@ -139,17 +150,22 @@ class HackerNewsReportGenerator(BaseReportGenerator):
         # 按小时排序
         hour_files.sort()
         
-        # 读取并聚合所有小时数据
-        all_hours_content = []
+        # 读取所有小时数据
+        hours = []
+        contents = []
         for hour_file in hour_files:
             try:
                 hour = os.path.basename(hour_file).replace(".md", "")
                 with open(hour_file, "r", encoding="utf-8") as f:
-                    content = f.read()
-                all_hours_content.append(f"## {hour}:00\n\n{content}\n")
+                    contents.append(f.read())
+                hours.append(hour)
             except Exception as e:
                 LOG.error(f"读取{hour_file}时发生错误: {e}", exc_info=True)
         
+        # 同一故事会出现在多个小时的文件中，只保留最新的一条
+        contents = dedup_markdown_stories(contents)
+        all_hours_content = [f"## {hour}:00\n\n{content}\n" for hour, content in zip(hours, contents)]
+        
         # 合并所有小时数据
         return f"# Hacker News {date_str}全天数据\n\n" + "\n".join(all_hours_content)
     
@@ -5,6 +5,21 @@ from openai import OpenAI  # 导入OpenAI库用于访问GPT模型
 from logger import LOG  # 导入日志模块
 import time
 
+
+class ErrorChunk(str):
+    """
+    流式输出中的错误提示。仍按普通文本展示，调用方据 is_error 判断生成没有正常完成
+    （例如不把这次的输出保存为报告产物）。本模块可能以 llm 和 src.llm 两个名字导入，
+    因此用属性而不是 isinstance 判断。
+    """
+    is_error = True
+
+
+def is_error_chunk(chunk) -> bool:
+    """chunk 是否为 ErrorChunk"""
+    return getattr(chunk, 'is_error', False) is True
+
+
 class LLM:
     def __init__(self, settings): # Renamed parameter from config to settings
         """
@@ -23,6 +38,8 @@ class LLM:
         self.ollama_model_name = None
         self.ollama_api_url = None
         self.client = None # OpenAI client
+        self.http_client = None # httpx.Client backing the OpenAI client
+        self.ollama_session = None # requests.Session reused across Ollama calls
 
         try:
             raw_model_type_from_settings = self.settings.get_llm_model_type()
@@ -68,6 +85,7 @@ class LLM:
                     follow_redirects=True  # 跟随重定向
                 )
                 client_params["http_client"] = custom_http_client
+                self.http_client = custom_http_client
                 LOG.debug("自定义 httpx.Client 创建成功并已添加到 client_params。")
             except Exception as http_client_exc:
                 LOG.error(f"创建自定义 httpx.Client 时发生错误: {http_client_exc}", exc_info=True)
@@ -114,12 +132,27 @@ class LLM:
         elif self.model_type == "ollama":
             self.ollama_model_name = self.settings.get_ollama_model_name()
             self.ollama_api_url = self.settings.get_ollama_api_url()
-            # ... (any other ollama specific setup)
+            self.ollama_session = requests.Session() # Keep-alive connections survive across reports
         else:
             # This log should ideally include the problematic value of self.model_type
             LOG.error(f"LLM.__init__: 不支持的模型类型在最终判断时为: '{self.model_type}'")
             # raise ValueError(f"不支持的模型类型: {self.model_type}") # Temporarily comment out raise for full log flow
 
+    def close(self):
+        """
+        关闭底层的 HTTP 连接池。实例被长期缓存复用（例如 Streamlit 的 cache_resource）时，
+        在被替换或释放时调用。
+        """
+        if self.http_client is not None:
+            try:
+                self.http_client.close()
+            except Exception as e:
+                LOG.warning(f"关闭 httpx.Client 时出错: {e}")
+            self.http_client = None
+        if self.ollama_session is not None:
+            self.ollama_session.close()
+            self.ollama_session = None
+
     def generate_report(self, system_prompt, user_content):
         """
         生成报告，根据配置选择不同的模型来处理请求。
@@ -141,7 +174,7 @@ class LLM:
         else:
             # This case should have been caught in __init__
             LOG.error(f"generate_report called with unsupported model type: {self.model_type}")
-            yield f"错误: 不支持的模型类型 '{self.model_type}'。" # Yield error as a chunk
+            yield ErrorChunk(f"错误: 不支持的模型类型 '{self.model_type}'。") # Yield error as a chunk
 
     def _generate_report_openai(self, messages):
         """
@@ -153,7 +186,7 @@ class LLM:
         if not self.client:
             LOG.error("OpenAI 客户端未初始化。请检查 API Key 和 Base URL 配置。")
             # Yield error as a chunk or raise, for now, yield as error string
-            yield "错误: OpenAI 客户端未初始化。可能是由于 API Key 或 Base URL 配置不正确。"
+            yield ErrorChunk("错误: OpenAI 客户端未初始化。可能是由于 API Key 或 Base URL 配置不正确。")
             return # Stop generation
 
         LOG.info(f"使用 OpenAI {self.openai_model_name or '默认模型'} 模型流式生成报告 (Base URL: {self.openai_base_url or '默认'})。")
@@ -181,7 +214,7 @@ class LLM:
                 LOG.error(f"生成 OpenAI 报告时发生错误 (尝试 {retry_count}/{max_retries})：{e}")
                 if retry_count >= max_retries:
                     # 所有重试都失败
-                    yield f"错误: 调用 OpenAI API 失败 - {e}"
+                    yield ErrorChunk(f"错误: 调用 OpenAI API 失败 - {e}")
                 else:
                     # 稍等然后重试
                     wait_seconds = 2 ** retry_count  # 指数退避: 2, 4, 8...
@@ -200,7 +233,7 @@ class LLM:
         LOG.info(f"使用 Ollama {self.ollama_model_name or '默认模型'} 模型流式生成报告 (API URL: {self.ollama_api_url or '未配置'})。")
         if not self.ollama_api_url or not self.ollama_model_name:
             LOG.error("Ollama API URL 或模型名称未配置。")
-            yield "错误: Ollama API URL 或模型名称未配置。" # Yield error as a chunk
+            yield ErrorChunk("错误: Ollama API URL 或模型名称未配置。") # Yield error as a chunk
             return # Stop generation
         try:
             payload = {
@@ -212,7 +245,8 @@ class LLM:
                 "stream": True # Enable streaming
             }
 
-            response = requests.post(self.ollama_api_url, json=payload, stream=True) # Corrected self.api_url to self.ollama_api_url
+            http = self.ollama_session or requests
+            response = http.post(self.ollama_api_url, json=payload, stream=True) # Corrected self.api_url to self.ollama_api_url
             response.raise_for_status()  # Raise an exception for HTTP error codes
 
             for line in response.iter_lines():
@@ -242,12 +276,13 @@ class LLM:
                     except json.JSONDecodeError:
                         LOG.warning(f"无法解码来自 Ollama 的 JSON 行: {line.decode('utf-8')}")
                         continue # Skip malformed lines
+            response.close() # Release the connection back to the session pool
         except requests.exceptions.RequestException as e:
             LOG.error(f"调用 Ollama API 时发生请求错误：{e}")
-            yield f"错误: 调用 Ollama API 失败 - {e}"
+            yield ErrorChunk(f"错误: 调用 Ollama API 失败 - {e}")
         except Exception as e:
             LOG.error(f"生成 Ollama 报告时发生错误：{e}")
-            yield f"错误: 处理 Ollama 响应时发生未知错误 - {e}"
+            yield ErrorChunk(f"错误: 处理 Ollama 响应时发生未知错误 - {e}")
             raise
 
 if __name__ == '__main__':
@@ -1,5 +1,5 @@
 import smtplib
-import markdown2
+import requests
 import re
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -8,164 +8,63 @@ import socket # From previous step
 import traceback # From previous step
 import os # For template path
 
+try:
+    from src.utils.smtp_delivery import SmtpDeliveryEngine, SmtpDeliveryError, PartialDeliveryError, is_transient_error
+    from src.utils.outbox import PermanentDeliveryError
+    from src.utils.email_renderer import get_email_renderer
+except ImportError:
+    from utils.smtp_delivery import SmtpDeliveryEngine, SmtpDeliveryError, PartialDeliveryError, is_transient_error
+    from utils.outbox import PermanentDeliveryError
+    from utils.email_renderer import get_email_renderer
+
+# Slack 单条消息文本的长度上限约为 40000 字符
+SLACK_MAX_TEXT_LENGTH = 39000
+SLACK_TIMEOUT_SECONDS = 10
+
 class Notifier:
-    def __init__(self, email_settings):
+    def __init__(self, email_settings, outbox=None, slack_webhook_url=None):
+        """
+        Args:
+            email_settings: 邮件配置
+            outbox: NotificationOutbox；提供时通知写入发件箱，由后台发送器投递
+            slack_webhook_url: Slack Incoming Webhook 地址
+        """
         self.email_settings = email_settings
+        self.outbox = outbox
+        self.slack_webhook_url = slack_webhook_url
         # Define template path relative to this file
         # Ensure the 'templates' directory is at the same level as 'notifier.py' or adjust path accordingly.
         # Assuming 'src/templates/email_template.html' and 'src/notifier.py'
         self.template_path = os.path.join(os.path.dirname(__file__), 'templates', 'email_template.html')
-        
-    def _generate_toc(self, markdown_text):
-        """从Markdown文本生成目录HTML"""
-        # 查找所有标题行
-        headers = []
-        for line in markdown_text.split('\n'):
-            if line.startswith('#'):
-                level = 0
-                for char in line:
-                    if char == '#':
-                        level += 1
-                    else:
-                        break
-                
-                if level > 0 and level <= 3:  # 只处理一级到三级标题
-                    title = line.lstrip('#').strip()
-                    anchor = title.lower().replace(' ', '-').replace('.', '').replace(':', '')
-                    anchor = re.sub(r'[^\w\-]', '', anchor)
-                    # 中文处理
-                    anchor = re.sub(r'[\u4e00-\u9fff]', lambda x: f"ch{ord(x.group())}", anchor)
-                    headers.append((level, title, anchor))
-        
-        if not headers:
-            return ""  # 如果没有找到标题，则返回空字符串
-        
-        # 生成目录HTML
-        toc_html = '<div class="toc">\n'
-        toc_html += '<div class="toc-title">目录</div>\n'
-        toc_html += '<ul>\n'
-        
-        current_level = 0
-        for level, title, anchor in headers:
-            # 根据标题层级调整缩进
-            if level > current_level:
-                while level > current_level:
-                    toc_html += '<ul>\n'
-                    current_level += 1
-            elif level < current_level:
-                while level < current_level:
-                    toc_html += '</ul>\n'
-                    current_level -= 1
-            
-            toc_html += f'<li><a href="#{anchor}">{title}</a></li>\n'
-        
-        # 关闭所有剩余的列表标签
-        while current_level > 0:
-            toc_html += '</ul>\n'
-            current_level -= 1
-        
-        toc_html += '</ul>\n'
-        toc_html += '</div>\n'
-        
-        return toc_html
-
-    def _load_email_template(self, subject_content, report_html_content):
-        try:
-            # Check if template file exists
-            if not os.path.exists(self.template_path):
-                LOG.error(f"Email template file not found at {self.template_path}. Sending plain HTML report.")
-                # Fallback to just the report HTML if template is missing
-                return f"<h1>{subject_content}</h1>{report_html_content}"
-
-            with open(self.template_path, 'r', encoding='utf-8') as f:
-                template = f.read()
-            template = template.replace('{{subject}}', subject_content)
-            template = template.replace('{{report_content}}', report_html_content)
-            return template
-        except FileNotFoundError: # Should be caught by os.path.exists, but as a safeguard
-            LOG.error(f"Email template not found (FileNotFoundError) at {self.template_path}. Sending plain HTML report.")
-            return f"<h1>{subject_content}</h1>{report_html_content}"
-        except Exception as e:
-            LOG.error(f"Error loading email template: {e}. Sending plain HTML report.")
-            return f"<h1>{subject_content}</h1>{report_html_content}"
-    
-    def _preprocess_markdown(self, markdown_text):
+        # 模板只编译一次，渲染结果在进程内共享缓存
+        self.renderer = get_email_renderer(self.template_path)
+        # 复用已登录的 SMTP 会话，首次发送时创建
+        self._delivery = None
+
+    @property
+    def delivery(self) -> SmtpDeliveryEngine:
+        if self._delivery is None:
+            self._delivery = SmtpDeliveryEngine(self.email_settings)
+        return self._delivery
+
+    def close(self):
+        """关闭保持的 SMTP 会话"""
+        if self._delivery is not None:
+            self._delivery.close()
+            self._delivery = None
+
+    def apply_settings(self, email_settings, slack_webhook_url=None):
         """
-        预处理Markdown文本，增强一些特性的支持
+        配置变化后更新邮件和 Slack 设置；邮件设置变化时关闭已登录的 SMTP 会话，下次发送时按新配置重建
+
+        Args:
+            email_settings: 新的邮件配置
+            slack_webhook_url: 新的 Slack Incoming Webhook 地址
         """
-        # 修复列表项的识别 (确保列表项前有空行)
-        pattern = r'([^\n])\n([\s]*[-*+][\s]+)'
-        markdown_text = re.sub(pattern, r'\1\n\n\2', markdown_text)
-        
-        # 修复数字列表项的识别
-        pattern = r'([^\n])\n([\s]*\d+\.[\s]+)'
-        markdown_text = re.sub(pattern, r'\1\n\n\2', markdown_text)
-        
-        # 增强代码块的处理
-        def enhance_code_blocks(match):
-            entire_block = match.group(0)
-            code_content = match.group(1)
-            
-            # 检查是否有语言标识
-            first_line = code_content.strip().split('\n')[0] if '\n' in code_content.strip() else ''
-            language = ''
-            
-            if first_line and not first_line.startswith(' '):
-                language = first_line
-                # 移除语言标识行
-                code_content = code_content[len(first_line):].strip()
-                return f"```{language}\n{code_content}\n```"
-            
-            return entire_block
-        
-        # 处理以```开始和结束的代码块
-        pattern = r'```(.*?)```'
-        markdown_text = re.sub(pattern, enhance_code_blocks, markdown_text, flags=re.DOTALL)
-        
-        # 为标题添加锚点ID
-        lines = markdown_text.split('\n')
-        for i in range(len(lines)):
-            if lines[i].startswith('#'):
-                level = 0
-                for char in lines[i]:
-                    if char == '#':
-                        level += 1
-                    else:
-                        break
-                
-                if level > 0:
-                    title = lines[i].lstrip('#').strip()
-                    anchor = title.lower().replace(' ', '-').replace('.', '').replace(':', '')
-                    anchor = re.sub(r'[^\w\-]', '', anchor)
-                    # 中文处理
-                    anchor = re.sub(r'[\u4e00-\u9fff]', lambda x: f"ch{ord(x.group())}", anchor)
-                    
-                    lines[i] = f"{lines[i]} {{#{anchor}}}"
-        
-        markdown_text = '\n'.join(lines)
-        
-        # 在大块内容之间添加"回到顶部"链接
-        if len(markdown_text) > 1000:  # 只对较长内容添加
-            headers = re.findall(r'^#{2,3} .+$', markdown_text, re.MULTILINE)
-            if len(headers) >= 2:  # 至少有两个二级或三级标题
-                # 在二级和三级标题前添加"回到顶部"链接
-                markdown_text = re.sub(
-                    r'(\n{2,})^(#{2,3} .+)$',
-                    r'\1<div class="back-to-top"><a href="#top">回到顶部 ↑</a></div>\n\n\2',
-                    markdown_text,
-                    flags=re.MULTILINE
-                )
-        
-        return markdown_text
-    
-    def _enhance_html_with_toc(self, html_content, markdown_text):
-        """在HTML内容的开头添加目录"""
-        toc_html = self._generate_toc(markdown_text)
-        if toc_html:
-            # 添加top锚点
-            html_content = f'<a id="top"></a>\n{toc_html}\n{html_content}'
-        
-        return html_content
+        if email_settings != self.email_settings:
+            self.close()
+            self.email_settings = email_settings
+        self.slack_webhook_url = slack_webhook_url
 
     def notify_github_report(self, repo, report):
         if self.email_settings:
@@ -181,20 +80,30 @@ class Notifier:
         else:
             LOG.warning("邮件设置未配置正确，无法发送 Hacker News 报告通知")
 
-    def send_email(self, subject, report_markdown):
-        LOG.info(f"准备发送邮件: {subject}")
+    def _build_message(self, subject, report_markdown, recipients=None):
+        """
+        生成邮件内容
 
+        Args:
+            subject: 邮件主题
+            report_markdown: Markdown 格式的报告
+            recipients: 收件人列表，None 时使用配置中的 to
+
+        Returns:
+            (发件人, 收件人列表, MIME 邮件)，配置不完整时返回None
+        """
         if not self.email_settings.get('from') or \
-           not self.email_settings.get('to') or \
+           (recipients is None and not self.email_settings.get('to')) or \
            not self.email_settings.get('smtp_server') or \
            not self.email_settings.get('smtp_port'):
             LOG.error("Email settings incomplete (from, to, server, or port missing). Cannot send email.")
-            return
+            return None
 
         msg = MIMEMultipart('alternative')
         msg['From'] = self.email_settings['from']
 
-        recipients = self.email_settings['to']
+        if recipients is None:
+            recipients = self.email_settings['to']
         if isinstance(recipients, list):
             msg['To'] = ", ".join(recipients)
         else: # Assuming it's a string for a single recipient
@@ -203,75 +112,34 @@ class Notifier:
 
         if not recipients: # Handle empty recipient list after processing
             LOG.error("No recipients configured for email. Cannot send.")
-            return
+            return None
 
         msg['Subject'] = subject
 
-        # 预处理Markdown内容
-        processed_markdown = self._preprocess_markdown(report_markdown)
-
-        # 使用markdown2的扩展功能，支持更多的Markdown特性
-        extras = [
-            "code-friendly",   # 保留代码块中的空格
-            "fenced-code-blocks", # 支持```代码块
-            "tables",          # 支持表格
-            "break-on-newline", # 处理换行
-            "header-ids",      # 为标题生成IDs
-            "numbering",       # 支持数字列表
-            "strike",          # 支持删除线
-            "task_list",       # 支持任务列表
-            "wiki-tables",      # 支持更复杂的表格
-            "code-color"       # 支持代码块语法高亮
-        ]
-        
-        # 转换Markdown为HTML
-        html_report_content = markdown2.markdown(processed_markdown, extras=extras)
-        
-        # 添加目录
-        if len(report_markdown) > 800:  # 只对长内容添加目录
-            html_report_content = self._enhance_html_with_toc(html_report_content, processed_markdown)
-        
         # 添加纯文本版本作为备用显示
-        plain_text = report_markdown
-        msg.attach(MIMEText(plain_text, 'plain', 'utf-8'))
-        
-        # 使用自定义模板生成美观的HTML邮件
-        final_html_body = self._load_email_template(subject, html_report_content)
+        msg.attach(MIMEText(report_markdown, 'plain', 'utf-8'))
+
+        # 使用自定义模板生成美观的HTML邮件（带目录，按内容缓存）
+        final_html_body = self.renderer.render(subject, report_markdown)
         msg.attach(MIMEText(final_html_body, 'html', 'utf-8'))
 
+        return msg['From'], recipients, msg
+
+    def _deliver(self, subject, sender_email, recipients, msg) -> bool:
         smtp_server_addr = self.email_settings['smtp_server']
         smtp_port = int(self.email_settings['smtp_port'])
-        sender_email = msg['From']
-        password = self.email_settings.get('password', '') # Use .get for password
-
-        server = None # Initialize server to None for finally block
         try:
             LOG.info(f"Attempting to send email via {smtp_server_addr}:{smtp_port}")
             LOG.debug(f"From: {sender_email}, To: {recipients}, Subject: {subject}")
 
-            if smtp_port == 587:
-                LOG.info(f"Using SMTP (STARTTLS) on port {smtp_port}")
-                server = smtplib.SMTP(smtp_server_addr, smtp_port, timeout=10)
-                server.ehlo()
-                server.starttls()
-                server.ehlo()
-            elif smtp_port == 465:
-                LOG.info(f"Using SMTP_SSL on port {smtp_port}")
-                server = smtplib.SMTP_SSL(smtp_server_addr, smtp_port, timeout=10)
-            else:
-                LOG.warning(f"Uncommon SMTP port {smtp_port} configured. Attempting SMTP_SSL as default.")
-                server = smtplib.SMTP_SSL(smtp_server_addr, smtp_port, timeout=10)
-
-            if password: # Only login if password is provided
-                LOG.debug(f"Logging in with username: {sender_email}")
-                server.login(sender_email, password)
-            else:
-                LOG.info("No password configured. Attempting to send without SMTP authentication.")
-
-            LOG.debug(f"Sending email to: {recipients}")
-            server.sendmail(sender_email, recipients, msg.as_string())
+            refused = self.delivery.send(sender_email, recipients, msg.as_string())
+            if refused:
+                LOG.warning(f"部分收件人被拒收: {refused}")
             LOG.info("邮件发送成功！")
-
+            return True
+        except SmtpDeliveryError as e:
+            # 临时性错误重试后仍失败
+            LOG.error(f"发送邮件失败 ({smtp_server_addr}:{smtp_port}): {str(e)}")
         except smtplib.SMTPAuthenticationError as e:
             LOG.error(f"SMTP Authentication Error for {sender_email} on {smtp_server_addr}:{smtp_port}. Error: {str(e)}. Check email, password/token.")
         except smtplib.SMTPServerDisconnected as e:
@@ -285,15 +153,154 @@ class Notifier:
         except Exception as e:
             LOG.error(f"发送邮件失败 (General Exception for {smtp_server_addr}:{smtp_port}): {str(e)}")
             LOG.error(traceback.format_exc())
-        finally:
-            if server:
-                try:
-                    server.quit()
-                except smtplib.SMTPServerDisconnected:
-                    # Server might have already disconnected if there was an issue.
-                    pass
-                except Exception as e:
-                    LOG.warning(f"Error during server.quit(): {e}")
+        return False
+
+    def send_email(self, subject, report_markdown, dedup_key=None, recipients=None) -> bool:
+        """
+        发送一封报告邮件；配置了发件箱时只入队，SMTP 会话在多次调用之间复用
+
+        Args:
+            subject: 邮件主题
+            report_markdown: Markdown 格式的报告
+            dedup_key: 发件箱去重键，同一份报告重复调用时只发送一次
+            recipients: 收件人列表，None 时使用配置中的 to
+
+        Returns:
+            是否发送成功（或已加入发件箱）
+        """
+        if self.outbox is not None:
+            self.outbox.enqueue('email', {'subject': subject, 'markdown': report_markdown, 'recipients': recipients},
+                                dedup_key=dedup_key)
+            LOG.info(f"邮件已加入发件箱: {subject}")
+            return True
+
+        LOG.info(f"准备发送邮件: {subject}")
+        built = self._build_message(subject, report_markdown, recipients)
+        if built is None:
+            return False
+        sender_email, recipients, msg = built
+        return self._deliver(subject, sender_email, recipients, msg)
+
+    def send_emails(self, reports) -> list:
+        """
+        批量发送报告邮件；配置了发件箱时逐封入队，否则通过 send_many 依次投递，共用同一组 SMTP 会话
+
+        Args:
+            reports: [(subject, report_markdown)]
+
+        Returns:
+            与输入顺序一致的发送结果列表
+        """
+        if self.outbox is not None:
+            return [self.send_email(subject, report_markdown) for subject, report_markdown in reports]
+
+        results = [False] * len(reports)
+        positions, messages = [], []
+        for i, (subject, report_markdown) in enumerate(reports):
+            built = self._build_message(subject, report_markdown)
+            if built is None:
+                continue
+            sender_email, recipients, msg = built
+            positions.append(i)
+            messages.append((sender_email, recipients, msg.as_string()))
+        if messages:
+            LOG.info(f"准备批量发送 {len(messages)} 封邮件")
+            for i, error in zip(positions, self.delivery.send_many(messages)):
+                results[i] = error is None
+        return results
+
+    def deliver_email(self, payload):
+        """
+        发件箱 email 渠道的投递函数，失败时抛出异常；部分收件人批次失败时
+        把 payload 的 recipients 改为未送达的收件人，发件箱重试时只发送给他们
+
+        Raises:
+            PermanentDeliveryError: 配置不完整或服务器永久拒绝，不再重试
+        """
+        subject = payload['subject']
+        LOG.info(f"准备发送邮件: {subject}")
+        built = self._build_message(subject, payload['markdown'], payload.get('recipients'))
+        if built is None:
+            raise PermanentDeliveryError("邮件配置不完整")
+        sender_email, recipients, msg = built
+        try:
+            refused = self.delivery.send(sender_email, recipients, msg.as_string())
+        except PartialDeliveryError as e:
+            # 已送达的批次不再重发：发件箱重试时只投递给未送达的收件人
+            LOG.warning(f"邮件已送达 {len(e.delivered)} 个收件人，{len(e.pending)} 个待重试: {e}")
+            payload['recipients'] = e.pending
+            if e.transient:
+                raise
+            raise PermanentDeliveryError(str(e)) from e
+        except SmtpDeliveryError:
+            raise
+        except Exception as e:
+            if is_transient_error(e):
+                raise
+            raise PermanentDeliveryError(f"{type(e).__name__}: {e}") from e
+        if refused:
+            LOG.warning(f"部分收件人被拒收: {refused}")
+        LOG.info("邮件发送成功！")
+
+    @property
+    def slack_enabled(self) -> bool:
+        # 默认配置中的占位值不是有效地址
+        return bool(self.slack_webhook_url) and self.slack_webhook_url.startswith('https://')
+
+    @staticmethod
+    def _markdown_to_slack(markdown_text):
+        """把报告的 Markdown 转为 Slack mrkdwn：标题和粗体变为 *粗体*，链接变为 <url|text>"""
+        text = re.sub(r'^#{1,6}\s+(.+)$', r'*\1*', markdown_text, flags=re.MULTILINE)
+        text = re.sub(r'\*\*(.+?)\*\*', r'*\1*', text)
+        text = re.sub(r'\[([^\]]+)\]\((https?://[^)\s]+)\)', r'<\2|\1>', text)
+        if len(text) > SLACK_MAX_TEXT_LENGTH:
+            text = text[:SLACK_MAX_TEXT_LENGTH] + "\n…（内容过长已截断）"
+        return text
+
+    def send_slack(self, title, report_markdown, dedup_key=None) -> bool:
+        """
+        发送 Slack 消息；配置了发件箱时只入队
+
+        Returns:
+            是否发送成功（或已加入发件箱）；未配置 Slack 时返回 False
+        """
+        if not self.slack_enabled:
+            LOG.debug("未配置 Slack Webhook，跳过 Slack 通知")
+            return False
+        payload = {'title': title, 'markdown': report_markdown}
+        if self.outbox is not None:
+            self.outbox.enqueue('slack', payload, dedup_key=dedup_key)
+            LOG.info(f"Slack 消息已加入发件箱: {title}")
+            return True
+        try:
+            self.deliver_slack(payload)
+            return True
+        except Exception as e:
+            LOG.error(f"发送 Slack 消息失败: {e}")
+            return False
+
+    def deliver_slack(self, payload):
+        """
+        发件箱 slack 渠道的投递函数，失败时抛出异常
+
+        Raises:
+            PermanentDeliveryError: Webhook 无效或请求被拒绝（除限流外的 4xx），不再重试
+        """
+        if not self.slack_enabled:
+            raise PermanentDeliveryError("未配置 Slack Webhook")
+        text = self._markdown_to_slack(f"# {payload['title']}\n\n{payload['markdown']}")
+        response = requests.post(self.slack_webhook_url, json={'text': text}, timeout=SLACK_TIMEOUT_SECONDS)
+        if response.status_code == 200:
+            LOG.info(f"Slack 消息发送成功: {payload['title']}")
+            return
+        error = f"Slack Webhook 返回 {response.status_code}: {response.text[:200]}"
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RuntimeError(error)
+        raise PermanentDeliveryError(error)
+
+    def outbox_channels(self) -> dict:
+        """供 OutboxSender 使用的 {渠道名: 投递函数}"""
+        return {'email': self.deliver_email, 'slack': self.deliver_slack}
 
 if __name__ == '__main__':
     from config import Config
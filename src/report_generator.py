@@ -1,15 +1,27 @@
 import os
+import hashlib
 from logger import LOG  # 导入日志模块
 from datetime import datetime, timezone, timedelta, date as datetime_date # Added for release date handling
 from typing import Generator # ADD THIS LINE
 from src.clients.hacker_news_client import HackerNewsClient # 修复导入路径
+from src.utils.dedup import dedup_markdown_stories
+from src.utils.pipeline import ordered_prefetch
+from src.utils.artifact_store import ReportArtifactStore
+from src.utils.hn_snapshots import HNSnapshotStore, render_aggregated_stories, render_category_sections
+from src.utils.subscription_store import normalize_repo
+try:
+    from src.llm import ErrorChunk, is_error_chunk
+except ImportError:
+    from llm import ErrorChunk, is_error_chunk
 
 class ReportGenerator:
     # 1. Modified __init__ signature and assignments
-    def __init__(self, llm, settings, github_client): # Added settings and github_client
+    def __init__(self, llm, settings, github_client, artifact_store: ReportArtifactStore = None): # Added settings and github_client
         self.llm = llm
         self.settings = settings # Store settings instance
         self.github_client = github_client # Store github_client instance
+        # Optional store of precomputed reports; without it every request regenerates via the LLM
+        self.artifact_store = artifact_store
 
         # Fully enable __init__ with settings
         self.report_types = self.settings.get_report_types()
@@ -135,14 +147,10 @@ class ReportGenerator:
         
         return "\n".join(markdown_parts)
 
-    def _generate_github_project_basic_info_markdown(self, owner: str, repo_name: str, days: int) -> str:
+    def _github_report_window(self, days: int):
         """
-        Fetches and formats basic project info (issues, PRs, commits, releases) into Markdown.
-        This is the content that might be passed to an LLM or used directly.
+        Returns (start_date_str, today_str, since_date_iso) for a report covering the past `days` days.
         """
-        repo_full_name = f"{owner}/{repo_name}"
-
-        # Calculate date range for the report title
         today = datetime.now(timezone.utc)
         # If days=1, it's "past 1 day" meaning today. start_date should be today.
         # If days=2, it's "past 2 days" meaning yesterday and today. start_date should be yesterday.
@@ -158,15 +166,60 @@ class ReportGenerator:
         # For issues/PRs, 'since' usually refers to update time.
         # Using the start_date at midnight (beginning of the day) is a safe bet.
         since_date_dt_for_api = datetime(start_date.year, start_date.month, start_date.day, 0, 0, 0, tzinfo=timezone.utc)
-        since_date_iso = since_date_dt_for_api.isoformat()
+        return start_date_str, today_str, since_date_dt_for_api.isoformat()
 
-        LOG.debug(f"Fetching updates for {repo_full_name} for the period {start_date_str} to {today_str} (API 'since': {since_date_iso})")
+    def _prefetch_github_project_data(self, repos: list, days: int) -> dict:
+        """
+        Fetches commits, issues, PRs and releases for all (owner, repo_name) pairs concurrently
+        through the GitHub client's batch fetcher.
 
-        # It's crucial that github_client methods return lists of dicts with expected keys
-        commits = self.github_client.fetch_commits(repo_full_name, since=since_date_iso)
-        issues = self.github_client.fetch_issues(repo_full_name, since=since_date_iso)
-        pull_requests = self.github_client.fetch_pull_requests(repo_full_name, since=since_date_iso)
-        recent_releases = self.github_client.get_recent_releases(owner, repo_name, days_limit=days) # days_limit here should align with 'days'
+        Returns a dict keyed by "owner/repo_name". Repos missing from the result (or an empty
+        dict when the batch fetch is unavailable or fails) fall back to serial per-repo calls.
+        """
+        batch_fetch = getattr(self.github_client, 'batch_fetch_project_data', None)
+        if not repos or not callable(batch_fetch):
+            return {}
+
+        _, _, since_date_iso = self._github_report_window(days)
+        repo_names = [f"{owner}/{repo_name}" for owner, repo_name in repos]
+        try:
+            prefetched = batch_fetch(repo_names, since=since_date_iso, days_limit=days)
+        except Exception as e:
+            LOG.error(f"批量预取 GitHub 仓库数据失败，将逐个仓库串行获取: {e}")
+            return {}
+        if not isinstance(prefetched, dict):
+            return {}
+        LOG.info(f"已批量预取 {len(prefetched)}/{len(repo_names)} 个仓库的 GitHub 数据")
+        return prefetched
+
+    def _generate_github_project_basic_info_markdown(self, owner: str, repo_name: str, days: int,
+                                                     prefetched: dict = None) -> str:
+        """
+        Fetches and formats basic project info (issues, PRs, commits, releases) into Markdown.
+        This is the content that might be passed to an LLM or used directly.
+
+        If `prefetched` (one entry of _prefetch_github_project_data) is given, its data is used
+        instead of issuing the four GitHub API calls.
+        """
+        repo_full_name = f"{owner}/{repo_name}"
+
+        # Calculate date range for the report title
+        start_date_str, today_str, since_date_iso = self._github_report_window(days)
+
+        if prefetched is not None:
+            LOG.debug(f"Using prefetched updates for {repo_full_name} for the period {start_date_str} to {today_str}")
+            commits = prefetched.get('commits') or []
+            issues = prefetched.get('issues') or []
+            pull_requests = prefetched.get('pull_requests') or []
+            recent_releases = prefetched.get('releases') or []
+        else:
+            LOG.debug(f"Fetching updates for {repo_full_name} for the period {start_date_str} to {today_str} (API 'since': {since_date_iso})")
+
+            # It's crucial that github_client methods return lists of dicts with expected keys
+            commits = self.github_client.fetch_commits(repo_full_name, since=since_date_iso)
+            issues = self.github_client.fetch_issues(repo_full_name, since=since_date_iso)
+            pull_requests = self.github_client.fetch_pull_requests(repo_full_name, since=since_date_iso)
+            recent_releases = self.github_client.get_recent_releases(owner, repo_name, days_limit=days) # days_limit here should align with 'days'
 
         content_parts = [f"## {repo_full_name} 项目更新 (过去 {days} 天: {start_date_str} 至 {today_str})\n"]
 
@@ -223,6 +276,14 @@ class ReportGenerator:
             LOG.warning(f"Data directory {data_dir} not found for Hacker News aggregation.")
             return f"注意：未找到日期 {date_str} 的Hacker News聚合数据目录。"
 
+        # 优先使用结构化的小时快照：跨小时去重后每个故事只出现一次，附带分数轨迹
+        snapshot_store = HNSnapshotStore(hacker_news_base_dir)
+        if snapshot_store.has_snapshots(date_str):
+            stories = snapshot_store.aggregate([date_str])
+            if stories:
+                LOG.info(f"Aggregated {len(stories)} Hacker News stories from hourly snapshots in {data_dir}.")
+                return render_aggregated_stories(stories, f"Hacker News {date_str} 全天热门")
+
         markdown_files = [f for f in os.listdir(data_dir) if f.endswith('.md')]
         if not markdown_files:
             LOG.warning(f"No markdown files found in {data_dir} for aggregation.")
@@ -239,6 +300,9 @@ class ReportGenerator:
         if not all_content: # If all files failed to read or list was empty after filtering
              return f"注意：无法从目录 {data_dir} 中的文件读取内容进行聚合。"
 
+        # 同一故事会出现在多个小时的文件中，只保留最新的一条
+        all_content = dedup_markdown_stories(all_content)
+
         LOG.info(f"Aggregated content from {len(all_content)} files in {data_dir}.")
         return "\n\n---\n\n".join(all_content)
 
@@ -267,10 +331,12 @@ class ReportGenerator:
         # Fallback to the base report_type key
         return report_type_base
 
-    def generate_github_project_report(self, owner: str, repo_name: str, days: int = None) -> str:
+    def generate_github_project_report(self, owner: str, repo_name: str, days: int = None,
+                                       prefetched: dict = None) -> str:
         """
         Generates a report for a single GitHub project, including recent releases.
         It first compiles factual data, then optionally uses an LLM for a summary.
+        `prefetched` is this repo's entry from _prefetch_github_project_data, if available.
         """
         if days is None:
             # Assuming settings has a method to get this default value
@@ -278,7 +344,7 @@ class ReportGenerator:
         LOG.info(f"准备为 {owner}/{repo_name} 生成项目报告 (过去 {days} 天)...")
 
         # 1. Generate the factual Markdown content
-        factual_markdown = self._generate_github_project_basic_info_markdown(owner, repo_name, days)
+        factual_markdown = self._generate_github_project_basic_info_markdown(owner, repo_name, days, prefetched)
 
         # 2. (Optional) Pass to LLM for summarization/analysis
         # Check if a specific prompt for "github" type is loaded and LLM is available
@@ -338,10 +404,14 @@ class ReportGenerator:
         LOG.info(f"GitHub 项目报告已保存到 {report_file_path} (using deprecated method)")
         return report, report_file_path
 
-    def generate_github_subscription_report(self):
+    def generate_github_subscription_report(self, lookahead: int = 4):
         """
         Yields an overall title, then yields individual GitHub project report generators
         for each subscribed repository.
+
+        The per-repo generators run in a prefetch pipeline: while the caller consumes
+        repo N, the GitHub fetches and LLM generation for the next `lookahead` repos
+        already run in background threads. Output is still yielded in subscription order.
         """
         LOG.info("准备为所有已订阅的 GitHub 仓库生成单独报告的迭代器...")
         yield f"# GitHub 订阅总报告 - {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S %Z')}\n\n"
@@ -356,119 +426,181 @@ class ReportGenerator:
         days = self.settings.get_github_progress_frequency_days()
         # The "github" prompt will be fetched by generate_github_project_report itself.
 
-        processed_subs_count = 0
+        repos_to_report = []
         for sub_idx, sub in enumerate(subscriptions):
-            owner = None
-            repo_name = None
-            repo_identifier_for_log = str(sub)
-
-            if isinstance(sub, dict):
-                owner = sub.get("owner")
-                repo_name = sub.get("repo_name") or sub.get("repo")
-                if 'repo_url' in sub and sub['repo_url'] and not (owner and repo_name) :
-                    try:
-                        url_path = sub['repo_url'].replace("https://github.com/", "")
-                        parts = url_path.split('/')
-                        if len(parts) >= 2:
-                            owner = parts[-2]
-                            repo_name = parts[-1]
-                            repo_identifier_for_log = f"{owner}/{repo_name}"
-                        else:
-                            LOG.warning(f"无法从 repo_url '{sub['repo_url']}' 解析 owner 和 repo_name。跳过订阅: {sub}")
-                            continue
-                    except Exception as e:
-                        LOG.error(f"解析 repo_url '{sub['repo_url']}' 时出错: {e}。跳过订阅: {sub}", exc_info=True)
-                        continue
-            elif isinstance(sub, str) and '/' in sub:
-                try:
-                    parts = sub.split('/')
-                    if len(parts) == 2:
-                        owner = parts[0]
-                        repo_name = parts[1]
-                        repo_identifier_for_log = f"{owner}/{repo_name}"
-                    else:
-                        LOG.warning(f"字符串订阅格式 '{sub}' 不正确。跳过。")
-                        continue
-                except Exception as e:
-                    LOG.error(f"解析字符串订阅 '{sub}' 时出错: {e}。跳过。", exc_info=True)
-                    continue
-
-            if not owner or not repo_name:
+            repo_full_name = normalize_repo(sub)
+            if not repo_full_name:
                 LOG.warning(f"订阅条目格式无法识别或信息不完整，跳过: {sub}")
                 continue
+            owner, repo_name = repo_full_name.split('/')
 
             LOG.info(f"为仓库 {owner}/{repo_name} (订阅 {sub_idx+1}/{len(subscriptions)}) 创建报告生成器...")
-            # Yield the generator for the individual project report
-            yield self.generate_github_project_report(owner=owner, repo_name=repo_name, days=days)
-            processed_subs_count +=1
-        
-        if processed_subs_count == 0 and subscriptions: # Check if any subs were actually processed
+            repos_to_report.append((owner, repo_name))
+
+        # Fetch GitHub data for all repos concurrently up front instead of four serial calls per repo
+        prefetched = self._prefetch_github_project_data(repos_to_report, days)
+
+        # Yield the generator for each individual project report, prefetched in order
+        factories = [
+            (lambda o=owner, r=repo_name: self.generate_github_project_report(
+                owner=o, repo_name=r, days=days, prefetched=prefetched.get(f"{o}/{r}")))
+            for owner, repo_name in repos_to_report
+        ]
+        yield from ordered_prefetch(factories, lookahead=lookahead)
+
+        if not repos_to_report and subscriptions: # Check if any subs were actually processed
              yield "所有订阅条目均未能成功解析为有效的仓库，未生成任何报告。"
 
         LOG.info("所有 GitHub 订阅的报告生成器已提供完毕。")
 
-    def get_consolidated_github_report_for_email(self, days: int = 1) -> str:
-        LOG.info(f"Starting generation of consolidated GitHub report for email (last {days} days).")
+    # 多进程模式下每个仓库的报告作为一个工作项，由各守护进程分别领取
+    GITHUB_PROJECT_WORK_KIND = 'github_project_report'
+
+    def fetch_github_project_data(self, owner: str, repo_name: str, days: int) -> dict:
+        """
+        获取单个仓库在统计窗口内的 commits、issues、PRs 和 releases
 
+        结构与 _prefetch_github_project_data 中的单项相同，可作为 prefetched 传给报告生成；
+        GitHub API 出错时抛出异常，由调用方决定是否重试。
+        """
+        _, _, since_date_iso = self._github_report_window(days)
+        repo_full_name = f"{owner}/{repo_name}"
+        data = {
+            'commits': self.github_client.fetch_commits(repo_full_name, since=since_date_iso),
+            'issues': self.github_client.fetch_issues(repo_full_name, since=since_date_iso),
+            'pull_requests': self.github_client.fetch_pull_requests(repo_full_name, since=since_date_iso),
+            'releases': self.github_client.get_recent_releases(owner, repo_name, days_limit=days),
+        }
+        self._record_github_fetch(repo_full_name)
+        return data
+
+    def _record_github_fetch(self, repo_full_name: str):
+        """在订阅存储中记录仓库最近一次成功抓取的时间，记录失败不影响报告"""
+        get_store = getattr(self.settings, 'get_subscription_store', None)
+        if get_store is None:
+            return
         try:
-            subscriptions = self.settings.get_github_subscriptions()
+            get_store().record_fetch(repo_full_name, cursor=datetime.now(timezone.utc).isoformat())
         except Exception as e:
-            LOG.error(f"Failed to get GitHub subscriptions from settings: {e}", exc_info=True)
-            return "错误：无法从设置中获取GitHub订阅列表。"
+            LOG.warning(f"记录 {repo_full_name} 的抓取时间失败: {e}")
 
-        if not subscriptions:
-            LOG.warning("No GitHub subscriptions found. Returning empty report.")
-            return "注意：未找到任何GitHub仓库订阅，无法生成GitHub报告部分。"
+    @staticmethod
+    def github_subscription_days(parsed_subscriptions: list, default_days: int) -> dict:
+        """
+        各仓库的统计周期
 
-        LOG.debug(f"Found {len(subscriptions)} GitHub subscriptions: {subscriptions}")
+        Returns:
+            {"owner/repo": 天数}，订阅设置了 frequency_days 时使用该值，否则为 default_days
+        """
+        return {repo_full_name: (sub_item.get('frequency_days') if isinstance(sub_item, dict) else None) or default_days
+                for sub_item, repo_full_name in parsed_subscriptions if repo_full_name}
+
+    @staticmethod
+    def format_github_project_section(owner: str, repo_name: str, report: str) -> str:
+        """把单个仓库的报告包装为合并邮件中的一节（以分隔线开头）"""
+        if report.strip():
+            return f"\n---\n{report}"
+        LOG.warning(f"Generated report for {owner}/{repo_name} was empty.")
+        return f"\n---\n## Report for {owner}/{repo_name}\n\n_No updates or unable to generate report._\n"
+
+    @staticmethod
+    def format_github_project_error(repo_full_name: str, error) -> str:
+        return f"\n---\n## Error for {repo_full_name}\n\n_Failed to generate report: {error}_\n"
+
+    def render_github_project_section(self, owner: str, repo_name: str, days: int, prefetched=None) -> str:
+        """
+        生成合并邮件中单个仓库的部分（以分隔线开头）
 
-        all_project_reports = ["# GitHub Subscriptions Update\n"]
+        Args:
+            owner: 仓库所有者
+            repo_name: 仓库名
+            days: 统计天数
+            prefetched: 预先获取的仓库数据
+
+        Returns:
+            Markdown 片段，生成失败时为错误说明
+        """
+        try:
+            LOG.info(f"Generating report for {owner}/{repo_name}...")
+            report = "".join(str(chunk) for chunk in self.generate_github_project_report(
+                owner=owner, repo_name=repo_name, days=days, prefetched=prefetched))
+            return self.format_github_project_section(owner, repo_name, report)
+        except Exception as e:
+            LOG.error(f"Error generating report for {owner}/{repo_name}: {e}", exc_info=True)
+            return self.format_github_project_error(f"{owner}/{repo_name}", e)
+
+    def handle_github_project_work_item(self, payload: dict) -> str:
+        """WorkItemQueue 的处理函数，payload 为 {'owner', 'repo', 'days'}"""
+        return self.render_github_project_section(payload['owner'], payload['repo'], payload['days'])
+
+    def run_github_project_work_items(self, valid_repos: list, days: int, work_queue, batch: str,
+                                      repo_days: dict = None) -> dict:
+        """
+        多进程模式下把各仓库的报告作为工作项分给所有守护进程，等待全部完成
+
+        Args:
+            valid_repos: [(owner, repo)]
+            days: 统计周期（天）
+            work_queue: WorkItemQueue
+            batch: 批次标识
+            repo_days: 各仓库单独设置的统计周期，见 github_subscription_days
+
+        Returns:
+            {"owner/repo": 该仓库的部分}，失败的仓库为错误说明
+        """
+        # 入队是幂等的；本进程和其他守护进程一起领取，全部完成后按订阅顺序拼接
+        work_queue.enqueue(batch, self.GITHUB_PROJECT_WORK_KIND,
+                           {f"{owner}/{repo}": {'owner': owner, 'repo': repo,
+                                                'days': (repo_days or {}).get(f"{owner}/{repo}", days)}
+                            for owner, repo in valid_repos})
+        results = work_queue.run_batch(
+            batch, {self.GITHUB_PROJECT_WORK_KIND: self.handle_github_project_work_item})
+        return {repo_full_name: item['result'] if item['result'] is not None
+                else self.format_github_project_error(repo_full_name, item['error'])
+                for repo_full_name, item in results.items()}
+
+    def parse_github_subscriptions(self) -> tuple:
+        """
+        解析订阅列表
 
-        for sub_item in subscriptions:
-            repo_full_name = None
-            # Try to parse owner/repo from various subscription formats
-            if isinstance(sub_item, str):
-                repo_full_name = sub_item
-            elif isinstance(sub_item, dict):
-                # Prefer 'owner'/'repo_name' or 'owner'/'repo' if they exist
-                owner = sub_item.get("owner")
-                repo_name_from_dict = sub_item.get("repo_name") or sub_item.get("repo")
-                if owner and repo_name_from_dict:
-                    repo_full_name = f"{owner}/{repo_name_from_dict}"
-                elif "repo_url" in sub_item: # Fallback to repo_url
-                     # Attempt to parse owner/repo from repo_url like "https://github.com/owner/repo" or "owner/repo"
-                    url_parts = sub_item["repo_url"].replace("https://github.com/", "").split('/')
-                    if len(url_parts) >= 2: # Ensure at least owner/repo
-                        repo_full_name = f"{url_parts[-2]}/{url_parts[-1]}"
+        Returns:
+            (parsed_subscriptions, valid_repos)：前者为 [(订阅项, "owner/repo" 或 None)]，
+            后者为格式正确的 [(owner, repo)]；读取设置失败时抛出异常
+        """
+        subscriptions = self.settings.get_github_subscriptions()
+        parsed_subscriptions = []
+        for sub_item in subscriptions or []:
+            # 字符串、repo_url、owner/repo_name 等格式统一规范化为 owner/repo
+            parsed_subscriptions.append((sub_item, normalize_repo(sub_item)))
+
+        valid_repos = []
+        for _, repo_full_name in parsed_subscriptions:
+            parts = repo_full_name.split('/') if repo_full_name else []
+            if len(parts) == 2 and parts[0] and parts[1]:
+                valid_repos.append((parts[0], parts[1]))
+        return parsed_subscriptions, valid_repos
+
+    def combine_github_sections(self, parsed_subscriptions: list, sections: dict) -> str:
+        """
+        按订阅顺序拼接各仓库的部分
+
+        Args:
+            parsed_subscriptions: parse_github_subscriptions 返回的第一项
+            sections: {"owner/repo": 该仓库的 Markdown 片段}
 
+        Returns:
+            合并后的 Markdown；没有任何仓库内容时返回提示
+        """
+        all_project_reports = ["# GitHub Subscriptions Update\n"]
+        for sub_item, repo_full_name in parsed_subscriptions:
             if not repo_full_name:
                 LOG.warning(f"Skipping invalid or unparsable subscription item: {sub_item}")
                 all_project_reports.append(f"\n---\n## Invalid Subscription Item\n\n_Skipped item: {sub_item}_")
-                continue
-
-            try:
-                parts = repo_full_name.split('/')
-                if len(parts) == 2 and parts[0] and parts[1]:
-                    owner, repo_name = parts[0], parts[1]
-                    LOG.info(f"Generating report for {owner}/{repo_name}...")
-
-                    project_report_chunks = []
-                    for chunk in self.generate_github_project_report(owner=owner, repo_name=repo_name, days=days):
-                        project_report_chunks.append(str(chunk))
-
-                    full_project_report_str = "".join(project_report_chunks)
-
-                    if full_project_report_str.strip():
-                        all_project_reports.append(f"\n---\n{full_project_report_str}")
-                    else:
-                        LOG.warning(f"Generated report for {owner}/{repo_name} was empty.")
-                        all_project_reports.append(f"\n---\n## Report for {owner}/{repo_name}\n\n_No updates or unable to generate report._\n")
-                else:
-                    LOG.error(f"Invalid repository name format in subscription: '{repo_full_name}'. Skipping.")
-                    all_project_reports.append(f"\n---\n## Invalid Repository: {repo_full_name}\n\n_Skipped due to invalid format._\n")
-            except Exception as e:
-                LOG.error(f"Error generating report for {repo_full_name}: {e}", exc_info=True)
-                all_project_reports.append(f"\n---\n## Error for {repo_full_name}\n\n_Failed to generate report: {e}_\n")
+            elif repo_full_name in sections:
+                all_project_reports.append(sections[repo_full_name])
+            else:
+                LOG.error(f"Invalid repository name format in subscription: '{repo_full_name}'. Skipping.")
+                all_project_reports.append(f"\n---\n## Invalid Repository: {repo_full_name}\n\n_Skipped due to invalid format._\n")
 
         if len(all_project_reports) == 1:
              LOG.info("No individual GitHub project reports were successfully generated.")
@@ -477,6 +609,38 @@ class ReportGenerator:
         LOG.info("Consolidated GitHub report for email generated successfully.")
         return "\n".join(all_project_reports)
 
+    def get_consolidated_github_report_for_email(self, days: int = 1) -> str:
+        """
+        在当前进程中生成合并邮件中的 GitHub 部分（守护进程的多进程分担见 daemon_process 中的任务图）
+
+        Args:
+            days: 统计天数
+
+        Returns:
+            Markdown 字符串
+        """
+        LOG.info(f"Starting generation of consolidated GitHub report for email (last {days} days).")
+
+        try:
+            parsed_subscriptions, valid_repos = self.parse_github_subscriptions()
+        except Exception as e:
+            LOG.error(f"Failed to get GitHub subscriptions from settings: {e}", exc_info=True)
+            return "错误：无法从设置中获取GitHub订阅列表。"
+
+        if not parsed_subscriptions:
+            LOG.warning("No GitHub subscriptions found. Returning empty report.")
+            return "注意：未找到任何GitHub仓库订阅，无法生成GitHub报告部分。"
+
+        LOG.debug(f"Found {len(parsed_subscriptions)} GitHub subscriptions: {parsed_subscriptions}")
+
+        # Fetch GitHub data for all valid repos concurrently before generating the per-repo reports
+        prefetched = self._prefetch_github_project_data(valid_repos, days)
+        sections = {f"{owner}/{repo_name}": self.render_github_project_section(
+                        owner, repo_name, days, prefetched=prefetched.get(f"{owner}/{repo_name}"))
+                    for owner, repo_name in valid_repos}
+
+        return self.combine_github_sections(parsed_subscriptions, sections)
+
     def generate_hacker_news_hours_topic_report(self, content: str): # -> Generator[str, None, None]
         """
         Generates a report for Hacker News hourly topics using provided content (stream capable).
@@ -484,13 +648,13 @@ class ReportGenerator:
         if not content or not content.strip(): # Check if content is None or empty
             message = "错误: 未提供Hacker News小时主题报告的内容或内容为空。"
             LOG.error(message)
-            yield message
+            yield ErrorChunk(message)
             return
         
         # Check if content itself is an error message from a previous step
         if content.startswith("错误:") or content.startswith("No data found") or content.startswith("No content found"):
             LOG.warning(f"generate_hacker_news_hours_topic_report received potentially erroneous content: {content}")
-            yield content
+            yield ErrorChunk(content)
             return
 
         system_prompt = self.prompts.get("hacker_news_hours_topic", "Summarize the top Hacker News topics from the last hour:")
@@ -501,7 +665,7 @@ class ReportGenerator:
         except Exception as e:
             error_message = f"LLM 生成 HN 小时主题报告失败: {e}"
             LOG.error(error_message, exc_info=True)
-            yield error_message
+            yield ErrorChunk(error_message)
         
 
     def generate_hacker_news_daily_report(self, aggregated_content: str): # -> Generator[str, None, None]
@@ -511,12 +675,12 @@ class ReportGenerator:
         if not aggregated_content or not aggregated_content.strip():
             message = "错误: 未提供Hacker News每日摘要报告的内容或内容为空。"
             LOG.error(message)
-            yield message
+            yield ErrorChunk(message)
             return
 
         if aggregated_content.startswith("错误:") or aggregated_content.startswith("No aggregated data found"):
             LOG.warning(f"generate_hacker_news_daily_report received potentially erroneous content: {aggregated_content}")
-            yield aggregated_content
+            yield ErrorChunk(aggregated_content)
             return
 
         system_prompt = self.prompts.get("hacker_news_daily_report", "Summarize the main Hacker News trends from the day:")
@@ -527,7 +691,7 @@ class ReportGenerator:
         except Exception as e:
             error_message = f"LLM 生成 HN 每日摘要报告失败: {e}"
             LOG.error(error_message, exc_info=True)
-            yield error_message
+            yield ErrorChunk(error_message)
 
 
     def get_hacker_news_hourly_report(self, target_date: str, target_hour: str): # -> Generator[str, None, None]
@@ -548,7 +712,7 @@ class ReportGenerator:
         if not os.path.exists(file_path):
             message = f"No data found for Hacker News at {target_date} {target_hour}:00. File does not exist: {file_path}"
             LOG.warning(message)
-            yield message
+            yield ErrorChunk(message)
             return
 
         try:
@@ -558,7 +722,7 @@ class ReportGenerator:
             if not content.strip():
                 message = f"No content found in Hacker News data file: {file_path} for {target_date} {target_hour}:00."
                 LOG.warning(message)
-                yield message
+                yield ErrorChunk(message)
                 return
 
             LOG.info(f"Successfully read content from {file_path}. Generating hourly report.")
@@ -566,7 +730,7 @@ class ReportGenerator:
         except Exception as e:
             message = f"Error reading or processing Hacker News data file {file_path}: {e}"
             LOG.error(message, exc_info=True)
-            yield message
+            yield ErrorChunk(message)
 
 
     def get_hacker_news_daily_summary(self, date_str: str) -> Generator[str, None, None]:
@@ -618,7 +782,7 @@ class ReportGenerator:
                 user_prompt_template = "Please summarize the following aggregated data for the report on {report_date}:\n\n{aggregated_data}"
             else:
                 LOG.error(f"Prompt for '{prompt_key}' is not correctly loaded or structured. Cannot generate HN daily summary.")
-                yield f"错误：无法加载或解析 '{prompt_key}' 的提示词，无法生成Hacker News每日摘要。"
+                yield ErrorChunk(f"错误：无法加载或解析 '{prompt_key}' 的提示词，无法生成Hacker News每日摘要。")
                 return
 
             user_prompt = user_prompt_template.format(
@@ -632,7 +796,7 @@ class ReportGenerator:
                 yield from response_stream
             except Exception as e:
                 LOG.error(f"Error during LLM completion for HN daily summary (aggregated): {e}", exc_info=True)
-                yield f"错误：在为Hacker News每日摘要（聚合数据）请求LLM补全时发生错误: {e}"
+                yield ErrorChunk(f"错误：在为Hacker News每日摘要（聚合数据）请求LLM补全时发生错误: {e}")
 
         else:
             LOG.info(f"No meaningful aggregated Hacker News data for {date_str} (or content was '{aggregated_content[:100] if aggregated_content else ''}...'). Attempting to fetch live stories.")
@@ -643,7 +807,7 @@ class ReportGenerator:
 
                 if not live_stories:
                     LOG.warning(f"Failed to fetch live Hacker News stories for {date_str}.")
-                    yield "未能获取到最新的Hacker News头条新闻，无法生成实时摘要。"
+                    yield ErrorChunk("未能获取到最新的Hacker News头条新闻，无法生成实时摘要。")
                     return
 
                 live_stories_markdown_parts = [f"# Live Hacker News Top Stories ({date_str})\n"]
@@ -667,7 +831,7 @@ class ReportGenerator:
                     user_prompt_template = "Please summarize the following live data for the report on {report_date}:\n\n{aggregated_data}"
                 else:
                     LOG.error(f"Prompt for '{prompt_key}' (live data) is not correctly loaded or structured. Cannot generate HN daily summary.")
-                    yield f"错误：无法加载或解析 '{prompt_key}' 的提示词（用于实时数据），无法生成Hacker News实时摘要。"
+                    yield ErrorChunk(f"错误：无法加载或解析 '{prompt_key}' 的提示词（用于实时数据），无法生成Hacker News实时摘要。")
                     return
 
                 user_prompt = user_prompt_template.format(
@@ -682,7 +846,102 @@ class ReportGenerator:
 
             except Exception as e:
                 LOG.error(f"Error processing live Hacker News stories for daily summary on {date_str}: {e}", exc_info=True)
-                yield f"错误：在处理Hacker News实时新闻用于生成每日摘要时发生错误: {e}"
+                yield ErrorChunk(f"错误：在处理Hacker News实时新闻用于生成每日摘要时发生错误: {e}")
+
+    # --- Report artifacts ---
+
+    def _artifact_identity(self, report_type_base: str):
+        """
+        Returns (model, prompt_version) identifying how a report of this type would be generated now.
+        A change of model or prompt text yields a different identity, so stale artifacts are not served.
+        """
+        model_type = getattr(self.llm, 'model_type', None) or 'llm'
+        model_name = getattr(self.llm, 'openai_model_name', None) if model_type == 'openai' \
+            else getattr(self.llm, 'ollama_model_name', None)
+        model = f"{model_type}-{model_name}" if model_name else model_type
+
+        prompt = self.prompts.get(self._get_prompt_key(report_type_base), "")
+        prompt_text = prompt if isinstance(prompt, str) else repr(prompt)
+        prompt_version = hashlib.sha1(prompt_text.encode('utf-8')).hexdigest()[:10]
+        return model, prompt_version
+
+    def _get_or_generate_artifact(self, report_type: str, scope: str, period: str, generate,
+                                  refresh: bool = False, max_age: float = None):
+        """
+        Yields a stored artifact if one exists for the current model/prompt, otherwise streams
+        a freshly generated report and stores it once complete. The report is not stored if the
+        generator raises or yields an ErrorChunk.
+        """
+        if self.artifact_store is None:
+            yield from generate()
+            return
+
+        model, prompt_version = self._artifact_identity(report_type)
+        if not refresh:
+            artifact = self.artifact_store.get(report_type, scope, period, model, prompt_version, max_age=max_age)
+            if artifact:
+                LOG.info(f"使用已生成的报告产物: {artifact['path']}")
+                yield artifact['content']
+                return
+
+        chunks = []
+        failed = False
+        for chunk in generate():
+            failed = failed or is_error_chunk(chunk)
+            chunks.append(str(chunk))
+            yield chunk
+
+        content = "".join(chunks)
+        if content.strip() and not failed:
+            try:
+                self.artifact_store.put(report_type, scope, period, model, prompt_version, content)
+            except Exception as e:
+                LOG.error(f"保存报告产物失败 ({report_type}/{scope}/{period}): {e}")
+        else:
+            LOG.warning(f"报告 {report_type}/{scope}/{period} 生成失败或为空，不保存产物。")
+
+    def get_stored_report(self, report_type: str, scope: str, period: str):
+        """Returns the stored artifact for the current model/prompt, or None."""
+        if self.artifact_store is None:
+            return None
+        model, prompt_version = self._artifact_identity(report_type)
+        return self.artifact_store.get(report_type, scope, period, model, prompt_version)
+
+    def get_hacker_news_category_sections(self, date_str: str, limit: int = 8) -> dict:
+        """
+        当天各分类的热门故事列表（直接取自小时快照，不调用 LLM），用于按分类订阅的日报
+
+        Returns:
+            {分类: Markdown}，没有快照时为空字典
+        """
+        hacker_news_base_dir = getattr(self.settings, 'hacker_news_data_dir', 'hacker_news')
+        snapshot_store = HNSnapshotStore(hacker_news_base_dir)
+        if not snapshot_store.has_snapshots(date_str):
+            LOG.warning(f"No Hacker News snapshots for {date_str}; category sections unavailable.")
+            return {}
+        return render_category_sections(snapshot_store.aggregate([date_str]), limit=limit)
+
+    def get_or_generate_hacker_news_daily_summary(self, date_str: str, refresh: bool = False,
+                                                  max_age: float = None) -> Generator[str, None, None]:
+        """
+        Serves the stored Hacker News daily summary for date_str if available,
+        otherwise generates it via get_hacker_news_daily_summary and stores it.
+        """
+        yield from self._get_or_generate_artifact(
+            "hacker_news_daily_report", "all", date_str,
+            lambda: self.get_hacker_news_daily_summary(date_str), refresh=refresh, max_age=max_age
+        )
+
+    def get_or_generate_hacker_news_hourly_report(self, target_date: str, target_hour: str,
+                                                  refresh: bool = False) -> Generator[str, None, None]:
+        """
+        Serves the stored Hacker News hourly report if available,
+        otherwise generates it via get_hacker_news_hourly_report and stores it.
+        """
+        yield from self._get_or_generate_artifact(
+            "hacker_news_hours_topic", "all", f"{target_date}T{target_hour}",
+            lambda: self.get_hacker_news_hourly_report(target_date, target_hour), refresh=refresh
+        )
 
     # Note: The original get_hacker_news_daily_summary was replaced by the new one above.
     # The method generate_hacker_news_daily_report(self, aggregated_content: str) is still used by the old daemon logic.
@@ -17,6 +17,8 @@ import json
 import re # Added import for normalize_repo_input
 import traceback
 import hashlib
+import itertools
+import threading
 from datetime import datetime # Added
 
 # Third-Party Imports
@@ -28,11 +30,14 @@ from loguru import logger as LOG
 from src.logger import LOG # ADD THIS LINE
 try:
     from src.report_generator import ReportGenerator
-    from src.config import Settings
+    from src.config import get_settings_service, prompts_signature
     from src.llm import LLM
     from src.clients.github_client import GitHubClient
     from src.clients.hacker_news_client import HackerNewsClient
     from src.notifier import Notifier
+    from src.utils.artifact_store import ReportArtifactStore
+    from src.utils.job_queue import ReportJobQueue, ACTIVE_STATUSES, STATUS_FAILED, STATUS_INTERRUPTED
+    from src.utils.search_index import get_search_index
 except ImportError as e:
     st.error(f"核心模块导入失败: {e}。应用无法启动。\n请检查项目结构和依赖项。")
     st.stop()
@@ -128,39 +133,91 @@ def build_github_url(owner_repo_str: str) -> str:
     return f"https://github.com/{owner_repo_str}"
 
 
+# --- Cached Components ---
+# Settings/LLM/clients are built once per process and reused across reruns and sessions,
+# so HTTP connection pools and loaded prompts survive button clicks. Each one lives in a
+# slot keyed by the current settings snapshot (plus prompt file stats for the LLM):
+# editing config.json or a prompt file rebuilds it. The previous instance is not closed,
+# since a queued report job may still be using it; it is released once garbage collected.
+
+class _ComponentSlot:
+    """Holds one long-lived object, replacing it when its key changes."""
+
+    def __init__(self, name):
+        self._name = name
+        self._lock = threading.Lock()
+        self._key = None
+        self._value = None
+
+    def get(self, key, build):
+        with self._lock:
+            if self._value is None or self._key != key:
+                if self._value is not None:
+                    LOG.info(f"配置已变化，重建{self._name}。")
+                self._value, self._key = build(), key
+            return self._value
+
+
+class ReportComponents:
+    """The long-lived objects needed to generate reports."""
+
+    def __init__(self, settings, llm, github_client, report_generator):
+        self.settings = settings
+        self.llm = llm
+        self.github_client = github_client
+        self.report_generator = report_generator
+
+
+def _build_report_components(settings) -> ReportComponents:
+    LOG.info("构建报告组件")
+    llm_instance = LLM(settings=settings)
+    github_token = settings.get_github_token()
+    github_client_instance = GitHubClient(token=github_token if github_token else "dummy_token_if_not_github_report")
+    report_generator = ReportGenerator(llm=llm_instance, settings=settings, github_client=github_client_instance,
+                                       artifact_store=ReportArtifactStore(search_index=get_search_index()))
+    return ReportComponents(settings, llm_instance, github_client_instance, report_generator)
+
+
+@st.cache_resource(show_spinner=False)
+def _component_slots() -> dict:
+    """Process-wide slots shared by all sessions and reruns."""
+    return {
+        'report': _ComponentSlot("报告组件"),
+        # Keeps the topic analyzer, story index and analysis worker process warm between clicks
+        'hn_client': _ComponentSlot("Hacker News 客户端"),
+    }
+
+
+def get_report_components(config_path: str = CONFIG_PATH) -> ReportComponents:
+    """Returns the cached report components, rebuilding them only if the settings snapshot or a prompt changed."""
+    # The service re-stats config.json at most once per check interval; the file is only parsed when it changed
+    settings = get_settings_service(config_path).snapshot
+    return _component_slots()['report'].get((settings, prompts_signature()),
+                                            lambda: _build_report_components(settings))
+
+
+def get_hn_client(config_path: str = CONFIG_PATH):
+    """Returns the cached HackerNewsClient, rebuilt only if the settings snapshot changed."""
+    return _component_slots()['hn_client'].get(get_settings_service(config_path).snapshot, HackerNewsClient)
+
+
 # --- Subscription Management ---
 
+def get_github_subscription_store():
+    """The shared GitHub subscription store; subscriptions.json is imported into it on first use."""
+    return get_settings_service(CONFIG_PATH).snapshot.get_subscription_store()
+
+
 def get_subscriptions() -> dict:
-    """Retrieves and prepares subscription data."""
-    data = load_json_file(SUBSCRIPTIONS_PATH)
-    if not isinstance(data, dict):
-        if data is not None:
-            show_message("info", f"文件 {SUBSCRIPTIONS_PATH} 内容不是预期的字典格式或为空，将使用默认订阅结构。")
-        return {"github_subscriptions": [], "hacker_news_subscriptions": []}
-
-    data.setdefault("github_subscriptions", [])
-    data.setdefault("hacker_news_subscriptions", [])
-
-    migrated_subs = []
-    needs_save = False
-    for sub in data.get("github_subscriptions", []):
-        if isinstance(sub, str):
-            migrated_subs.append({"repo_url": sub, "last_processed_timestamp": None, "custom_branch": None})
-            needs_save = True
-        elif isinstance(sub, dict) and "repo_url" in sub:
-            sub.setdefault("last_processed_timestamp", None)
-            sub.setdefault("custom_branch", None)
-            migrated_subs.append(sub)
-
-    if needs_save:
-        data["github_subscriptions"] = migrated_subs
-        if save_json_file(SUBSCRIPTIONS_PATH, data):
-            show_message("info", "旧版订阅格式已自动更新为新版。")
-        else:
-            show_message("error", "自动迁移旧版订阅格式失败。更改未保存。")
-    else:
-        data["github_subscriptions"] = migrated_subs
-    return data
+    """Retrieves subscription data: GitHub subscriptions from the store, Hacker News ones from the file."""
+    data = load_json_file(SUBSCRIPTIONS_PATH) if os.path.exists(SUBSCRIPTIONS_PATH) else None
+    hacker_news_subs = data.get("hacker_news_subscriptions", []) if isinstance(data, dict) else []
+    try:
+        github_subs = get_github_subscription_store().list()
+    except Exception as e:
+        show_message("error", f"读取 GitHub 订阅失败: {e}")
+        github_subs = []
+    return {"github_subscriptions": github_subs, "hacker_news_subscriptions": hacker_news_subs}
 
 
 def display_subscription_management():
@@ -184,16 +241,17 @@ def display_subscription_management():
             normalized_repo_url = normalize_repo_input(new_repo_input)
             if not normalized_repo_url:
                  show_message("error", "输入格式不正确。请使用 'owner/repo' 或完整的 GitHub URL。")
-            elif any(sub.get("repo_url") == normalized_repo_url for sub in github_subs_list):
-                show_message("warning", f"仓库 {normalized_repo_url} 已经订阅过了。")
             else:
-                new_sub_entry = {"repo_url": normalized_repo_url, "last_processed_timestamp": None, "custom_branch": None}
-                github_subs_list.append(new_sub_entry)
-                if save_json_file(SUBSCRIPTIONS_PATH, subscriptions_data):
-                    show_message("success", f"成功添加订阅: {normalized_repo_url}")
-                    st.rerun()
+                try:
+                    added = get_github_subscription_store().add(normalized_repo_url)
+                except Exception as e:
+                    show_message("error", f"添加订阅 {normalized_repo_url} 失败: {e}")
                 else:
-                    github_subs_list.pop()
+                    if added:
+                        show_message("success", f"成功添加订阅: {normalized_repo_url}")
+                        st.rerun()
+                    else:
+                        show_message("warning", f"仓库 {normalized_repo_url} 已经订阅过了。")
         else:
             show_message("warning", "请输入仓库信息。")
 
@@ -215,14 +273,11 @@ def display_subscription_management():
 
         if st.session_state.repo_to_remove:
             repo_to_remove_url = st.session_state.repo_to_remove
-            current_subs = get_subscriptions()
-            updated_github_subs = [sub for sub in current_subs.get("github_subscriptions", []) if sub.get("repo_url") != repo_to_remove_url]
-            if len(updated_github_subs) < len(current_subs.get("github_subscriptions", [])):
-                current_subs["github_subscriptions"] = updated_github_subs
-                if save_json_file(SUBSCRIPTIONS_PATH, current_subs):
+            try:
+                if get_github_subscription_store().remove(repo_to_remove_url):
                     show_message("success", f"成功移除仓库: {repo_to_remove_url}")
-                else:
-                    show_message("error", f"移除仓库 {repo_to_remove_url} 失败。更改未保存。")
+            except Exception as e:
+                show_message("error", f"移除仓库 {repo_to_remove_url} 失败: {e}")
             st.session_state.repo_to_remove = None
             st.rerun()
 
@@ -631,6 +686,222 @@ def display_app_settings_ui():
 
 
 # --- Report Generation UI ---
+# --- Report Jobs ---
+# Report generation runs in a background job queue rather than inside the script run, so a
+# browser refresh or a second viewer does not cancel or duplicate the work.
+
+JOB_GITHUB_SUBSCRIPTIONS = "github_subscriptions"
+JOB_GITHUB_PROJECT = "github_project"
+JOB_HN_HOURS_TOPIC = "hacker_news_hours_topic"
+JOB_HN_DAILY = "hacker_news_daily_report"
+
+# Job kind -> report type shown in the report type selector
+JOB_REPORT_TYPES = {
+    JOB_GITHUB_SUBSCRIPTIONS: "github",
+    JOB_GITHUB_PROJECT: "github",
+    JOB_HN_HOURS_TOPIC: "hacker_news_hours_topic",
+    JOB_HN_DAILY: "hacker_news_daily_report",
+}
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_queue() -> ReportJobQueue:
+    """Returns the process-wide report job queue."""
+    return ReportJobQueue()
+
+
+def _flatten_subscription_report(report_iter):
+    """
+    Turns the nested output of generate_github_subscription_report into (part, text) chunks:
+    part 0 holds the title and notices, part N holds the chunks of the N-th project report.
+    """
+    project_index = 0
+    for item in report_iter:
+        if isinstance(item, str):
+            yield (0, item)
+        else:
+            project_index += 1
+            for chunk in item:
+                yield (project_index, chunk)
+
+
+def _texts(chunks):
+    for _, text in chunks:
+        yield text
+
+
+def _render_github_project_chunks(chunk_iter, left_col, right_col, factual_heading=None):
+    """Factual data goes to the left column; the summary header and LLM stream go to the right."""
+    factual_data_chunk = next(chunk_iter, None)
+    if factual_data_chunk is None:
+        with left_col: st.warning("未能获取项目的原始数据部分。")
+        return
+    with left_col:
+        st.markdown("---")
+        if factual_heading:
+            st.markdown(factual_heading)
+        # Factual data already contains its own "## owner/repo ..." title from _generate_github_project_basic_info_markdown
+        st.markdown(factual_data_chunk)
+
+    separator_chunk = next(chunk_iter, None)
+    if separator_chunk is None:
+        with right_col: st.info("LLM摘要部分未生成或无内容。")
+        return
+    with right_col:
+        st.markdown("---")
+        st.markdown(separator_chunk)
+        # Check if it's the actual LLM summary header or a skip notice
+        if "LLM 智能摘要" in separator_chunk or "AI Summary" in separator_chunk:
+            st.write_stream(chunk_iter)
+
+
+def _render_github_subscriptions_job(stream):
+    for part, chunks in itertools.groupby(stream, key=lambda chunk: chunk[0]):
+        if part == 0:
+            for text in _texts(chunks):
+                if text.startswith("没有配置 GitHub 仓库订阅") or \
+                   text.startswith("所有订阅条目均未能成功解析为有效的仓库"):
+                    st.info(text)
+                else:
+                    st.markdown(text) # Display the main title
+            continue
+        left_col, right_col = st.columns(2)
+        try:
+            _render_github_project_chunks(_texts(chunks), left_col, right_col)
+        except Exception as e_proj_stream:
+            st.error(f"处理单个项目报告流时出错: {e_proj_stream}")
+            st.code(traceback.format_exc())
+        st.divider() # Visual separator between project reports
+    show_message("success", "GitHub 订阅报告流程处理完毕。")
+
+
+def _render_github_project_job(stream, repo: str):
+    left_column, right_column = st.columns(2)
+    try:
+        _render_github_project_chunks(_texts(stream), left_column, right_column,
+                                      factual_heading="### 📝 原始数据 (Factual Data)")
+    except Exception as e_stream_consume:
+        st.error(f"处理报告流时发生错误: {e_stream_consume}")
+        st.code(traceback.format_exc())
+    show_message("success", f"GitHub 项目 {repo} 报告流程处理完毕。")
+
+
+def _latest_hn_hourly_export(date_str: str = None) -> str | None:
+    """Returns the path of the latest hacker_news/<date>/<HH>.md export for the day, if any."""
+    date_str = date_str or datetime.now().strftime('%Y-%m-%d')
+    day_dir = os.path.join("hacker_news", date_str)
+    if not os.path.isdir(day_dir):
+        return None
+    hours = sorted(
+        name for name in os.listdir(day_dir)
+        if name.endswith(".md") and os.path.splitext(name)[0].isdigit()
+    )
+    return os.path.join(day_dir, hours[-1]) if hours else None
+
+
+def _render_hn_hourly_files(markdown_file_path: str):
+    enable_topic_analysis = st.session_state.get("show_hn_topic_analysis", True)
+
+    fn = os.path.basename(markdown_file_path)
+    hour_str = os.path.splitext(fn)[0]
+    date_str = os.path.basename(os.path.dirname(markdown_file_path))
+    if not (hour_str.isdigit() and len(date_str.split('-')) == 3):
+        st.error(f"错误: 无法从路径 {markdown_file_path} 解析日期/小时。")
+        return
+
+    st.caption(f"数据时间: {date_str} {hour_str}:00")
+
+    # 读取基本列表报告
+    with open(markdown_file_path, 'r', encoding='utf-8') as f:
+        stories_content = f.read()
+
+    # 尝试读取话题分析报告
+    topics_file_path = os.path.join(os.path.dirname(markdown_file_path), f"{hour_str}_topics.md")
+    topics_content = None
+    if os.path.exists(topics_file_path):
+        with open(topics_file_path, 'r', encoding='utf-8') as f:
+            topics_content = f.read()
+
+    # 守护进程预生成的 LLM 小时解读
+    ai_report = None
+    try:
+        ai_report = get_report_components(CONFIG_PATH).report_generator.get_stored_report(
+            "hacker_news_hours_topic", "all", f"{date_str}T{hour_str}")
+    except Exception as e:
+        LOG.error(f"读取已生成的小时报告失败: {e}")
+
+    # 显示报告
+    if (enable_topic_analysis and topics_content) or ai_report:
+        # 有分析结果时以标签页形式展示
+        tab_contents = []
+        if enable_topic_analysis and topics_content:
+            tab_contents.append(("📊 话题分析", topics_content))
+        if ai_report:
+            tab_contents.append(("🤖 AI 解读", ai_report["content"]))
+        tab_contents.append(("📝 原始列表", stories_content))
+        for tab, (_, content) in zip(st.tabs([label for label, _ in tab_contents]), tab_contents):
+            with tab:
+                st.markdown(content)
+    else:
+        # 只显示原始列表
+        st.markdown(stories_content)
+
+    if enable_topic_analysis and not topics_content:
+        st.info("未找到话题分析结果。这可能是因为分析器尚未安装、分析过程中出错，或者数据量不足以进行有意义的聚类。")
+
+
+def _render_hn_hours_topic_job(stream):
+    markdown_file_path = "".join(_texts(stream))
+    if not markdown_file_path:
+        st.error("错误: 未能获取Hacker News数据文件路径。")
+        return
+    _render_hn_hourly_files(markdown_file_path)
+    show_message("success", "Hacker News 小时热门话题报告生成完毕。")
+
+
+def _render_hn_daily_job(stream):
+    st.write_stream(_texts(stream))
+    show_message("success", "Hacker News 每日摘要报告流程处理完毕。")
+
+
+def _render_report_job(job_queue: ReportJobQueue, job_id: str):
+    """Replays a report job from the start and keeps streaming until it finishes."""
+    job = job_queue.get(job_id)
+    if not job:
+        show_message("warning", "报告任务不存在或已过期。")
+        return
+
+    kind = job["kind"]
+    stream = job_queue.stream(job_id)
+    spinner_texts = {
+        JOB_GITHUB_SUBSCRIPTIONS: "⏳ 正在为所有已订阅仓库生成GitHub报告...",
+        JOB_GITHUB_PROJECT: f"⏳ 正在为 {job['params'].get('repo')} 生成GitHub报告...",
+        JOB_HN_HOURS_TOPIC: "⏳ 正在生成Hacker News小时热门话题报告...",
+        JOB_HN_DAILY: "⏳ 正在生成Hacker News每日摘要报告...",
+    }
+    try:
+        with st.spinner(spinner_texts.get(kind, "⏳ 正在生成报告...")):
+            if kind == JOB_GITHUB_SUBSCRIPTIONS:
+                _render_github_subscriptions_job(stream)
+            elif kind == JOB_GITHUB_PROJECT:
+                _render_github_project_job(stream, job["params"].get("repo"))
+            elif kind == JOB_HN_HOURS_TOPIC:
+                _render_hn_hours_topic_job(stream)
+            elif kind == JOB_HN_DAILY:
+                _render_hn_daily_job(stream)
+            else:
+                show_message("warning", f"未知的报告任务类型: {kind}")
+    except Exception as e:
+        st.error(f"显示报告任务输出时出错: {e}")
+        st.code(traceback.format_exc())
+
+    job = job_queue.get(job_id)
+    if job["status"] == STATUS_FAILED:
+        st.error(f"报告任务执行失败: {job['error']}")
+    elif job["status"] == STATUS_INTERRUPTED:
+        show_message("warning", "该报告任务在完成前被中断（应用重启），以上为已生成的部分。")
+
+
 def display_report_generation_ui():
     """UI for generating various types of reports."""
     st.header("📊 生成报告")
@@ -697,7 +968,13 @@ def display_report_generation_ui():
             github_report_scope = "all"
             generate_report_button = st.button("为所有已订阅仓库生成GitHub报告", key="generate_all_gh_report_btn")
     elif report_type == "hacker_news_hours_topic":
-        generate_report_button = st.button("生成Hacker News小时热门话题报告", key="generate_hn_hours_topic_btn")
+        # The daemon exports HN data every few hours; show the latest export right away
+        latest_hn_export = _latest_hn_hourly_export()
+        if latest_hn_export:
+            generate_report_button = st.button("🔄 抓取最新数据并重新生成", key="generate_hn_hours_topic_btn",
+                                               help="下方显示的是最近一次已生成的报告。")
+        else:
+            generate_report_button = st.button("生成Hacker News小时热门话题报告", key="generate_hn_hours_topic_btn")
         
         # 添加显示选项
         if "show_hn_topic_analysis" not in st.session_state:
@@ -718,197 +995,95 @@ def display_report_generation_ui():
         st.session_state.show_hn_topic_analysis = st.session_state.hn_topic_analysis_checkbox
         st.session_state.enable_ai_summary = st.session_state.hn_ai_summary_checkbox
     elif report_type == "hacker_news_daily_report":
-        generate_report_button = st.button("生成Hacker News每日摘要报告", key="generate_hn_daily_report_btn")
+        # Serve today's precomputed summary if the daemon (or an earlier click) already generated it
+        try:
+            stored_daily_summary = get_report_components(CONFIG_PATH).report_generator.get_stored_report(
+                "hacker_news_daily_report", "all", datetime.now().strftime('%Y-%m-%d'))
+        except Exception as e:
+            LOG.error(f"读取已生成的每日摘要失败: {e}")
+            stored_daily_summary = None
+        if stored_daily_summary:
+            generate_report_button = st.button("🔄 重新生成今日摘要", key="generate_hn_daily_report_btn",
+                                               help="下方显示的是已生成的摘要，重新生成会再次调用 LLM。")
+        else:
+            generate_report_button = st.button("生成Hacker News每日摘要报告", key="generate_hn_daily_report_btn")
     else:
         show_message("warning", f"暂不支持 '{report_type}' 类型的报告生成UI。")
 
+    job_queue = get_job_queue()
+
     if generate_report_button:
         try:
-            settings = Settings(config_file=CONFIG_PATH)
-            llm_instance = LLM(settings=settings)
-            github_token = config_data.get("github", {}).get("token")
+            components = get_report_components(CONFIG_PATH)
+            github_token = components.settings.get_github_token()
             if not github_token and report_type == "github":
                 show_message("error", "GitHub token 未在配置中找到，无法生成GitHub相关报告。")
                 st.session_state.generated_report_content = "错误: GitHub token 未配置。"
                 return
-            github_client_instance = GitHubClient(token=github_token if github_token else "dummy_token_if_not_github_report")
-            report_generator = ReportGenerator(llm=llm_instance, settings=settings, github_client=github_client_instance)
+            report_generator = components.report_generator
         except Exception as e:
             show_message("error", f"初始化报告所需组件失败: {e}")
             st.code(traceback.format_exc())
-            # st.session_state.generated_report_content = f"初始化报告生成器失败: {e}" # Old way
             st.error(f"初始化报告生成器失败: {e}") # Direct error display
             return
 
-        # Logic for st.write_stream
+        # Identical requests that are still running are shared instead of started twice
+        job_id = None
         if report_type == "github" and github_report_scope == "all":
-            with st.spinner("⏳ 正在为所有已订阅仓库生成GitHub报告..."):
-                main_report_iter = iter(report_generator.generate_github_subscription_report())
-
-                overall_title = next(main_report_iter, None)
-                if overall_title and isinstance(overall_title, str):
-                    # Check if it's an info/error message first
-                    if overall_title.startswith("没有配置 GitHub 仓库订阅") or \
-                       overall_title.startswith("所有订阅条目均未能成功解析为有效的仓库"):
-                        st.info(overall_title)
-                        # No further processing needed if it's just an info message
-                    else:
-                        st.markdown(overall_title) # Display the main title
-                        # Now iterate through the project-specific generators
-                        for single_project_generator in main_report_iter:
-                            project_specific_iter = iter(single_project_generator)
-                            left_col, right_col = st.columns(2)
-                            factual_data_chunk = None # Initialize for current project
-                            separator_chunk = None  # Initialize for current project
-                            try:
-                                factual_data_chunk = next(project_specific_iter, None)
-                                if factual_data_chunk:
-                                    with left_col:
-                                        st.markdown("---")
-                                        # Factual data already contains its own "## owner/repo ..." title from _generate_github_project_basic_info_markdown
-                                        st.markdown(factual_data_chunk)
-                                else:
-                                    with left_col: st.warning("未能获取项目的原始数据部分。")
-
-                                separator_chunk = next(project_specific_iter, None)
-                                if separator_chunk:
-                                    with right_col:
-                                        st.markdown("---") # Added for visual consistency
-                                        st.markdown(separator_chunk)
-                                        # Check if it's the actual LLM summary header or a skip notice
-                                        if "LLM 智能摘要" in separator_chunk or "AI Summary" in separator_chunk:
-                                            st.write_stream(project_specific_iter)
-                                        # If it's a skip notice like "LLM摘要已跳过", it's already displayed by the markdown above.
-                                else: # No separator/notice, means LLM part was skipped or something unexpected.
-                                     with right_col: st.info("LLM摘要部分未生成或无内容。")
-
-                            except StopIteration:
-                                # This means the single_project_generator ended.
-                                # This can happen if only factual data was yielded (LLM skipped with no notice chunk)
-                                if factual_data_chunk and not separator_chunk:
-                                     with right_col: st.info("LLM摘要部分未生成或无内容。")
-                                elif not factual_data_chunk: # Should be caught by earlier check but as a safeguard
-                                     st.warning("一个项目报告生成器未产生预期的数据。")
-                            except Exception as e_proj_stream:
-                                st.error(f"处理单个项目报告流时出错: {e_proj_stream}")
-                                st.code(traceback.format_exc())
-                            st.divider() # Visual separator between project reports
-                elif overall_title is None: # Should not happen if generator is well-behaved
-                     st.warning("报告生成器未能初始化或未产生任何内容。")
-
-            show_message("success", "GitHub 订阅报告流程处理完毕。")
-
+            job_id = job_queue.submit(
+                JOB_GITHUB_SUBSCRIPTIONS,
+                {"days": components.settings.get_github_progress_frequency_days()},
+                lambda: _flatten_subscription_report(report_generator.generate_github_subscription_report())
+            )
         elif report_type == "github" and github_report_scope == "single" and target_repo_input:
             try:
                 owner, repo_name = target_repo_input.split('/')
-                with st.spinner(f"⏳ 正在为 {target_repo_input} 生成GitHub报告..."):
-                    left_column, right_column = st.columns(2)
-                    report_stream = report_generator.generate_github_project_report(owner=owner, repo_name=repo_name)
-                    factual_data_chunk = None
-                    separator_chunk = None
-                    try:
-                        factual_data_chunk = next(report_stream)
-                        with left_column:
-                            st.markdown("---") # Added for visual consistency
-                            st.markdown("### 📝 原始数据 (Factual Data)")
-                            st.markdown(factual_data_chunk)
-
-                        separator_chunk = next(report_stream)
-                        with right_column:
-                            st.markdown(separator_chunk) # Display the rich separator
-                            st.write_stream(report_stream) # Stream remaining LLM parts
-
-                    except StopIteration:
-                        with left_column: # Ensure message appears in a column
-                            if factual_data_chunk is not None and separator_chunk is None:
-                                # Factual data yielded, LLM part skipped.
-                                # Factual data is already in left_column.
-                                with right_column: # Display message in right column
-                                    st.info("LLM摘要未生成（可能由于配置或无适用内容）。")
-                            elif factual_data_chunk is None:
-                                st.warning("报告生成器未产生任何内容。")
-                    except Exception as e_stream_consume:
-                        st.error(f"处理报告流时发生错误: {e_stream_consume}")
-                        st.code(traceback.format_exc())
-                show_message("success", f"GitHub 项目 {target_repo_input} 报告流程处理完毕。")
             except ValueError:
                 st.error(f"仓库格式不正确: {target_repo_input}。请使用 'owner/repo' 格式。")
-            except Exception as e_gh_single:
-                st.error(f"为 {target_repo_input} 生成GitHub报告时出错: {e_gh_single}")
-                st.code(traceback.format_exc())
-
+                return
+            job_id = job_queue.submit(
+                JOB_GITHUB_PROJECT,
+                {"repo": target_repo_input, "days": components.settings.get_github_progress_frequency_days()},
+                lambda: report_generator.generate_github_project_report(owner=owner, repo_name=repo_name)
+            )
         elif report_type == "hacker_news_hours_topic":
-            with st.spinner("⏳ 正在生成Hacker News小时热门话题报告..."):
-                try:
-                    hn_client = HackerNewsClient()
-                    
-                    # 根据用户选择是否进行话题分析
-                    enable_topic_analysis = st.session_state.get("show_hn_topic_analysis", True)
-                    
-                    # 根据用户选择是否启用AI摘要
-                    enable_ai_summary = st.session_state.get("enable_ai_summary", True)
-                    
-                    # 导出热门文章
-                    markdown_file_path = hn_client.export_top_stories(enable_ai_summary=enable_ai_summary)
-                    
-                    if markdown_file_path is None:
-                        st.error("错误: 未能获取Hacker News数据文件路径。")
-                    else:
-                        fn = os.path.basename(markdown_file_path)
-                        hour_str = os.path.splitext(fn)[0]
-                        date_str = os.path.basename(os.path.dirname(markdown_file_path))
-                        
-                        if not (hour_str.isdigit() and len(date_str.split('-')) == 3):
-                            st.error(f"错误: 无法从路径 {markdown_file_path} 解析日期/小时。")
-                        else:
-                            # 读取基本列表报告
-                            with open(markdown_file_path, 'r', encoding='utf-8') as f:
-                                stories_content = f.read()
-                                
-                            # 尝试读取话题分析报告
-                            topics_file_path = os.path.join(os.path.dirname(markdown_file_path), f"{hour_str}_topics.md")
-                            topics_content = None
-                            
-                            if os.path.exists(topics_file_path):
-                                with open(topics_file_path, 'r', encoding='utf-8') as f:
-                                    topics_content = f.read()
-                            
-                            # 显示报告
-                            if enable_topic_analysis and topics_content:
-                                # 如果启用了话题分析并且有分析结果，则以标签页形式展示
-                                tab1, tab2 = st.tabs(["📊 话题分析", "📝 原始列表"])
-                                
-                                with tab1:
-                                    st.markdown(topics_content)
-                                    
-                                with tab2:
-                                    st.markdown(stories_content)
-                            else:
-                                # 只显示原始列表
-                                st.markdown(stories_content)
-                                
-                                if enable_topic_analysis and not topics_content:
-                                    st.info("未找到话题分析结果。这可能是因为分析器尚未安装、分析过程中出错，或者数据量不足以进行有意义的聚类。")
-                            
-                            show_message("success", "Hacker News 小时热门话题报告生成完毕。")
-                except Exception as e_hn_hourly:
-                    st.error(f"生成Hacker News小时报告时出错: {e_hn_hourly}")
-                    st.code(traceback.format_exc())
-
+            enable_ai_summary = st.session_state.get("enable_ai_summary", True)
+            hn_client = get_hn_client(CONFIG_PATH)
+            job_id = job_queue.submit(
+                JOB_HN_HOURS_TOPIC,
+                {"hour": datetime.now().strftime('%Y-%m-%d %H'), "enable_ai_summary": enable_ai_summary},
+                # The result view shows the topics file, so this interactive export waits for the analysis
+                lambda: [hn_client.export_top_stories(enable_ai_summary=enable_ai_summary,
+                                                      wait_for_analysis=True) or ""]
+            )
         elif report_type == "hacker_news_daily_report":
-            with st.spinner("⏳ 正在生成Hacker News每日摘要报告..."):
-                try:
-                    current_date_str = datetime.now().strftime('%Y-%m-%d')
-                    st.write_stream(report_generator.get_hacker_news_daily_summary(current_date_str))
-                    show_message("success", "Hacker News 每日摘要报告流程处理完毕。")
-                except Exception as e_hn_daily:
-                    st.error(f"生成Hacker News每日报告时出错: {e_hn_daily}")
-                    st.code(traceback.format_exc())
+            current_date_str = datetime.now().strftime('%Y-%m-%d')
+            job_id = job_queue.submit(
+                JOB_HN_DAILY,
+                {"date": current_date_str, "refresh": True},
+                lambda: report_generator.get_or_generate_hacker_news_daily_summary(current_date_str, refresh=True)
+            )
         else:
             if report_type == "github" and github_report_scope == "single" and not target_repo_input:
                 show_message("info", "请为 '指定单个仓库' 提供一个仓库（手动输入或从列表选择）。")
-            # else: # Other unhandled cases, though UI should prevent most.
-                # show_message("warning", "选择的报告类型或范围无法处理。")
+
+        if job_id:
+            # Remember the job in the URL so a page reload reattaches instead of restarting it
+            st.query_params["job"] = job_id
+            _render_report_job(job_queue, job_id)
+
+    else:
+        job = job_queue.get(st.query_params["job"]) if st.query_params.get("job") else None
+        if job and JOB_REPORT_TYPES.get(job["kind"]) == report_type:
+            if job["status"] in ACTIVE_STATUSES:
+                st.info("检测到正在运行的报告任务，已重新连接。")
+            _render_report_job(job_queue, job["id"])
+        elif report_type == "hacker_news_daily_report" and stored_daily_summary:
+            created = datetime.fromtimestamp(stored_daily_summary["created_at"]).strftime('%Y-%m-%d %H:%M')
+            st.caption(f"已生成于 {created}（模型: {stored_daily_summary.get('model', 'N/A')}）")
+            st.markdown(stored_daily_summary["content"])
+        elif report_type == "hacker_news_hours_topic" and latest_hn_export:
+            _render_hn_hourly_files(latest_hn_export)
 
     # Remove or comment out the old display logic
     # st.markdown("---")
@@ -924,7 +1099,8 @@ def display_report_generation_ui():
     if st.button("立即发送测试摘要邮件", key="send_test_email_now_button"):
         with st.spinner("⏳ 正在准备并发送测试邮件..."):
             try:
-                current_settings = Settings(config_file=CONFIG_PATH)
+                components = get_report_components(CONFIG_PATH)
+                current_settings = components.settings
                 if not current_settings.get_email_config().get('to'):
                     show_message("error", "邮件发送失败：未配置收件人地址。请在应用设置中配置。")
                 elif not current_settings.get_email_config().get('from') or \
@@ -932,12 +1108,8 @@ def display_report_generation_ui():
                      not current_settings.get_email_config().get('smtp_port'):
                     show_message("error", "邮件发送失败：发件人邮箱或SMTP服务器信息不完整。请在应用设置中配置。")
                 else:
-                    llm_instance = LLM(settings=current_settings)
-                    github_token = current_settings.get_github_token()
-                    github_client_instance = GitHubClient(token=github_token if github_token else "dummy_token_for_test_email")
-
                     notifier_instance = Notifier(email_settings=current_settings.get_email_config())
-                    report_generator_instance = ReportGenerator(llm=llm_instance, settings=current_settings, github_client=github_client_instance)
+                    report_generator_instance = components.report_generator
 
                     # --- Generate Hacker News Daily Summary ---
                     hn_summary_str = ""
@@ -988,6 +1160,7 @@ def display_report_generation_ui():
                     if combined_report_markdown.strip():
                         LOG.info("Test Email: Sending combined report...")
                         notifier_instance.send_email(email_subject, combined_report_markdown)
+                        notifier_instance.close()
 
                         recipients = current_settings.get_email_config().get('to', [])
                         recipients_str = ", ".join(recipients) if isinstance(recipients, list) else str(recipients)
@@ -1002,6 +1175,56 @@ def display_report_generation_ui():
                 show_message("error", f"发送测试邮件时发生错误: {e}")
                 st.code(traceback.format_exc())
 
+# --- Report Search UI ---
+SEARCH_SOURCE_LABELS = {"全部": None, "Hacker News": "hacker_news", "GitHub 进展": "github", "已生成报告": "report"}
+
+
+def display_report_search_ui():
+    """UI for full-text search over generated HN/GitHub markdown and stored reports."""
+    st.header("🔎 报告搜索")
+    search_index = get_search_index()
+
+    # 每个会话首次打开时做一次增量同步，补上索引钩子之外写入的文件（例如话题分析结果）
+    if not st.session_state.get("search_index_synced"):
+        with st.spinner("正在同步报告索引..."):
+            search_index.sync()
+        st.session_state.search_index_synced = True
+
+    query_col, source_col = st.columns([3, 1])
+    with query_col:
+        query = st.text_input("搜索关键词", placeholder="例如: rust 编译器 (多个词之间为 AND)", key="report_search_query")
+    with source_col:
+        source_label = st.selectbox("来源", list(SEARCH_SOURCE_LABELS.keys()), key="report_search_source")
+
+    sync_col, count_col = st.columns([1, 3])
+    with sync_col:
+        if st.button("🔄 同步索引", key="report_search_sync"):
+            with st.spinner("正在同步报告索引..."):
+                stats = search_index.sync()
+            show_message("success", f"同步完成：新增/更新 {stats['indexed']} 篇，删除 {stats['removed']} 篇。")
+    with count_col:
+        st.caption(f"索引中共 {search_index.count()} 篇文档")
+
+    if not query.strip():
+        return
+
+    started = datetime.now()
+    results = search_index.search(query, limit=50, source=SEARCH_SOURCE_LABELS[source_label])
+    elapsed_ms = (datetime.now() - started).total_seconds() * 1000
+    st.caption(f"找到 {len(results)} 条结果，耗时 {elapsed_ms:.0f} ms")
+
+    for result in results:
+        st.markdown(f"**{result['title']}**  \n`{result['path']}` · {result['modified']}")
+        st.markdown(result['snippet'])
+        with st.expander("查看全文"):
+            try:
+                with open(result['path'], 'r', encoding='utf-8') as f:
+                    st.markdown(f.read())
+            except OSError as e:
+                show_message("error", f"读取文件失败: {e}")
+        st.markdown("---")
+
+
 # --- Config Overview UI ---
 def _display_config_detail_item(label: str, value, is_sensitive: bool = False):
     """Internal helper to display a single config item."""
@@ -1232,8 +1455,8 @@ def main():
         
     st.sidebar.title("🧭 导航与控制")
     # Updated nav_options and nav_icons
-    nav_options = ["配置概览", "订阅管理", "报告生成", "应用设置"]
-    nav_icons = {"配置概览": "⚙️", "订阅管理": "🔧", "报告生成": "📊", "应用设置": "🛠️"}
+    nav_options = ["配置概览", "订阅管理", "报告生成", "报告搜索", "应用设置"]
+    nav_icons = {"配置概览": "⚙️", "订阅管理": "🔧", "报告生成": "📊", "报告搜索": "🔎", "应用设置": "🛠️"}
 
     nav_display_options = []
     for opt in nav_options:
@@ -1266,6 +1489,8 @@ def main():
         display_subscription_management()
     elif nav_selection == "报告生成":
         display_report_generation_ui()
+    elif nav_selection == "报告搜索":
+        display_report_search_ui()
     elif nav_selection == "应用设置": # New branch for App Settings
         display_app_settings_ui()
     else:
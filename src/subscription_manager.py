@@ -1,27 +1,70 @@
 import json
 
+try:
+    from src.utils.subscription_store import normalize_repo
+except ImportError:
+    from utils.subscription_store import normalize_repo
+
+
+def _subscription_key(repo):
+    # 同一仓库的不同写法（大小写、URL）视为同一个订阅
+    normalized = normalize_repo(repo)
+    return normalized.lower() if normalized else json.dumps(repo, sort_keys=True)
+
+
 class SubscriptionManager:
-    def __init__(self, subscriptions_file):
+    def __init__(self, subscriptions_file, store=None):
+        """
+        Args:
+            subscriptions_file: JSON 订阅文件（仓库列表）
+            store: SubscriptionStore；提供时订阅的增删直接写入存储，不再重写订阅文件
+        """
         self.subscriptions_file = subscriptions_file
+        self.store = store
         self.subscriptions = self.load_subscriptions()
-    
+
+    @property
+    def subscriptions(self):
+        return self._subscriptions
+
+    @subscriptions.setter
+    def subscriptions(self, subscriptions):
+        self._subscriptions = subscriptions
+        # 成员判断使用的索引，与列表一起更新
+        self._index = {_subscription_key(repo) for repo in subscriptions}
+
     def load_subscriptions(self):
+        if self.store is not None:
+            return self.store.repos()
         with open(self.subscriptions_file, 'r') as f:
             return json.load(f)
-    
+
     def save_subscriptions(self):
+        if self.store is not None:
+            # 存储中的每次增删都已单独提交
+            return
         with open(self.subscriptions_file, 'w') as f:
             json.dump(self.subscriptions, f, indent=4)
-    
+
     def list_subscriptions(self):
         return self.subscriptions
-    
+
     def add_subscription(self, repo):
-        if repo not in self.subscriptions:
-            self.subscriptions.append(repo)
-            self.save_subscriptions()
-    
+        key = _subscription_key(repo)
+        if key in self._index:
+            return
+        if self.store is not None:
+            self.store.add(repo)
+            repo = normalize_repo(repo)
+        self.subscriptions.append(repo)
+        self._index.add(key)
+        self.save_subscriptions()
+
     def remove_subscription(self, repo):
-        if repo in self.subscriptions:
-            self.subscriptions.remove(repo)
-            self.save_subscriptions()
\ No newline at end of file
+        key = _subscription_key(repo)
+        if key not in self._index:
+            return
+        if self.store is not None:
+            self.store.remove(repo)
+        self.subscriptions = [item for item in self.subscriptions if _subscription_key(item) != key]
+        self.save_subscriptions()
@@ -0,0 +1,208 @@
+"""
+近似最近邻索引
+基于倒排文件（IVF）的余弦相似度检索，适用于单位向量
+"""
+
+import os
+import math
+import tempfile
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    倒排文件近似最近邻索引
+
+    先用球面 K-Means 把向量划分到 nlist 个簇，查询时只在距离最近的 nprobe 个簇内
+    做精确的内积计算。向量数量不超过 flat_threshold 时直接暴力检索，
+    小规模数据下这比任何近似结构都快。
+    """
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 3,
+                 flat_threshold: int = 256, n_iter: int = 10, seed: int = 42):
+        """
+        初始化索引
+
+        Args:
+            nlist: 簇数量，为None时取 sqrt(n)
+            nprobe: 查询时探查的簇数量
+            flat_threshold: 不超过该数量时使用暴力检索
+            n_iter: K-Means 迭代次数
+            seed: 随机种子
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.flat_threshold = flat_threshold
+        self.n_iter = n_iter
+        self.seed = seed
+
+        self.vectors = None
+        self.centroids = None
+        self.assignments = None
+        self.lists = []
+        # 上次训练簇中心时的向量数量
+        self.trained_size = 0
+
+    def __len__(self):
+        return 0 if self.vectors is None else len(self.vectors)
+
+    @property
+    def is_flat(self) -> bool:
+        return self.centroids is None
+
+    def build(self, vectors: np.ndarray) -> 'IVFIndex':
+        """
+        构建索引
+
+        Args:
+            vectors: (n, dim) 的单位向量矩阵
+
+        Returns:
+            索引自身
+        """
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n = len(self.vectors)
+
+        if n <= self.flat_threshold:
+            self.centroids = None
+            self.assignments = None
+            self.lists = []
+            return self
+
+        nlist = self.nlist or max(1, int(math.sqrt(n)))
+        self.centroids = self._train_centroids(self.vectors, min(nlist, n))
+        self.assignments = (self.vectors @ self.centroids.T).argmax(axis=1)
+        self.trained_size = n
+        self._rebuild_lists()
+        return self
+
+    def update(self, vectors: np.ndarray, retrain_factor: float = 4.0) -> 'IVFIndex':
+        """
+        增量更新索引
+
+        vectors 为完整的向量矩阵（可以是内存映射），其中前面已索引的行保持不变，
+        只为新增的行分配簇。数据量增长超过 retrain_factor 倍或首次超过
+        flat_threshold 时重新训练簇中心。
+
+        Args:
+            vectors: (n, dim) 的单位向量矩阵
+            retrain_factor: 触发重新训练的增长倍数
+
+        Returns:
+            索引自身
+        """
+        n = len(vectors)
+        if self.is_flat or n > self.trained_size * retrain_factor:
+            return self.build(vectors)
+
+        self.vectors = vectors
+        indexed = len(self.assignments)
+        if n > indexed:
+            new_assignments = (np.asarray(vectors[indexed:n]) @ self.centroids.T).argmax(axis=1)
+            self.assignments = np.concatenate([self.assignments, new_assignments])
+            self._rebuild_lists()
+        elif not self.lists:
+            self._rebuild_lists()
+        return self
+
+    def save(self, path: str):
+        """原子保存簇中心和分配结果（向量本身由调用方存储）"""
+        directory = os.path.dirname(path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npz.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f,
+                         centroids=self.centroids if self.centroids is not None else np.zeros((0, 0), np.float32),
+                         assignments=self.assignments if self.assignments is not None else np.zeros(0, np.int64),
+                         trained_size=np.array(self.trained_size))
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def load(self, path: str, vectors: np.ndarray) -> 'IVFIndex':
+        """
+        加载簇中心和分配结果，并把新增的向量增量加入索引
+
+        Args:
+            path: save 保存的文件路径
+            vectors: 完整的向量矩阵
+        """
+        with np.load(path, allow_pickle=False) as data:
+            centroids = data['centroids']
+            assignments = data['assignments']
+            trained_size = int(data['trained_size'])
+
+        if not centroids.size or len(assignments) > len(vectors):
+            return self.build(vectors)
+
+        self.centroids = centroids.astype(np.float32)
+        self.assignments = assignments.astype(np.int64)
+        self.trained_size = trained_size
+        return self.update(vectors)
+
+    def _train_centroids(self, vectors: np.ndarray, nlist: int) -> np.ndarray:
+        """球面 K-Means 训练簇中心"""
+        rng = np.random.default_rng(self.seed)
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+
+        for _ in range(self.n_iter):
+            assignments = (vectors @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # 空簇保留原来的中心
+            sums[empty] = centroids[empty]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        return centroids.astype(np.float32)
+
+    def _rebuild_lists(self):
+        order = np.argsort(self.assignments, kind='stable')
+        bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        检索每个查询向量的 k 个最近邻
+
+        Args:
+            queries: (m, dim) 的单位向量矩阵
+            k: 近邻数量
+
+        Returns:
+            (相似度, 下标) 两个 (m, k) 矩阵，不足 k 个时下标为 -1、相似度为 -inf
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        m = len(queries)
+        sims_out = np.full((m, k), -np.inf, dtype=np.float32)
+        ids_out = np.full((m, k), -1, dtype=np.int64)
+        if not len(self) or k <= 0:
+            return sims_out, ids_out
+
+        if self.is_flat:
+            sims = queries @ self.vectors.T
+            top = min(k, sims.shape[1])
+            idx = np.argpartition(-sims, top - 1, axis=1)[:, :top]
+            part = np.take_along_axis(sims, idx, axis=1)
+            order = np.argsort(-part, axis=1)
+            sims_out[:, :top] = np.take_along_axis(part, order, axis=1)
+            ids_out[:, :top] = np.take_along_axis(idx, order, axis=1)
+            return sims_out, ids_out
+
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :nprobe]
+        for row in range(m):
+            candidates = np.concatenate([self.lists[c] for c in probes[row]])
+            if not len(candidates):
+                continue
+            sims = self.vectors[candidates] @ queries[row]
+            top = min(k, len(candidates))
+            order = np.argsort(-sims)[:top]
+            sims_out[row, :top] = sims[order]
+            ids_out[row, :top] = candidates[order]
+        return sims_out, ids_out
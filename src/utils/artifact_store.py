@@ -0,0 +1,159 @@
+"""
+报告产物存储
+按 (报告类型, 范围, 周期, 模型, 提示词版本) 保存已生成的报告，
+守护进程提前生成，仪表盘直接读取，无需每次查看都调用 LLM
+"""
+
+import os
+import re
+import json
+import time
+import tempfile
+from typing import Dict, List, Optional
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+def _safe_component(value: str) -> str:
+    """把键的各部分转换为安全的路径片段"""
+    text = str(value) if value not in (None, '') else 'default'
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', text)
+
+
+def _atomic_write(path: str, content: str):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class ReportArtifactStore:
+    """
+    文件系统上的报告产物存储
+
+    布局: <base_dir>/<report_type>/<scope>/<period>/<model>__<prompt_version>.md，
+    同名 .json 文件保存元数据（生成时间等）。模型或提示词变化后键随之变化，旧产物不会被误用。
+    """
+
+    def __init__(self, base_dir: str = 'reports', search_index=None):
+        """
+        初始化产物存储
+
+        Args:
+            base_dir: 产物根目录
+            search_index: 可选的 ReportSearchIndex，写入产物后同步更新索引
+        """
+        self.base_dir = base_dir
+        self.search_index = search_index
+
+    def _period_dir(self, report_type: str, scope: str, period: str) -> str:
+        return os.path.join(self.base_dir, _safe_component(report_type), _safe_component(scope),
+                            _safe_component(period))
+
+    def _path(self, report_type: str, scope: str, period: str, model: str, prompt_version: str) -> str:
+        file_name = f"{_safe_component(model)}__{_safe_component(prompt_version)}.md"
+        return os.path.join(self._period_dir(report_type, scope, period), file_name)
+
+    def _read(self, path: str) -> Optional[Dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+
+        meta = {}
+        meta_path = os.path.splitext(path)[0] + '.json'
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        meta.setdefault('created_at', os.path.getmtime(path))
+        return {'content': content, 'path': path, **meta}
+
+    def get(self, report_type: str, scope: str, period: str, model: str, prompt_version: str,
+            max_age: Optional[float] = None) -> Optional[Dict]:
+        """
+        读取产物
+
+        Args:
+            report_type: 报告类型，例如 "hacker_news_daily_report"
+            scope: 报告范围，例如 "all" 或仓库名
+            period: 报告周期，例如 "2025-06-13" 或 "2025-06-13T08"
+            model: 生成所用的模型标识
+            prompt_version: 提示词版本
+            max_age: 最大有效期（秒），超过则视为不存在
+
+        Returns:
+            包含 content、path、created_at 及其他元数据的字典，不存在返回None
+        """
+        artifact = self._read(self._path(report_type, scope, period, model, prompt_version))
+        if artifact and max_age is not None and time.time() - artifact['created_at'] > max_age:
+            return None
+        return artifact
+
+    def latest(self, report_type: str, scope: str, period: str) -> Optional[Dict]:
+        """返回该周期内最新的产物，不限模型和提示词版本"""
+        artifacts = self.list(report_type, scope, period)
+        return artifacts[0] if artifacts else None
+
+    def list(self, report_type: str, scope: str, period: str) -> List[Dict]:
+        """列出该周期内的全部产物，按生成时间从新到旧排序"""
+        period_dir = self._period_dir(report_type, scope, period)
+        if not os.path.isdir(period_dir):
+            return []
+        artifacts = []
+        for name in os.listdir(period_dir):
+            if name.endswith('.md'):
+                artifact = self._read(os.path.join(period_dir, name))
+                if artifact:
+                    artifacts.append(artifact)
+        artifacts.sort(key=lambda a: a['created_at'], reverse=True)
+        return artifacts
+
+    def put(self, report_type: str, scope: str, period: str, model: str, prompt_version: str,
+            content: str, meta: Optional[Dict] = None) -> str:
+        """
+        写入产物（原子替换，读取方不会看到写了一半的文件）
+
+        Args:
+            report_type: 报告类型
+            scope: 报告范围
+            period: 报告周期
+            model: 生成所用的模型标识
+            prompt_version: 提示词版本
+            content: 报告内容
+            meta: 额外的元数据
+
+        Returns:
+            产物文件路径
+        """
+        path = self._path(report_type, scope, period, model, prompt_version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        metadata = {
+            'report_type': report_type,
+            'scope': scope,
+            'period': period,
+            'model': model,
+            'prompt_version': prompt_version,
+            'created_at': time.time(),
+            **(meta or {}),
+        }
+        _atomic_write(path, content)
+        _atomic_write(os.path.splitext(path)[0] + '.json', json.dumps(metadata, ensure_ascii=False, indent=2))
+        LOG.info(f"已保存报告产物: {path}")
+        if self.search_index is not None:
+            try:
+                self.search_index.index_file(path)
+            except Exception as e:
+                LOG.warning(f"更新报告索引失败 ({path}): {e}")
+        return path
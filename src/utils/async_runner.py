@@ -0,0 +1,88 @@
+"""
+共享事件循环线程
+让同步代码（守护进程任务、Streamlit 回调）可以在一个常驻的事件循环上运行协程，
+而不必每次都 asyncio.run 新建和销毁事件循环
+"""
+
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+class AsyncLoopThread:
+    """在后台守护线程中运行的事件循环"""
+
+    def __init__(self, name: str = 'async-runner'):
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._thread is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name=self._name, daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+                LOG.debug(f"共享事件循环线程已启动: {self._name}")
+            return self._loop
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._ensure_started()
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        在共享事件循环上运行协程并阻塞等待结果
+
+        Args:
+            coro: 协程对象
+            timeout: 超时时间（秒），超时会取消协程并抛出 TimeoutError
+
+        Returns:
+            协程的返回值
+        """
+        loop = self._ensure_started()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("不能在共享事件循环线程内同步等待协程")
+
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self):
+        """停止事件循环线程"""
+        with self._lock:
+            if self._loop is not None and self._loop.is_running():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+            if self._thread is not None:
+                self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
+
+
+_shared_runner = AsyncLoopThread()
+
+
+def run_sync(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """在进程共享的事件循环线程上运行协程并返回结果"""
+    return _shared_runner.run(coro, timeout)
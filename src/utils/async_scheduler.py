@@ -0,0 +1,553 @@
+"""
+基于 asyncio 的任务调度器
+事件循环只在下一个任务到期时醒来；任务在线程中并发执行，每个任务有独立的并发上限和重叠策略。
+另提供基于 mtime 的文件变化监视，用于在 config.json 修改后重新安排任务
+"""
+
+import os
+import asyncio
+import time
+import inspect
+from collections import deque
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+from zoneinfo import ZoneInfo
+
+try:
+    from src.utils.job_ledger import RUN_SUCCEEDED
+except ImportError:
+    from utils.job_ledger import RUN_SUCCEEDED
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+# 任务到期时上一次执行仍未结束（已达并发上限）的处理方式
+OVERLAP_SKIP = 'skip'          # 放弃本次执行
+OVERLAP_QUEUE = 'queue'        # 排队，每次到期都会执行一次
+OVERLAP_COALESCE = 'coalesce'  # 合并，最多保留一次待执行
+OVERLAP_POLICIES = (OVERLAP_SKIP, OVERLAP_QUEUE, OVERLAP_COALESCE)
+
+# 错过多个计划时间（重启、系统休眠）后的补跑方式
+CATCHUP_ALL = 'all'        # 逐个补跑（不超过 catchup_limit 次），适合按日期生成的报告
+CATCHUP_LATEST = 'latest'  # 只执行最近的一次，适合抓取实时数据的任务
+CATCHUP_POLICIES = (CATCHUP_ALL, CATCHUP_LATEST)
+
+# 单次休眠的上限（秒）。系统挂起或调整时钟后，最迟这么久会重新按墙上时间计算到期任务
+MAX_SLEEP_SECONDS = 300
+
+
+def _utc_now() -> datetime:
+    return datetime.now(dt_timezone.utc)
+
+
+class DailyTrigger:
+    """在指定时区的每天固定时刻触发，可设置每隔若干天执行一次"""
+
+    def __init__(self, times: Iterable[str], timezone='Asia/Shanghai', interval_days: int = 1):
+        """
+        初始化触发器
+
+        Args:
+            times: 触发时刻列表，格式 HH:MM，格式错误时抛出 ValueError
+            timezone: 时区名称或 tzinfo
+            interval_days: 两次触发之间至少间隔的天数
+        """
+        self.times = sorted(datetime.strptime(value, "%H:%M").time() for value in times)
+        if not self.times:
+            raise ValueError("DailyTrigger 至少需要一个触发时刻")
+        self.tz = ZoneInfo(timezone) if isinstance(timezone, str) else timezone
+        self.interval_days = max(1, int(interval_days))
+
+    def _localize(self, day, at: dt_time) -> datetime:
+        naive = datetime.combine(day, at)
+        if hasattr(self.tz, 'localize'):  # pytz 时区
+            return self.tz.normalize(self.tz.localize(naive))
+        return naive.replace(tzinfo=self.tz)
+
+    def next_run(self, after: datetime, last_run: Optional[datetime] = None) -> datetime:
+        """
+        计算 after 之后的下一次触发时间
+
+        Args:
+            after: 起算时间（带时区）
+            last_run: 上一次触发时间，interval_days > 1 时用于推算下一个可执行的日期
+
+        Returns:
+            带时区的触发时间
+        """
+        day = after.astimezone(self.tz).date()
+        if last_run is not None and self.interval_days > 1:
+            day = max(day, last_run.astimezone(self.tz).date() + timedelta(days=self.interval_days))
+        while True:
+            for at in self.times:
+                candidate = self._localize(day, at)
+                if candidate > after:
+                    return candidate
+            day += timedelta(days=1)
+
+    def __repr__(self):
+        times = ', '.join(at.strftime('%H:%M') for at in self.times)
+        return f"DailyTrigger([{times}], {self.tz}, every {self.interval_days} day(s))"
+
+
+class IntervalTrigger:
+    """每隔固定秒数触发"""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("IntervalTrigger 的间隔必须大于0")
+        self.seconds = seconds
+
+    def next_run(self, after: datetime, last_run: Optional[datetime] = None) -> datetime:
+        if last_run is None:
+            return after + timedelta(seconds=self.seconds)
+        # 与上一次触发时间对齐：last_run + k * seconds 中第一个晚于 after 的时刻
+        periods = max(1, int((after - last_run).total_seconds() // self.seconds) + 1)
+        return last_run + timedelta(seconds=periods * self.seconds)
+
+    def __repr__(self):
+        return f"IntervalTrigger({self.seconds}s)"
+
+
+class ScheduledJob:
+    """调度器中的一个任务及其运行状态"""
+
+    def __init__(self, name: str, func: Callable, trigger, args: Sequence = (), kwargs: Optional[Dict] = None,
+                 max_concurrency: int = 1, overlap: str = OVERLAP_SKIP, catchup: str = CATCHUP_LATEST,
+                 catchup_limit: int = 1, catchup_window: Optional[timedelta] = None,
+                 pass_scheduled_time: bool = False):
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"未知的重叠策略: {overlap}")
+        if catchup not in CATCHUP_POLICIES:
+            raise ValueError(f"未知的补跑策略: {catchup}")
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.args = tuple(args)
+        self.kwargs = kwargs or {}
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.overlap = overlap
+        self.catchup = catchup
+        self.catchup_limit = max(1, int(catchup_limit))
+        self.catchup_window = catchup_window
+        self.pass_scheduled_time = pass_scheduled_time
+        self.next_run: Optional[datetime] = None
+        self.last_run: Optional[datetime] = None
+        self.running = 0
+        # 等待执行的 (计划时间, 是否补跑)
+        self.pending = deque()
+        self.replaced_by: Optional['ScheduledJob'] = None
+        # 下次检查台账中失败或遗留执行的时间（CATCHUP_ALL），None 表示不检查
+        self.retry_at: Optional[datetime] = None
+
+    def __repr__(self):
+        return (f"ScheduledJob({self.name!r}, {self.trigger!r}, next_run={self.next_run}, "
+                f"running={self.running}, pending={len(self.pending)})")
+
+
+class AsyncScheduler:
+    """
+    事件驱动的任务调度器
+
+    run() 在事件循环中运行：计算最早到期的任务并休眠到该时刻，
+    添加、修改任务或调用 stop() 时会立即唤醒重新计算。
+    同步任务通过 asyncio.to_thread 在线程中执行，协程函数直接在事件循环中执行，
+    耗时很长的日报任务不会推迟其他任务。
+
+    提供 ledger（JobRunLedger）时，每次执行按 (任务名, 计划时间) 记入台账：
+    同一计划时间只执行一次；启动时从台账中最近一次成功的计划时间起补跑错过的执行。
+    CATCHUP_ALL 的任务在 catchup_window 之内失败或因进程退出而中断的执行会重新补跑，
+    每个计划时间最多尝试 max_retry_attempts 次。
+
+    多个进程共享 ledger 和 lease_store（LeaseStore）时，每次执行先获取该计划时间的租约，
+    只有持有者执行；其他进程等待租约释放或过期，持有者在执行中退出时由它们接手。
+    """
+
+    def __init__(self, clock: Callable[[], datetime] = _utc_now, ledger=None, max_catchup_parallel: int = 2,
+                 lease_store=None, lease_poll_interval: float = 10.0, max_retry_attempts: int = 3,
+                 retry_delay: timedelta = timedelta(minutes=30)):
+        """
+        初始化调度器
+
+        Args:
+            clock: 返回当前时间（带时区）的函数，测试时可替换
+            ledger: 任务执行台账，None 时不记录也不补跑
+            max_catchup_parallel: 同时进行的补跑执行数上限（所有任务合计）
+            lease_store: 多进程模式下的租约存储，None 表示单进程
+            lease_poll_interval: 等待其他进程手中租约的检查间隔（秒）
+            max_retry_attempts: 同一计划时间的最多尝试次数（含首次执行）
+            retry_delay: 执行失败后隔多久重新补跑
+        """
+        self.clock = clock
+        self.ledger = ledger
+        self.lease_store = lease_store
+        self.lease_poll_interval = lease_poll_interval
+        self.max_catchup_parallel = max(1, int(max_catchup_parallel))
+        self.max_retry_attempts = max(1, int(max_retry_attempts))
+        self.retry_delay = retry_delay
+        # 台账中早于此刻开始、仍为执行中的记录来自之前退出的进程
+        self.started_at = time.time()
+        self._catchup_semaphore: Optional[asyncio.Semaphore] = None
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._tasks = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def add_job(self, name: str, func: Callable, trigger, *args, max_concurrency: int = 1,
+                overlap: str = OVERLAP_SKIP, catchup: str = CATCHUP_LATEST, catchup_limit: int = 1,
+                catchup_window: Optional[timedelta] = None, pass_scheduled_time: bool = False,
+                **kwargs) -> ScheduledJob:
+        """
+        添加任务，同名任务会被替换（正在执行的实例不受影响）
+
+        Args:
+            name: 任务名
+            func: 同步函数或协程函数
+            trigger: 提供 next_run(after, last_run) 的触发器
+            *args, **kwargs: 调用 func 时的参数
+            max_concurrency: 同一任务同时执行的实例上限
+            overlap: 达到并发上限时的重叠策略，见 OVERLAP_POLICIES
+            catchup: 错过多个计划时间时的补跑策略，见 CATCHUP_POLICIES
+            catchup_limit: CATCHUP_ALL 时最多补跑的次数，更早的记为跳过
+            catchup_window: 只补跑这段时间之内的计划时间，None 表示不限
+            pass_scheduled_time: 是否以关键字参数 scheduled_for 把计划时间传给 func
+
+        Returns:
+            ScheduledJob
+        """
+        job = ScheduledJob(name, func, trigger, args, kwargs, max_concurrency, overlap,
+                           catchup, catchup_limit, catchup_window, pass_scheduled_time)
+        now = self.clock()
+        previous = self.jobs.get(name)
+        if previous is not None:
+            # 沿用运行状态，执行中的实例结束时仍能找到并发计数
+            job.running, job.pending, job.last_run = previous.running, previous.pending, previous.last_run
+            job.retry_at = previous.retry_at
+            previous.replaced_by = job
+            job.next_run = trigger.next_run(now, job.last_run)
+        else:
+            job.next_run = self._first_run(job, now)
+        self.jobs[name] = job
+        LOG.info(f"已安排任务 {name}: {trigger!r}，下次执行 {job.next_run}")
+        self._wake()
+        return job
+
+    def _first_run(self, job: ScheduledJob, now: datetime) -> datetime:
+        """新任务的首次计划时间：台账中有记录时从最近一次成功之后开始，错过的部分由 run_pending 补跑"""
+        last_done = self.ledger.last_success(job.name, include_skipped=True) if self.ledger else None
+        # 最近一次成功之前失败或中断的执行由 _retry_unfinished 补跑
+        job.retry_at = now
+        if last_done is None:
+            return job.trigger.next_run(now, None)
+        job.last_run = last_done
+        start = last_done
+        if job.catchup_window is not None:
+            start = max(start, now - job.catchup_window)
+        first = job.trigger.next_run(start, last_done)
+        if first <= now:
+            LOG.info(f"任务 {job.name} 上次成功的计划时间为 {last_done}，将从 {first} 开始补跑")
+        return first
+
+    def reschedule(self, name: str, trigger):
+        """替换任务的触发器并重新计算下次执行时间"""
+        job = self.jobs[name]
+        job.trigger = trigger
+        job.next_run = trigger.next_run(self.clock(), job.last_run)
+        LOG.info(f"任务 {name} 已重新安排: {trigger!r}，下次执行 {job.next_run}")
+        self._wake()
+
+    def remove_job(self, name: str):
+        self.jobs.pop(name, None)
+        self._wake()
+
+    def _mark_skipped(self, job: ScheduledJob, scheduled_for: datetime, reason: str):
+        if self.ledger is not None:
+            self.ledger.mark_skipped(job.name, scheduled_for, reason)
+
+    def fire(self, name: str, scheduled_for: Optional[datetime] = None, catchup: bool = False) -> bool:
+        """
+        触发一次任务（按重叠策略处理），必须在事件循环中调用
+
+        Args:
+            name: 任务名
+            scheduled_for: 计划时间，None 表示当前时间（手动触发）
+            catchup: 是否为补跑；补跑总是排队执行，不受重叠策略影响
+
+        Returns:
+            本次触发是否开始执行或进入等待
+        """
+        job = self.jobs[name]
+        scheduled_for = scheduled_for or self.clock()
+        if job.running < job.max_concurrency:
+            self._start(job, scheduled_for, catchup)
+            return True
+        if catchup or job.overlap == OVERLAP_QUEUE:
+            job.pending.append((scheduled_for, catchup))
+        elif job.overlap == OVERLAP_COALESCE:
+            if job.pending:
+                replaced, _ = job.pending[-1]
+                job.pending[-1] = (scheduled_for, catchup)
+                self._mark_skipped(job, replaced, 'coalesced')
+                LOG.info(f"任务 {name} 已有一次等待中的执行，本次触发与其合并")
+                return False
+            job.pending.append((scheduled_for, catchup))
+        else:
+            LOG.warning(f"任务 {name} 上一次执行尚未结束，跳过本次触发（策略: {job.overlap}）")
+            self._mark_skipped(job, scheduled_for, 'overlap')
+            return False
+        LOG.info(f"任务 {name} 上一次执行尚未结束，本次触发等待执行（策略: {job.overlap}，等待 {len(job.pending)} 次）")
+        return True
+
+    def _start(self, job: ScheduledJob, scheduled_for: datetime, catchup: bool = False):
+        job.running += 1
+        task = asyncio.get_running_loop().create_task(self._execute(job, scheduled_for, catchup),
+                                                      name=f"job:{job.name}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, job: ScheduledJob, scheduled_for: datetime, catchup: bool = False):
+        try:
+            if catchup:
+                if self._catchup_semaphore is None:
+                    self._catchup_semaphore = asyncio.Semaphore(self.max_catchup_parallel)
+                async with self._catchup_semaphore:
+                    await self._invoke(job, scheduled_for, catchup)
+            else:
+                await self._invoke(job, scheduled_for, catchup)
+        finally:
+            # 执行期间任务可能被 add_job 替换，计数记在最新的对象上
+            while job.replaced_by is not None:
+                job = job.replaced_by
+            job.running -= 1
+            if job.pending and not self._stopping and self.jobs.get(job.name) is job:
+                self._start(job, *job.pending.popleft())
+
+    async def _acquire_lease(self, job: ScheduledJob, scheduled_for: datetime):
+        """
+        获取本次执行的租约；被其他进程持有时等待其释放或过期
+
+        Returns:
+            Lease，本次执行已由其他进程完成（或调度器正在停止）时返回None
+        """
+        key = f"job:{job.name}@{scheduled_for.timestamp():.0f}"
+        while True:
+            lease = await asyncio.to_thread(self.lease_store.lease, key)
+            if lease is not None:
+                return lease
+            record = self.ledger.get(job.name, scheduled_for) if self.ledger is not None else None
+            if self.ledger is None or (record and record['status'] == RUN_SUCCEEDED) or self._stopping:
+                LOG.info(f"任务 {job.name} 计划时间 {scheduled_for} 由 {self.lease_store.holder(key)} 执行，本进程跳过")
+                return None
+            LOG.debug(f"任务 {job.name} 计划时间 {scheduled_for} 的租约由其他进程持有，等待")
+            await asyncio.sleep(self.lease_poll_interval)
+
+    async def _invoke(self, job: ScheduledJob, scheduled_for: datetime, catchup: bool):
+        if self.lease_store is None:
+            # 单进程：之前的进程退出时留下的执行中记录可直接接手
+            await self._invoke_claimed(job, scheduled_for, catchup, takeover=False,
+                                       orphaned_before=self.started_at)
+            return
+        lease = await self._acquire_lease(job, scheduled_for)
+        if lease is None:
+            return
+        try:
+            await self._invoke_claimed(job, scheduled_for, catchup, takeover=True)
+        finally:
+            await asyncio.to_thread(lease.release)
+
+    async def _invoke_claimed(self, job: ScheduledJob, scheduled_for: datetime, catchup: bool, takeover: bool,
+                              orphaned_before: Optional[float] = None):
+        if self.ledger is not None and not self.ledger.claim(job.name, scheduled_for, takeover=takeover,
+                                                             orphaned_before=orphaned_before):
+            LOG.info(f"任务 {job.name} 计划时间 {scheduled_for} 的执行已完成或正在进行，跳过")
+            return
+
+        kwargs = dict(job.kwargs)
+        if job.pass_scheduled_time:
+            kwargs['scheduled_for'] = scheduled_for
+        started = self.clock()
+        LOG.info(f"任务 {job.name} 开始执行（计划时间 {scheduled_for}{'，补跑' if catchup else ''}）")
+        error = None
+        try:
+            if inspect.iscoroutinefunction(job.func):
+                await job.func(*job.args, **kwargs)
+            else:
+                await asyncio.to_thread(job.func, *job.args, **kwargs)
+            LOG.info(f"任务 {job.name} 执行完毕，耗时 {(self.clock() - started).total_seconds():.1f} 秒")
+        except asyncio.CancelledError:
+            error = 'cancelled'
+            LOG.warning(f"任务 {job.name} 被取消")
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            LOG.error(f"任务 {job.name} 执行失败: {e}", exc_info=True)
+        finally:
+            if self.ledger is not None:
+                self.ledger.finish(job.name, scheduled_for, error)
+                if error is not None and error != 'cancelled':
+                    self._schedule_retry(job)
+
+    def _schedule_retry(self, job: ScheduledJob):
+        while job.replaced_by is not None:
+            job = job.replaced_by
+        if job.catchup != CATCHUP_ALL or self._stopping:
+            return
+        retry_at = self.clock() + self.retry_delay
+        if job.retry_at is None or retry_at < job.retry_at:
+            job.retry_at = retry_at
+            LOG.info(f"任务 {job.name} 将于 {retry_at} 重新补跑失败的执行")
+            self._wake()
+
+    def _retry_unfinished(self, job: ScheduledJob, now: datetime, exclude: Sequence[datetime] = ()):
+        """补跑 catchup_window 之内失败或中断的执行（最多 catchup_limit 次，跳过本轮已触发的计划时间）"""
+        job.retry_at = None
+        if self.ledger is None or job.catchup != CATCHUP_ALL:
+            return
+        if self.lease_store is None:
+            running_before = self.started_at
+        else:
+            # 多进程：执行中的记录可能属于其他进程，只接手超过 stale_after 的
+            running_before = time.time() - self.ledger.stale_after
+        since = now - job.catchup_window if job.catchup_window is not None else None
+        slots = [slot for slot in self.ledger.unfinished(job.name, since=since, before=now,
+                                                         max_attempts=self.max_retry_attempts,
+                                                         running_started_before=running_before)
+                 if slot not in exclude]
+        if not slots:
+            return
+        slots = slots[-job.catchup_limit:]
+        LOG.warning(f"任务 {job.name} 有 {len(slots)} 次执行失败或中断，重新补跑: "
+                    f"{', '.join(str(slot) for slot in slots)}")
+        for slot in slots:
+            self.fire(job.name, slot, catchup=True)
+
+    def _due_slots(self, job: ScheduledJob, now: datetime) -> List[datetime]:
+        """job.next_run 起到 now 为止的全部计划时间"""
+        slots = []
+        slot = job.next_run
+        while slot is not None and slot <= now:
+            slots.append(slot)
+            slot = job.trigger.next_run(slot, slot)
+        job.next_run = slot
+        return slots
+
+    def run_pending(self) -> Optional[float]:
+        """
+        触发所有已到期的任务，必须在事件循环中调用
+
+        Returns:
+            距下一个任务到期的秒数，没有任务时为 None
+        """
+        now = self.clock()
+        for job in list(self.jobs.values()):
+            fired = []
+            if job.next_run is not None and job.next_run <= now:
+                fired = self._fire_due(job, now)
+                # 每个新的计划时间到来时顺带检查之前失败的执行
+                job.retry_at = now
+            if job.retry_at is not None and job.retry_at <= now:
+                # 在本轮计划执行之后触发，补跑不会让当前计划时间被重叠策略跳过
+                self._retry_unfinished(job, now, exclude=fired)
+        upcoming = [when for job in self.jobs.values() for when in (job.next_run, job.retry_at) if when is not None]
+        if not upcoming:
+            return None
+        return max(0.0, (min(upcoming) - self.clock()).total_seconds())
+
+    def _fire_due(self, job: ScheduledJob, now: datetime) -> List[datetime]:
+        """触发已到期的计划时间，返回实际触发的计划时间"""
+        slots = self._due_slots(job, now)
+        job.last_run = slots[-1]
+        if len(slots) == 1:
+            self.fire(job.name, slots[0])
+            return slots
+
+        # 错过了多个计划时间（重启或系统休眠）
+        keep = job.catchup_limit if job.catchup == CATCHUP_ALL else 1
+        for slot in slots[:-keep]:
+            self._mark_skipped(job, slot, 'missed')
+        LOG.warning(f"任务 {job.name} 错过了 {len(slots)} 个计划时间，"
+                    f"补跑 {min(keep, len(slots))} 次（策略: {job.catchup}）")
+        for slot in slots[-keep:]:
+            self.fire(job.name, slot, catchup=True)
+        return slots[-keep:]
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self, shutdown_timeout: Optional[float] = None):
+        """
+        运行调度循环直到 stop() 被调用，然后等待正在执行的任务结束
+
+        Args:
+            shutdown_timeout: 退出时等待执行中任务的最长秒数，None 表示一直等待
+        """
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        LOG.info(f"调度器已启动，共 {len(self.jobs)} 个任务")
+        while not self._stopping:
+            delay = self.run_pending()
+            self._wakeup.clear()
+            timeout = MAX_SLEEP_SECONDS if delay is None else min(delay, MAX_SLEEP_SECONDS)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        if self._tasks:
+            LOG.info(f"调度器正在退出，等待 {len(self._tasks)} 个执行中的任务结束")
+            done, pending = await asyncio.wait(set(self._tasks), timeout=shutdown_timeout)
+            if pending:
+                LOG.warning(f"{len(pending)} 个任务在退出时仍未结束")
+        LOG.info("调度器已停止")
+
+    def stop(self):
+        """停止调度，不再触发新的执行"""
+        self._stopping = True
+        self._wake()
+
+
+def _file_signature(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+async def watch_file(path: str, on_change: Callable[[], None], interval: float = 5.0,
+                     stop_event: Optional[asyncio.Event] = None):
+    """
+    监视文件变化，mtime 或大小改变时调用 on_change
+
+    每次检查只做一次 stat，不读取文件内容；on_change 抛出的异常会被记录，不会中断监视。
+
+    Args:
+        path: 文件路径
+        on_change: 变化时调用的函数（同步函数或协程函数）
+        interval: 检查间隔（秒）
+        stop_event: 设置后停止监视
+    """
+    stop_event = stop_event or asyncio.Event()
+    signature = _file_signature(path)
+    while not stop_event.is_set():
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval)
+            break
+        except asyncio.TimeoutError:
+            pass
+        current = _file_signature(path)
+        if current == signature:
+            continue
+        signature = current
+        LOG.info(f"检测到文件变化: {path}")
+        try:
+            result = on_change()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            LOG.error(f"处理文件变化时出错 ({path}): {e}", exc_info=True)
@@ -0,0 +1,240 @@
+"""
+近重复内容检测
+基于标题 MinHash + LSH 分桶以及规范化 URL，对故事做近重复折叠。
+每插入一条只需检查同桶候选，不需要与全部历史逐一比较。
+"""
+
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+import numpy as np
+
+# 常见的跟踪参数，规范化 URL 时去掉
+_TRACKING_PARAMS = {'ref', 'ref_src', 'source', 'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'share', 'via'}
+_TITLE_PREFIX_RE = re.compile(r'^(show|ask|tell|launch)\s+hn\s*[:：]\s*', re.IGNORECASE)
+_NON_WORD_RE = re.compile(r'[^\w\s]+')
+_STORY_HEADER_RE = re.compile(r'^\S+ \*\*\[(?P<title>.+?)\]\((?P<url>[^)]*)\)\*\*\s*$')
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normalize_url(url: Optional[str]) -> str:
+    """
+    规范化 URL：忽略协议、www 前缀、片段、跟踪参数和末尾斜杠
+
+    Args:
+        url: 原始 URL
+
+    Returns:
+        规范化后的字符串，空 URL 返回空字符串
+    """
+    if not url:
+        return ''
+    parsed = urlparse(url.strip())
+    host = (parsed.netloc or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if host.startswith('m.'):
+        host = host[2:]
+    path = parsed.path.rstrip('/') or ''
+    query = [(k, v) for k, v in parse_qsl(parsed.query)
+             if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith('utm_')]
+    query_str = urlencode(sorted(query))
+    return f"{host}{path}" + (f"?{query_str}" if query_str else '')
+
+
+def url_domain(url: Optional[str]) -> str:
+    """返回规范化后的域名"""
+    return normalize_url(url).split('/', 1)[0].split('?', 1)[0]
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """去掉 Show HN/Ask HN 前缀和标点，统一小写"""
+    title = _TITLE_PREFIX_RE.sub('', (title or '').strip())
+    return ' '.join(_NON_WORD_RE.sub(' ', title.lower()).split())
+
+
+def title_shingles(title: str, k: int = 4) -> set:
+    """标题的字符 k-gram 集合（对词形变化比单词集合更稳健）"""
+    text = normalize_title(title)
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+class MinHasher:
+    """使用全域哈希族 (a*x + b) mod p 生成 MinHash 签名"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        # 参数取 32 位以内，与 32 位哈希值相乘不会溢出 uint64
+        self.a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles: Iterable[str]) -> np.ndarray:
+        hashes = np.array([zlib.crc32(s.encode('utf-8')) for s in shingles], dtype=np.uint64)
+        if not len(hashes):
+            return np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        values = (hashes[:, None] * self.a[None, :] + self.b[None, :]) % np.uint64(_MERSENNE_PRIME)
+        return values.min(axis=0)
+
+
+def estimate_jaccard(sig1: np.ndarray, sig2: np.ndarray) -> float:
+    """由两个 MinHash 签名估计 Jaccard 相似度"""
+    return float(np.mean(sig1 == sig2))
+
+
+class NearDuplicateDetector:
+    """
+    近重复检测器
+
+    判定规则：规范化 URL 相同；或标题相似度达到 threshold 且域名相同；
+    或标题相似度达到 strict_threshold（不同来源转载同一新闻）。
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.6,
+                 strict_threshold: float = 0.85):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.strict_threshold = strict_threshold
+
+        self._buckets: List[Dict[bytes, List]] = [{} for _ in range(bands)]
+        self._urls: Dict[str, object] = {}
+        self._entries: Dict[object, Tuple[np.ndarray, str]] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def find(self, title: str, url: Optional[str] = None) -> Optional[object]:
+        """
+        查找已登记的近重复条目
+
+        Returns:
+            重复条目的 key，未找到返回None
+        """
+        norm_url = normalize_url(url)
+        if norm_url and norm_url in self._urls:
+            return self._urls[norm_url]
+
+        signature = self.hasher.signature(title_shingles(title))
+        domain = url_domain(url)
+        best_key, best_sim = None, 0.0
+        checked = set()
+        for band, band_key in self._band_keys(signature):
+            for key in self._buckets[band].get(band_key, ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                other_sig, other_domain = self._entries[key]
+                sim = estimate_jaccard(signature, other_sig)
+                same_domain = bool(domain) and domain == other_domain
+                if (sim >= self.strict_threshold or (same_domain and sim >= self.threshold)) and sim > best_sim:
+                    best_key, best_sim = key, sim
+        return best_key
+
+    def add(self, key, title: str, url: Optional[str] = None) -> Optional[object]:
+        """
+        登记一个条目；如果与已有条目重复则不登记
+
+        Args:
+            key: 条目的唯一标识
+            title: 标题
+            url: 链接
+
+        Returns:
+            重复条目的 key；不重复时返回None
+        """
+        duplicate = self.find(title, url)
+        if duplicate is not None:
+            return duplicate
+
+        signature = self.hasher.signature(title_shingles(title))
+        self._entries[key] = (signature, url_domain(url))
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, []).append(key)
+        norm_url = normalize_url(url)
+        if norm_url:
+            self._urls[norm_url] = key
+        return None
+
+
+def dedup_stories(stories: Sequence[Dict]) -> List[Dict]:
+    """
+    折叠近重复的故事
+
+    每组重复故事中分数最高的一条作为规范条目，其余记录在规范条目的
+    duplicates 字段中。传入的故事不会被修改：需要追加 duplicates 的规范条目
+    以浅拷贝返回，其余故事原样返回。已经折叠过的列表再次调用结果不变。
+
+    Args:
+        stories: 故事列表
+
+    Returns:
+        保持原顺序的规范故事列表
+    """
+    detector = NearDuplicateDetector()
+    canonical = {}
+    by_score = sorted(range(len(stories)), key=lambda i: stories[i].get('score', 0) or 0, reverse=True)
+    for i in by_score:
+        story = stories[i]
+        duplicate_of = detector.add(i, story.get('title', ''), story.get('url'))
+        if duplicate_of is None:
+            canonical[i] = story
+        elif duplicate_of in canonical:
+            target = canonical[duplicate_of]
+            canonical[duplicate_of] = dict(target, duplicates=target.get('duplicates', []) + [
+                {field: story.get(field) for field in ('id', 'title', 'url', 'score')}])
+    return [canonical[i] for i in sorted(canonical)]
+
+
+def dedup_markdown_stories(documents: Sequence[str]) -> List[str]:
+    """
+    跨多份小时报告去掉重复的故事条目
+
+    条目格式与 hn_renderer.render_story_markdown 一致：以 "<图标> **[标题](链接)**"
+    开头、后接缩进行。同一故事保留最后（最新）一份报告中的条目，其分数和摘要最新。
+
+    Args:
+        documents: 按时间顺序排列的 Markdown 文本
+
+    Returns:
+        去重后的 Markdown 文本，顺序不变
+    """
+    detector = NearDuplicateDetector()
+    result = []
+    for doc_idx in range(len(documents) - 1, -1, -1):
+        lines = documents[doc_idx].split('\n')
+        kept = []
+        i = 0
+        entry_no = 0
+        while i < len(lines):
+            match = _STORY_HEADER_RE.match(lines[i])
+            if not match:
+                kept.append(lines[i])
+                i += 1
+                continue
+            end = i + 1
+            while end < len(lines) and lines[end].startswith('  '):
+                end += 1
+            entry_no += 1
+            duplicate = detector.add((doc_idx, entry_no), match.group('title'), match.group('url'))
+            if duplicate is None:
+                kept.extend(lines[i:end])
+            elif end < len(lines) and not lines[end].strip():
+                # 同时去掉条目后的空行
+                end += 1
+            i = end
+        result.append('\n'.join(kept))
+    result.reverse()
+    return result
@@ -0,0 +1,140 @@
+"""
+按收件人组合日报
+仓库报告、Hacker News 摘要和各分类的故事列表各生成一次，作为片段；
+每个收件人的邮件只是按其订阅条件挑选片段拼接，不会为单个收件人调用 LLM。
+订阅条件相同的收件人共用同一封邮件，渲染和投递的次数与不同的条件组合数成正比。
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+class DigestRecipient:
+    """一个日报收件人及其筛选条件，条件为 None 表示不筛选"""
+
+    def __init__(self, address: str, repos: Optional[Iterable[str]] = None,
+                 hn_categories: Optional[Iterable[str]] = None):
+        self.address = address
+        self.repos = frozenset(repo.lower() for repo in repos) if repos else None
+        self.hn_categories = frozenset(hn_categories) if hn_categories else None
+
+    @property
+    def personalized(self) -> bool:
+        return self.repos is not None or self.hn_categories is not None
+
+    def signature(self) -> Tuple:
+        """筛选条件的标识，相同标识的收件人收到完全相同的邮件"""
+        return (tuple(sorted(self.repos)) if self.repos is not None else None,
+                tuple(sorted(self.hn_categories)) if self.hn_categories is not None else None)
+
+    def wants_repo(self, repo_full_name: str) -> bool:
+        return self.repos is None or repo_full_name.lower() in self.repos
+
+    def __repr__(self):
+        return f"DigestRecipient({self.address!r}, repos={self.repos}, hn_categories={self.hn_categories})"
+
+
+def parse_digest_recipients(email_settings: Optional[dict]) -> List[DigestRecipient]:
+    """
+    读取收件人配置
+
+    email.to 中的地址收到完整日报；email.recipients 为个性化订阅，例如::
+
+        "recipients": [
+            {"address": "a@example.com", "repos": ["owner/repo"], "hn_categories": ["tech", "science"]}
+        ]
+
+    同一地址同时出现在两处时以 recipients 中的条件为准。
+
+    Returns:
+        按配置顺序排列、地址不重复的收件人列表
+    """
+    email_settings = email_settings or {}
+    recipients: Dict[str, DigestRecipient] = {}
+    to = email_settings.get('to') or []
+    for address in ([to] if isinstance(to, str) else to):
+        if address:
+            recipients[address] = DigestRecipient(address)
+    for entry in email_settings.get('recipients') or []:
+        if isinstance(entry, str):
+            entry = {'address': entry}
+        address = entry.get('address') or entry.get('email')
+        if not address:
+            LOG.warning(f"忽略缺少地址的收件人配置: {entry}")
+            continue
+        recipients[address] = DigestRecipient(address, entry.get('repos'), entry.get('hn_categories'))
+    return list(recipients.values())
+
+
+class DigestComposer:
+    """
+    用预先生成的片段组合日报
+
+    完整日报与原有的合并报告完全相同；有筛选条件的收件人只包含匹配的仓库部分，
+    设置了 hn_categories 的收件人收到所选分类的故事列表，代替完整的 Hacker News 摘要。
+    """
+
+    def __init__(self, date_str: str, github_report: str, hn_summary: str,
+                 github_sections: Optional[Dict[str, str]] = None,
+                 hn_category_sections: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            date_str: 日报日期
+            github_report: 完整的 GitHub 部分
+            hn_summary: 完整的 Hacker News 摘要
+            github_sections: {"owner/repo": 该仓库的部分}，按订阅顺序排列
+            hn_category_sections: {分类: 该分类的故事列表}
+        """
+        self.date_str = date_str
+        self.github_report = github_report
+        self.hn_summary = hn_summary
+        self.github_sections = github_sections or {}
+        self.hn_category_sections = hn_category_sections or {}
+
+    def _github_part(self, recipient: DigestRecipient) -> str:
+        if recipient.repos is None or not self.github_sections:
+            return self.github_report
+        sections = [section for repo, section in self.github_sections.items() if recipient.wants_repo(repo)]
+        if not sections:
+            return "_订阅的仓库在本周期内没有更新。_"
+        return "\n".join(["# GitHub Subscriptions Update\n"] + sections)
+
+    def _hn_part(self, recipient: DigestRecipient) -> str:
+        if recipient.hn_categories is None or not self.hn_category_sections:
+            return self.hn_summary
+        sections = [section for category, section in self.hn_category_sections.items()
+                    if category in recipient.hn_categories]
+        if not sections:
+            return "_订阅的分类今天没有热门故事。_"
+        return "\n\n".join(sections)
+
+    def compose(self, recipient: Optional[DigestRecipient] = None) -> str:
+        """组合一位收件人的日报 Markdown，recipient 为 None 时返回完整日报"""
+        recipient = recipient or DigestRecipient('')
+        return (
+            f"# 每日资讯摘要 ({self.date_str})\n\n"
+            f"## 1. GitHub 仓库订阅更新\n\n{self._github_part(recipient)}\n\n"
+            f"---\n"
+            f"## 2. Hacker News 每日热点\n\n{self._hn_part(recipient)}"
+        )
+
+    def compose_all(self, recipients: Iterable[DigestRecipient]) -> List[Tuple[List[str], str]]:
+        """
+        为全部收件人组合日报，条件相同的收件人合并为一组
+
+        Returns:
+            [(收件人地址列表, Markdown)]，按各组第一位收件人的顺序排列
+        """
+        groups: Dict[Tuple, Tuple[List[str], DigestRecipient]] = {}
+        for recipient in recipients:
+            signature = recipient.signature()
+            if signature in groups:
+                groups[signature][0].append(recipient.address)
+            else:
+                groups[signature] = ([recipient.address], recipient)
+        return [(addresses, self.compose(recipient)) for addresses, recipient in groups.values()]
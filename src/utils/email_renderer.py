@@ -0,0 +1,275 @@
+"""
+报告邮件渲染
+Markdown 只解析一次：目录直接取自 markdown2 生成标题 id 时收集的标题列表，
+邮件模板在加载时拆分为片段，渲染结果按内容哈希缓存，同一份报告发给多个渠道或收件人时只渲染一次。
+markdown2 的耗时随文档长度超线性增长，长报告按分隔线（---）拆成小节分别解析，小节的结果也单独缓存。
+"""
+
+import os
+import re
+import html
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import markdown2
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+DEFAULT_TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'templates', 'email_template.html')
+
+# markdown2 扩展：header-ids 为标题生成 id，toc 在同一次解析中收集标题
+MARKDOWN_EXTRAS = [
+    "code-friendly",   # 保留代码块中的空格
+    "fenced-code-blocks", # 支持```代码块
+    "tables",          # 支持表格
+    "break-on-newline", # 处理换行
+    "header-ids",      # 为标题生成IDs
+    "toc",             # 收集标题用于生成目录
+    "numbering",       # 支持数字列表
+    "strike",          # 支持删除线
+    "task_list",       # 支持任务列表
+    "wiki-tables",      # 支持更复杂的表格
+]
+# 代码块语法高亮（模板中有 .codehilite 样式），需要 Pygments
+HIGHLIGHT_EXTRA = "code-color"
+
+# 报告长度超过该值时才生成目录 / 回到顶部链接
+TOC_MIN_LENGTH = 800
+BACK_TO_TOP_MIN_LENGTH = 1000
+TOC_MAX_LEVEL = 3
+
+# 列表项（无序或有序）前补空行，否则 markdown2 会把它并入上一段
+_LIST_ITEM_RE = re.compile(r'([^\n])\n([ \t]*(?:[-*+]|\d+\.)[ \t]+)')
+_SECTION_HEADER_RE = re.compile(r'^#{2,3} .+$', re.MULTILINE)
+_BACK_TO_TOP_RE = re.compile(r'(\n{2,})^(#{2,3} .+)$', re.MULTILINE)
+_TEMPLATE_FIELD_RE = re.compile(r'\{\{(\w+)\}\}')
+# 前面是空行的 --- 是分隔线（紧跟在文字后面的是 setext 二级标题，不能在此拆分）
+_SECTION_BREAK_RE = re.compile(r'\n\n(?=---[ \t]*\n)')
+_FENCE_RE = re.compile(r'^[ \t]*```', re.MULTILINE)
+
+
+class CompiledTemplate:
+    """
+    预先拆分的邮件模板
+
+    加载时把模板按 {{字段}} 拆成文本片段和字段名，渲染时只做一次拼接。
+    """
+
+    def __init__(self, source: str):
+        self.parts: List[Tuple[bool, str]] = []
+        position = 0
+        for match in _TEMPLATE_FIELD_RE.finditer(source):
+            self.parts.append((False, source[position:match.start()]))
+            self.parts.append((True, match.group(1)))
+            position = match.end()
+        self.parts.append((False, source[position:]))
+
+    @classmethod
+    def load(cls, path: str) -> Optional['CompiledTemplate']:
+        """读取并编译模板文件，失败时返回None"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(f.read())
+        except FileNotFoundError:
+            LOG.error(f"Email template file not found at {path}. Sending plain HTML report.")
+        except Exception as e:
+            LOG.error(f"Error loading email template: {e}. Sending plain HTML report.")
+        return None
+
+    def render(self, values: Dict[str, str]) -> str:
+        return "".join(values.get(text, '') if is_field else text for is_field, text in self.parts)
+
+
+def build_toc_html(toc: List[tuple], max_level: int = TOC_MAX_LEVEL) -> str:
+    """
+    根据 markdown2 收集的标题 [(级别, id, 标题), ...] 生成目录 HTML
+
+    Returns:
+        目录 HTML，没有一到 max_level 级标题时返回空字符串
+    """
+    headers = [(entry[0], entry[1], entry[2]) for entry in toc or [] if entry[0] <= max_level]
+    if not headers:
+        return ""
+
+    parts = ['<div class="toc">\n', '<div class="toc-title">目录</div>\n', '<ul>\n']
+    current_level = 0
+    for level, anchor, title in headers:
+        # 根据标题层级调整缩进
+        while level > current_level:
+            parts.append('<ul>\n')
+            current_level += 1
+        while level < current_level:
+            parts.append('</ul>\n')
+            current_level -= 1
+        parts.append(f'<li><a href="#{html.escape(anchor, quote=True)}">{html.escape(title)}</a></li>\n')
+    # 关闭所有剩余的列表标签
+    parts.append('</ul>\n' * current_level)
+    parts.append('</ul>\n</div>\n')
+    return "".join(parts)
+
+
+def split_sections(markdown_text: str) -> List[str]:
+    """按分隔线把报告拆成小节，不会拆开代码块"""
+    sections = []
+    for part in _SECTION_BREAK_RE.split(markdown_text):
+        # 上一节的代码块没有闭合时（分隔线在代码块内），并回上一节
+        if sections and len(_FENCE_RE.findall(sections[-1])) % 2:
+            sections[-1] = f"{sections[-1]}\n\n{part}"
+        else:
+            sections.append(part)
+    return sections
+
+
+class EmailRenderer:
+    """
+    报告邮件的 HTML 渲染器
+
+    线程安全：每个线程使用自己的 markdown2.Markdown 实例，渲染缓存加锁访问。
+    """
+
+    def __init__(self, template_path: str = DEFAULT_TEMPLATE_PATH, highlight_code: bool = True,
+                 cache_size: int = 32, section_cache_size: int = 256):
+        """
+        初始化渲染器
+
+        Args:
+            template_path: 邮件模板路径，模板中使用 {{subject}} 和 {{report_content}}
+            highlight_code: 是否对代码块做语法高亮（较慢）
+            cache_size: 缓存的渲染结果数量
+            section_cache_size: 缓存的小节解析结果数量
+        """
+        self.template_path = template_path
+        self.template = CompiledTemplate.load(template_path)
+        self.extras = MARKDOWN_EXTRAS + ([HIGHLIGHT_EXTRA] if highlight_code else [])
+        self.cache_size = max(0, int(cache_size))
+        self._cache: 'OrderedDict[str, str]' = OrderedDict()
+        self.section_cache_size = max(0, int(section_cache_size))
+        self._sections: 'OrderedDict[str, Tuple[str, List[tuple]]]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def reload_template(self):
+        """重新读取模板（模板文件修改后调用）"""
+        self.template = CompiledTemplate.load(self.template_path)
+        with self._cache_lock:
+            self._cache.clear()
+
+    @staticmethod
+    def _remember(cache: OrderedDict, key: str, value, limit: int):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+    def _markdown(self) -> markdown2.Markdown:
+        converter = getattr(self._local, 'markdown', None)
+        if converter is None:
+            converter = self._local.markdown = markdown2.Markdown(extras=self.extras)
+        return converter
+
+    @staticmethod
+    def preprocess(markdown_text: str) -> str:
+        """修正列表项前缺少的空行，长报告在二、三级标题前加入“回到顶部”链接"""
+        markdown_text = _LIST_ITEM_RE.sub(r'\1\n\n\2', markdown_text)
+        if len(markdown_text) > BACK_TO_TOP_MIN_LENGTH and \
+                len(_SECTION_HEADER_RE.findall(markdown_text)) >= 2:
+            markdown_text = _BACK_TO_TOP_RE.sub(
+                r'\1<div class="back-to-top"><a href="#top">回到顶部 ↑</a></div>\n\n\2', markdown_text)
+        return markdown_text
+
+    def _render_section(self, section: str) -> Tuple[str, List[tuple]]:
+        """解析一个小节，返回 (HTML, [(级别, id, 标题)])"""
+        key = hashlib.sha1(section.encode('utf-8')).hexdigest()
+        with self._cache_lock:
+            cached = self._sections.get(key)
+            if cached is not None:
+                self._sections.move_to_end(key)
+                return cached
+
+        converter = self._markdown()
+        section_html = str(converter.convert(section))
+        result = (section_html, [tuple(entry[:3]) for entry in converter._toc or []])
+        if self.section_cache_size:
+            with self._cache_lock:
+                self._remember(self._sections, key, result, self.section_cache_size)
+        return result
+
+    def render_body(self, markdown_text: str) -> str:
+        """把报告 Markdown 转为邮件正文 HTML（不含模板），长报告在开头加目录"""
+        html_parts, toc, used_ids = [], [], set()
+        for section in split_sections(self.preprocess(markdown_text)):
+            section_html, section_toc = self._render_section(section)
+            # 各小节分别解析，标题 id 只在小节内唯一；与前面小节重复的 id 加序号
+            section_ids = {anchor for _, anchor, _ in section_toc}
+            for level, anchor, title in section_toc:
+                unique, n = anchor, 1
+                while unique in used_ids or (unique != anchor and unique in section_ids):
+                    n += 1
+                    unique = f"{anchor}-{n}"
+                if unique != anchor:
+                    section_html = section_html.replace(f'id="{anchor}"', f'id="{unique}"', 1)
+                used_ids.add(unique)
+                toc.append((level, unique, title))
+            html_parts.append(section_html)
+
+        body = "\n".join(html_parts)
+        if len(markdown_text) > TOC_MIN_LENGTH:
+            toc_html = build_toc_html(toc)
+            if toc_html:
+                # 添加top锚点
+                body = f'<a id="top"></a>\n{toc_html}\n{body}'
+        return body
+
+    def render(self, subject: str, markdown_text: str) -> str:
+        """
+        渲染完整的邮件 HTML
+
+        Args:
+            subject: 邮件主题
+            markdown_text: 报告 Markdown
+
+        Returns:
+            HTML 字符串；相同的主题和内容直接返回缓存结果
+        """
+        key = hashlib.sha1(f"{subject}\0{markdown_text}".encode('utf-8')).hexdigest()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return cached
+            self.stats['misses'] += 1
+
+        body = self.render_body(markdown_text)
+        if self.template is None:
+            result = f"<h1>{subject}</h1>{body}"
+        else:
+            result = self.template.render({'subject': subject, 'report_content': body})
+
+        if self.cache_size:
+            with self._cache_lock:
+                self._remember(self._cache, key, result, self.cache_size)
+        return result
+
+
+_renderers: Dict[Tuple[str, bool], EmailRenderer] = {}
+_renderers_lock = threading.Lock()
+
+
+def get_email_renderer(template_path: str = DEFAULT_TEMPLATE_PATH, highlight_code: bool = True) -> EmailRenderer:
+    """返回进程内共享的渲染器，多个 Notifier 共用模板和渲染缓存"""
+    key = (os.path.abspath(template_path), highlight_code)
+    with _renderers_lock:
+        renderer = _renderers.get(key)
+        if renderer is None:
+            renderer = _renderers[key] = EmailRenderer(template_path, highlight_code=highlight_code)
+        return renderer
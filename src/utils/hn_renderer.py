@@ -0,0 +1,262 @@
+"""
+Hacker News 小时报告渲染
+同步和异步导出共用的渲染引擎：故事只排序、分类一次形成 StoryView，
+再按分区模板渲染为 Markdown / HTML / JSON，在内存中生成后原子写入文件
+"""
+
+import os
+import json
+import html
+import tempfile
+from typing import Callable, Dict, List, Sequence
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+HN_ITEM_URL = "https://news.ycombinator.com/item?id={id}"
+
+REPORT_TITLE = "Hacker News 热门新闻 ({date} {hour}:00)"
+REPORT_INTRO = "本报告收集了最近一小时内Hacker News平台上的热门讨论内容。\"分数\"代表用户的投票数量，反映了文章的热度与受欢迎程度。"
+HOTTEST_HEADING = "🔥 最热门讨论"
+HOTTEST_COUNT = 3
+
+# 分区模板：(分类, 标题, 说明)，按顺序渲染，空分区跳过
+REPORT_SECTIONS = (
+    ('show_hn', "👀 展示与分享", "用户分享的项目、产品和创造。"),
+    ('ask_hn', "❓ 问答与讨论", "社区成员提出的问题和讨论。"),
+    ('tech', "💻 技术与工程", "编程、开发和技术相关的热门话题。"),
+    ('science', "🔬 科学研究", "科学发现、研究和相关讨论。"),
+    ('business', "💼 商业与创业", "商业新闻、创业和行业动态。"),
+    ('others', "📚 其他热门内容", None),
+)
+
+
+def _score_key(story: Dict):
+    return story.get('score', 0)
+
+
+class StoryView:
+    """
+    一小时故事列表的预计算视图
+
+    by_heat 只排序一次，同时用于"最热门讨论"分区和AI摘要的选择；
+    categories 为 _categorize_stories 的分类结果。
+    """
+
+    def __init__(self, stories: Sequence[Dict], date: str, hour: str,
+                 categories: Dict[str, List[Dict]], heat_key: Callable[[Dict], object] = _score_key):
+        """
+        初始化视图
+
+        Args:
+            stories: 按 HN 排名顺序排列的故事列表
+            date: 日期字符串 (YYYY-MM-DD)
+            hour: 小时字符串 (HH)
+            categories: {分类: [故事, ...]}
+            heat_key: 热度排序键，默认按分数
+        """
+        self.stories = list(stories)
+        self.date = date
+        self.hour = hour
+        self.categories = categories
+        self.by_heat = sorted(self.stories, key=heat_key, reverse=True)
+
+    @property
+    def hottest(self) -> List[Dict]:
+        return self.by_heat[:HOTTEST_COUNT]
+
+    @property
+    def title(self) -> str:
+        return REPORT_TITLE.format(date=self.date, hour=self.hour)
+
+    def sections(self):
+        """按模板顺序返回非空分区 (分类, 标题, 说明, 故事列表)"""
+        for key, heading, description in REPORT_SECTIONS:
+            stories = self.categories.get(key) or []
+            if stories:
+                yield key, heading, description, stories
+
+
+def story_url(story: Dict) -> str:
+    """故事链接，没有外部链接的（Ask HN 等）指向 HN 讨论页"""
+    if 'url' in story:
+        return story['url']
+    return HN_ITEM_URL.format(id=story.get('id', ''))
+
+
+def story_icon(story: Dict) -> str:
+    title = story.get('title', '无标题').lower()
+    if "show hn" in title:
+        return "🔍"
+    if "ask hn" in title:
+        return "❓"
+    if story.get('type', 'unknown') == "job":
+        return "💼"
+    return "📰"
+
+
+def _stats(story: Dict) -> List[str]:
+    """分数、作者、评论数、上升速度"""
+    extra_info = []
+    if 'score' in story:
+        extra_info.append(f"👍 **{story['score']}** 分")
+    if 'by' in story:
+        extra_info.append(f"👤 作者: {story['by']}")
+    if 'descendants' in story and story['descendants'] > 0:
+        extra_info.append(f"💬 {story['descendants']} 条评论")
+    if story.get('points_per_hour'):
+        extra_info.append(f"📈 +{story['points_per_hour']:g} 分/小时")
+    return extra_info
+
+
+def render_story_markdown(story: Dict) -> str:
+    """
+    渲染单个故事条目
+
+    格式为 "<图标> **[标题](链接)**" 加若干缩进行，dedup_markdown_stories 依赖这一格式。
+    """
+    if not story:
+        return ""
+
+    lines = [f"{story_icon(story)} **[{story.get('title', '无标题')}]({story_url(story)})**"]
+
+    # AI摘要（如果有）
+    if story.get('ai_summary'):
+        lines.append(f"  📝 {story['ai_summary']}")
+
+    # 本次抓取中被折叠的重复提交
+    if story.get('duplicates'):
+        dup_links = [f"[{dup.get('title', '')}]({HN_ITEM_URL.format(id=dup.get('id', ''))})"
+                     for dup in story['duplicates']]
+        lines.append(f"  🔁 另有 {len(dup_links)} 个重复提交: {' · '.join(dup_links)}")
+
+    # 重复提交和相关旧闻（来自历史故事索引）
+    if story.get('duplicate_of'):
+        dup = story['duplicate_of']
+        dup_url = dup.get('url') or HN_ITEM_URL.format(id=dup.get('id', ''))
+        lines.append(f"  ♻️ 疑似重复提交: [{dup.get('title', '')}]({dup_url})")
+    if story.get('related'):
+        links = []
+        for rel in story['related']:
+            rel_url = rel.get('url') or HN_ITEM_URL.format(id=rel.get('id', ''))
+            seen = f" ({rel['first_seen'][:10]})" if rel.get('first_seen') else ""
+            links.append(f"[{rel.get('title', '')}]({rel_url}){seen}")
+        lines.append(f"  🔗 相关旧闻: {' · '.join(links)}")
+
+    # 分数、发布者等额外信息，条目之间空一行
+    extra_info = _stats(story)
+    if extra_info:
+        lines.append(f"  {' | '.join(extra_info)}")
+    lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def render_markdown(view: StoryView) -> str:
+    """把视图渲染为小时报告 Markdown"""
+    parts = [f"# {view.title}\n\n", f"{REPORT_INTRO}\n\n", f"## {HOTTEST_HEADING}\n\n"]
+    parts.extend(render_story_markdown(story) for story in view.hottest)
+    for _, heading, description, stories in view.sections():
+        parts.append(f"\n## {heading}\n\n")
+        if description:
+            parts.append(f"{description}\n\n")
+        parts.extend(render_story_markdown(story) for story in stories)
+    return "".join(parts)
+
+
+def _render_story_html(story: Dict) -> str:
+    esc = html.escape
+    parts = [f'<li><span class="icon">{story_icon(story)}</span> '
+             f'<a href="{esc(story_url(story), quote=True)}"><strong>{esc(story.get("title", "无标题"))}</strong></a>']
+    if story.get('ai_summary'):
+        parts.append(f'<p class="summary">📝 {esc(story["ai_summary"])}</p>')
+    stats = [text.replace('**', '') for text in _stats(story)]
+    if stats:
+        parts.append(f'<p class="stats">{esc(" | ".join(stats))}</p>')
+    parts.append('</li>')
+    return ''.join(parts)
+
+
+def render_html(view: StoryView) -> str:
+    """把视图渲染为独立的 HTML 片段"""
+    esc = html.escape
+    parts = [f'<article class="hn-hourly-report">\n<h1>{esc(view.title)}</h1>\n<p>{esc(REPORT_INTRO)}</p>\n',
+             f'<h2>{esc(HOTTEST_HEADING)}</h2>\n<ul>\n']
+    parts.extend(_render_story_html(story) + '\n' for story in view.hottest)
+    parts.append('</ul>\n')
+    for key, heading, description, stories in view.sections():
+        parts.append(f'<section class="{key}">\n<h2>{esc(heading)}</h2>\n')
+        if description:
+            parts.append(f'<p>{esc(description)}</p>\n')
+        parts.append('<ul>\n')
+        parts.extend(_render_story_html(story) + '\n' for story in stories)
+        parts.append('</ul>\n</section>\n')
+    parts.append('</article>\n')
+    return ''.join(parts)
+
+
+_JSON_STORY_FIELDS = ('id', 'title', 'url', 'score', 'descendants', 'by', 'type', 'time',
+                      'ai_summary', 'points_per_hour', 'comments_per_hour', 'categories')
+
+
+def render_json(view: StoryView) -> str:
+    """把视图渲染为 JSON，分区中只保存故事ID"""
+    def compact(story):
+        data = {field: story[field] for field in _JSON_STORY_FIELDS if field in story}
+        data['url'] = story_url(story)
+        return data
+
+    payload = {
+        'date': view.date,
+        'hour': view.hour,
+        'title': view.title,
+        'stories': [compact(story) for story in view.stories],
+        'hottest': [story.get('id') for story in view.hottest],
+        'sections': {key: [story.get('id') for story in stories] for key, _, _, stories in view.sections()},
+    }
+    return json.dumps(payload, ensure_ascii=False, indent=2)
+
+
+RENDERERS = {
+    'md': render_markdown,
+    'html': render_html,
+    'json': render_json,
+}
+
+
+def write_report(view: StoryView, dir_path: str, formats: Sequence[str] = ('md',)) -> Dict[str, str]:
+    """
+    渲染并原子写入 <dir_path>/<HH>.<格式>
+
+    内容先在内存中完整生成，再写入同目录的临时文件并重命名，
+    读取方（例如日报聚合）不会看到写了一半的文件。
+
+    Args:
+        view: 故事视图
+        dir_path: 输出目录
+        formats: 输出格式，可选 md / html / json
+
+    Returns:
+        {格式: 文件路径}
+    """
+    os.makedirs(dir_path, exist_ok=True)
+    paths = {}
+    for fmt in formats:
+        if fmt not in RENDERERS:
+            raise ValueError(f"不支持的报告格式: {fmt}")
+        content = RENDERERS[fmt](view)
+        path = os.path.join(dir_path, f'{view.hour}.{fmt}')
+        fd, tmp_path = tempfile.mkstemp(dir=dir_path, suffix=f'.{fmt}.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        paths[fmt] = path
+    LOG.debug(f"已写入Hacker News小时报告: {', '.join(paths.values())}")
+    return paths
@@ -0,0 +1,274 @@
+"""
+Hacker News 小时快照
+每次导出时把结构化的故事数据保存为 hacker_news/<date>/<HH>.jsonl，
+按日/按周的聚合直接在这些快照上做列式计算（跨小时去重、分数轨迹），不再拼接 Markdown
+"""
+
+import os
+import json
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+try:
+    from src.utils.dedup import dedup_stories
+    from src.utils.hn_renderer import REPORT_SECTIONS
+    from src.logger import LOG
+except ImportError:
+    from utils.dedup import dedup_stories
+    from utils.hn_renderer import REPORT_SECTIONS
+    try:
+        from logger import LOG
+    except ImportError:
+        import logging
+        LOG = logging.getLogger(__name__)
+
+
+def _story_category(story: Dict, categories: Optional[Dict[str, List[Dict]]]) -> Optional[str]:
+    if not categories:
+        return None
+    story_id = story.get('id')
+    for category, members in categories.items():
+        if any(member.get('id') == story_id for member in members):
+            return category
+    return None
+
+
+class HNSnapshotStore:
+    """按小时保存、按日期范围聚合 Hacker News 故事快照"""
+
+    def __init__(self, base_dir: str = 'hacker_news'):
+        """
+        初始化快照存储
+
+        Args:
+            base_dir: 数据根目录，与 Markdown 导出共用 <base_dir>/<date>/ 目录
+        """
+        self.base_dir = base_dir
+
+    def snapshot_path(self, date: str, hour: str) -> str:
+        return os.path.join(self.base_dir, date, f'{hour}.jsonl')
+
+    def write(self, stories: List[Dict], date: str, hour: str,
+              categories: Optional[Dict[str, List[Dict]]] = None) -> str:
+        """
+        保存一个小时的故事快照（原子替换）
+
+        Args:
+            stories: 按 HN 排名顺序排列的故事列表
+            date: 日期字符串 (YYYY-MM-DD)
+            hour: 小时字符串 (HH)
+            categories: _categorize_stories 的分类结果，用于记录每个故事的分类
+
+        Returns:
+            快照文件路径
+        """
+        path = self.snapshot_path(date, hour)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        lines = []
+        for rank, story in enumerate(stories, start=1):
+            if story.get('id') is None:
+                continue
+            record = {
+                'id': story.get('id'),
+                'title': story.get('title', ''),
+                'url': story.get('url', ''),
+                'score': story.get('score', 0) or 0,
+                'descendants': story.get('descendants', 0) or 0,
+                'rank': rank,
+                'category': _story_category(story, categories),
+                'summary': story.get('ai_summary'),
+                'by': story.get('by'),
+            }
+            duplicates = [dup.get('id') for dup in story.get('duplicates', []) if dup.get('id') is not None]
+            if duplicates:
+                record['duplicates'] = duplicates
+            lines.append(json.dumps(record, ensure_ascii=False))
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.jsonl.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + ('\n' if lines else ''))
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        LOG.debug(f"已保存HN小时快照: {path} ({len(lines)} 条)")
+        return path
+
+    def has_snapshots(self, date: str) -> bool:
+        """该日期是否存在快照"""
+        return bool(self._snapshot_files(date))
+
+    def _snapshot_files(self, date: str) -> List[str]:
+        day_dir = os.path.join(self.base_dir, date)
+        if not os.path.isdir(day_dir):
+            return []
+        return sorted(
+            os.path.join(day_dir, name) for name in os.listdir(day_dir)
+            if name.endswith('.jsonl') and os.path.splitext(name)[0].isdigit()
+        )
+
+    def load(self, dates: Iterable[str]) -> List[Dict]:
+        """
+        读取若干日期的全部快照记录，每条记录附带 hour 字段 ("YYYY-MM-DD HH")
+
+        Args:
+            dates: 日期字符串列表
+
+        Returns:
+            快照记录列表
+        """
+        records = []
+        for date in dates:
+            for path in self._snapshot_files(date):
+                hour = f"{date} {os.path.splitext(os.path.basename(path))[0]}"
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        for line in f:
+                            if line.strip():
+                                record = json.loads(line)
+                                record['hour'] = hour
+                                records.append(record)
+                except (OSError, json.JSONDecodeError) as e:
+                    LOG.error(f"读取HN快照 {path} 失败: {e}")
+        return records
+
+    def aggregate(self, dates: Iterable[str]) -> List[Dict]:
+        """
+        聚合若干日期的快照：同一故事跨小时只保留一条，并计算其在榜表现
+
+        每个故事包含最新的标题/链接/分类/摘要，以及
+        peak_score、latest_score、descendants、best_rank、hours_on_front_page、
+        first_seen、last_seen 和按时间排列的 trajectory [(hour, score), ...]。
+        重复提交的不同 id 最后由 dedup_stories 折叠。
+
+        Args:
+            dates: 日期字符串列表
+
+        Returns:
+            按峰值分数从高到低排序的故事列表
+        """
+        records = self.load(dates)
+        if not records:
+            return []
+
+        # 列式表示：按 (id, hour) 排序后每个故事占据连续的一段
+        ids = np.array([r['id'] for r in records], dtype=np.int64)
+        hours = np.array([r['hour'] for r in records])
+        scores = np.array([r.get('score', 0) or 0 for r in records], dtype=np.int64)
+        comments = np.array([r.get('descendants', 0) or 0 for r in records], dtype=np.int64)
+        ranks = np.array([r.get('rank', 0) or 0 for r in records], dtype=np.int64)
+
+        order = np.lexsort((hours, ids))
+        ids, hours, scores, comments, ranks = ids[order], hours[order], scores[order], comments[order], ranks[order]
+        unique_ids, starts, counts = np.unique(ids, return_index=True, return_counts=True)
+        ends = starts + counts - 1
+
+        peak_scores = np.maximum.reduceat(scores, starts)
+        peak_comments = np.maximum.reduceat(comments, starts)
+        best_ranks = np.minimum.reduceat(ranks, starts)
+
+        stories = []
+        for i, story_id in enumerate(unique_ids):
+            start, end = starts[i], ends[i]
+            latest = records[order[end]]
+            story = {
+                'id': int(story_id),
+                'title': latest.get('title', ''),
+                'url': latest.get('url', ''),
+                'by': latest.get('by'),
+                'category': latest.get('category'),
+                # 摘要只为热门故事生成，取最近一次非空的摘要
+                'summary': next((records[order[j]].get('summary') for j in range(end, start - 1, -1)
+                                 if records[order[j]].get('summary')), None),
+                'score': int(peak_scores[i]),
+                'peak_score': int(peak_scores[i]),
+                'latest_score': int(scores[end]),
+                'descendants': int(peak_comments[i]),
+                'best_rank': int(best_ranks[i]),
+                'hours_on_front_page': int(counts[i]),
+                'first_seen': str(hours[start]),
+                'last_seen': str(hours[end]),
+                'trajectory': [(str(h), int(s)) for h, s in zip(hours[start:end + 1], scores[start:end + 1])],
+            }
+            stories.append(story)
+
+        stories = dedup_stories(stories)
+        stories.sort(key=lambda s: s['peak_score'], reverse=True)
+        return stories
+
+    def aggregate_range(self, end_date: str, days: int = 7) -> List[Dict]:
+        """聚合截至 end_date（含）的最近 days 天，例如周报"""
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+        dates = [(end - timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days - 1, -1, -1)]
+        return self.aggregate(dates)
+
+
+def render_aggregated_stories(stories: List[Dict], title: str, limit: int = 40) -> str:
+    """
+    把聚合后的故事渲染为紧凑的 Markdown，作为 LLM 的输入
+
+    Args:
+        stories: HNSnapshotStore.aggregate 的结果
+        title: 标题
+        limit: 最多列出的故事数量
+
+    Returns:
+        Markdown 字符串
+    """
+    lines = [f"# {title}", "", f"共 {len(stories)} 个不同的故事上榜，以下按峰值分数列出前 {min(limit, len(stories))} 个。", ""]
+    for idx, story in enumerate(stories[:limit], start=1):
+        lines.append(f"{idx}. [{story['title']}]({story['url'] or '#'})")
+        details = [
+            f"峰值 {story['peak_score']} 分",
+            f"{story['descendants']} 条评论",
+            f"在榜 {story['hours_on_front_page']} 小时",
+            f"最高排名 #{story['best_rank']}",
+        ]
+        if story.get('category'):
+            details.append(f"分类: {story['category']}")
+        lines.append(f"   - {' · '.join(details)}")
+        if len(story['trajectory']) > 1:
+            trajectory = ' → '.join(f"{hour[-2:]}:00 {score}" for hour, score in story['trajectory'])
+            lines.append(f"   - 分数轨迹: {trajectory}")
+        if story.get('summary'):
+            lines.append(f"   - 摘要: {story['summary']}")
+        if story.get('duplicates'):
+            lines.append(f"   - 另有 {len(story['duplicates'])} 次重复提交")
+    return "\n".join(lines)
+
+
+def render_category_sections(stories: List[Dict], limit: int = 8) -> Dict[str, str]:
+    """
+    按分类渲染聚合后的故事列表，用于按分类订阅的日报（不经过 LLM）
+
+    Args:
+        stories: HNSnapshotStore.aggregate 的结果（按峰值分数排序）
+        limit: 每个分类最多列出的故事数量
+
+    Returns:
+        {分类: Markdown}，按 REPORT_SECTIONS 的顺序排列，没有故事的分类不出现
+    """
+    grouped: Dict[str, List[Dict]] = {}
+    for story in stories:
+        grouped.setdefault(story.get('category') or 'others', []).append(story)
+
+    titles = {category: title for category, title, _ in REPORT_SECTIONS}
+    ordered = [category for category, _, _ in REPORT_SECTIONS] + sorted(set(grouped) - set(titles))
+    sections = {}
+    for category in ordered:
+        members = grouped.get(category)
+        if not members:
+            continue
+        lines = [f"### {titles.get(category, category)}", ""]
+        for story in members[:limit]:
+            lines.append(f"- [{story['title']}]({story['url'] or '#'}) · "
+                         f"峰值 {story['peak_score']} 分 · {story['descendants']} 条评论")
+            if story.get('summary'):
+                lines.append(f"  - {story['summary']}")
+        sections[category] = "\n".join(lines)
+    return sections
@@ -0,0 +1,222 @@
+"""
+定时任务执行台账
+以 (任务名, 计划时间) 为键，把守护进程每次计划执行的状态保存在 SQLite 中。
+重启或系统休眠后据此找出错过的执行并补跑；同一计划时间只会成功执行一次。
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+RUN_RUNNING = 'running'
+RUN_SUCCEEDED = 'succeeded'
+RUN_FAILED = 'failed'
+# 错过后未补跑（被更新的执行覆盖或超出补跑上限）
+RUN_SKIPPED = 'skipped'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_runs (
+    job_name TEXT NOT NULL,
+    scheduled_for REAL NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    started_at REAL,
+    finished_at REAL,
+    PRIMARY KEY (job_name, scheduled_for)
+);
+CREATE INDEX IF NOT EXISTS idx_job_runs_status ON job_runs (job_name, status, scheduled_for);
+"""
+
+
+def _to_timestamp(value: datetime) -> float:
+    return value.timestamp()
+
+
+def _to_datetime(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+
+
+class JobRunLedger:
+    """
+    SQLite 持久化的任务执行台账
+
+    claim() 以一条带条件的 UPSERT 原子地占用某次计划执行：已成功的执行不会再次占用，
+    正在执行的只有超过 stale_after 秒（进程在执行中退出）后才能被重新占用。
+    """
+
+    def __init__(self, db_path: str = 'cache/jobs/ledger.db', stale_after: float = 6 * 3600,
+                 retention_days: int = 30):
+        """
+        初始化台账
+
+        Args:
+            db_path: SQLite 数据库路径，多进程共享时各进程必须使用同一个文件
+            stale_after: 执行中记录被视为遗留（可重新占用）的秒数
+            retention_days: 记录保留天数
+        """
+        self.db_path = db_path
+        self.stale_after = stale_after
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._db_lock = threading.Lock()
+        # 多进程模式下与租约共用同一数据库，同时写入时等待文件锁，而不是立即报 database is locked
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._execute("DELETE FROM job_runs WHERE scheduled_for < ?", (time.time() - retention_days * 86400,))
+
+    def _execute(self, sql: str, args: tuple = ()) -> List[tuple]:
+        with self._db_lock:
+            rows = self._conn.execute(sql, args).fetchall()
+            self._conn.commit()
+            return rows
+
+    def claim(self, job_name: str, scheduled_for: datetime, takeover: bool = False,
+              orphaned_before: Optional[float] = None) -> bool:
+        """
+        占用一次计划执行
+
+        Args:
+            job_name: 任务名
+            scheduled_for: 计划时间
+            takeover: 调用方已通过租约确认没有其他执行者时为 True，可直接接手执行中的记录
+            orphaned_before: 在该时间戳之前开始、仍为执行中的记录视为遗留（单进程调度器传入自己的启动时间）
+
+        Returns:
+            True 表示调用方应当执行；False 表示该次执行已成功或正由其他执行者处理
+        """
+        now = time.time()
+        stale_before = now if takeover else now - self.stale_after
+        if orphaned_before is not None:
+            stale_before = max(stale_before, orphaned_before)
+        with self._db_lock:
+            cursor = self._conn.execute(
+                "INSERT INTO job_runs (job_name, scheduled_for, status, attempts, started_at) VALUES (?, ?, ?, 1, ?) "
+                "ON CONFLICT (job_name, scheduled_for) DO UPDATE SET "
+                "status = excluded.status, attempts = attempts + 1, error = NULL, "
+                "started_at = excluded.started_at, finished_at = NULL "
+                "WHERE status NOT IN (?, ?) OR (status = ? AND started_at <= ?)",
+                (job_name, _to_timestamp(scheduled_for), RUN_RUNNING, now,
+                 RUN_SUCCEEDED, RUN_RUNNING, RUN_RUNNING, stale_before)
+            )
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def finish(self, job_name: str, scheduled_for: datetime, error: Optional[str] = None):
+        """记录执行结果，error 为 None 表示成功"""
+        self._execute(
+            "UPDATE job_runs SET status = ?, error = ?, finished_at = ? WHERE job_name = ? AND scheduled_for = ?",
+            (RUN_FAILED if error else RUN_SUCCEEDED, error, time.time(), job_name, _to_timestamp(scheduled_for))
+        )
+
+    def mark_skipped(self, job_name: str, scheduled_for: datetime, reason: str = ''):
+        """记录一次没有执行的计划时间（已有记录时不覆盖）"""
+        self._execute(
+            "INSERT OR IGNORE INTO job_runs (job_name, scheduled_for, status, error, finished_at) VALUES (?, ?, ?, ?, ?)",
+            (job_name, _to_timestamp(scheduled_for), RUN_SKIPPED, reason or None, time.time())
+        )
+
+    def last_success(self, job_name: str, include_skipped: bool = False) -> Optional[datetime]:
+        """
+        最近一次成功执行的计划时间
+
+        Args:
+            job_name: 任务名
+            include_skipped: 是否把已记录为跳过的计划时间也视为已处理
+
+        Returns:
+            带时区（UTC）的计划时间，没有记录时返回None
+        """
+        statuses = (RUN_SUCCEEDED, RUN_SKIPPED) if include_skipped else (RUN_SUCCEEDED,)
+        rows = self._execute(
+            f"SELECT MAX(scheduled_for) FROM job_runs WHERE job_name = ? AND status IN ({','.join('?' * len(statuses))})",
+            (job_name, *statuses)
+        )
+        return _to_datetime(rows[0][0]) if rows else None
+
+    def unfinished(self, job_name: str, since: Optional[datetime] = None, before: Optional[datetime] = None,
+                   max_attempts: Optional[int] = None, running_started_before: Optional[float] = None) -> List[datetime]:
+        """
+        需要重新执行的计划时间：失败的，以及执行中但已遗留的
+
+        Args:
+            job_name: 任务名
+            since: 只返回不早于该时间的计划时间
+            before: 只返回早于该时间的计划时间
+            max_attempts: 只返回尝试次数少于该值的记录
+            running_started_before: 在该时间戳之前开始的执行中记录视为遗留，None 表示不返回执行中的记录
+
+        Returns:
+            按计划时间升序排列的计划时间（UTC）
+        """
+        sql = "SELECT scheduled_for FROM job_runs WHERE job_name = ? AND (status = ?"
+        args = [job_name, RUN_FAILED]
+        if running_started_before is not None:
+            sql += " OR (status = ? AND started_at < ?)"
+            args += [RUN_RUNNING, running_started_before]
+        sql += ")"
+        if since is not None:
+            sql += " AND scheduled_for >= ?"
+            args.append(_to_timestamp(since))
+        if before is not None:
+            sql += " AND scheduled_for < ?"
+            args.append(_to_timestamp(before))
+        if max_attempts is not None:
+            sql += " AND attempts < ?"
+            args.append(max_attempts)
+        rows = self._execute(sql + " ORDER BY scheduled_for", tuple(args))
+        return [_to_datetime(row[0]) for row in rows]
+
+    def get(self, job_name: str, scheduled_for: datetime) -> Optional[Dict]:
+        """返回一次计划执行的记录，不存在返回None"""
+        rows = self._execute(
+            "SELECT status, attempts, error, started_at, finished_at FROM job_runs "
+            "WHERE job_name = ? AND scheduled_for = ?",
+            (job_name, _to_timestamp(scheduled_for))
+        )
+        if not rows:
+            return None
+        status, attempts, error, started_at, finished_at = rows[0]
+        return {
+            'job_name': job_name,
+            'scheduled_for': scheduled_for,
+            'status': status,
+            'attempts': attempts,
+            'error': error,
+            'started_at': started_at,
+            'finished_at': finished_at,
+        }
+
+    def history(self, job_name: str, limit: int = 50) -> List[Dict]:
+        """最近的执行记录，按计划时间倒序"""
+        rows = self._execute(
+            "SELECT scheduled_for, status, attempts, error, started_at, finished_at FROM job_runs "
+            "WHERE job_name = ? ORDER BY scheduled_for DESC LIMIT ?",
+            (job_name, limit)
+        )
+        return [{
+            'job_name': job_name,
+            'scheduled_for': _to_datetime(scheduled_for),
+            'status': status,
+            'attempts': attempts,
+            'error': error,
+            'started_at': started_at,
+            'finished_at': finished_at,
+        } for scheduled_for, status, attempts, error, started_at, finished_at in rows]
+
+    def close(self):
+        with self._db_lock:
+            self._conn.close()
@@ -0,0 +1,285 @@
+"""
+报告任务队列
+在后台线程池中运行报告生成任务，任务状态和输出保存在 SQLite 中。
+相同参数的任务在运行期间只执行一次，任意数量的查看者都可以从头回放并继续接收输出。
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+# 进程退出时仍未完成的任务
+STATUS_INTERRUPTED = 'interrupted'
+
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    job_key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (job_key, created_at);
+CREATE TABLE IF NOT EXISTS job_chunks (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    part INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+def make_job_key(kind: str, params: Dict) -> str:
+    """根据任务类型和参数生成去重键"""
+    payload = json.dumps({'kind': kind, 'params': params}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class _LiveJob:
+    """运行中任务的内存状态，供查看者等待新输出"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.chunks: List[Tuple[int, str]] = []
+        self.status = STATUS_QUEUED
+        self.error: Optional[str] = None
+        self.cond = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status not in ACTIVE_STATUSES
+
+
+class ReportJobQueue:
+    """
+    SQLite 持久化的报告任务队列
+
+    任务是一个无参可调用对象，返回字符串分块的可迭代对象；分块也可以是 (part, text) 元组，
+    用 part 区分同一任务中的多个段落（例如多个仓库的报告）。
+    """
+
+    def __init__(self, db_path: str = 'cache/jobs/jobs.db', max_workers: int = 2,
+                 flush_interval: float = 0.5, retention_days: int = 7):
+        """
+        初始化任务队列
+
+        Args:
+            db_path: SQLite 数据库路径
+            max_workers: 同时运行的任务数
+            flush_interval: 输出分块写入数据库的最小间隔（秒）
+            retention_days: 已结束任务的保留天数
+        """
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._recover(retention_days)
+
+        self._lock = threading.Lock()
+        self._live: Dict[str, _LiveJob] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-job')
+
+    def _execute(self, sql: str, args: tuple = ()) -> List[tuple]:
+        with self._db_lock:
+            rows = self._conn.execute(sql, args).fetchall()
+            self._conn.commit()
+            return rows
+
+    def _recover(self, retention_days: int):
+        """把上次进程遗留的未完成任务标记为中断，并清理过期任务"""
+        now = time.time()
+        self._execute(
+            f"UPDATE jobs SET status = ?, finished_at = ? WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+            (STATUS_INTERRUPTED, now, *ACTIVE_STATUSES)
+        )
+        cutoff = now - retention_days * 86400
+        self._execute("DELETE FROM job_chunks WHERE job_id IN (SELECT id FROM jobs WHERE created_at < ?)", (cutoff,))
+        self._execute("DELETE FROM jobs WHERE created_at < ?", (cutoff,))
+
+    def submit(self, kind: str, params: Dict, task: Callable[[], Iterable],
+               reuse_done_within: float = 0) -> str:
+        """
+        提交任务；已有相同参数的任务在排队或运行时直接返回其ID
+
+        Args:
+            kind: 任务类型，例如 "hacker_news_daily_report"
+            params: 任务参数，与 kind 一起决定去重键
+            task: 无参可调用对象，返回输出分块的可迭代对象
+            reuse_done_within: 大于0时，该时间（秒）内成功完成的相同任务也会被复用
+
+        Returns:
+            任务ID
+        """
+        job_key = make_job_key(kind, params)
+        with self._lock:
+            existing = self.find(kind, params, reuse_done_within)
+            if existing:
+                LOG.info(f"复用已有任务 {existing} ({kind})")
+                return existing
+
+            job_id = uuid.uuid4().hex
+            self._execute(
+                "INSERT INTO jobs (id, job_key, kind, params, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, job_key, kind, json.dumps(params, ensure_ascii=False, default=str), STATUS_QUEUED, time.time())
+            )
+            self._live[job_id] = _LiveJob(job_id)
+            self._executor.submit(self._run, job_id, task)
+            LOG.info(f"已提交任务 {job_id} ({kind})")
+            return job_id
+
+    def find(self, kind: str, params: Dict, reuse_done_within: float = 0) -> Optional[str]:
+        """
+        查找相同参数的进行中任务（以及可复用的近期已完成任务）
+
+        Returns:
+            任务ID，没有则返回None
+        """
+        job_key = make_job_key(kind, params)
+        statuses = list(ACTIVE_STATUSES)
+        if reuse_done_within > 0:
+            statuses.append(STATUS_DONE)
+        rows = self._execute(
+            f"SELECT id, status, finished_at FROM jobs WHERE job_key = ? AND status IN ({','.join('?' * len(statuses))}) "
+            "ORDER BY created_at DESC",
+            (job_key, *statuses)
+        )
+        now = time.time()
+        for job_id, status, finished_at in rows:
+            if status in ACTIVE_STATUSES or (finished_at and now - finished_at <= reuse_done_within):
+                return job_id
+        return None
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """返回任务信息（kind, params, status, error 及时间戳），不存在返回None"""
+        rows = self._execute(
+            "SELECT id, kind, params, status, error, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+            (job_id,)
+        )
+        if not rows:
+            return None
+        job_id, kind, params, status, error, created_at, started_at, finished_at = rows[0]
+        return {
+            'id': job_id,
+            'kind': kind,
+            'params': json.loads(params),
+            'status': status,
+            'error': error,
+            'created_at': created_at,
+            'started_at': started_at,
+            'finished_at': finished_at,
+        }
+
+    def _set_status(self, live: _LiveJob, status: str, error: Optional[str] = None):
+        column = 'started_at' if status == STATUS_RUNNING else 'finished_at'
+        self._execute(f"UPDATE jobs SET status = ?, error = ?, {column} = ? WHERE id = ?",
+                      (status, error, time.time(), live.job_id))
+        with live.cond:
+            live.status = status
+            live.error = error
+            live.cond.notify_all()
+
+    def _flush(self, job_id: str, chunks: List[Tuple[int, str]], start_seq: int):
+        if not chunks:
+            return
+        with self._db_lock:
+            self._conn.executemany(
+                "INSERT INTO job_chunks (job_id, seq, part, content) VALUES (?, ?, ?, ?)",
+                [(job_id, start_seq + i, part, text) for i, (part, text) in enumerate(chunks)]
+            )
+            self._conn.commit()
+
+    def _run(self, job_id: str, task: Callable[[], Iterable]):
+        live = self._live[job_id]
+        self._set_status(live, STATUS_RUNNING)
+        flushed = 0
+        last_flush = time.monotonic()
+        try:
+            for chunk in task():
+                part, text = chunk if isinstance(chunk, tuple) else (0, chunk)
+                with live.cond:
+                    live.chunks.append((part, str(text)))
+                    live.cond.notify_all()
+                # 按时间间隔批量写库，避免每个 LLM 分块都提交一次事务
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    pending = live.chunks[flushed:]
+                    self._flush(job_id, pending, flushed)
+                    flushed += len(pending)
+                    last_flush = time.monotonic()
+            self._flush(job_id, live.chunks[flushed:], flushed)
+            self._set_status(live, STATUS_DONE)
+            LOG.info(f"任务 {job_id} 已完成")
+        except Exception as e:
+            LOG.error(f"任务 {job_id} 执行失败: {e}")
+            self._flush(job_id, live.chunks[flushed:], flushed)
+            self._set_status(live, STATUS_FAILED, str(e))
+        finally:
+            # 输出已全部落库，之后的查看者直接从数据库回放
+            with self._lock:
+                self._live.pop(job_id, None)
+
+    def stream(self, job_id: str, timeout: Optional[float] = None) -> Iterator[Tuple[int, str]]:
+        """
+        从头回放任务输出，任务仍在运行时持续等待新的分块，直到任务结束
+
+        Args:
+            job_id: 任务ID
+            timeout: 等待新分块的最长时间（秒），None 表示一直等待
+
+        Yields:
+            (part, text) 元组
+        """
+        with self._lock:
+            live = self._live.get(job_id)
+
+        if live is None:
+            rows = self._execute("SELECT part, content FROM job_chunks WHERE job_id = ? ORDER BY seq", (job_id,))
+            yield from rows
+            return
+
+        index = 0
+        while True:
+            with live.cond:
+                if index >= len(live.chunks) and not live.finished:
+                    if not live.cond.wait_for(lambda: index < len(live.chunks) or live.finished, timeout):
+                        return
+                pending = live.chunks[index:]
+                finished = live.finished
+            yield from pending
+            index += len(pending)
+            if finished and index >= len(live.chunks):
+                return
+
+    def close(self):
+        """停止接受新任务并等待运行中的任务结束"""
+        self._executor.shutdown(wait=True)
+        with self._db_lock:
+            self._conn.close()
@@ -0,0 +1,356 @@
+"""
+多进程协调：基于租约的锁和工作项队列
+多个守护进程共享同一个 SQLite 文件：任务的每次执行由持有租约的进程完成，
+大的任务拆成工作项（例如每个仓库一份报告），由各进程分别领取。
+租约需要定期续期，进程在执行中退出后租约过期，其他进程即可接手。
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+ITEM_PENDING = 'pending'
+ITEM_LEASED = 'leased'
+ITEM_DONE = 'done'
+ITEM_FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS work_items (
+    batch TEXT NOT NULL,
+    item_key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    PRIMARY KEY (batch, item_key)
+);
+CREATE INDEX IF NOT EXISTS idx_work_items_status ON work_items (status, created_at);
+"""
+
+
+def default_owner() -> str:
+    """当前进程的标识：主机名:进程号:随机后缀"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class _Heartbeat:
+    """后台线程，每隔 interval 秒调用一次 renew；renew 返回 False 表示租约已丢失"""
+
+    def __init__(self, renew: Callable[[], bool], interval: float, name: str):
+        self._renew = renew
+        self._interval = interval
+        self._stop = threading.Event()
+        self.lost = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                if not self._renew():
+                    self.lost = True
+                    LOG.warning(f"租约续期失败，可能已被其他进程接手: {self._thread.name}")
+                    return
+            except Exception as e:
+                LOG.error(f"租约续期出错 ({self._thread.name}): {e}", exc_info=True)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=self._interval + 1)
+
+
+class Lease:
+    """持有中的租约，在后台自动续期；可用作上下文管理器，退出时释放"""
+
+    def __init__(self, store: 'LeaseStore', key: str, ttl: float):
+        self.store = store
+        self.key = key
+        self.ttl = ttl
+        self._heartbeat = _Heartbeat(lambda: store.renew(key, ttl), ttl / 3, f"lease:{key}")
+
+    @property
+    def lost(self) -> bool:
+        return self._heartbeat.lost
+
+    def release(self):
+        self._heartbeat.stop()
+        self.store.release(self.key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class LeaseStore:
+    """
+    SQLite 中的租约表
+
+    同一时刻每个键只有一个未过期的持有者；acquire 对过期或自己持有的租约直接覆盖。
+    """
+
+    def __init__(self, db_path: str = 'cache/jobs/cluster.db', owner: Optional[str] = None, ttl: float = 60.0):
+        """
+        初始化租约存储
+
+        Args:
+            db_path: SQLite 数据库路径，各进程必须使用同一个文件
+            owner: 当前进程的标识，默认由主机名和进程号生成
+            ttl: 默认租约时长（秒），续期间隔为其三分之一
+        """
+        self.db_path = db_path
+        self.owner = owner or default_owner()
+        self.ttl = ttl
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._db_lock = threading.Lock()
+        # 多个进程同时写入时等待文件锁，而不是立即报 database is locked
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def execute(self, sql: str, args: tuple = ()) -> List[tuple]:
+        """在自动提交模式下执行一条语句，单条语句即为一个原子操作"""
+        with self._db_lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def acquire(self, key: str, ttl: Optional[float] = None) -> bool:
+        """尝试获取租约，成功返回True"""
+        now = time.time()
+        rows = self.execute(
+            "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.expires_at < ? OR leases.owner = excluded.owner "
+            "RETURNING owner",
+            (key, self.owner, now + (ttl or self.ttl), now)
+        )
+        return bool(rows)
+
+    def renew(self, key: str, ttl: Optional[float] = None) -> bool:
+        """续期自己持有的租约；租约已被他人接手时返回False"""
+        rows = self.execute(
+            "UPDATE leases SET expires_at = ? WHERE key = ? AND owner = ? RETURNING key",
+            (time.time() + (ttl or self.ttl), key, self.owner)
+        )
+        return bool(rows)
+
+    def release(self, key: str):
+        self.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+    def holder(self, key: str) -> Optional[str]:
+        """当前未过期租约的持有者"""
+        rows = self.execute("SELECT owner FROM leases WHERE key = ? AND expires_at >= ?", (key, time.time()))
+        return rows[0][0] if rows else None
+
+    def lease(self, key: str, ttl: Optional[float] = None) -> Optional[Lease]:
+        """
+        获取租约并开始自动续期
+
+        Returns:
+            Lease，未能获取时返回None
+        """
+        ttl = ttl or self.ttl
+        if not self.acquire(key, ttl):
+            return None
+        return Lease(self, key, ttl)
+
+    def close(self):
+        with self._db_lock:
+            self._conn.close()
+
+
+class WorkItemQueue:
+    """
+    共享的工作项队列
+
+    工作项以 (batch, item_key) 为键，重复入队会被忽略；领取时同样带租约，
+    领取者退出后租约过期，工作项回到可领取状态，超过 max_attempts 次后记为失败。
+    """
+
+    def __init__(self, store: LeaseStore, max_attempts: int = 3):
+        self.store = store
+        self.max_attempts = max_attempts
+
+    def enqueue(self, batch: str, kind: str, items: Dict[str, Dict]) -> int:
+        """
+        添加一批工作项
+
+        Args:
+            batch: 批次标识，例如 "daily_reports@2025-06-13T00:00:00+00:00"
+            kind: 工作项类型，对应 process() 中的处理函数
+            items: {item_key: payload}
+
+        Returns:
+            新增的工作项数
+        """
+        now = time.time()
+        added = 0
+        for item_key, payload in items.items():
+            rows = self.store.execute(
+                "INSERT OR IGNORE INTO work_items (batch, item_key, kind, payload, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) RETURNING item_key",
+                (batch, item_key, kind, json.dumps(payload, ensure_ascii=False), ITEM_PENDING, now)
+            )
+            added += len(rows)
+        return added
+
+    def claim(self, kinds: Optional[Iterable[str]] = None, batch: Optional[str] = None) -> Optional[Dict]:
+        """
+        领取一个待处理（或租约已过期）的工作项
+
+        Args:
+            kinds: 只领取这些类型，None 表示不限
+            batch: 只领取该批次，None 表示不限
+
+        Returns:
+            {'batch', 'item_key', 'kind', 'payload', 'attempts'}，没有可领取的返回None
+        """
+        now = time.time()
+        self._expire(now)
+        conditions = ["(status = ? OR (status = ? AND lease_expires < ?))"]
+        args = [ITEM_PENDING, ITEM_LEASED, now]
+        if kinds is not None:
+            kinds = list(kinds)
+            conditions.append(f"kind IN ({','.join('?' * len(kinds))})")
+            args.extend(kinds)
+        if batch is not None:
+            conditions.append("batch = ?")
+            args.append(batch)
+        rows = self.store.execute(
+            "UPDATE work_items SET status = ?, owner = ?, lease_expires = ?, attempts = attempts + 1 "
+            "WHERE rowid = (SELECT rowid FROM work_items WHERE " + " AND ".join(conditions) +
+            " ORDER BY created_at, item_key LIMIT 1) "
+            "RETURNING batch, item_key, kind, payload, attempts",
+            (ITEM_LEASED, self.store.owner, now + self.store.ttl, *args)
+        )
+        if not rows:
+            return None
+        batch, item_key, kind, payload, attempts = rows[0]
+        return {'batch': batch, 'item_key': item_key, 'kind': kind,
+                'payload': json.loads(payload), 'attempts': attempts}
+
+    def _expire(self, now: float):
+        """租约过期且已用完重试次数的工作项记为失败"""
+        self.store.execute(
+            "UPDATE work_items SET status = ?, error = COALESCE(error, ?), owner = NULL, finished_at = ? "
+            "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+            (ITEM_FAILED, 'lease expired', now, ITEM_LEASED, now, self.max_attempts)
+        )
+
+    def renew(self, item: Dict) -> bool:
+        rows = self.store.execute(
+            "UPDATE work_items SET lease_expires = ? WHERE batch = ? AND item_key = ? AND owner = ? AND status = ? "
+            "RETURNING item_key",
+            (time.time() + self.store.ttl, item['batch'], item['item_key'], self.store.owner, ITEM_LEASED)
+        )
+        return bool(rows)
+
+    def complete(self, item: Dict, result: str):
+        self.store.execute(
+            "UPDATE work_items SET status = ?, result = ?, error = NULL, finished_at = ? "
+            "WHERE batch = ? AND item_key = ? AND owner = ?",
+            (ITEM_DONE, result, time.time(), item['batch'], item['item_key'], self.store.owner)
+        )
+
+    def fail(self, item: Dict, error: str):
+        """记录失败；未达到 max_attempts 时回到待处理状态"""
+        self.store.execute(
+            "UPDATE work_items SET status = CASE WHEN attempts < ? THEN ? ELSE ? END, error = ?, "
+            "owner = NULL, lease_expires = NULL, finished_at = ? WHERE batch = ? AND item_key = ? AND owner = ?",
+            (self.max_attempts, ITEM_PENDING, ITEM_FAILED, error, time.time(),
+             item['batch'], item['item_key'], self.store.owner)
+        )
+
+    def process(self, handlers: Dict[str, Callable[[Dict], str]], batch: Optional[str] = None,
+                max_items: Optional[int] = None) -> int:
+        """
+        循环领取并处理工作项，直到没有可领取的工作项
+
+        处理期间在后台续期工作项租约。
+
+        Args:
+            handlers: {kind: 处理函数}，处理函数接收 payload 并返回结果字符串
+            batch: 只处理该批次
+            max_items: 最多处理的工作项数
+
+        Returns:
+            处理的工作项数
+        """
+        processed = 0
+        while max_items is None or processed < max_items:
+            item = self.claim(kinds=handlers.keys(), batch=batch)
+            if item is None:
+                break
+            heartbeat = _Heartbeat(lambda: self.renew(item), self.store.ttl / 3, f"work:{item['item_key']}")
+            try:
+                result = handlers[item['kind']](item['payload'])
+                self.complete(item, result if isinstance(result, str) else json.dumps(result, ensure_ascii=False))
+            except Exception as e:
+                LOG.error(f"处理工作项 {item['batch']}/{item['item_key']} 失败: {e}", exc_info=True)
+                self.fail(item, f"{type(e).__name__}: {e}")
+            finally:
+                heartbeat.stop()
+            processed += 1
+        return processed
+
+    def status(self, batch: str) -> Dict[str, int]:
+        """批次中各状态的工作项数"""
+        self._expire(time.time())
+        rows = self.store.execute("SELECT status, COUNT(*) FROM work_items WHERE batch = ? GROUP BY status", (batch,))
+        return dict(rows)
+
+    def results(self, batch: str) -> Dict[str, Dict]:
+        """批次中所有工作项的 {item_key: {'status', 'result', 'error'}}"""
+        rows = self.store.execute(
+            "SELECT item_key, status, result, error FROM work_items WHERE batch = ? ORDER BY created_at, item_key",
+            (batch,)
+        )
+        return {item_key: {'status': status, 'result': result, 'error': error}
+                for item_key, status, result, error in rows}
+
+    def run_batch(self, batch: str, handlers: Dict[str, Callable[[Dict], str]],
+                  poll_interval: float = 2.0, timeout: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        处理一个批次，直到其中所有工作项都已完成或失败
+
+        当前进程领取不到时，等待其他进程手中的工作项完成（或租约过期后接手）。
+
+        Returns:
+            results(batch)
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            self.process(handlers, batch=batch)
+            counts = self.status(batch)
+            if not counts.get(ITEM_PENDING) and not counts.get(ITEM_LEASED):
+                return self.results(batch)
+            if deadline is not None and time.time() >= deadline:
+                LOG.warning(f"批次 {batch} 等待超时，仍有 {counts.get(ITEM_LEASED, 0)} 个工作项在其他进程中处理")
+                return self.results(batch)
+            time.sleep(poll_interval)
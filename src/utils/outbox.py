@@ -0,0 +1,318 @@
+"""
+通知发件箱
+报告任务只把待发送的通知写入 SQLite 队列，由后台发送器异步投递。
+投递失败按指数退避重试，超过次数或遇到永久性错误的通知进入死信，可以人工重新入队。
+"""
+
+import os
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+OUTBOX_PENDING = 'pending'
+OUTBOX_SENDING = 'sending'
+OUTBOX_SENT = 'sent'
+# 重试次数用尽或遇到永久性错误
+OUTBOX_DEAD = 'dead'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    dedup_key TEXT UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+class PermanentDeliveryError(Exception):
+    """重试也不会成功的投递错误（如认证失败、地址无效），通知直接进入死信"""
+
+
+class NotificationOutbox:
+    """
+    SQLite 持久化的通知队列
+
+    进程在投递中途退出时，状态为 sending 且超过 sending_timeout 秒的通知会重新变为可投递。
+    dedup_key 相同的通知只入队一次，重跑的任务不会重复发送同一份报告。
+    """
+
+    def __init__(self, db_path: str = 'cache/outbox/outbox.db', max_attempts: int = 6,
+                 base_delay: float = 30.0, max_delay: float = 3600.0, sending_timeout: float = 600.0,
+                 retention_days: int = 30):
+        """
+        初始化发件箱
+
+        Args:
+            db_path: SQLite 数据库路径
+            max_attempts: 最多投递次数，用尽后进入死信
+            base_delay: 首次重试前的等待（秒），之后每次加倍
+            max_delay: 重试等待的上限（秒）
+            sending_timeout: 投递中的通知被视为遗留的秒数
+            retention_days: 已发送通知的保留天数
+        """
+        self.db_path = db_path
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sending_timeout = sending_timeout
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._listeners: List[Callable[[], None]] = []
+        self._execute("DELETE FROM outbox WHERE status = ? AND finished_at < ?",
+                      (OUTBOX_SENT, time.time() - retention_days * 86400))
+
+    def _execute(self, sql: str, args: tuple = ()) -> List[tuple]:
+        with self._db_lock:
+            rows = self._conn.execute(sql, args).fetchall()
+            self._conn.commit()
+            return rows
+
+    def add_listener(self, callback: Callable[[], None]):
+        """注册入队回调（在入队的线程中调用），用于唤醒发送器"""
+        self._listeners.append(callback)
+
+    def enqueue(self, channel: str, payload: Dict[str, Any], dedup_key: Optional[str] = None) -> Optional[int]:
+        """
+        加入一条待发送的通知
+
+        Args:
+            channel: 投递渠道名，如 'email'、'slack'
+            payload: 渠道处理函数的参数，必须可以 JSON 序列化
+            dedup_key: 去重键，已存在时不再入队
+
+        Returns:
+            通知 id；因去重未入队时返回None
+        """
+        now = time.time()
+        rows = self._execute(
+            "INSERT OR IGNORE INTO outbox (channel, dedup_key, payload, status, next_attempt_at, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) RETURNING id",
+            (channel, dedup_key, json.dumps(payload, ensure_ascii=False), OUTBOX_PENDING, now, now)
+        )
+        if not rows:
+            LOG.info(f"通知已在发件箱中，跳过重复入队: {dedup_key}")
+            return None
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                LOG.warning(f"发件箱入队回调出错: {e}")
+        return rows[0][0]
+
+    def claim_due(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """领取到期的通知并标记为投递中"""
+        now = time.time()
+        rows = self._execute(
+            "UPDATE outbox SET status = ?, attempts = attempts + 1, next_attempt_at = ? "
+            "WHERE id IN (SELECT id FROM outbox WHERE (status = ? AND next_attempt_at <= ?) "
+            "OR (status = ? AND next_attempt_at <= ?) ORDER BY next_attempt_at, id LIMIT ?) "
+            "RETURNING id, channel, payload, attempts",
+            (OUTBOX_SENDING, now + self.sending_timeout, OUTBOX_PENDING, now, OUTBOX_SENDING, now, limit)
+        )
+        return [{'id': item_id, 'channel': channel, 'payload': json.loads(payload), 'attempts': attempts}
+                for item_id, channel, payload, attempts in sorted(rows)]
+
+    def mark_sent(self, item_id: int):
+        self._execute("UPDATE outbox SET status = ?, last_error = NULL, finished_at = ? WHERE id = ?",
+                      (OUTBOX_SENT, time.time(), item_id))
+
+    def mark_failed(self, item_id: int, error: str, permanent: bool = False,
+                    payload: Optional[Dict[str, Any]] = None) -> str:
+        """
+        记录一次投递失败
+
+        Args:
+            item_id: 通知ID
+            error: 错误信息
+            permanent: 是否为永久性错误（直接进入死信）
+            payload: 替换后的通知内容（如只保留未送达的收件人），None 表示不变
+
+        Returns:
+            新状态：OUTBOX_PENDING（稍后重试）或 OUTBOX_DEAD
+        """
+        if payload is not None:
+            self._execute("UPDATE outbox SET payload = ? WHERE id = ?",
+                          (json.dumps(payload, ensure_ascii=False), item_id))
+        rows = self._execute("SELECT attempts FROM outbox WHERE id = ?", (item_id,))
+        attempts = rows[0][0] if rows else self.max_attempts
+        now = time.time()
+        if permanent or attempts >= self.max_attempts:
+            self._execute("UPDATE outbox SET status = ?, last_error = ?, finished_at = ? WHERE id = ?",
+                          (OUTBOX_DEAD, error, now, item_id))
+            return OUTBOX_DEAD
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        # 加入少量抖动，避免大量通知在同一时刻重试
+        delay *= random.uniform(0.8, 1.2)
+        self._execute("UPDATE outbox SET status = ?, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                      (OUTBOX_PENDING, error, now + delay, item_id))
+        return OUTBOX_PENDING
+
+    def next_due_in(self) -> Optional[float]:
+        """距离下一条通知可以投递的秒数，没有待投递的通知时返回None"""
+        rows = self._execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status IN (?, ?)",
+                             (OUTBOX_PENDING, OUTBOX_SENDING))
+        if not rows or rows[0][0] is None:
+            return None
+        return max(0.0, rows[0][0] - time.time())
+
+    def dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """最近进入死信的通知"""
+        rows = self._execute(
+            "SELECT id, channel, dedup_key, payload, attempts, last_error, finished_at FROM outbox "
+            "WHERE status = ? ORDER BY finished_at DESC LIMIT ?", (OUTBOX_DEAD, limit))
+        return [{'id': item_id, 'channel': channel, 'dedup_key': dedup_key, 'payload': json.loads(payload),
+                 'attempts': attempts, 'error': error, 'finished_at': finished_at}
+                for item_id, channel, dedup_key, payload, attempts, error, finished_at in rows]
+
+    def requeue(self, item_id: int) -> bool:
+        """把一条死信重新放回队列（重置投递次数）"""
+        rows = self._execute(
+            "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ?, finished_at = NULL "
+            "WHERE id = ? AND status = ? RETURNING id", (OUTBOX_PENDING, time.time(), item_id, OUTBOX_DEAD))
+        return bool(rows)
+
+    def get(self, item_id: int) -> Optional[Dict[str, Any]]:
+        rows = self._execute("SELECT channel, payload, status, attempts, last_error FROM outbox WHERE id = ?",
+                             (item_id,))
+        if not rows:
+            return None
+        channel, payload, status, attempts, error = rows[0]
+        return {'id': item_id, 'channel': channel, 'payload': json.loads(payload), 'status': status,
+                'attempts': attempts, 'error': error}
+
+    def counts(self) -> Dict[str, int]:
+        """各状态的通知数量"""
+        return dict(self._execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"))
+
+    def close(self):
+        with self._db_lock:
+            self._conn.close()
+
+
+class OutboxSender:
+    """
+    在事件循环中持续投递发件箱中的通知
+
+    渠道处理函数是同步的（SMTP、HTTP 请求），在线程中执行；抛出 PermanentDeliveryError 表示不再重试。
+    处理函数可以在抛出异常前修改 payload（如去掉已送达的收件人），修改后的内容会保存下来供重试使用。
+    """
+
+    def __init__(self, outbox: NotificationOutbox, channels: Dict[str, Callable[[Dict[str, Any]], Any]],
+                 max_parallel: int = 2, poll_interval: float = 30.0, batch_size: int = 10):
+        """
+        初始化发送器
+
+        Args:
+            outbox: 发件箱
+            channels: {渠道名: 处理函数}
+            max_parallel: 同时进行的投递数
+            poll_interval: 没有入队通知时检查到期重试的最长间隔（秒）
+            batch_size: 每次领取的通知数
+        """
+        self.outbox = outbox
+        self.channels = channels
+        self.max_parallel = max(1, int(max_parallel))
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        outbox.add_listener(self.wake)
+
+    def wake(self):
+        """有新通知入队时调用，可以在任意线程中调用"""
+        if self._loop is not None and self._wakeup is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    def _deliver(self, item: Dict[str, Any]) -> bool:
+        handler = self.channels.get(item['channel'])
+        if handler is None:
+            self.outbox.mark_failed(item['id'], f"未知的投递渠道: {item['channel']}", permanent=True)
+            return False
+        original = json.dumps(item['payload'], sort_keys=True)
+        try:
+            handler(item['payload'])
+        except Exception as e:
+            changed = json.dumps(item['payload'], sort_keys=True) != original
+            payload = item['payload'] if changed else None
+            if isinstance(e, PermanentDeliveryError):
+                LOG.error(f"通知 {item['id']}（{item['channel']}）投递失败，不再重试: {e}")
+                self.outbox.mark_failed(item['id'], str(e), permanent=True, payload=payload)
+                return False
+            status = self.outbox.mark_failed(item['id'], f"{type(e).__name__}: {e}", payload=payload)
+            if status == OUTBOX_DEAD:
+                LOG.error(f"通知 {item['id']}（{item['channel']}）第 {item['attempts']} 次投递失败，已转入死信: {e}")
+            else:
+                LOG.warning(f"通知 {item['id']}（{item['channel']}）第 {item['attempts']} 次投递失败，稍后重试: {e}")
+            return False
+        self.outbox.mark_sent(item['id'])
+        LOG.info(f"通知 {item['id']}（{item['channel']}）投递成功")
+        return True
+
+    async def drain(self) -> int:
+        """投递当前所有到期的通知，返回成功数"""
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def deliver(item):
+            async with semaphore:
+                return await asyncio.to_thread(self._deliver, item)
+
+        delivered = 0
+        while True:
+            items = await asyncio.to_thread(self.outbox.claim_due, self.batch_size)
+            if not items:
+                return delivered
+            results = await asyncio.gather(*(deliver(item) for item in items))
+            delivered += sum(results)
+
+    async def run(self, stop_event: asyncio.Event):
+        """持续投递，直到 stop_event 被设置；正在进行的投递会先完成"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while not stop_event.is_set():
+                self._wakeup.clear()
+                try:
+                    await self.drain()
+                except Exception as e:
+                    LOG.error(f"投递发件箱通知时出错: {e}", exc_info=True)
+                next_due = await asyncio.to_thread(self.outbox.next_due_in)
+                timeout = self.poll_interval if next_due is None else min(self.poll_interval, next_due)
+                stop_wait = asyncio.ensure_future(stop_event.wait())
+                wake_wait = asyncio.ensure_future(self._wakeup.wait())
+                try:
+                    await asyncio.wait({stop_wait, wake_wait}, timeout=timeout,
+                                       return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    stop_wait.cancel()
+                    wake_wait.cancel()
+        finally:
+            self._wakeup = None
+            self._loop = None
@@ -0,0 +1,90 @@
+"""
+有序预取流水线
+在后台线程中提前运行后续若干个生成器，同时按原顺序把各自的输出流式交给调用方
+"""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Generator, Iterable, Iterator, List
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+_DONE = object()
+
+
+class _Failure:
+    """在队列中传递生产端异常"""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def _drain(factory: Callable[[], Iterable], out: queue.Queue, stop: threading.Event):
+    """在工作线程中运行生成器，把每个分块放入队列"""
+    try:
+        for chunk in factory():
+            if stop.is_set():
+                return
+            out.put(chunk)
+    except BaseException as e:
+        out.put(_Failure(e))
+    finally:
+        out.put(_DONE)
+
+
+def _replay(out: queue.Queue) -> Generator:
+    """从队列中按顺序取出某个生成器的输出"""
+    while True:
+        chunk = out.get()
+        if chunk is _DONE:
+            return
+        if isinstance(chunk, _Failure):
+            raise chunk.exc
+        yield chunk
+
+
+def ordered_prefetch(factories: List[Callable[[], Iterable]], lookahead: int = 4) -> Iterator[Generator]:
+    """
+    并行运行一组生成器，并按原顺序逐个返回它们的输出流
+
+    当前正在消费的生成器及其后 lookahead 个生成器同时在后台线程中运行；
+    当前项的分块一产生就能被消费，后续项的分块先缓存在各自的队列里。
+    调用方提前结束迭代时，尚未开始的任务不会再启动，运行中的任务在下一个分块处停止。
+
+    Args:
+        factories: 无参可调用对象列表，每个返回一个可迭代对象（通常是生成器）
+        lookahead: 预取的后续项数量，0 表示完全串行
+
+    Yields:
+        与 factories 一一对应的生成器
+    """
+    if not factories:
+        return
+
+    window = max(0, lookahead) + 1
+    stop = threading.Event()
+    queues = [queue.Queue() for _ in factories]
+    executor = ThreadPoolExecutor(max_workers=min(window, len(factories)), thread_name_prefix='prefetch')
+    submitted = 0
+
+    def submit_until(limit):
+        nonlocal submitted
+        while submitted < min(limit, len(factories)):
+            executor.submit(_drain, factories[submitted], queues[submitted], stop)
+            submitted += 1
+
+    try:
+        submit_until(window)
+        for index in range(len(factories)):
+            yield _replay(queues[index])
+            # 当前项的输出已被完整读取（或调用方放弃读取），再补充一个预取任务
+            submit_until(index + 1 + window)
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,278 @@
+"""
+报告全文检索
+把 hacker_news/、daily_progress/ 和 reports/ 下生成的 Markdown 增量写入 SQLite FTS5 索引，
+导出和保存报告时即时更新，查询按 BM25 排序并返回高亮片段
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+DEFAULT_INDEX_PATH = 'cache/search/reports.db'
+DEFAULT_ROOTS = ('hacker_news', 'daily_progress', 'reports')
+
+# 路径第一段到来源的映射，用于按来源过滤
+SOURCES = {
+    'hacker_news': 'hacker_news',
+    'daily_progress': 'github',
+    'reports': 'report',
+}
+
+# trigram 分词同时支持中文和英文的子串匹配，但查询词至少需要3个字符
+_MIN_FTS_TERM_LENGTH = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    title TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_source ON documents (source, mtime);
+CREATE INDEX IF NOT EXISTS idx_documents_mtime ON documents (mtime);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(title, body, tokenize = 'trigram');
+"""
+
+_TITLE_RE = re.compile(r'^#\s+(.+)$', re.MULTILINE)
+
+
+def _source_for(path: str) -> str:
+    parts = os.path.normpath(path).split(os.sep)
+    for part in parts:
+        if part in SOURCES:
+            return SOURCES[part]
+    return 'other'
+
+
+def _fts_query(terms: List[str]) -> str:
+    """把查询词转换为 FTS5 短语查询，避免用户输入被当作查询语法"""
+    return ' AND '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+class ReportSearchIndex:
+    """SQLite FTS5 报告索引"""
+
+    def __init__(self, db_path: str = DEFAULT_INDEX_PATH, roots: Iterable[str] = DEFAULT_ROOTS):
+        """
+        初始化索引
+
+        Args:
+            db_path: SQLite 数据库路径
+            roots: sync 时扫描的目录
+        """
+        self.db_path = db_path
+        self.roots = tuple(roots)
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def _key(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path))
+
+    def index_file(self, path: str, force: bool = False) -> bool:
+        """
+        索引单个 Markdown 文件，文件未变化（mtime 和大小相同）时跳过
+
+        Args:
+            path: 文件路径
+            force: 是否忽略变化检查强制重建
+
+        Returns:
+            是否写入了索引
+        """
+        key = self._key(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.remove(path)
+            return False
+
+        with self._lock:
+            row = self._conn.execute("SELECT id, mtime, size FROM documents WHERE path = ?", (key,)).fetchone()
+            if row and not force and row[1] == stat.st_mtime and row[2] == stat.st_size:
+                return False
+
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    body = f.read()
+            except (OSError, UnicodeDecodeError) as e:
+                LOG.warning(f"读取待索引文件 {path} 失败: {e}")
+                return False
+
+            match = _TITLE_RE.search(body)
+            title = match.group(1).strip() if match else os.path.basename(path)
+            if row:
+                doc_id = row[0]
+                self._conn.execute("UPDATE documents SET title = ?, mtime = ?, size = ? WHERE id = ?",
+                                   (title, stat.st_mtime, stat.st_size, doc_id))
+                self._conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+            else:
+                doc_id = self._conn.execute(
+                    "INSERT INTO documents (path, source, title, mtime, size) VALUES (?, ?, ?, ?, ?)",
+                    (key, _source_for(key), title, stat.st_mtime, stat.st_size)
+                ).lastrowid
+            self._conn.execute("INSERT INTO documents_fts (rowid, title, body) VALUES (?, ?, ?)",
+                               (doc_id, title, body))
+            self._conn.commit()
+        return True
+
+    def remove(self, path: str):
+        """从索引中删除文件"""
+        key = self._key(path)
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM documents WHERE path = ?", (key,)).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (row[0],))
+                self._conn.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+                self._conn.commit()
+
+    def sync(self) -> Dict[str, int]:
+        """
+        增量同步：扫描 roots 下的 Markdown 文件，索引新增和变化的文件，删除已不存在的文件
+
+        Returns:
+            {'indexed': 新写入数量, 'removed': 删除数量, 'total': 当前文档总数}
+        """
+        seen = set()
+        indexed = 0
+        for root in self.roots:
+            for dir_path, _, file_names in os.walk(root):
+                for name in file_names:
+                    if name.endswith('.md'):
+                        path = os.path.join(dir_path, name)
+                        seen.add(self._key(path))
+                        if self.index_file(path):
+                            indexed += 1
+
+        with self._lock:
+            stale = [(doc_id, path) for doc_id, path in self._conn.execute("SELECT id, path FROM documents")
+                     if path not in seen]
+        for _, path in stale:
+            self.remove(path)
+        total = self.count()
+        LOG.info(f"报告索引同步完成: 新增/更新 {indexed}，删除 {len(stale)}，共 {total} 篇")
+        return {'indexed': indexed, 'removed': len(stale), 'total': total}
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def search(self, query: str, limit: int = 20, source: Optional[str] = None,
+               since: Optional[float] = None) -> List[Dict]:
+        """
+        全文检索
+
+        多个词之间为 AND 关系；不足3个字符的词（例如两个汉字）无法使用 trigram 索引，
+        改为在 FTS 结果或全部文档上做子串过滤。
+
+        Args:
+            query: 查询字符串
+            limit: 返回结果数量上限
+            source: 只搜索某个来源（hacker_news / github / report）
+            since: 只搜索该时间戳之后修改的文档
+
+        Returns:
+            结果列表，每项包含 path、source、title、mtime、snippet 和 score（越小越相关）
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        fts_terms = [term for term in terms if len(term) >= _MIN_FTS_TERM_LENGTH]
+        short_terms = [term for term in terms if len(term) < _MIN_FTS_TERM_LENGTH]
+
+        conditions, args = [], []
+        if fts_terms:
+            conditions.append("documents_fts MATCH ?")
+            args.append(_fts_query(fts_terms))
+        for term in short_terms:
+            conditions.append("documents_fts.body LIKE ? ESCAPE '\\'")
+            args.append('%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+        if source:
+            conditions.append("documents.source = ?")
+            args.append(source)
+        if since is not None:
+            conditions.append("documents.mtime >= ?")
+            args.append(since)
+
+        # 先排序取前 limit 条，再只为这些结果生成高亮片段；
+        # snippet() 写在排序查询里会对所有匹配行都计算一遍
+        if fts_terms:
+            score_column, order = "bm25(documents_fts, 5.0, 1.0)", "ORDER BY 6"
+            join = "documents_fts JOIN documents ON documents.id = documents_fts.rowid"
+        else:
+            # 只有短词时无法使用索引，按修改时间从新到旧逐篇检查，凑够 limit 条即停止
+            score_column, order = "0", "ORDER BY documents.mtime DESC"
+            join = "documents CROSS JOIN documents_fts ON documents_fts.rowid = documents.id"
+        sql = (f"SELECT documents.id, documents.path, documents.source, documents.title, documents.mtime, {score_column} "
+               f"FROM {join} WHERE {' AND '.join(conditions)} {order} LIMIT ?")
+
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, (*args, limit)).fetchall()
+                doc_ids = [row[0] for row in rows]
+                placeholders = ','.join('?' * len(doc_ids))
+                if fts_terms:
+                    snippet_sql = (f"SELECT rowid, snippet(documents_fts, 1, '**', '**', '…', 16) FROM documents_fts "
+                                   f"WHERE documents_fts MATCH ? AND rowid IN ({placeholders})")
+                    snippet_args = (_fts_query(fts_terms), *doc_ids)
+                else:
+                    snippet_sql = (f"SELECT rowid, substr(body, max(instr(body, ?) - 60, 1), 160) FROM documents_fts "
+                                   f"WHERE rowid IN ({placeholders})")
+                    snippet_args = (short_terms[0], *doc_ids)
+                snippets = dict(self._conn.execute(snippet_sql, snippet_args).fetchall()) if doc_ids else {}
+            except sqlite3.OperationalError as e:
+                LOG.warning(f"报告检索失败 ({query}): {e}")
+                return []
+
+        return [{
+            'path': path,
+            'source': doc_source,
+            'title': title,
+            'mtime': mtime,
+            'modified': datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M'),
+            'score': score,
+            'snippet': snippets.get(doc_id, ''),
+        } for doc_id, path, doc_source, title, mtime, score in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_search_index() -> ReportSearchIndex:
+    """返回进程内共享的默认索引"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = ReportSearchIndex()
+        return _default_index
+
+
+def index_report_file(path: Optional[str]):
+    """导出或保存报告后调用，更新默认索引；失败只记录日志，不影响调用方"""
+    if not path:
+        return
+    try:
+        get_search_index().index_file(path)
+    except Exception as e:
+        LOG.warning(f"更新报告索引失败 ({path}): {e}")
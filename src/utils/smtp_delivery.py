@@ -0,0 +1,322 @@
+"""
+SMTP 投递引擎
+复用已登录的 SMTP 会话连续发送多封邮件，避免每封邮件都重新建立 TLS 连接和登录。
+空闲较久的会话在使用前用 NOOP 检查，收件人较多时分批投递，临时性错误按指数退避重试；
+部分批次失败时报告未送达的收件人，调用方只需重发这些收件人。
+"""
+
+import time
+import smtplib
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+SECURITY_SSL = 'ssl'
+SECURITY_STARTTLS = 'starttls'
+# 不加密，只用于本地测试服务器或内网中继
+SECURITY_PLAIN = 'plain'
+
+
+class SmtpDeliveryError(Exception):
+    """投递失败（重试后仍失败或遇到永久性错误）"""
+
+    def __init__(self, message: str, transient: bool = False):
+        super().__init__(message)
+        self.transient = transient
+
+
+class PartialDeliveryError(SmtpDeliveryError):
+    """分批投递时部分批次失败；其余批次已经送达，重试时只需发送给 pending 中的收件人"""
+
+    def __init__(self, message: str, pending: List[str], delivered: List[str],
+                 refused: Dict[str, Tuple[int, bytes]], transient: bool = False):
+        super().__init__(message, transient=transient)
+        self.pending = pending
+        self.delivered = delivered
+        self.refused = refused
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    判断 SMTP 错误是否值得重试
+
+    连接断开、超时和 4xx 响应是临时性的；认证失败和其他 5xx 响应重试也不会成功。
+    """
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(400 <= code < 500 for code in codes)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    # socket.timeout、ConnectionError、DNS 解析失败等
+    return isinstance(error, OSError)
+
+
+class _Session:
+    """一个已连接（并已登录）的 SMTP 会话"""
+
+    def __init__(self, server):
+        self.server = server
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.messages_sent = 0
+
+    def close(self):
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+
+
+class SmtpDeliveryEngine:
+    """
+    带连接复用的 SMTP 发送器
+
+    最多保持 max_connections 个会话，发送时借出一个空闲会话，发送完归还；
+    会话发送 max_messages_per_connection 封邮件或空闲超过 idle_timeout 秒后重新建立。
+    线程安全，可以在多个线程中同时调用 send()。
+    """
+
+    def __init__(self, email_settings: dict, timeout: float = 10, max_connections: int = 2,
+                 keepalive_interval: float = 30, idle_timeout: float = 240,
+                 max_messages_per_connection: int = 100, max_recipients_per_message: int = 50,
+                 retries: int = 2, retry_backoff: float = 1.0, sleep: Callable[[float], None] = time.sleep):
+        """
+        初始化投递引擎
+
+        Args:
+            email_settings: 邮件配置，使用 smtp_server、smtp_port、from、password，可选 smtp_security
+            timeout: 连接和单条命令的超时（秒）
+            max_connections: 同时保持的会话数上限
+            keepalive_interval: 会话空闲超过该秒数后，使用前先发送 NOOP 确认仍然可用
+            idle_timeout: 会话空闲超过该秒数后直接关闭重建（大多数服务器会主动断开空闲连接）
+            max_messages_per_connection: 单个会话最多发送的邮件数
+            max_recipients_per_message: 单次投递的收件人上限，超过时分批投递
+            retries: 临时性错误的重试次数
+            retry_backoff: 首次重试前的等待（秒），之后每次加倍
+            sleep: 等待函数，便于测试替换
+        """
+        self.email_settings = email_settings or {}
+        self.timeout = timeout
+        self.max_connections = max(1, int(max_connections))
+        self.keepalive_interval = keepalive_interval
+        self.idle_timeout = idle_timeout
+        self.max_messages_per_connection = max(1, int(max_messages_per_connection))
+        self.max_recipients_per_message = max(1, int(max_recipients_per_message))
+        self.retries = max(0, int(retries))
+        self.retry_backoff = retry_backoff
+        self._sleep = sleep
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._idle: List[_Session] = []
+        self._closed = False
+        # 统计信息：建立的连接数、登录次数、投递次数
+        self.stats = {'connections': 0, 'logins': 0, 'deliveries': 0, 'retries': 0}
+
+    @property
+    def security(self) -> str:
+        security = self.email_settings.get('smtp_security')
+        if security:
+            return security
+        # 与原有行为一致：587 使用 STARTTLS，其余端口使用 SSL
+        return SECURITY_STARTTLS if int(self.email_settings.get('smtp_port', 465)) == 587 else SECURITY_SSL
+
+    def _connect(self) -> _Session:
+        host = self.email_settings['smtp_server']
+        port = int(self.email_settings['smtp_port'])
+        security = self.security
+        LOG.info(f"建立 SMTP 连接 {host}:{port} ({security})")
+        if security == SECURITY_SSL:
+            server = smtplib.SMTP_SSL(host, port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(host, port, timeout=self.timeout)
+            if security == SECURITY_STARTTLS:
+                server.ehlo()
+                server.starttls()
+                server.ehlo()
+        session = _Session(server)
+        try:
+            password = self.email_settings.get('password', '')
+            if password:
+                server.login(self.email_settings['from'], password)
+                self.stats['logins'] += 1
+        except Exception:
+            session.close()
+            raise
+        self.stats['connections'] += 1
+        return session
+
+    def _usable(self, session: _Session) -> bool:
+        """检查借出的空闲会话是否还能使用"""
+        idle = time.monotonic() - session.last_used
+        if idle >= self.idle_timeout or session.messages_sent >= self.max_messages_per_connection:
+            return False
+        if idle < self.keepalive_interval:
+            return True
+        try:
+            code, _ = session.server.noop()
+        except Exception as e:
+            LOG.debug(f"SMTP 会话 NOOP 检查失败，将重新连接: {e}")
+            return False
+        return code == 250
+
+    def _checkout(self) -> _Session:
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    if self._closed:
+                        raise SmtpDeliveryError("投递引擎已关闭")
+                    session = self._idle.pop() if self._idle else None
+                if session is None:
+                    return self._connect()
+                if self._usable(session):
+                    return session
+                session.close()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _checkin(self, session: _Session, healthy: bool):
+        try:
+            if not healthy:
+                session.close()
+                return
+            session.last_used = time.monotonic()
+            with self._lock:
+                if not self._closed:
+                    self._idle.append(session)
+                    return
+            session.close()
+        finally:
+            self._slots.release()
+
+    def _deliver_once(self, from_addr: str, recipients: List[str], message: str) -> Dict[str, Tuple[int, bytes]]:
+        session = self._checkout()
+        healthy = False
+        try:
+            refused = session.server.sendmail(from_addr, recipients, message)
+            session.messages_sent += 1
+            self.stats['deliveries'] += 1
+            healthy = True
+            return refused if isinstance(refused, dict) else {}
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+            # 邮件被拒收时会话通常仍可用；smtplib 收到 421 时已经关闭了连接
+            healthy = session.server.sock is not None
+            if healthy:
+                self._reset(session)
+            raise
+        finally:
+            self._checkin(session, healthy)
+
+    @staticmethod
+    def _reset(session: _Session):
+        try:
+            session.server.rset()
+        except Exception:
+            pass
+
+    def _deliver_batch(self, from_addr: str, recipients: List[str], message: str) -> Dict[str, Tuple[int, bytes]]:
+        attempt = 0
+        while True:
+            try:
+                return self._deliver_once(from_addr, recipients, message)
+            except Exception as e:
+                if not is_transient_error(e):
+                    raise
+                if attempt >= self.retries:
+                    raise SmtpDeliveryError(f"重试 {attempt} 次后仍失败: {e}", transient=True) from e
+                delay = self.retry_backoff * (2 ** attempt)
+                attempt += 1
+                self.stats['retries'] += 1
+                LOG.warning(f"SMTP 投递失败，{delay:.1f} 秒后第 {attempt} 次重试: {e}")
+                self._sleep(delay)
+
+    def send(self, from_addr: str, recipients: Iterable[str], message: str) -> Dict[str, Tuple[int, bytes]]:
+        """
+        投递一封邮件
+
+        Args:
+            from_addr: 信封发件人
+            recipients: 收件人列表，超过 max_recipients_per_message 时分批投递同一封邮件
+            message: 完整的邮件内容（msg.as_string()）
+
+        Returns:
+            被拒收的收件人 {地址: (代码, 响应)}，全部成功时为空字典
+
+        Raises:
+            smtplib.SMTPException: 永久性错误（如认证失败），没有任何批次送达
+            SmtpDeliveryError: 临时性错误重试后仍失败，没有任何批次送达
+            PartialDeliveryError: 部分批次失败，其余批次已送达；pending 为失败批次的收件人
+        """
+        recipients = list(recipients)
+        refused = {}
+        delivered, pending, errors = [], [], []
+        # 每个批次独立投递，一个批次失败不影响其余批次
+        for start in range(0, len(recipients), self.max_recipients_per_message):
+            batch = recipients[start:start + self.max_recipients_per_message]
+            try:
+                batch_refused = self._deliver_batch(from_addr, batch, message)
+            except Exception as e:
+                LOG.warning(f"第 {start // self.max_recipients_per_message + 1} 批收件人投递失败: {e}")
+                pending.extend(batch)
+                errors.append(e)
+            else:
+                refused.update(batch_refused)
+                delivered.extend(address for address in batch if address not in batch_refused)
+        if not errors:
+            return refused
+        if not delivered:
+            raise errors[0]
+        transient = all((isinstance(e, SmtpDeliveryError) and e.transient) or is_transient_error(e) for e in errors)
+        raise PartialDeliveryError(f"{len(pending)}/{len(recipients)} 个收件人投递失败: {errors[0]}",
+                                   pending, delivered, refused, transient=transient)
+
+    def send_many(self, messages: Iterable[Tuple[str, Iterable[str], str]]) -> List[Optional[Exception]]:
+        """
+        依次投递多封邮件，共用同一组会话；单封失败不影响其余邮件
+
+        Args:
+            messages: [(from_addr, recipients, message)]
+
+        Returns:
+            与输入顺序一致的错误列表，成功的位置为 None
+        """
+        errors = []
+        for from_addr, recipients, message in messages:
+            try:
+                self.send(from_addr, recipients, message)
+                errors.append(None)
+            except Exception as e:
+                LOG.error(f"邮件投递失败: {e}")
+                errors.append(e)
+        return errors
+
+    def close(self):
+        """关闭所有空闲会话；之后不能再发送"""
+        with self._lock:
+            self._closed = True
+            sessions, self._idle = self._idle, []
+        for session in sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,200 @@
+"""
+Hacker News 故事时间序列
+每次抓取时记录每个故事的分数、评论数和排名，按天追加到定长二进制文件中，
+据此计算上升速度（分/小时、评论/小时），让正在上升的故事排在整天霸榜的故事前面
+"""
+
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+# 每个样本 26 字节，一天几千个样本也只有几十KB
+SAMPLE_DTYPE = np.dtype([
+    ('ts', '<f8'),
+    ('id', '<i8'),
+    ('score', '<i4'),
+    ('comments', '<i4'),
+    ('rank', '<i2'),
+])
+
+
+class StoryTimeSeries:
+    """按天分文件的故事采样存储，追加写入、按时间窗口读取"""
+
+    def __init__(self, base_dir: str = 'hacker_news/timeseries', retention_days: int = 14,
+                 sample_interval_hours: float = 1.0):
+        """
+        初始化时间序列存储
+
+        Args:
+            base_dir: 采样文件目录，每天一个 <YYYY-MM-DD>.bin
+            retention_days: 采样文件保留天数
+            sample_interval_hours: 预期的采样间隔（小时），决定计算速度时向前查找样本的范围
+        """
+        self.base_dir = base_dir
+        self.retention_days = retention_days
+        self.sample_interval_hours = sample_interval_hours
+        self._lock = threading.Lock()
+
+    @property
+    def lookback_hours(self) -> float:
+        """计算速度时向前查找样本的范围：至少 3 小时，且覆盖 1.5 个采样间隔，容忍抓取延迟"""
+        return max(3.0, 1.5 * self.sample_interval_hours)
+
+    def _day_path(self, day: str) -> str:
+        return os.path.join(self.base_dir, f'{day}.bin')
+
+    def record(self, stories: List[Dict], timestamp: Optional[float] = None) -> int:
+        """
+        记录一次抓取的采样
+
+        Args:
+            stories: 按 HN 排名顺序排列的故事列表
+            timestamp: 采样时间戳，默认当前时间
+
+        Returns:
+            写入的样本数
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        rows = [(timestamp, story['id'], story.get('score', 0) or 0, story.get('descendants', 0) or 0, rank)
+                for rank, story in enumerate(stories, start=1) if story.get('id') is not None]
+        if not rows:
+            return 0
+
+        samples = np.array(rows, dtype=SAMPLE_DTYPE)
+        day = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d')
+        with self._lock:
+            os.makedirs(self.base_dir, exist_ok=True)
+            with open(self._day_path(day), 'ab') as f:
+                samples.tofile(f)
+        self._prune(timestamp)
+        return len(rows)
+
+    def _prune(self, now: float):
+        cutoff = datetime.fromtimestamp(now - self.retention_days * 86400).strftime('%Y-%m-%d')
+        for name in os.listdir(self.base_dir):
+            if name.endswith('.bin') and name[:-4] < cutoff:
+                try:
+                    os.remove(os.path.join(self.base_dir, name))
+                except OSError as e:
+                    LOG.warning(f"删除过期采样文件 {name} 失败: {e}")
+
+    def window(self, start: float, end: Optional[float] = None) -> np.ndarray:
+        """
+        读取时间窗口 [start, end] 内的全部样本
+
+        Args:
+            start: 起始时间戳
+            end: 结束时间戳，默认当前时间
+
+        Returns:
+            SAMPLE_DTYPE 结构化数组，按时间排序
+        """
+        end = time.time() if end is None else end
+        day = datetime.fromtimestamp(start).date()
+        last_day = datetime.fromtimestamp(end).date()
+        chunks = []
+        while day <= last_day:
+            path = self._day_path(day.strftime('%Y-%m-%d'))
+            if os.path.exists(path):
+                # 只读取完整的记录，忽略并发写入时可能出现的半条记录
+                count = os.path.getsize(path) // SAMPLE_DTYPE.itemsize
+                chunks.append(np.fromfile(path, dtype=SAMPLE_DTYPE, count=count))
+            day += timedelta(days=1)
+
+        if not chunks:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        samples = np.concatenate(chunks)
+        samples = samples[(samples['ts'] >= start) & (samples['ts'] <= end)]
+        return samples[np.argsort(samples['ts'], kind='stable')]
+
+    def velocities(self, stories: List[Dict], window_hours: Optional[float] = None, now: Optional[float] = None,
+                   min_elapsed_hours: float = 0.25) -> Dict[int, Dict[str, float]]:
+        """
+        计算故事的当前上升速度
+
+        与窗口内最近的一次更早样本（通常是上一次抓取）比较得到分数和评论的增长速度；
+        窗口内没有更早的样本时（刚上榜的故事），按发布以来的平均速度计算。
+
+        Args:
+            stories: 当前抓取的故事列表
+            window_hours: 向前查找样本的范围（小时），默认 lookback_hours
+            now: 当前时间戳，默认当前时间
+            min_elapsed_hours: 参与比较的样本与当前时间的最小间隔（小时）
+
+        Returns:
+            {故事ID: {'points_per_hour': float, 'comments_per_hour': float}}
+        """
+        now = time.time() if now is None else now
+        window_hours = self.lookback_hours if window_hours is None else window_hours
+        stories = [story for story in stories if story.get('id') is not None]
+        if not stories:
+            return {}
+
+        ids = np.array([story['id'] for story in stories], dtype=np.int64)
+        scores = np.array([story.get('score', 0) or 0 for story in stories], dtype=np.float64)
+        comments = np.array([story.get('descendants', 0) or 0 for story in stories], dtype=np.float64)
+        posted = np.array([story.get('time', now) or now for story in stories], dtype=np.float64)
+
+        # 默认：发布以来的平均速度，发布时间不足1小时按1小时计，避免新故事速度虚高
+        elapsed = np.maximum((now - posted) / 3600, 1.0)
+        base_scores = np.zeros_like(scores)
+        base_comments = np.zeros_like(comments)
+
+        samples = self.window(now - window_hours * 3600, now - min_elapsed_hours * 3600)
+        if len(samples):
+            # 每个故事在窗口内的最近样本：按 (id, ts) 排序后取每组最后一条
+            order = np.lexsort((samples['ts'], samples['id']))
+            sorted_samples = samples[order]
+            sample_ids, first = np.unique(sorted_samples['id'], return_index=True)
+            latest = sorted_samples[np.append(first[1:], len(sorted_samples)) - 1]
+
+            pos = np.searchsorted(sample_ids, ids)
+            pos = np.minimum(pos, len(sample_ids) - 1)
+            matched = sample_ids[pos] == ids
+            elapsed = np.where(matched, (now - latest['ts'][pos]) / 3600, elapsed)
+            base_scores = np.where(matched, latest['score'][pos], base_scores)
+            base_comments = np.where(matched, latest['comments'][pos], base_comments)
+
+        points_per_hour = np.maximum(scores - base_scores, 0) / elapsed
+        comments_per_hour = np.maximum(comments - base_comments, 0) / elapsed
+        return {
+            int(story_id): {'points_per_hour': round(float(pph), 1), 'comments_per_hour': round(float(cph), 1)}
+            for story_id, pph, cph in zip(ids, points_per_hour, comments_per_hour)
+        }
+
+    def annotate(self, stories: List[Dict], window_hours: Optional[float] = None,
+                 now: Optional[float] = None) -> List[Dict]:
+        """
+        记录本次采样并为故事原地添加 points_per_hour / comments_per_hour 字段
+
+        Args:
+            stories: 当前抓取的故事列表
+            window_hours: 向前查找样本的范围（小时），默认 lookback_hours
+            now: 当前时间戳，默认当前时间
+
+        Returns:
+            传入的故事列表
+        """
+        now = time.time() if now is None else now
+        velocity = self.velocities(stories, window_hours=window_hours, now=now)
+        self.record(stories, timestamp=now)
+        for story in stories:
+            story.update(velocity.get(story.get('id'), {}))
+        return stories
+
+
+def velocity_sort_key(story: Dict):
+    """按上升速度排序的键，没有速度数据时退回到分数"""
+    return (story.get('points_per_hour', 0), story.get('score', 0))
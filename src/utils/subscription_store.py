@@ -0,0 +1,345 @@
+"""
+GitHub 仓库订阅存储
+订阅保存在 SQLite 中，每个仓库一行，以规范化的 owner/repo（小写）为主键：
+查询、添加、删除都是单行操作，不需要重写和重新解析整个订阅列表。
+每个仓库还保存优先级、统计周期、分支等设置，以及最近一次抓取的游标和 ETag。
+旧的 subscriptions.json（字符串、repo_url、owner/repo_name 等各种格式）首次打开时导入一次。
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+DEFAULT_SUBSCRIPTIONS_DB = 'cache/subscriptions/subscriptions.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS github_subscriptions (
+    repo_key TEXT PRIMARY KEY,
+    repo TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    frequency_days INTEGER,
+    custom_branch TEXT,
+    enabled INTEGER NOT NULL DEFAULT 1,
+    last_processed_timestamp TEXT,
+    last_fetched_at REAL,
+    cursor TEXT,
+    etag TEXT,
+    added_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_subscriptions_order ON github_subscriptions (enabled, priority DESC, position);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 可以通过 add / update 设置的字段
+METADATA_FIELDS = ('priority', 'frequency_days', 'custom_branch', 'enabled', 'last_processed_timestamp',
+                   'last_fetched_at', 'cursor', 'etag')
+
+_COLUMNS = ('repo', 'position', 'priority', 'frequency_days', 'custom_branch', 'enabled',
+            'last_processed_timestamp', 'last_fetched_at', 'cursor', 'etag', 'added_at')
+
+_REPO_RE = re.compile(r'^(?:(?:https?://)?(?:www\.)?github\.com/)?([\w.-]+)/([\w.-]+?)(?:\.git)?/?$')
+
+
+def normalize_repo(item) -> Optional[str]:
+    """
+    把各种格式的订阅项规范化为 "owner/repo"
+
+    支持 "owner/repo"、GitHub 仓库 URL、{"repo_url": ...} 和 {"owner": ..., "repo_name"/"repo": ...}。
+
+    Returns:
+        "owner/repo"（保留原有大小写），无法识别时返回None
+    """
+    if isinstance(item, dict):
+        owner = item.get('owner')
+        name = item.get('repo_name') or item.get('repo')
+        item = f"{owner}/{name}" if owner and name else item.get('repo_url')
+    if not isinstance(item, str):
+        return None
+    match = _REPO_RE.match(item.strip())
+    if not match or match.group(2) in ('.', '..'):
+        return None
+    return f"{match.group(1)}/{match.group(2)}"
+
+
+def _repo_key(repo: str) -> str:
+    # GitHub 的 owner 和仓库名不区分大小写
+    return repo.lower()
+
+
+class SubscriptionStore:
+    """
+    SQLite 持久化的 GitHub 订阅列表
+
+    列表顺序为优先级从高到低，同优先级按添加顺序；list() 返回的字典与旧订阅文件中的
+    {"repo_url": "owner/repo", ...} 兼容，并带有 owner、repo_name 和各项元数据。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_SUBSCRIPTIONS_DB):
+        """
+        初始化订阅存储
+
+        Args:
+            db_path: SQLite 数据库路径
+        """
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def _execute(self, sql: str, args: tuple = ()) -> List[tuple]:
+        with self._db_lock:
+            rows = self._conn.execute(sql, args).fetchall()
+            self._conn.commit()
+            return rows
+
+    @staticmethod
+    def _require_repo(repo) -> str:
+        normalized = normalize_repo(repo)
+        if normalized is None:
+            raise ValueError(f"无法识别的仓库: {repo!r}，请使用 'owner/repo' 或 GitHub 仓库地址")
+        return normalized
+
+    @staticmethod
+    def _check_fields(fields: Dict[str, Any]):
+        unknown = set(fields) - set(METADATA_FIELDS)
+        if unknown:
+            raise ValueError(f"未知的订阅字段: {sorted(unknown)}")
+
+    @staticmethod
+    def _to_dict(row: tuple) -> Dict[str, Any]:
+        item = dict(zip(_COLUMNS, row))
+        owner, repo_name = item['repo'].split('/', 1)
+        item['repo_url'] = item.pop('repo')
+        item['owner'] = owner
+        item['repo_name'] = repo_name
+        item['enabled'] = bool(item['enabled'])
+        return item
+
+    def add(self, repo, **metadata) -> bool:
+        """
+        添加订阅
+
+        Args:
+            repo: 仓库（任意支持的格式）
+            **metadata: METADATA_FIELDS 中的字段
+
+        Returns:
+            是否新增；已订阅时不修改并返回 False
+
+        Raises:
+            ValueError: 仓库格式无法识别或字段未知
+        """
+        repo = self._require_repo(repo)
+        self._check_fields(metadata)
+        return self._insert([(repo, metadata)]) == 1
+
+    def _insert(self, items: List[tuple]) -> int:
+        """在一个事务中插入多条订阅，已存在的跳过，返回新增数量"""
+        now = time.time()
+        fields = ', '.join(METADATA_FIELDS)
+        placeholders = ', '.join('?' for _ in METADATA_FIELDS)
+        sql = (f"INSERT INTO github_subscriptions (repo_key, repo, position, added_at, updated_at, {fields}) "
+               f"VALUES (?, ?, ?, ?, ?, {placeholders}) ON CONFLICT (repo_key) DO NOTHING")
+        with self._db_lock:
+            position = self._conn.execute(
+                "SELECT COALESCE(MAX(position), 0) FROM github_subscriptions").fetchone()[0]
+            added = 0
+            try:
+                for repo, metadata in items:
+                    values = [metadata.get('priority', 0), metadata.get('frequency_days'),
+                              metadata.get('custom_branch'), int(metadata.get('enabled', True))]
+                    values += [metadata.get(field) for field in METADATA_FIELDS[4:]]
+                    cursor = self._conn.execute(sql, [_repo_key(repo), repo, position + 1, now, now] + values)
+                    if cursor.rowcount:
+                        position += 1
+                        added += 1
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            return added
+
+    def remove(self, repo) -> bool:
+        """删除订阅，返回是否存在"""
+        normalized = normalize_repo(repo)
+        if normalized is None:
+            return False
+        rows = self._execute("DELETE FROM github_subscriptions WHERE repo_key = ? RETURNING repo_key",
+                             (_repo_key(normalized),))
+        return bool(rows)
+
+    def get(self, repo) -> Optional[Dict[str, Any]]:
+        """返回一个订阅及其元数据，未订阅时返回None"""
+        normalized = normalize_repo(repo)
+        if normalized is None:
+            return None
+        rows = self._execute(f"SELECT {', '.join(_COLUMNS)} FROM github_subscriptions WHERE repo_key = ?",
+                             (_repo_key(normalized),))
+        return self._to_dict(rows[0]) if rows else None
+
+    def __contains__(self, repo) -> bool:
+        normalized = normalize_repo(repo)
+        if normalized is None:
+            return False
+        return bool(self._execute("SELECT 1 FROM github_subscriptions WHERE repo_key = ?",
+                                  (_repo_key(normalized),)))
+
+    def update(self, repo, **fields) -> bool:
+        """
+        更新订阅的元数据
+
+        Returns:
+            订阅是否存在
+
+        Raises:
+            ValueError: 字段未知
+        """
+        self._check_fields(fields)
+        normalized = normalize_repo(repo)
+        if normalized is None:
+            return False
+        if not fields:
+            return normalized in self
+        if 'enabled' in fields:
+            fields['enabled'] = int(bool(fields['enabled']))
+        assignments = ', '.join(f"{field} = ?" for field in fields)
+        rows = self._execute(
+            f"UPDATE github_subscriptions SET {assignments}, updated_at = ? WHERE repo_key = ? RETURNING repo_key",
+            tuple(fields.values()) + (time.time(), _repo_key(normalized)))
+        return bool(rows)
+
+    def record_fetch(self, repo, cursor: Optional[str] = None, etag: Optional[str] = None) -> bool:
+        """
+        记录一次成功的抓取：更新 last_fetched_at，并在提供时更新游标和 ETag
+
+        Returns:
+            订阅是否存在（未订阅的仓库不记录）
+        """
+        normalized = normalize_repo(repo)
+        if normalized is None:
+            return False
+        now = time.time()
+        rows = self._execute(
+            "UPDATE github_subscriptions SET last_fetched_at = ?, cursor = COALESCE(?, cursor), "
+            "etag = COALESCE(?, etag), updated_at = ? WHERE repo_key = ? RETURNING repo_key",
+            (now, cursor, etag, now, _repo_key(normalized)))
+        return bool(rows)
+
+    def list(self, include_disabled: bool = False) -> List[Dict[str, Any]]:
+        """按优先级和添加顺序返回订阅列表"""
+        where = "" if include_disabled else "WHERE enabled = 1 "
+        rows = self._execute(f"SELECT {', '.join(_COLUMNS)} FROM github_subscriptions {where}"
+                             f"ORDER BY priority DESC, position")
+        return [self._to_dict(row) for row in rows]
+
+    def repos(self, include_disabled: bool = False) -> List[str]:
+        """按列表顺序返回 "owner/repo" 列表"""
+        return [item['repo_url'] for item in self.list(include_disabled)]
+
+    def count(self) -> int:
+        return self._execute("SELECT COUNT(*) FROM github_subscriptions")[0][0]
+
+    def import_subscriptions(self, items: Iterable) -> int:
+        """
+        批量导入旧格式的订阅项（在一个事务中完成），已存在的仓库保持不变
+
+        Returns:
+            新增的数量
+        """
+        parsed = []
+        for item in items or []:
+            repo = normalize_repo(item)
+            if repo is None:
+                LOG.warning(f"跳过无法识别的订阅项: {item}")
+                continue
+            metadata = {field: item[field] for field in METADATA_FIELDS
+                        if isinstance(item, dict) and item.get(field) is not None}
+            parsed.append((repo, metadata))
+        return self._insert(parsed)
+
+    def migrate_from_json(self, subscriptions_file: str) -> int:
+        """
+        从旧的订阅文件导入 github_subscriptions（只执行一次，之后以数据库为准）
+
+        Returns:
+            新增的数量；已经导入过或文件不存在时为0
+        """
+        if self._execute("SELECT 1 FROM store_meta WHERE key = 'migrated_from'"):
+            return 0
+        if not os.path.exists(subscriptions_file):
+            return 0
+        try:
+            with open(subscriptions_file, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+            data = json.loads(content) if content else []
+        except (OSError, json.JSONDecodeError) as e:
+            LOG.error(f"读取订阅文件 {subscriptions_file} 失败，暂不导入: {e}")
+            return 0
+        items = data.get('github_subscriptions', []) if isinstance(data, dict) else data
+        added = self.import_subscriptions(items if isinstance(items, list) else [])
+        self._execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('migrated_from', ?)",
+                      (os.path.abspath(subscriptions_file),))
+        LOG.info(f"已从 {subscriptions_file} 导入 {added} 个 GitHub 订阅到 {self.db_path}")
+        return added
+
+    def export_json(self, path: str, hacker_news_subscriptions: Optional[list] = None):
+        """以旧订阅文件的格式导出（先写临时文件再替换），用于备份或给只读取文件的工具使用"""
+        data = {
+            'github_subscriptions': [
+                {'repo_url': item['repo_url'], 'last_processed_timestamp': item['last_processed_timestamp'],
+                 'custom_branch': item['custom_branch'], 'priority': item['priority'],
+                 'frequency_days': item['frequency_days'], 'enabled': item['enabled']}
+                for item in self.list(include_disabled=True)],
+            'hacker_news_subscriptions': hacker_news_subscriptions or [],
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        with self._db_lock:
+            self._conn.close()
+
+
+_stores: Dict[str, SubscriptionStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_subscription_store(db_path: str = DEFAULT_SUBSCRIPTIONS_DB,
+                           legacy_file: Optional[str] = None) -> SubscriptionStore:
+    """
+    返回进程内共享的订阅存储
+
+    Args:
+        db_path: SQLite 数据库路径
+        legacy_file: 旧的订阅文件，首次打开数据库时从中导入
+    """
+    key = os.path.abspath(db_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = SubscriptionStore(db_path)
+            if legacy_file:
+                store.migrate_from_json(legacy_file)
+        return store
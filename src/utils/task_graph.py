@@ -0,0 +1,342 @@
+"""
+任务依赖图执行器
+把一个大任务拆成有依赖关系的小任务，在限定的并发数内并行执行；
+每个任务有独立的超时和重试，失败只影响依赖它的任务。
+带缓存键的任务结果保存在磁盘上，失败后重跑时已完成的部分直接复用。
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    from src.logger import LOG
+except ImportError:
+    import logging
+    LOG = logging.getLogger(__name__)
+
+
+TASK_SUCCEEDED = 'succeeded'
+TASK_FAILED = 'failed'
+# 依赖的任务失败，本任务没有执行
+TASK_SKIPPED = 'skipped'
+
+
+class TaskTimeoutError(Exception):
+    """任务单次执行超过了 timeout"""
+
+
+class FileTaskCache:
+    """
+    任务结果的磁盘缓存
+
+    每个键一个 JSON 文件（原子写入），超过 max_age 秒的结果视为失效；值必须可以 JSON 序列化。
+    创建时删除已失效的缓存文件，目录不会随每天新的缓存键无限增长。
+    """
+
+    def __init__(self, base_dir: str = 'cache/tasks', max_age: Optional[float] = 12 * 3600):
+        self.base_dir = base_dir
+        self.max_age = max_age
+        if max_age is not None:
+            self.prune()
+
+    def prune(self, max_age: Optional[float] = None) -> int:
+        """
+        删除超过 max_age 秒的缓存文件（按修改时间，即写入时间）和中断写入留下的临时文件
+
+        Args:
+            max_age: 保留时长（秒），默认使用构造时的 max_age
+
+        Returns:
+            删除的文件数
+        """
+        max_age = self.max_age if max_age is None else max_age
+        if max_age is None or not os.path.isdir(self.base_dir):
+            return 0
+        cutoff = time.time() - max_age
+        removed = 0
+        for bucket in os.scandir(self.base_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError as e:
+                    LOG.warning(f"删除过期任务缓存 {entry.path} 失败: {e}")
+            try:
+                os.rmdir(bucket.path)
+            except OSError:
+                # 目录非空
+                pass
+        if removed:
+            LOG.info(f"已删除 {removed} 个过期的任务缓存文件")
+        return removed
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.base_dir, digest[:2], f"{digest}.json")
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        读取缓存
+
+        Returns:
+            (是否命中, 值)
+        """
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False, None
+        if entry.get('key') != key:
+            return False, None
+        if self.max_age is not None and time.time() - entry.get('created_at', 0) > self.max_age:
+            return False, None
+        return True, entry.get('value')
+
+    def put(self, key: str, value: Any):
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        content = json.dumps({'key': key, 'created_at': time.time(), 'value': value}, ensure_ascii=False)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def _spawn(func: Callable, arg: Any, name: str) -> Future:
+    """
+    在独立的守护线程中执行一次任务
+
+    不使用线程池：超时的执行无法中止，若占用池中的线程会拖慢后续任务；
+    同时执行的任务数由 TaskGraph 自己限制。
+    """
+    future = Future()
+    future.set_running_or_notify_cancel()
+
+    def target():
+        try:
+            result = func(arg)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    threading.Thread(target=target, name=f"task:{name}", daemon=True).start()
+    return future
+
+
+class TaskResult:
+    """单个任务的执行结果"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.status: Optional[str] = None
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.cached = False
+        self.duration = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == TASK_SUCCEEDED
+
+    def __repr__(self):
+        return f"TaskResult({self.name!r}, {self.status}, attempts={self.attempts}, cached={self.cached})"
+
+
+class _Task:
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: Tuple[str, ...],
+                 timeout: Optional[float], retries: int, retry_delay: float,
+                 cache_key: Optional[str], tolerate_failures: bool):
+        self.name = name
+        self.func = func
+        self.deps = deps
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.cache_key = cache_key
+        self.tolerate_failures = tolerate_failures
+
+
+class TaskGraph:
+    """
+    有向无环的任务图
+
+    任务函数接收一个字典 {依赖名: 依赖结果}；设置 tolerate_failures 的任务在依赖失败时仍会执行，
+    失败的依赖不出现在字典中（用于汇总部分成功的结果），失败原因可以从 results 读取。
+    超时的执行无法被强制中止，它所在的线程会继续运行到结束，但结果会被丢弃；
+    该线程结束前仍占用一个并发名额，重试和其他任务不会让线程数超过 max_workers。
+    """
+
+    def __init__(self, cache: Optional[FileTaskCache] = None, max_workers: int = 4):
+        """
+        初始化任务图
+
+        Args:
+            cache: 结果缓存，None 表示不缓存
+            max_workers: 同时执行的任务数上限
+        """
+        self.cache = cache
+        self.max_workers = max(1, int(max_workers))
+        self.tasks: Dict[str, _Task] = {}
+        # 最近一次 run() 的结果，执行过程中即可读取已结束任务的状态
+        self.results: Dict[str, TaskResult] = {}
+
+    def add(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: Iterable[str] = (),
+            timeout: Optional[float] = None, retries: int = 0, retry_delay: float = 1.0,
+            cache_key: Optional[str] = None, tolerate_failures: bool = False) -> str:
+        """
+        添加任务，依赖必须先于本任务添加
+
+        Args:
+            name: 任务名，图内唯一
+            func: 任务函数
+            deps: 依赖的任务名
+            timeout: 单次执行的超时（秒）
+            retries: 失败或超时后的重试次数
+            retry_delay: 首次重试前的等待（秒），之后每次加倍
+            cache_key: 缓存键；命中时不执行，成功后写入缓存
+            tolerate_failures: 依赖失败时是否仍然执行
+
+        Returns:
+            任务名
+        """
+        if name in self.tasks:
+            raise ValueError(f"任务已存在: {name}")
+        deps = tuple(deps)
+        for dep in deps:
+            if dep not in self.tasks:
+                raise ValueError(f"任务 {name} 依赖的任务 {dep} 不存在")
+        self.tasks[name] = _Task(name, func, deps, timeout, max(0, int(retries)), retry_delay,
+                                 cache_key, tolerate_failures)
+        return name
+
+    def _ready(self, task: _Task, results: Dict[str, TaskResult]) -> Optional[bool]:
+        """依赖全部结束时返回是否可以执行（False 表示应跳过），尚未结束返回None"""
+        dep_results = [results[dep] for dep in task.deps]
+        if any(result.status is None for result in dep_results):
+            return None
+        return task.tolerate_failures or all(result.ok for result in dep_results)
+
+    def run(self) -> Dict[str, TaskResult]:
+        """
+        执行全部任务
+
+        Returns:
+            {任务名: TaskResult}
+        """
+        results = self.results = {name: TaskResult(name) for name in self.tasks}
+        waiting = list(self.tasks)
+        running = {}    # future -> (任务, 开始时间, 截止时间)
+        retry_at = {}   # 任务名 -> 可以重试的时间
+        orphaned = set()  # 已超时但线程仍在运行的执行
+
+        def finish(task: _Task, status: str, value=None, error=None):
+            result = results[task.name]
+            result.status, result.value, result.error = status, value, error
+            if status == TASK_SUCCEEDED and task.cache_key and self.cache is not None and not result.cached:
+                try:
+                    self.cache.put(task.cache_key, value)
+                except Exception as e:
+                    LOG.warning(f"任务 {task.name} 的结果未能写入缓存: {e}")
+            if status == TASK_FAILED:
+                LOG.error(f"任务 {task.name} 失败（共 {result.attempts} 次）: {error}")
+
+        def attempt_failed(task: _Task, error: str):
+            result = results[task.name]
+            if result.attempts <= task.retries:
+                delay = task.retry_delay * (2 ** (result.attempts - 1))
+                LOG.warning(f"任务 {task.name} 第 {result.attempts} 次执行失败，{delay:.1f} 秒后重试: {error}")
+                retry_at[task.name] = time.monotonic() + delay
+                waiting.append(task.name)
+            else:
+                finish(task, TASK_FAILED, error=error)
+
+        while waiting or running:
+            orphaned = {future for future in orphaned if not future.done()}
+            now = time.monotonic()
+            # 启动依赖已满足、且不在重试等待中的任务
+            for name in list(waiting):
+                if len(running) + len(orphaned) >= self.max_workers:
+                    break
+                task = self.tasks[name]
+                ready = self._ready(task, results)
+                if ready is None or retry_at.get(name, 0) > now:
+                    continue
+                waiting.remove(name)
+                if not ready:
+                    failed = [dep for dep in task.deps if not results[dep].ok]
+                    results[name].status = TASK_SKIPPED
+                    results[name].error = f"依赖的任务失败: {', '.join(failed)}"
+                    continue
+                if task.cache_key and self.cache is not None and results[name].attempts == 0:
+                    hit, value = self.cache.get(task.cache_key)
+                    if hit:
+                        results[name].cached = True
+                        finish(task, TASK_SUCCEEDED, value)
+                        continue
+                inputs = {dep: results[dep].value for dep in task.deps if results[dep].ok}
+                results[name].attempts += 1
+                future = _spawn(task.func, inputs, name)
+                deadline = now + task.timeout if task.timeout else None
+                running[future] = (task, now, deadline)
+
+            if not running:
+                if waiting:
+                    # 只剩等待重试或等待超时线程让出名额的任务
+                    pending_retries = [retry_at[name] for name in waiting if name in retry_at]
+                    delay = max(0.0, min(pending_retries) - time.monotonic()) if pending_retries else 0.01
+                    if orphaned:
+                        wait(list(orphaned), timeout=delay if pending_retries else None,
+                             return_when=FIRST_COMPLETED)
+                    else:
+                        time.sleep(delay)
+                continue
+
+            # 等到有任务结束（包括让出名额的超时线程）、最早的截止时间或最早的重试时间
+            wake_times = [deadline for _, _, deadline in running.values() if deadline is not None]
+            wake_times += [retry_at[name] for name in waiting if name in retry_at]
+            timeout = max(0.0, min(wake_times) - time.monotonic()) if wake_times else None
+            watched = list(running) + (list(orphaned) if waiting else [])
+            done, _ = wait(watched, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future not in running:
+                    continue
+                task, started, _ = running.pop(future)
+                results[task.name].duration += time.monotonic() - started
+                try:
+                    value = future.result()
+                except Exception as e:
+                    attempt_failed(task, f"{type(e).__name__}: {e}")
+                else:
+                    finish(task, TASK_SUCCEEDED, value)
+
+            now = time.monotonic()
+            for future, (task, started, deadline) in list(running.items()):
+                if deadline is not None and now >= deadline:
+                    running.pop(future)
+                    orphaned.add(future)
+                    results[task.name].duration += now - started
+                    attempt_failed(task, f"{TaskTimeoutError.__name__}: 超过 {task.timeout} 秒")
+
+        failed = [name for name, result in results.items() if not result.ok]
+        if failed:
+            LOG.warning(f"任务图执行完毕，{len(failed)}/{len(results)} 个任务未成功: {', '.join(failed)}")
+        else:
+            LOG.info(f"任务图执行完毕，共 {len(results)} 个任务")
+        return results
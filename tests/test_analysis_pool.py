@@ -0,0 +1,173 @@
+import sys
+import os
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from analyzers import analysis_pool
+from analyzers.analysis_pool import TopicAnalysisPool, analyze_and_write_report
+
+
+class StubAnalyzer:
+    def analyze_topics(self, stories, date, hour):
+        return {'topics': stories, 'date': date, 'hour': hour}
+
+    def generate_report(self, result):
+        return f"# {result['date']} {result['hour']}:00 ({len(result['topics'])})"
+
+
+class TestAnalyzeAndWriteReport(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.indexed = []
+        self.original_index = analysis_pool.index_report_file
+        analysis_pool.index_report_file = self.indexed.append
+
+    def tearDown(self):
+        analysis_pool.index_report_file = self.original_index
+        shutil.rmtree(self.base_dir)
+
+    def test_writes_topics_file(self):
+        path = analyze_and_write_report(StubAnalyzer(), [{'id': 1}, {'id': 2}], '2025-06-13', '08',
+                                        base_dir=self.base_dir)
+        self.assertEqual(path, os.path.join(self.base_dir, '2025-06-13', '08_topics.md'))
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), "# 2025-06-13 08:00 (2)")
+        # 不应残留临时文件
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['08_topics.md'])
+        self.assertEqual(self.indexed, [path])
+
+
+class ThreadBackedPool(TopicAnalysisPool):
+    """用线程池代替工作进程，记录启动次数"""
+
+    def __init__(self, base_dir):
+        super().__init__(base_dir=base_dir)
+        self.starts = 0
+
+    def _start_executor(self):
+        self.starts += 1
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+
+class TestTopicAnalysisPool(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.pool = ThreadBackedPool(self.base_dir)
+        self.original_run_analysis = analysis_pool._run_analysis
+        self.original_index = analysis_pool.index_report_file
+        analysis_pool.index_report_file = lambda path: None
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        analysis_pool._run_analysis = self.original_run_analysis
+        analysis_pool.index_report_file = self.original_index
+        self.pool.shutdown()
+        shutil.rmtree(self.base_dir)
+
+    def _use(self, run_analysis):
+        analysis_pool._run_analysis = run_analysis
+
+    def test_run_and_analyze_return_report_path(self):
+        self._use(lambda stories, date, hour, base_dir: analyze_and_write_report(
+            StubAnalyzer(), stories, date, hour, base_dir))
+        path = self.pool.run([{'id': 1}], '2025-06-13', '08')
+        self.assertEqual(path, os.path.join(self.base_dir, '2025-06-13', '08_topics.md'))
+        path = asyncio.run(self.pool.analyze([{'id': 1}], '2025-06-13', '09'))
+        self.assertEqual(path, os.path.join(self.base_dir, '2025-06-13', '09_topics.md'))
+        self.assertEqual(self.pool.starts, 1)
+
+    def test_timeout_stops_waiting_but_keeps_worker(self):
+        finished = []
+
+        def slow(stories, date, hour, base_dir):
+            self.release.wait(5)
+            finished.append(hour)
+            return hour
+
+        self._use(slow)
+        started = time.monotonic()
+        self.assertIsNone(self.pool.run([], '2025-06-13', '08', timeout=0.05))
+        self.assertIsNone(asyncio.run(self.pool.analyze([], '2025-06-13', '09', timeout=0.05)))
+        self.assertLess(time.monotonic() - started, 2)
+
+        # 超时不中断分析，工作进程也不会被重建
+        self.release.set()
+        self.pool.shutdown()
+        self.assertEqual(finished, ['08', '09'])
+        self.assertEqual(self.pool.starts, 1)
+
+    def test_submit_returns_before_analysis_finishes(self):
+        def slow(stories, date, hour, base_dir):
+            self.release.wait(5)
+            return hour
+
+        self._use(slow)
+        started = time.monotonic()
+        future = self.pool.submit([{'id': 1}], '2025-06-13', '08')
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertFalse(future.done())
+        self.release.set()
+        self.assertEqual(future.result(timeout=5), '08')
+
+    def test_export_does_not_wait_for_topic_analysis(self):
+        try:
+            from clients.hacker_news_client import HackerNewsClient
+        except ImportError as e:
+            self.skipTest(f"Hacker News 客户端依赖不可用: {e}")
+
+        finished = []
+
+        def slow(stories, date, hour, base_dir):
+            self.release.wait(5)
+            finished.append(hour)
+            return hour
+
+        self._use(slow)
+        client = HackerNewsClient(use_cache=False, topic_analysis_config={}, category_rules={})
+        client._analysis_pool = self.pool
+        stories = [{'id': 1, 'title': 'Show HN: something'}]
+        started = time.monotonic()
+        self.assertIsNone(client._run_topic_analysis(stories, '2025-06-13', '08'))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(finished, [])
+
+        self.release.set()
+        self.pool.shutdown()
+        self.assertEqual(finished, ['08'])
+
+    def test_broken_pool_is_rebuilt_on_next_call(self):
+        def crash(stories, date, hour, base_dir):
+            raise BrokenProcessPool('worker died')
+
+        self._use(crash)
+        self.assertIsNone(self.pool.run([], '2025-06-13', '08'))
+        self.assertIsNone(self.pool._executor)
+        self.assertIsNone(asyncio.run(self.pool.analyze([], '2025-06-13', '08')))
+        self.assertIsNone(self.pool._executor)
+
+        self._use(lambda stories, date, hour, base_dir: hour)
+        self.assertEqual(self.pool.run([], '2025-06-13', '09'), '09')
+        self.assertEqual(self.pool.starts, 3)
+
+    def test_failed_start_is_reported_not_raised(self):
+        def broken_start():
+            raise BrokenProcessPool('initializer failed')
+
+        self.pool._start_executor = broken_start
+        self.assertIsNone(self.pool.run([], '2025-06-13', '08'))
+        self.assertIsNone(asyncio.run(self.pool.analyze([], '2025-06-13', '08')))
+        self.assertIsNone(self.pool._executor)
+
+
+if __name__ == '__main__':
+    unittest.main()
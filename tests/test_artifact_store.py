@@ -0,0 +1,105 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.artifact_store import ReportArtifactStore
+from report_generator import ReportGenerator
+from llm import ErrorChunk
+
+
+class TestReportArtifactStore(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.store = ReportArtifactStore(base_dir=self.base_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def test_put_and_get_by_full_key(self):
+        self.store.put('hacker_news_daily_report', 'all', '2025-06-13', 'openai-gpt-4o-mini', 'abc', '# Summary')
+        artifact = self.store.get('hacker_news_daily_report', 'all', '2025-06-13', 'openai-gpt-4o-mini', 'abc')
+        self.assertEqual(artifact['content'], '# Summary')
+        self.assertEqual(artifact['model'], 'openai-gpt-4o-mini')
+        # 模型或提示词版本不同都不命中
+        self.assertIsNone(self.store.get('hacker_news_daily_report', 'all', '2025-06-13', 'ollama-llama3', 'abc'))
+        self.assertIsNone(self.store.get('hacker_news_daily_report', 'all', '2025-06-13', 'openai-gpt-4o-mini', 'def'))
+
+    def test_max_age(self):
+        self.store.put('t', 's', 'p', 'm', 'v', 'content')
+        self.assertIsNotNone(self.store.get('t', 's', 'p', 'm', 'v', max_age=60))
+        self.assertIsNone(self.store.get('t', 's', 'p', 'm', 'v', max_age=-1))
+
+    def test_latest_across_models(self):
+        self.store.put('t', 's', 'p', 'm1', 'v', 'old')
+        self.store.put('t', 's', 'p', 'm2', 'v', 'new')
+        self.assertEqual(self.store.latest('t', 's', 'p')['content'], 'new')
+
+
+class TestReportGeneratorArtifacts(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        settings = MagicMock()
+        settings.get_report_types.return_value = []
+        settings.get_prompt_file_path.return_value = None
+        self.llm = MagicMock()
+        self.llm.model_type = 'openai'
+        self.llm.openai_model_name = 'gpt-4o-mini'
+        self.generator = ReportGenerator(self.llm, settings, MagicMock(),
+                                         artifact_store=ReportArtifactStore(base_dir=self.base_dir))
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def _fake_summary(self, chunks):
+        def summary(date_str):
+            self.calls.append(date_str)
+            yield from chunks
+        self.generator.get_hacker_news_daily_summary = summary
+
+    def test_second_request_is_served_from_store(self):
+        self._fake_summary(['## 摘要\n', 'AI news'])
+        first = ''.join(self.generator.get_or_generate_hacker_news_daily_summary('2025-06-13'))
+        second = ''.join(self.generator.get_or_generate_hacker_news_daily_summary('2025-06-13'))
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, ['2025-06-13'])
+
+        ''.join(self.generator.get_or_generate_hacker_news_daily_summary('2025-06-13', refresh=True))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_errors_are_not_stored(self):
+        self._fake_summary(['## 摘要\n', ErrorChunk('调用 OpenAI API 失败')])
+        ''.join(self.generator.get_or_generate_hacker_news_daily_summary('2025-06-13'))
+        self.assertIsNone(self.generator.get_stored_report('hacker_news_daily_report', 'all', '2025-06-13'))
+
+        def failing_summary(date_str):
+            yield '## 摘要\n'
+            raise RuntimeError('stream dropped')
+
+        self.generator.get_hacker_news_daily_summary = failing_summary
+        with self.assertRaises(RuntimeError):
+            ''.join(self.generator.get_or_generate_hacker_news_daily_summary('2025-06-13'))
+        self.assertIsNone(self.generator.get_stored_report('hacker_news_daily_report', 'all', '2025-06-13'))
+
+    def test_summary_text_resembling_an_error_is_stored(self):
+        # 只有 ErrorChunk 表示失败，正文恰好以这些词开头不影响保存
+        self._fake_summary(['错误处理框架成为热门话题\n', 'Error handling in Rust\n'])
+        content = ''.join(self.generator.get_or_generate_hacker_news_daily_summary('2025-06-13'))
+        self.assertEqual(self.generator.get_stored_report('hacker_news_daily_report', 'all', '2025-06-13')['content'],
+                         content)
+
+    def test_prompt_change_invalidates(self):
+        self._fake_summary(['summary'])
+        ''.join(self.generator.get_or_generate_hacker_news_daily_summary('2025-06-13'))
+        self.generator.prompts['hacker_news_daily_report'] = 'A different prompt'
+        self.assertIsNone(self.generator.get_stored_report('hacker_news_daily_report', 'all', '2025-06-13'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import sys
+import os
+import asyncio
+import threading
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.async_runner import AsyncLoopThread, run_sync
+from clients.github_client import GitHubClient
+
+
+class TestAsyncLoopThread(unittest.TestCase):
+    def test_reuses_one_loop_thread(self):
+        async def current():
+            return asyncio.get_running_loop(), threading.current_thread()
+
+        first = run_sync(current())
+        second = run_sync(current())
+        self.assertIs(first[0], second[0])
+        self.assertIs(first[1], second[1])
+        self.assertIsNot(first[1], threading.current_thread())
+
+    def test_timeout_cancels(self):
+        runner = AsyncLoopThread(name='test-runner')
+        cancelled = threading.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with self.assertRaises(TimeoutError):
+            runner.run(slow(), timeout=0.05)
+        self.assertTrue(cancelled.wait(1))
+        runner.stop()
+
+    def test_exception_propagates(self):
+        async def broken():
+            raise ValueError('boom')
+
+        with self.assertRaises(ValueError):
+            run_sync(broken())
+
+
+class TestBatchFetchProjectData(unittest.TestCase):
+    def test_fetches_all_repos_concurrently(self):
+        client = GitHubClient('token', use_cache=False)
+        sessions = set()
+        in_flight = []
+        peak = []
+
+        async def fake_fetch(kind, session):
+            sessions.add(id(session))
+            in_flight.append(kind)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.05)
+            in_flight.remove(kind)
+            return [kind]
+
+        client.async_fetch_commits = lambda repo, since, until, session=None: fake_fetch('c', session)
+        client.async_fetch_issues = lambda repo, since, until, session=None: fake_fetch('i', session)
+        client.async_fetch_pull_requests = lambda repo, since, until, session=None: fake_fetch('p', session)
+        client.async_get_recent_releases = (
+            lambda owner, repo_name, days_limit, count_limit, session=None: fake_fetch('r', session))
+
+        data = client.batch_fetch_project_data(['a/x', 'b/y'], since='2025-06-13T00:00:00+00:00', days_limit=1)
+
+        self.assertEqual(set(data), {'a/x', 'b/y'})
+        self.assertEqual(data['a/x'], {'commits': ['c'], 'issues': ['i'], 'pull_requests': ['p'], 'releases': ['r']})
+        # 两个仓库的 8 个请求同时进行，并共用同一个会话
+        self.assertEqual(max(peak), 8)
+        self.assertEqual(len(sessions), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import sys
+import os
+import asyncio
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.async_scheduler import (AsyncScheduler, DailyTrigger, IntervalTrigger, OVERLAP_COALESCE,
+                                   OVERLAP_QUEUE, OVERLAP_SKIP, watch_file)
+
+
+BJ = ZoneInfo('Asia/Shanghai')
+
+
+class TestDailyTrigger(unittest.TestCase):
+    def test_next_run_in_timezone(self):
+        trigger = DailyTrigger(['20:00', '08:00'], 'Asia/Shanghai')
+        after = datetime(2025, 6, 13, 9, 30, tzinfo=BJ)
+        self.assertEqual(trigger.next_run(after), datetime(2025, 6, 13, 20, 0, tzinfo=BJ))
+        # 正好在触发时刻时取下一个
+        self.assertEqual(trigger.next_run(datetime(2025, 6, 13, 20, 0, tzinfo=BJ)),
+                         datetime(2025, 6, 14, 8, 0, tzinfo=BJ))
+        # 输入为 UTC 时间也按北京时间计算
+        utc_after = datetime(2025, 6, 13, 13, 0, tzinfo=timezone.utc)  # 北京时间 21:00
+        self.assertEqual(trigger.next_run(utc_after), datetime(2025, 6, 14, 8, 0, tzinfo=BJ))
+
+    def test_interval_days(self):
+        trigger = DailyTrigger(['08:00'], BJ, interval_days=3)
+        last_run = datetime(2025, 6, 13, 8, 0, tzinfo=BJ)
+        self.assertEqual(trigger.next_run(last_run, last_run), datetime(2025, 6, 16, 8, 0, tzinfo=BJ))
+
+    def test_invalid_time(self):
+        with self.assertRaises(ValueError):
+            DailyTrigger(['8 点'])
+
+
+class TestAsyncScheduler(unittest.TestCase):
+    def _fire_while_blocked(self, overlap, fires=3):
+        """第一次执行阻塞期间再触发若干次，返回总执行次数"""
+        release = threading.Event()
+        calls = []
+
+        def job():
+            calls.append(1)
+            release.wait(2)
+
+        async def scenario():
+            scheduler = AsyncScheduler()
+            scheduler.add_job('job', job, IntervalTrigger(3600), overlap=overlap)
+            for _ in range(fires):
+                scheduler.fire('job')
+            await asyncio.sleep(0.05)
+            release.set()
+            while scheduler._tasks:
+                await asyncio.sleep(0.01)
+
+        asyncio.run(scenario())
+        return len(calls)
+
+    def test_overlap_policies(self):
+        self.assertEqual(self._fire_while_blocked(OVERLAP_SKIP), 1)
+        self.assertEqual(self._fire_while_blocked(OVERLAP_QUEUE), 3)
+        self.assertEqual(self._fire_while_blocked(OVERLAP_COALESCE), 2)
+
+    def test_slow_job_does_not_delay_others(self):
+        release = threading.Event()
+        fast_runs = []
+
+        async def scenario():
+            scheduler = AsyncScheduler()
+            scheduler.add_job('slow', release.wait, IntervalTrigger(0.01), 2)
+            scheduler.add_job('fast', fast_runs.append, IntervalTrigger(0.02), 1)
+            runner = asyncio.create_task(scheduler.run())
+            await asyncio.sleep(0.2)
+            self.assertEqual(scheduler.jobs['slow'].running, 1)
+            release.set()
+            scheduler.stop()
+            await asyncio.wait_for(runner, 2)
+
+        asyncio.run(scenario())
+        self.assertGreaterEqual(len(fast_runs), 3)
+
+    def test_add_job_wakes_sleeping_loop(self):
+        runs = []
+
+        async def scenario():
+            scheduler = AsyncScheduler()
+            scheduler.add_job('later', runs.append, IntervalTrigger(3600), 'later')
+            runner = asyncio.create_task(scheduler.run())
+            await asyncio.sleep(0.02)
+            scheduler.add_job('soon', runs.append, IntervalTrigger(0.01), 'soon')
+            await asyncio.sleep(0.1)
+            scheduler.stop()
+            await asyncio.wait_for(runner, 2)
+
+        asyncio.run(scenario())
+        self.assertIn('soon', runs)
+        self.assertNotIn('later', runs)
+
+
+class TestWatchFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_detects_change(self):
+        path = os.path.join(self.temp_dir, 'config.json')
+        with open(path, 'w') as f:
+            f.write('{}')
+        changes = []
+
+        async def scenario():
+            stop = asyncio.Event()
+            watcher = asyncio.create_task(watch_file(path, lambda: changes.append(1), interval=0.01, stop_event=stop))
+            await asyncio.sleep(0.05)
+            self.assertEqual(changes, [])
+            with open(path, 'w') as f:
+                f.write('{"github": {}}')
+            await asyncio.sleep(0.05)
+            stop.set()
+            await asyncio.wait_for(watcher, 1)
+
+        asyncio.run(scenario())
+        self.assertEqual(changes, [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+import types
+import unittest
+from unittest.mock import patch
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from config import Settings, SettingsService
+
+
+class TestSettingsService(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.temp_dir, 'config.json')
+        self._write({'llm': {'model_type': 'openai'}, 'email': {'to': ['a@example.com']}})
+        self.service = SettingsService(self.config_file, check_interval=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, data):
+        with open(self.config_file, 'w', encoding='utf-8') as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+        # 保证 mtime 变化，不受文件系统时间精度影响
+        stat = os.stat(self.config_file)
+        os.utime(self.config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_snapshot_is_shared_and_read_only(self):
+        snapshot = self.service.snapshot
+        self.assertIs(snapshot, self.service.snapshot)
+        self.assertEqual(snapshot.get_llm_model_type(), 'openai')
+        with self.assertRaises(AttributeError):
+            snapshot.llm_model_type = 'ollama'
+        snapshot.get_email_config()['to'] = []
+        self.assertEqual(snapshot.get_email_config()['to'], ['a@example.com'])
+        # raw / email 返回副本，嵌套的内容也不能被调用方改动
+        snapshot.email['to'].append('b@example.com')
+        snapshot.raw['llm']['model_type'] = 'ollama'
+        self.assertEqual(snapshot.email['to'], ['a@example.com'])
+        self.assertEqual(snapshot.raw['llm']['model_type'], 'openai')
+        self.assertNotIn('password', snapshot.raw['email'])
+        with self.assertRaises(AttributeError):
+            snapshot.email = {}
+
+    def test_reload_notifies_only_changed_sections(self):
+        llm_events, email_events, all_events = [], [], []
+        self.service.subscribe(lambda new, changed, old: llm_events.append((new, changed, old)), sections=['llm'])
+        self.service.subscribe(lambda new, changed, old: email_events.append(changed), sections=['email'])
+        self.service.subscribe(lambda new, changed, old: all_events.append(changed))
+        first = self.service.current()
+
+        self.assertFalse(self.service.reload())
+        self._write({'llm': {'model_type': 'ollama'}, 'email': {'to': ['a@example.com']}})
+        self.assertEqual(self.service.snapshot.get_llm_model_type(), 'ollama')
+
+        self.assertEqual(len(llm_events), 1)
+        new, changed, old = llm_events[0]
+        self.assertEqual(changed, {'llm'})
+        self.assertIs(old, first)
+        self.assertIs(new, self.service.current())
+        self.assertEqual(email_events, [])
+        self.assertEqual(all_events, [{'llm'}])
+
+    def test_invalid_or_unchanged_file_keeps_snapshot(self):
+        events = []
+        self.service.subscribe(lambda new, changed, old: events.append(changed))
+        first = self.service.current()
+
+        self._write('{"llm": ')
+        self.assertFalse(self.service.reload())
+        self._write({'email': {'to': ['a@example.com']}, 'llm': {'model_type': 'openai'}})
+        self.assertFalse(self.service.reload())
+        self.assertIs(self.service.current(), first)
+        self.assertEqual(events, [])
+
+    def test_explicit_reload_only(self):
+        events = []
+        self.service.check_interval = None
+        self.service.subscribe(lambda new, changed, old: events.append(changed))
+        first = self.service.current()
+
+        self._write({'llm': {'model_type': 'ollama'}, 'email': {'to': ['a@example.com']}})
+        self.assertIs(self.service.snapshot, first)
+        self.assertEqual(events, [])
+        self.assertTrue(self.service.reload())
+        self.assertEqual(self.service.snapshot.get_llm_model_type(), 'ollama')
+        self.assertEqual(events, [{'llm'}])
+
+
+    def test_summary_llm_rebuilt_only_when_llm_section_changes(self):
+        try:
+            from clients.hacker_news_client import HackerNewsClient
+        except ImportError as e:
+            self.skipTest(f"Hacker News 客户端依赖不可用: {e}")
+
+        built = []
+
+        class FakeLLM:
+            def __init__(self, settings):
+                built.append(settings.get_llm_model_type())
+
+        client = HackerNewsClient(use_cache=False, topic_analysis_config={}, category_rules={})
+        with patch.dict(sys.modules, {'src.llm': types.SimpleNamespace(LLM=FakeLLM)}), \
+                patch.object(HackerNewsClient, '_current_settings', staticmethod(self.service.current)):
+            client._add_ai_summaries([])
+            self._write({'llm': {'model_type': 'openai'}, 'email': {'to': ['b@example.com']}})
+            self.service.reload()
+            client._add_ai_summaries([])
+            self._write({'llm': {'model_type': 'ollama'}, 'email': {'to': ['b@example.com']}})
+            self.service.reload()
+            client._add_ai_summaries([])
+        self.assertEqual(built, ['openai', 'ollama'])
+
+
+class TestTopicAnalysisConfig(unittest.TestCase):
+    def _config(self, topic_analysis):
+        return Settings('config.json', config_data={'topic_analysis': topic_analysis}).get_topic_analysis_config()
+
+    def test_related_stories_default_follows_backend(self):
+        self.assertFalse(self._config({})['related_stories'])
+        self.assertTrue(self._config({'backend': 'semantic'})['related_stories'])
+        self.assertTrue(self._config({'related_stories': True})['related_stories'])
+        self.assertFalse(self._config({'backend': 'semantic', 'related_stories': False})['related_stories'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import sys
+import os
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.dedup import (normalize_url, NearDuplicateDetector, dedup_stories,
+                         dedup_markdown_stories)
+
+
+class TestDedup(unittest.TestCase):
+    def test_normalize_url(self):
+        self.assertEqual(normalize_url('https://www.Example.com/post/?utm_source=hn&id=3#top'),
+                         'example.com/post?id=3')
+        self.assertEqual(normalize_url('http://example.com/post'), normalize_url('https://example.com/post/'))
+        self.assertEqual(normalize_url(None), '')
+
+    def test_detector_rules(self):
+        detector = NearDuplicateDetector()
+        self.assertIsNone(detector.add(1, 'Rust compiler performance', 'https://kobzol.github.io/rust/a'))
+        # 同域名、标题近似
+        self.assertEqual(detector.add(2, 'Rust Compiler Performance!', 'https://kobzol.github.io/rust/b'), 1)
+        # 不同域名、标题几乎相同
+        self.assertEqual(detector.add(3, 'Show HN: Rust compiler performance', 'https://other.com/'), 1)
+        # 标题不同但 URL 相同
+        self.assertEqual(detector.add(4, 'Something else', 'https://kobzol.github.io/rust/a?utm_medium=x'), 1)
+        self.assertIsNone(detector.add(5, 'Rendering crispy text on the GPU', 'https://osor.io/text'))
+        self.assertEqual(len(detector), 2)
+
+    def test_dedup_stories_keeps_highest_score(self):
+        stories = [
+            {'id': 1, 'title': 'Jemalloc Postmortem', 'url': 'https://jasone.github.io/jemalloc', 'score': 10},
+            {'id': 2, 'title': 'Chatterbox TTS', 'url': 'https://github.com/resemble-ai/chatterbox', 'score': 591},
+            {'id': 3, 'title': 'Jemalloc postmortem', 'url': 'https://jasone.github.io/jemalloc/', 'score': 244},
+        ]
+        result = dedup_stories(stories)
+        self.assertEqual([s['id'] for s in result], [2, 3])
+        self.assertEqual([d['id'] for d in result[1]['duplicates']], [1])
+        # 再次调用结果不变
+        self.assertEqual([s['id'] for s in dedup_stories(result)], [2, 3])
+        self.assertEqual(len(result[1]['duplicates']), 1)
+
+    def test_dedup_stories_does_not_modify_input(self):
+        stories = [
+            {'id': 1, 'title': 'Jemalloc Postmortem', 'url': 'https://jasone.github.io/jemalloc', 'score': 10},
+            {'id': 2, 'title': 'Chatterbox TTS', 'url': 'https://github.com/resemble-ai/chatterbox', 'score': 591},
+            {'id': 3, 'title': 'Jemalloc postmortem', 'url': 'https://jasone.github.io/jemalloc/', 'score': 244},
+        ]
+        first = dedup_stories(stories)
+        second = dedup_stories(stories)
+        self.assertNotIn('duplicates', stories[2])
+        self.assertEqual(len(second[1]['duplicates']), 1)
+        # 没有重复项的故事原样返回
+        self.assertIs(first[0], stories[1])
+
+    def test_dedup_markdown_keeps_latest_entry(self):
+        entry_old = "📰 **[Chatterbox TTS](https://github.com/resemble-ai/chatterbox)**\n  👍 **100** 分\n"
+        entry_new = "📰 **[Chatterbox TTS](https://github.com/resemble-ai/chatterbox)**\n  👍 **591** 分\n"
+        other = "📰 **[Jemalloc Postmortem](https://jasone.github.io/jemalloc)**\n  👍 **244** 分\n"
+        docs = [f"# 08:00\n\n{entry_old}\n{other}", f"# 12:00\n\n{entry_new}"]
+
+        result = dedup_markdown_stories(docs)
+        self.assertNotIn('Chatterbox', result[0])
+        self.assertIn('Jemalloc', result[0])
+        self.assertIn('**591**', result[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
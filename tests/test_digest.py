@@ -0,0 +1,84 @@
+import sys
+import os
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.digest import DigestComposer, DigestRecipient, parse_digest_recipients
+from utils.hn_snapshots import render_category_sections
+
+
+def _composer():
+    return DigestComposer(
+        '2024-05-01', "# GitHub Subscriptions Update\n\nFULL", "HN SUMMARY",
+        github_sections={'octo/alpha': "## alpha", 'octo/beta': "## beta"},
+        hn_category_sections={'tech': "### tech", 'science': "### science"})
+
+
+class TestParseDigestRecipients(unittest.TestCase):
+    def test_plain_and_personalized_recipients(self):
+        recipients = parse_digest_recipients({
+            'to': ['a@example.com', 'b@example.com'],
+            'recipients': [
+                {'address': 'b@example.com', 'repos': ['Octo/Alpha']},
+                {'email': 'c@example.com', 'hn_categories': ['tech']},
+                {'repos': ['octo/beta']},
+            ]})
+        self.assertEqual([r.address for r in recipients], ['a@example.com', 'b@example.com', 'c@example.com'])
+        self.assertFalse(recipients[0].personalized)
+        self.assertTrue(recipients[1].wants_repo('octo/alpha'))
+        self.assertFalse(recipients[1].wants_repo('octo/beta'))
+        self.assertEqual(recipients[2].hn_categories, frozenset({'tech'}))
+
+    def test_single_string_to(self):
+        recipients = parse_digest_recipients({'to': 'a@example.com'})
+        self.assertEqual([r.address for r in recipients], ['a@example.com'])
+        self.assertEqual(parse_digest_recipients(None), [])
+
+
+class TestDigestComposer(unittest.TestCase):
+    def test_unfiltered_digest_matches_full_layout(self):
+        self.assertEqual(_composer().compose(), (
+            "# 每日资讯摘要 (2024-05-01)\n\n"
+            "## 1. GitHub 仓库订阅更新\n\n# GitHub Subscriptions Update\n\nFULL\n\n"
+            "---\n"
+            "## 2. Hacker News 每日热点\n\nHN SUMMARY"))
+
+    def test_filtered_parts(self):
+        composer = _composer()
+        digest = composer.compose(DigestRecipient('x@example.com', repos=['octo/beta'], hn_categories=['science']))
+        self.assertIn("## beta", digest)
+        self.assertNotIn("## alpha", digest)
+        self.assertNotIn("FULL", digest)
+        self.assertIn("### science", digest)
+        self.assertNotIn("HN SUMMARY", digest)
+
+        digest = composer.compose(DigestRecipient('x@example.com', repos=['octo/missing']))
+        self.assertIn("没有更新", digest)
+        self.assertIn("HN SUMMARY", digest)
+
+    def test_recipients_with_same_filters_share_one_digest(self):
+        groups = _composer().compose_all([
+            DigestRecipient('a@example.com'),
+            DigestRecipient('b@example.com', repos=['octo/alpha']),
+            DigestRecipient('c@example.com'),
+            DigestRecipient('d@example.com', repos=['OCTO/ALPHA']),
+        ])
+        self.assertEqual([addresses for addresses, _ in groups],
+                         [['a@example.com', 'c@example.com'], ['b@example.com', 'd@example.com']])
+        self.assertEqual(groups[0][1], _composer().compose())
+
+
+class TestRenderCategorySections(unittest.TestCase):
+    def test_sections_follow_report_order_and_limit(self):
+        stories = [{'title': f"T{i}", 'url': None, 'peak_score': 100 - i, 'descendants': i,
+                    'category': 'tech' if i % 2 else 'show_hn'} for i in range(6)]
+        sections = render_category_sections(stories, limit=2)
+        self.assertEqual(list(sections), ['show_hn', 'tech'])
+        self.assertEqual(sections['tech'].count("\n- "), 2)
+        self.assertIn("[T1](#)", sections['tech'])
+
+
+if __name__ == '__main__':
+    unittest.main()
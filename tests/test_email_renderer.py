@@ -0,0 +1,81 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.email_renderer import CompiledTemplate, EmailRenderer, build_toc_html, split_sections
+
+
+def _digest(repos=3):
+    sections = [f"## {i}. owner/repo{i} 项目更新\n\n### 新增功能\n- 功能 {i}\n- 修复 {i}\n\n" + "说明文字。" * 60
+                for i in range(repos)]
+    return "# 每日资讯摘要\n\n" + "\n\n".join(sections)
+
+
+class TestEmailRenderer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.template_path = os.path.join(self.temp_dir, 'template.html')
+        with open(self.template_path, 'w', encoding='utf-8') as f:
+            f.write("<title>{{subject}}</title><main>{{report_content}}</main>")
+        self.renderer = EmailRenderer(self.template_path, highlight_code=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_template_fields(self):
+        template = CompiledTemplate("a{{x}}b{{y}}{{x}}")
+        self.assertEqual(template.render({'x': '1', 'y': '2'}), "a1b21")
+
+    def test_toc_links_match_header_ids(self):
+        html = self.renderer.render("日报", _digest())
+        self.assertTrue(html.startswith("<title>日报</title><main>"))
+        self.assertIn('<div class="toc">', html)
+        self.assertIn('回到顶部', html)
+        anchors = [part.split('"', 1)[0] for part in html.split('<a href="#')[1:] if not part.startswith('top')]
+        self.assertEqual(len(anchors), 7)  # 1 个一级标题 + 每个仓库的二、三级标题
+        for anchor in anchors:
+            self.assertIn(f'id="{anchor}"', html)
+
+    def test_short_report_has_no_toc(self):
+        html = self.renderer.render("短报告", "# 标题\n内容\n- 列表项")
+        self.assertNotIn('class="toc"', html)
+        self.assertIn('<li>列表项</li>', html)
+
+    def test_toc_nesting(self):
+        toc = build_toc_html([(1, 'a', 'A'), (3, 'b', 'B <x>'), (4, 'c', 'C'), (2, 'd', 'D')])
+        self.assertNotIn('href="#c"', toc)
+        self.assertIn('B &lt;x&gt;', toc)
+        self.assertEqual(toc.count('<ul>'), toc.count('</ul>'))
+
+    def test_sections_keep_ids_unique(self):
+        section = "\n\n---\n## owner/repo 项目更新\n\n### Commits\n- fix\n\n" + "说明。" * 200
+        html = self.renderer.render("日报", "# 日报" + section * 3)
+        anchors = [part.split('"', 1)[0] for part in html.split('<a href="#')[1:] if not part.startswith('top')]
+        self.assertEqual(len(anchors), 7)
+        self.assertEqual(len(set(anchors)), 7)
+        for anchor in anchors:
+            self.assertEqual(html.count(f'id="{anchor}"'), 1)
+
+    def test_split_sections_keeps_code_blocks(self):
+        text = "a\n\n---\nb\n```\nx\n\n---\ny\n```\n\n---\nc\ntext\n---\nd"
+        self.assertEqual(split_sections(text), ["a", "---\nb\n```\nx\n\n---\ny\n```", "---\nc\ntext\n---\nd"])
+
+    def test_render_is_cached_by_content(self):
+        report = _digest()
+        first = self.renderer.render("日报", report)
+        self.assertIs(self.renderer.render("日报", report), first)
+        self.assertNotEqual(self.renderer.render("日报", report + "\n更新"), first)
+        self.assertEqual(self.renderer.stats, {'hits': 1, 'misses': 2})
+
+    def test_missing_template_falls_back(self):
+        renderer = EmailRenderer(os.path.join(self.temp_dir, 'missing.html'), highlight_code=False)
+        self.assertTrue(renderer.render("主题", "内容").startswith("<h1>主题</h1>"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from analyzers.embeddings import HashingEmbedder, EmbeddingCache
+from utils.ann_index import IVFIndex
+
+
+class TestHashingEmbedder(unittest.TestCase):
+    def test_related_titles_are_closer(self):
+        embedder = HashingEmbedder()
+        vectors = embedder.embed([
+            "Rust compiler performance improvements",
+            "Why the Rust compiler is slow",
+            "A receipt printer cured my procrastination",
+        ])
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+        self.assertGreater(vectors[0] @ vectors[1], vectors[0] @ vectors[2])
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_put_get_and_reload(self):
+        cache = EmbeddingCache(self.cache_dir, dim=4, model_id='test', initial_capacity=2)
+        vectors = np.eye(4, dtype=np.float32)[:3]
+        cache.put_many([101, 102, 103], vectors)  # 超出初始容量，触发扩容
+
+        reloaded = EmbeddingCache(self.cache_dir, dim=4, model_id='test')
+        got, missing = reloaded.get_many([103, 999, 101])
+        self.assertEqual(missing, [999])
+        np.testing.assert_array_equal(got[0], vectors[2])
+        np.testing.assert_array_equal(got[1], np.zeros(4))
+        np.testing.assert_array_equal(got[2], vectors[0])
+        self.assertEqual(len(reloaded), 3)
+
+    def test_dimension_change_resets_cache(self):
+        cache = EmbeddingCache(self.cache_dir, dim=4, model_id='test')
+        cache.put_many([1], np.ones((1, 4), dtype=np.float32))
+        self.assertEqual(len(EmbeddingCache(self.cache_dir, dim=8, model_id='test')), 0)
+
+
+class TestIVFIndex(unittest.TestCase):
+    def _random_unit(self, n, dim, seed):
+        vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def test_flat_search_is_exact(self):
+        vectors = self._random_unit(50, 16, 0)
+        index = IVFIndex().build(vectors)
+        self.assertTrue(index.is_flat)
+        sims, ids = index.search(vectors[:5], 3)
+        self.assertEqual(list(ids[:, 0]), [0, 1, 2, 3, 4])
+        self.assertTrue(np.all(np.diff(sims, axis=1) <= 0))
+
+    def test_ivf_search_finds_self(self):
+        vectors = self._random_unit(1000, 32, 1)
+        index = IVFIndex(nprobe=4).build(vectors)
+        self.assertFalse(index.is_flat)
+        _, ids = index.search(vectors[:100], 1)
+        self.assertEqual(list(ids[:, 0]), list(range(100)))
+
+
+if __name__ == '__main__':
+    unittest.main()
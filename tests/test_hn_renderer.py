@@ -0,0 +1,80 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils import hn_renderer
+from utils.hn_renderer import StoryView, render_markdown, render_html, render_json, write_report
+from utils.dedup import dedup_markdown_stories
+
+
+def _view():
+    stories = [
+        {'id': 1, 'title': 'Show HN: <Thing>', 'url': 'https://a.com', 'score': 50, 'by': 'x', 'descendants': 3},
+        {'id': 2, 'title': 'Ask HN: What?', 'score': 80, 'by': 'y', 'descendants': 0},
+        {'id': 3, 'title': 'Rust 2.0', 'url': 'https://r.com', 'score': 300, 'ai_summary': '新版本发布'},
+        {'id': 4, 'title': 'Gardening', 'url': 'https://g.com', 'score': 5},
+    ]
+    categories = {'show_hn': [stories[0]], 'ask_hn': [stories[1]], 'tech': [stories[2]], 'others': [stories[3]]}
+    return StoryView(stories, '2025-06-13', '08', categories)
+
+
+class TestHNRenderer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_markdown_layout(self):
+        text = render_markdown(_view())
+        self.assertTrue(text.startswith('# Hacker News 热门新闻 (2025-06-13 08:00)\n\n'))
+        hottest = text.split('## 🔥 最热门讨论\n\n')[1].split('\n## ')[0]
+        self.assertEqual(hottest.count('**['), 3)
+        self.assertLess(hottest.index('Rust 2.0'), hottest.index('Ask HN'))
+        self.assertIn('## 👀 展示与分享\n\n用户分享的项目、产品和创造。\n\n🔍 **[Show HN: <Thing>](https://a.com)**', text)
+        self.assertIn('❓ **[Ask HN: What?](https://news.ycombinator.com/item?id=2)**', text)
+        self.assertIn('  📝 新版本发布\n', text)
+        self.assertNotIn('## 🔬 科学研究', text)
+
+    def test_markdown_entries_are_recognised_by_dedup(self):
+        # 同一份报告出现两次时，第一份中的条目全部被去掉；第二份中每个故事只保留一次
+        first, second = dedup_markdown_stories([render_markdown(_view()), render_markdown(_view())])
+        self.assertNotIn('**[', first)
+        for title in ('Show HN: <Thing>', 'Ask HN: What?', 'Rust 2.0', 'Gardening'):
+            self.assertEqual(second.count(f'**[{title}]'), 1)
+
+    def test_html_and_json_from_same_view(self):
+        view = _view()
+        page = render_html(view)
+        self.assertIn('Show HN: &lt;Thing&gt;', page)
+        self.assertIn('<section class="tech">', page)
+
+        data = json.loads(render_json(view))
+        self.assertEqual(data['hottest'], [3, 2, 1])
+        self.assertEqual(data['sections']['others'], [4])
+        self.assertEqual(data['stories'][1]['url'], 'https://news.ycombinator.com/item?id=2')
+
+    def test_write_report_is_atomic(self):
+        paths = write_report(_view(), self.temp_dir, formats=('md', 'json'))
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['08.json', '08.md'])
+        with open(paths['md'], encoding='utf-8') as f:
+            original = f.read()
+
+        # 写入中途失败时保留旧文件，也不留下临时文件
+        with patch.object(hn_renderer.os, 'replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                write_report(_view(), self.temp_dir)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['08.json', '08.md'])
+        with open(paths['md'], encoding='utf-8') as f:
+            self.assertEqual(f.read(), original)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.hn_snapshots import HNSnapshotStore, render_aggregated_stories
+
+
+def _story(story_id, title, score, url=None, **extra):
+    story = {'id': story_id, 'title': title, 'score': score, 'descendants': score // 2,
+             'url': url or f'https://example.com/{story_id}', 'by': 'alice'}
+    story.update(extra)
+    return story
+
+
+class TestHNSnapshotStore(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.store = HNSnapshotStore(base_dir=self.base_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def test_write_records_rank_category_and_summary(self):
+        stories = [_story(1, 'Rust 2.0', 120, ai_summary='摘要'), _story(2, 'Ask HN: Tools?', 30)]
+        path = self.store.write(stories, '2025-06-13', '08', {'tech': [stories[0]], 'ask_hn': [stories[1]]})
+        with open(path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r['rank'] for r in records], [1, 2])
+        self.assertEqual([r['category'] for r in records], ['tech', 'ask_hn'])
+        self.assertEqual(records[0]['summary'], '摘要')
+        self.assertIsNone(records[1]['summary'])
+
+    def test_aggregate_tracks_story_across_hours(self):
+        self.store.write([_story(1, 'Rust 2.0', 50), _story(2, 'Old news', 80)], '2025-06-13', '08')
+        self.store.write([_story(1, 'Rust 2.0 released', 200, ai_summary='新版本')], '2025-06-13', '09')
+        self.store.write([_story(3, 'Python 4', 10), _story(1, 'Rust 2.0 released', 180)], '2025-06-13', '10')
+
+        stories = self.store.aggregate(['2025-06-13'])
+        self.assertEqual([s['id'] for s in stories], [1, 2, 3])
+        rust = stories[0]
+        self.assertEqual(rust['title'], 'Rust 2.0 released')
+        self.assertEqual(rust['peak_score'], 200)
+        self.assertEqual(rust['latest_score'], 180)
+        self.assertEqual(rust['best_rank'], 1)
+        self.assertEqual(rust['hours_on_front_page'], 3)
+        self.assertEqual(rust['first_seen'], '2025-06-13 08')
+        self.assertEqual(rust['last_seen'], '2025-06-13 10')
+        self.assertEqual([score for _, score in rust['trajectory']], [50, 200, 180])
+        # 最近一小时没有摘要时保留之前生成的摘要
+        self.assertEqual(rust['summary'], '新版本')
+
+    def test_aggregate_range_spans_days_and_folds_resubmissions(self):
+        self.store.write([_story(1, 'Show HN: My editor', 40, url='https://editor.dev')], '2025-06-12', '23')
+        self.store.write([_story(9, 'Show HN: My editor', 90, url='https://editor.dev/')], '2025-06-13', '01')
+
+        stories = self.store.aggregate_range('2025-06-13', days=7)
+        self.assertEqual(len(stories), 1)
+        self.assertEqual(len(stories[0]['duplicates']), 1)
+        self.assertEqual(self.store.aggregate(['2025-06-01']), [])
+
+    def test_render_is_compact_markdown(self):
+        self.store.write([_story(1, 'Rust 2.0', 50)], '2025-06-13', '08')
+        self.store.write([_story(1, 'Rust 2.0', 70)], '2025-06-13', '09')
+        text = render_aggregated_stories(self.store.aggregate(['2025-06-13']), 'HN 2025-06-13')
+        self.assertIn('[Rust 2.0](https://example.com/1)', text)
+        self.assertIn('08:00 50 → 09:00 70', text)
+        self.assertEqual(text.count('Rust 2.0'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
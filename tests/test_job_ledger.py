@@ -0,0 +1,175 @@
+import sys
+import os
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.job_ledger import JobRunLedger, RUN_FAILED, RUN_SKIPPED, RUN_SUCCEEDED
+from utils.async_scheduler import AsyncScheduler, IntervalTrigger, CATCHUP_ALL, CATCHUP_LATEST
+
+
+T0 = datetime(2025, 6, 13, 0, 0, tzinfo=timezone.utc)
+
+
+async def _drain(scheduler):
+    while scheduler._tasks:
+        await asyncio.sleep(0.01)
+
+
+class TestJobRunLedger(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ledger = JobRunLedger(db_path=os.path.join(self.temp_dir, 'ledger.db'))
+
+    def tearDown(self):
+        self.ledger.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_claim_is_idempotent(self):
+        self.assertTrue(self.ledger.claim('job', T0))
+        # 正在执行的不能被再次占用
+        self.assertFalse(self.ledger.claim('job', T0))
+        self.ledger.finish('job', T0, error='boom')
+        self.assertEqual(self.ledger.get('job', T0)['status'], RUN_FAILED)
+
+        # 失败的可以重试，成功后不再执行
+        self.assertTrue(self.ledger.claim('job', T0))
+        self.ledger.finish('job', T0)
+        self.assertFalse(self.ledger.claim('job', T0))
+        record = self.ledger.get('job', T0)
+        self.assertEqual((record['status'], record['attempts'], record['error']), (RUN_SUCCEEDED, 2, None))
+        self.assertEqual(self.ledger.last_success('job'), T0)
+
+    def test_stale_running_can_be_reclaimed(self):
+        ledger = JobRunLedger(db_path=os.path.join(self.temp_dir, 'stale.db'), stale_after=0.01)
+        self.assertTrue(ledger.claim('job', T0))
+        time.sleep(0.02)
+        self.assertTrue(ledger.claim('job', T0))
+        ledger.close()
+
+    def test_skipped_does_not_override(self):
+        self.ledger.claim('job', T0)
+        self.ledger.finish('job', T0)
+        self.ledger.mark_skipped('job', T0, 'missed')
+        self.assertEqual(self.ledger.get('job', T0)['status'], RUN_SUCCEEDED)
+
+        later = T0 + timedelta(hours=1)
+        self.ledger.mark_skipped('job', later, 'missed')
+        self.assertEqual(self.ledger.last_success('job'), T0)
+        self.assertEqual(self.ledger.last_success('job', include_skipped=True), later)
+
+
+class TestSchedulerCatchUp(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ledger = JobRunLedger(db_path=os.path.join(self.temp_dir, 'ledger.db'))
+        self.ledger.claim('job', T0)
+        self.ledger.finish('job', T0)
+        # 上次成功之后错过了 5 个计划时间
+        self.now = T0 + timedelta(minutes=5, seconds=1)
+
+    def tearDown(self):
+        self.ledger.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _run(self, catchup, **options):
+        runs = []
+
+        async def scenario():
+            scheduler = AsyncScheduler(clock=lambda: self.now, ledger=self.ledger)
+            scheduler.add_job('job', lambda scheduled_for: runs.append(scheduled_for), IntervalTrigger(60),
+                              catchup=catchup, pass_scheduled_time=True, **options)
+            scheduler.run_pending()
+            await _drain(scheduler)
+
+        asyncio.run(scenario())
+        return runs
+
+    def test_catch_up_all_in_order(self):
+        runs = self._run(CATCHUP_ALL, catchup_limit=3)
+        self.assertEqual(runs, [T0 + timedelta(minutes=m) for m in (3, 4, 5)])
+        self.assertEqual(self.ledger.get('job', T0 + timedelta(minutes=1))['status'], RUN_SKIPPED)
+        self.assertEqual(self.ledger.last_success('job'), T0 + timedelta(minutes=5))
+
+        # 重新启动后不会重复执行
+        self.assertEqual(self._run(CATCHUP_ALL, catchup_limit=3), [])
+
+    def test_catch_up_latest_only(self):
+        self.assertEqual(self._run(CATCHUP_LATEST), [T0 + timedelta(minutes=5)])
+
+    def test_catch_up_window(self):
+        runs = self._run(CATCHUP_ALL, catchup_limit=10, catchup_window=timedelta(minutes=2))
+        self.assertEqual(runs, [T0 + timedelta(minutes=m) for m in (4, 5)])
+
+    def test_catch_up_parallelism_is_bounded(self):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def job(scheduled_for):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+
+        async def scenario():
+            scheduler = AsyncScheduler(clock=lambda: self.now, ledger=self.ledger, max_catchup_parallel=2)
+            for name in ('a', 'b', 'c'):
+                self.ledger.claim(name, T0)
+                self.ledger.finish(name, T0)
+                scheduler.add_job(name, job, IntervalTrigger(60), max_concurrency=3, catchup=CATCHUP_ALL,
+                                  catchup_limit=2, pass_scheduled_time=True)
+            scheduler.run_pending()
+            await _drain(scheduler)
+
+        asyncio.run(scenario())
+        self.assertEqual(peak[0], 2)
+        for name in ('a', 'b', 'c'):
+            self.assertEqual(self.ledger.last_success(name), T0 + timedelta(minutes=5))
+
+    def test_interrupted_run_is_resumed_after_restart(self):
+        # 上一个进程在执行中退出，留下的记录未超过 stale_after
+        self.ledger.claim('job', T0 + timedelta(minutes=5))
+        self.ledger.mark_skipped('job', T0 + timedelta(minutes=4), 'missed')
+        self.assertEqual(self._run(CATCHUP_ALL, catchup_limit=3), [T0 + timedelta(minutes=5)])
+        self.assertEqual(self.ledger.last_success('job'), T0 + timedelta(minutes=5))
+
+    def test_failed_slot_before_later_success_is_retried(self):
+        for minute in range(1, 6):
+            slot = T0 + timedelta(minutes=minute)
+            self.ledger.claim('job', slot)
+            self.ledger.finish('job', slot, error='boom' if minute == 2 else None)
+        self.assertEqual(self._run(CATCHUP_ALL, catchup_limit=3), [T0 + timedelta(minutes=2)])
+        self.assertEqual(self._run(CATCHUP_ALL, catchup_limit=3), [])
+
+    def test_failed_run_is_retried_in_running_scheduler(self):
+        attempts = []
+
+        def job(scheduled_for):
+            attempts.append(scheduled_for)
+            raise RuntimeError('boom')
+
+        async def scenario():
+            scheduler = AsyncScheduler(clock=lambda: self.now, ledger=self.ledger,
+                                       max_retry_attempts=2, retry_delay=timedelta(0))
+            scheduler.add_job('job', job, IntervalTrigger(60), catchup=CATCHUP_ALL, pass_scheduled_time=True)
+            for _ in range(3):
+                scheduler.run_pending()
+                await _drain(scheduler)
+
+        asyncio.run(scenario())
+        # 首次执行失败后重新补跑一次，达到尝试上限后不再执行
+        self.assertEqual(attempts, [T0 + timedelta(minutes=5)] * 2)
+        self.assertEqual(self.ledger.get('job', T0 + timedelta(minutes=5))['status'], RUN_FAILED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.job_queue import ReportJobQueue, STATUS_DONE, STATUS_FAILED, STATUS_INTERRUPTED
+
+
+class TestReportJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'jobs.db')
+        self.queue = ReportJobQueue(db_path=self.db_path, flush_interval=0)
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_identical_inflight_jobs_run_once(self):
+        release = threading.Event()
+        runs = []
+
+        def task():
+            runs.append(1)
+            yield 'a'
+            release.wait(5)
+            yield 'b'
+
+        first = self.queue.submit('daily', {'date': '2025-06-13'}, task)
+        second = self.queue.submit('daily', {'date': '2025-06-13'}, task)
+        other = self.queue.submit('daily', {'date': '2025-06-14'}, lambda: ['x'])
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+        release.set()
+        self.assertEqual(list(self.queue.stream(first)), [(0, 'a'), (0, 'b')])
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(self.queue.get(first)['status'], STATUS_DONE)
+
+    def test_multiple_viewers_see_full_output(self):
+        release = threading.Event()
+
+        def task():
+            yield (1, 'x')
+            release.wait(5)
+            yield (2, 'y')
+
+        job_id = self.queue.submit('subs', {}, task)
+        results = []
+        viewers = [threading.Thread(target=lambda: results.append(list(self.queue.stream(job_id))))
+                   for _ in range(3)]
+        for viewer in viewers:
+            viewer.start()
+        release.set()
+        for viewer in viewers:
+            viewer.join(5)
+        self.assertEqual(results, [[(1, 'x'), (2, 'y')]] * 3)
+        # 任务结束后的查看者从数据库回放
+        self.assertEqual(list(self.queue.stream(job_id)), [(1, 'x'), (2, 'y')])
+
+    def test_failure_keeps_partial_output(self):
+        def task():
+            yield 'partial'
+            raise RuntimeError('boom')
+
+        job_id = self.queue.submit('daily', {}, task)
+        self.assertEqual(list(self.queue.stream(job_id)), [(0, 'partial')])
+        job = self.queue.get(job_id)
+        self.assertEqual(job['status'], STATUS_FAILED)
+        self.assertEqual(job['error'], 'boom')
+        # 失败的任务不会被复用
+        self.assertNotEqual(self.queue.submit('daily', {}, lambda: []), job_id)
+
+    def test_reopen_marks_unfinished_jobs_interrupted(self):
+        release = threading.Event()
+
+        def task():
+            release.wait(5)
+            yield 'late'
+
+        job_id = self.queue.submit('daily', {}, task)
+        reopened = ReportJobQueue(db_path=self.db_path)
+        try:
+            self.assertEqual(reopened.get(job_id)['status'], STATUS_INTERRUPTED)
+        finally:
+            release.set()
+            reopened.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import sys
+import os
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timezone
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.leases import LeaseStore, WorkItemQueue, ITEM_DONE, ITEM_FAILED
+from utils.job_ledger import JobRunLedger, RUN_SUCCEEDED
+from utils.async_scheduler import AsyncScheduler, IntervalTrigger
+
+
+class TestLeaseStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'cluster.db')
+        self.a = LeaseStore(self.db_path, owner='a', ttl=0.3)
+        self.b = LeaseStore(self.db_path, owner='b', ttl=0.3)
+
+    def tearDown(self):
+        self.a.close()
+        self.b.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_exclusive_until_released(self):
+        lease = self.a.lease('job')
+        self.assertIsNotNone(lease)
+        self.assertIsNone(self.b.lease('job'))
+        self.assertEqual(self.b.holder('job'), 'a')
+        lease.release()
+        lease = self.b.lease('job')
+        self.assertIsNotNone(lease)
+        lease.release()
+
+    def test_heartbeat_keeps_lease_and_expiry_allows_takeover(self):
+        with self.a.lease('job'):
+            time.sleep(0.5)  # 超过 ttl，依靠续期保持
+            self.assertFalse(self.b.acquire('job'))
+
+        # 进程退出（未释放也不再续期）后租约过期
+        self.assertTrue(self.a.acquire('other'))
+        self.assertFalse(self.b.acquire('other'))
+        time.sleep(0.35)
+        self.assertTrue(self.b.acquire('other'))
+
+
+class TestWorkItemQueue(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'cluster.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _queue(self, owner, ttl=5.0):
+        return WorkItemQueue(LeaseStore(self.db_path, owner=owner, ttl=ttl))
+
+    def test_workers_split_a_batch(self):
+        queues = [self._queue(f'w{i}') for i in range(3)]
+        items = {f'repo{i}': {'n': i} for i in range(12)}
+        self.assertEqual(queues[0].enqueue('batch', 'square', items), 12)
+        # 重复入队不产生新工作项
+        self.assertEqual(queues[1].enqueue('batch', 'square', items), 0)
+
+        done_by = {}
+        lock = threading.Lock()
+
+        def handler_for(name):
+            def handler(payload):
+                with lock:
+                    done_by.setdefault(name, 0)
+                    done_by[name] += 1
+                time.sleep(0.01)
+                return str(payload['n'] ** 2)
+            return handler
+
+        threads = [threading.Thread(target=q.process, args=({'square': handler_for(q.store.owner)},))
+                   for q in queues]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        results = queues[0].results('batch')
+        self.assertEqual({k: v['result'] for k, v in results.items()}, {f'repo{i}': str(i * i) for i in range(12)})
+        self.assertEqual(sum(done_by.values()), 12)
+        self.assertGreater(len(done_by), 1)
+
+    def test_item_of_dead_worker_is_reclaimed(self):
+        dead = self._queue('dead', ttl=0.1)
+        alive = self._queue('alive', ttl=0.1)
+        dead.enqueue('batch', 'echo', {'x': {'v': 'x'}})
+        self.assertIsNotNone(dead.claim())
+        self.assertIsNone(alive.claim())
+
+        time.sleep(0.15)
+        results = alive.run_batch('batch', {'echo': lambda payload: payload['v']}, poll_interval=0.05)
+        self.assertEqual(results['x']['status'], ITEM_DONE)
+        self.assertEqual(results['x']['result'], 'x')
+
+    def test_failures_retry_then_give_up(self):
+        queue = self._queue('w')
+        queue.max_attempts = 2
+        queue.enqueue('batch', 'boom', {'x': {}})
+
+        def boom(payload):
+            raise ValueError('nope')
+
+        results = queue.run_batch('batch', {'boom': boom}, poll_interval=0.01)
+        self.assertEqual(results['x']['status'], ITEM_FAILED)
+        self.assertIn('nope', results['x']['error'])
+
+
+class TestSchedulerWithLeases(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _fire_on_two_workers(self, job):
+        """两个进程（各自的调度器）同时触发同一计划时间，返回台账记录"""
+        slot = datetime(2025, 6, 13, tzinfo=timezone.utc)
+
+        async def scenario():
+            schedulers = []
+            # 与守护进程相同：台账与租约共用集群数据库
+            cluster_db = os.path.join(self.temp_dir, 'cluster.db')
+            for owner in ('a', 'b'):
+                scheduler = AsyncScheduler(
+                    ledger=JobRunLedger(cluster_db),
+                    lease_store=LeaseStore(cluster_db, owner=owner, ttl=1.0),
+                    lease_poll_interval=0.02)
+                scheduler.add_job('job', job, IntervalTrigger(3600))
+                schedulers.append(scheduler)
+            for scheduler in schedulers:
+                scheduler.fire('job', slot)
+            while any(scheduler._tasks for scheduler in schedulers):
+                await asyncio.sleep(0.01)
+            return schedulers[0].ledger.get('job', slot)
+
+        return asyncio.run(scenario())
+
+    def test_same_slot_runs_once_across_workers(self):
+        runs = []
+        record = self._fire_on_two_workers(lambda: (runs.append(1), time.sleep(0.05)))
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(record['status'], RUN_SUCCEEDED)
+
+    def test_waiting_worker_takes_over_failed_run(self):
+        attempts = []
+
+        def job():
+            attempts.append(1)
+            time.sleep(0.05)
+            if len(attempts) == 1:
+                raise RuntimeError('worker crashed mid-job')
+
+        record = self._fire_on_two_workers(job)
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual((record['status'], record['attempts']), (RUN_SUCCEEDED, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
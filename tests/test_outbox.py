@@ -0,0 +1,148 @@
+import sys
+import os
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.outbox import (NotificationOutbox, OutboxSender, PermanentDeliveryError,
+                          OUTBOX_DEAD, OUTBOX_PENDING, OUTBOX_SENT)
+
+
+class TestNotificationOutbox(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.outbox = NotificationOutbox(os.path.join(self.temp_dir, 'outbox.db'), max_attempts=3,
+                                         base_delay=0.0)
+
+    def tearDown(self):
+        self.outbox.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_dedup_key_enqueues_once(self):
+        first = self.outbox.enqueue('email', {'subject': 'daily'}, dedup_key='daily@2025-06-13')
+        self.assertIsNotNone(first)
+        self.assertIsNone(self.outbox.enqueue('email', {'subject': 'daily'}, dedup_key='daily@2025-06-13'))
+        self.assertEqual([item['id'] for item in self.outbox.claim_due()], [first])
+        # 已领取的通知不会被再次领取
+        self.assertEqual(self.outbox.claim_due(), [])
+
+    def test_retry_then_dead_letter_and_requeue(self):
+        item_id = self.outbox.enqueue('email', {})
+        for attempt in range(1, 3):
+            self.assertEqual(self.outbox.claim_due()[0]['attempts'], attempt)
+            self.assertEqual(self.outbox.mark_failed(item_id, 'timeout'), OUTBOX_PENDING)
+        self.outbox.claim_due()
+        self.assertEqual(self.outbox.mark_failed(item_id, 'timeout'), OUTBOX_DEAD)
+        self.assertEqual(self.outbox.claim_due(), [])
+        self.assertEqual([item['id'] for item in self.outbox.dead_letters()], [item_id])
+
+        self.assertTrue(self.outbox.requeue(item_id))
+        self.assertEqual(self.outbox.claim_due()[0]['attempts'], 1)
+
+    def test_backoff_delays_retry(self):
+        outbox = NotificationOutbox(os.path.join(self.temp_dir, 'backoff.db'), base_delay=60)
+        item_id = outbox.enqueue('email', {})
+        outbox.claim_due()
+        outbox.mark_failed(item_id, 'timeout')
+        self.assertEqual(outbox.claim_due(), [])
+        self.assertGreater(outbox.next_due_in(), 40)
+        outbox.close()
+
+    def test_interrupted_delivery_is_reclaimed(self):
+        outbox = NotificationOutbox(os.path.join(self.temp_dir, 'stale.db'), sending_timeout=0.05)
+        item_id = outbox.enqueue('email', {})
+        outbox.claim_due()
+        self.assertEqual(outbox.claim_due(), [])
+        time.sleep(0.06)
+        self.assertEqual([item['id'] for item in outbox.claim_due()], [item_id])
+        outbox.close()
+
+
+class TestOutboxSender(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.outbox = NotificationOutbox(os.path.join(self.temp_dir, 'outbox.db'), max_attempts=3,
+                                         base_delay=0.01)
+
+    def tearDown(self):
+        self.outbox.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_channels_share_the_queue_with_retry_and_dead_letters(self):
+        delivered = []
+        email_failures = [2]
+
+        def email(payload):
+            if email_failures[0]:
+                email_failures[0] -= 1
+                raise ConnectionError('smtp down')
+            delivered.append(('email', payload['subject']))
+
+        def slack(payload):
+            raise PermanentDeliveryError('invalid webhook')
+
+        async def scenario():
+            sender = OutboxSender(self.outbox, {'email': email, 'slack': slack}, poll_interval=5)
+            stop = asyncio.Event()
+            task = asyncio.create_task(sender.run(stop))
+            await asyncio.sleep(0.05)
+            # 从其他线程入队（报告任务在线程中执行），发送器被立即唤醒
+            ids = []
+            thread = threading.Thread(target=lambda: ids.extend([
+                self.outbox.enqueue('email', {'subject': 'daily'}),
+                self.outbox.enqueue('slack', {'title': 'daily'})]))
+            thread.start()
+            thread.join()
+            for _ in range(100):
+                await asyncio.sleep(0.02)
+                counts = self.outbox.counts()
+                if counts.get(OUTBOX_SENT) == 1 and counts.get(OUTBOX_DEAD) == 1:
+                    break
+            stop.set()
+            await asyncio.wait_for(task, timeout=2)
+            return ids
+
+        email_id, slack_id = asyncio.run(scenario())
+        self.assertEqual(delivered, [('email', 'daily')])
+        self.assertEqual((self.outbox.get(email_id)['status'], self.outbox.get(email_id)['attempts']),
+                         (OUTBOX_SENT, 3))
+        self.assertEqual((self.outbox.get(slack_id)['status'], self.outbox.get(slack_id)['attempts']),
+                         (OUTBOX_DEAD, 1))
+
+    def test_handler_can_narrow_payload_for_retry(self):
+        attempts = []
+
+        def email(payload):
+            attempts.append(list(payload['recipients']))
+            if len(attempts) == 1:
+                # 第一批已送达，只剩未送达的收件人需要重试
+                payload['recipients'] = ['b@example.com']
+                raise ConnectionError('second batch failed')
+
+        item_id = self.outbox.enqueue('email', {'subject': 'daily', 'recipients': ['a@example.com', 'b@example.com']})
+
+        async def scenario():
+            sender = OutboxSender(self.outbox, {'email': email}, poll_interval=5)
+            stop = asyncio.Event()
+            task = asyncio.create_task(sender.run(stop))
+            for _ in range(100):
+                await asyncio.sleep(0.02)
+                if self.outbox.counts().get(OUTBOX_SENT) == 1:
+                    break
+            stop.set()
+            await asyncio.wait_for(task, timeout=2)
+
+        asyncio.run(scenario())
+        self.assertEqual(attempts, [['a@example.com', 'b@example.com'], ['b@example.com']])
+        self.assertEqual(self.outbox.get(item_id)['payload']['recipients'], ['b@example.com'])
+        self.assertEqual(self.outbox.get(item_id)['status'], OUTBOX_SENT)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import sys
+import os
+import time
+import threading
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.pipeline import ordered_prefetch
+
+
+def slow_report(name, delay=0.2, chunks=3):
+    def factory():
+        time.sleep(delay)
+        for i in range(chunks):
+            yield f"{name}-{i}"
+    return factory
+
+
+class TestOrderedPrefetch(unittest.TestCase):
+    def test_output_keeps_order(self):
+        factories = [slow_report(n, delay=d) for n, d in [('a', 0.3), ('b', 0.0), ('c', 0.1)]]
+        output = [list(gen) for gen in ordered_prefetch(factories, lookahead=2)]
+        self.assertEqual(output, [[f"{n}-{i}" for i in range(3)] for n in 'abc'])
+
+    def test_runs_ahead_in_parallel(self):
+        factories = [slow_report(str(i)) for i in range(5)]
+        start = time.monotonic()
+        for gen in ordered_prefetch(factories, lookahead=4):
+            list(gen)
+        # 串行需要约 1 秒，全部并行约 0.2 秒
+        self.assertLess(time.monotonic() - start, 0.6)
+
+    def test_lookahead_bounds_concurrency(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def factory():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+            yield 'x'
+
+        for gen in ordered_prefetch([factory] * 6, lookahead=1):
+            list(gen)
+        self.assertLessEqual(max(peak), 2)
+
+    def test_producer_error_is_raised_in_order(self):
+        def broken():
+            yield 'partial'
+            raise RuntimeError('boom')
+
+        gens = ordered_prefetch([slow_report('a', delay=0), broken], lookahead=1)
+        self.assertEqual(list(next(gens)), ['a-0', 'a-1', 'a-2'])
+        failing = next(gens)
+        self.assertEqual(next(failing), 'partial')
+        with self.assertRaises(RuntimeError):
+            next(failing)
+
+
+if __name__ == '__main__':
+    unittest.main()
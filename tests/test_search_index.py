@@ -0,0 +1,77 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.search_index import ReportSearchIndex
+from utils.artifact_store import ReportArtifactStore
+
+
+class TestReportSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.hn_dir = os.path.join(self.temp_dir, 'hacker_news')
+        self.gh_dir = os.path.join(self.temp_dir, 'daily_progress')
+        self.index = ReportSearchIndex(db_path=os.path.join(self.temp_dir, 'index.db'),
+                                       roots=[self.hn_dir, self.gh_dir])
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, directory, name, content):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_index_and_search(self):
+        self._write(os.path.join(self.hn_dir, '2025-06-13'), '08.md',
+                    "# Hacker News 热门新闻\n\nRust compiler gets 2x faster 编译器优化\n")
+        self._write(self.gh_dir, '2025-06-13.md', "# Progress for foo/bar\n\nFix python packaging\n")
+        self.assertEqual(self.index.sync()['indexed'], 2)
+
+        results = self.index.search('rust compiler')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['source'], 'hacker_news')
+        self.assertEqual(results[0]['title'], 'Hacker News 热门新闻')
+        self.assertIn('**', results[0]['snippet'])
+
+        # 中文子串，以及不足3个字符的词
+        self.assertEqual(len(self.index.search('编译器')), 1)
+        self.assertEqual(len(self.index.search('优化')), 1)
+        self.assertEqual(self.index.search('python', source='hacker_news'), [])
+        self.assertEqual(self.index.search('python', source='github')[0]['title'], 'Progress for foo/bar')
+        # 查询语法字符按普通文本处理
+        self.assertEqual(self.index.search('"rust" OR'), [])
+
+    def test_sync_is_incremental(self):
+        path = self._write(self.gh_dir, 'a.md', "# A\n\nold content\n")
+        self.index.sync()
+        self.assertEqual(self.index.sync()['indexed'], 0)
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("# A\n\nnew content here\n")
+        self.assertTrue(self.index.index_file(path))
+        self.assertEqual(self.index.search('old content'), [])
+        self.assertEqual(len(self.index.search('new content')), 1)
+
+        os.remove(path)
+        self.assertEqual(self.index.sync()['removed'], 1)
+        self.assertEqual(self.index.count(), 0)
+
+    def test_artifact_store_updates_index(self):
+        store = ReportArtifactStore(base_dir=os.path.join(self.temp_dir, 'reports'), search_index=self.index)
+        store.put('hacker_news_daily_report', 'all', '2025-06-13', 'model', 'v1', '# 每日摘要\n\n大模型推理成本下降')
+        results = self.index.search('推理成本')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['source'], 'report')
+
+
+if __name__ == '__main__':
+    unittest.main()
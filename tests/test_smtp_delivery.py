@@ -0,0 +1,166 @@
+import sys
+import os
+import smtplib
+import socketserver
+import threading
+import unittest
+from email.mime.text import MIMEText
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.smtp_delivery import PartialDeliveryError, SmtpDeliveryEngine, SmtpDeliveryError
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """最小的 SMTP 服务器实现，只支持测试用到的命令"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost ready")
+        recipients = []
+        sent_here = 0
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line.split(' ', 1)[0].upper()
+            if command in ('EHLO', 'HELO'):
+                self.reply("250 localhost")
+            elif command == 'MAIL':
+                recipients = []
+                self.reply("250 OK")
+            elif command == 'RCPT':
+                address = line.split(':', 1)[1].strip('<> ')
+                if address in server.rejected:
+                    self.reply("550 no such user")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif command == 'DATA':
+                self.reply("354 go ahead")
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                with server.lock:
+                    if server.fail_data > 0:
+                        server.fail_data -= 1
+                        self.reply("421 try again later")
+                        return
+                    server.messages.append(list(recipients))
+                self.reply("250 queued")
+                sent_here += 1
+                if server.drop_after and sent_here >= server.drop_after:
+                    return  # 模拟服务器断开空闲连接
+            elif command in ('NOOP', 'RSET'):
+                self.reply("250 OK")
+            elif command == 'QUIT':
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+class _LocalSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SmtpHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = []
+        self.rejected = set()
+        self.fail_data = 0
+        self.drop_after = 0
+
+
+class TestSmtpDeliveryEngine(unittest.TestCase):
+    def setUp(self):
+        self.server = _LocalSmtpServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.sleeps = []
+        self.settings = {'smtp_server': '127.0.0.1', 'smtp_port': self.server.server_address[1],
+                         'smtp_security': 'plain', 'from': 'bot@example.com'}
+        self.message = MIMEText('hello').as_string()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _engine(self, **options):
+        return SmtpDeliveryEngine(self.settings, sleep=self.sleeps.append, **options)
+
+    def test_session_is_reused_across_messages(self):
+        with self._engine() as engine:
+            for i in range(5):
+                engine.send('bot@example.com', [f'user{i}@example.com'], self.message)
+        self.assertEqual(len(self.server.messages), 5)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_recipients_are_batched(self):
+        recipients = [f'user{i}@example.com' for i in range(7)]
+        with self._engine(max_recipients_per_message=3) as engine:
+            engine.send('bot@example.com', recipients, self.message)
+        self.assertEqual([len(batch) for batch in self.server.messages], [3, 3, 1])
+        self.assertEqual(sum(self.server.messages, []), recipients)
+
+    def test_transient_failure_is_retried_with_backoff(self):
+        self.server.fail_data = 2
+        with self._engine(retries=2, retry_backoff=0.5) as engine:
+            engine.send('bot@example.com', ['a@example.com'], self.message)
+        self.assertEqual(self.server.messages, [['a@example.com']])
+        self.assertEqual(self.sleeps, [0.5, 1.0])
+
+        self.server.fail_data = 5
+        with self._engine(retries=1) as engine:
+            with self.assertRaises(SmtpDeliveryError):
+                engine.send('bot@example.com', ['a@example.com'], self.message)
+
+    def test_dropped_session_is_detected_by_noop(self):
+        self.server.drop_after = 1
+        with self._engine(keepalive_interval=0) as engine:
+            engine.send('bot@example.com', ['a@example.com'], self.message)
+            engine.send('bot@example.com', ['b@example.com'], self.message)
+        self.assertEqual(len(self.server.messages), 2)
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(self.sleeps, [])
+
+    def test_permanent_rejection_is_not_retried(self):
+        self.server.rejected = {'nobody@example.com'}
+        with self._engine() as engine:
+            with self.assertRaises(smtplib.SMTPRecipientsRefused):
+                engine.send('bot@example.com', ['nobody@example.com'], self.message)
+            refused = engine.send('bot@example.com', ['a@example.com', 'nobody@example.com'], self.message)
+        self.assertEqual(list(refused), ['nobody@example.com'])
+        self.assertEqual(self.server.messages, [['a@example.com']])
+        self.assertEqual(self.sleeps, [])
+
+    def test_failed_batch_reports_pending_recipients(self):
+        recipients = [f'{name}@example.com' for name in 'abcde']
+        self.server.rejected = {'c@example.com', 'd@example.com'}
+        with self._engine(max_recipients_per_message=2) as engine:
+            with self.assertRaises(PartialDeliveryError) as ctx:
+                engine.send('bot@example.com', recipients, self.message)
+        self.assertEqual(ctx.exception.pending, ['c@example.com', 'd@example.com'])
+        self.assertEqual(ctx.exception.delivered, ['a@example.com', 'b@example.com', 'e@example.com'])
+        self.assertFalse(ctx.exception.transient)
+        self.assertEqual(self.server.messages, [['a@example.com', 'b@example.com'], ['e@example.com']])
+
+        self.server.rejected = set()
+        self.server.messages = []
+        self.server.fail_data = 1
+        with self._engine(max_recipients_per_message=2, retries=0) as engine:
+            with self.assertRaises(PartialDeliveryError) as ctx:
+                engine.send('bot@example.com', recipients, self.message)
+        self.assertEqual(ctx.exception.pending, ['a@example.com', 'b@example.com'])
+        self.assertTrue(ctx.exception.transient)
+        self.assertEqual(self.server.messages, [['c@example.com', 'd@example.com'], ['e@example.com']])
+
+
+if __name__ == '__main__':
+    unittest.main()
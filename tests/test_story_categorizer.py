@@ -0,0 +1,56 @@
+import sys
+import os
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from analyzers.story_categorizer import StoryCategorizer
+
+
+class TestStoryCategorizer(unittest.TestCase):
+    def setUp(self):
+        self.categorizer = StoryCategorizer()
+
+    def _primary(self, title, **extra):
+        story = {'title': title, **extra}
+        return self.categorizer.primary_category(self.categorizer.classify([story])[0])
+
+    def test_short_keywords_respect_word_boundaries(self):
+        self.assertEqual(self._primary('Google said the appraisal was fine'), 'others')
+        self.assertEqual(self._primary('Writing a Go compiler'), 'tech')
+        self.assertEqual(self._primary('Why C++ is still here'), 'tech')
+        self.assertEqual(self._primary('AI models, explained'), 'tech')
+
+    def test_priority_rules(self):
+        self.assertEqual(self._primary('Show HN: A Python web app'), 'show_hn')
+        self.assertEqual(self._primary('Ask HN: Who is hiring? (June 2025)'), 'business')
+        self.assertEqual(self._primary('Acme (YC W24) is looking for engineers', type='job'), 'business')
+
+    def test_multi_label_scores(self):
+        labels = self.categorizer.classify([{'title': 'Machine learning for climate research startups'}])[0]
+        self.assertEqual(list(labels), ['tech', 'science', 'business'])
+        self.assertEqual(labels['tech'], 2.0)
+        self.assertEqual(labels['science'], 2.0)
+
+    def test_batch_matches_single_title_results(self):
+        stories = [{'title': 'Rust 2.0'}, {'title': 'NASA quantum study'}, {'title': 'Rust 2.0'}, {'title': ''}]
+        batch = self.categorizer.classify(stories)
+        self.assertEqual(batch, [self.categorizer.classify([story])[0] for story in stories])
+
+    def test_rules_from_config(self):
+        categorizer = StoryCategorizer({
+            'security': {'keywords': {'cve': 3, 'exploit': 2, '漏洞': 2}},
+            'tech': {'keywords': {'kernel': 1}},
+        })
+        grouped = categorizer.categorize([{'title': 'Linux kernel CVE-2025-1234 exploit'},
+                                          {'title': '某路由器曝出远程漏洞'},
+                                          {'title': 'Gardening tips'}])
+        self.assertEqual([s['title'] for s in grouped['security']],
+                         ['Linux kernel CVE-2025-1234 exploit', '某路由器曝出远程漏洞'])
+        self.assertEqual(grouped['security'][0]['categories'], {'security': 5.0, 'tech': 1.0})
+        self.assertEqual(len(grouped['others']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from analyzers.embeddings import HashingEmbedder
+from analyzers.story_index import StoryIndex
+
+
+STORIES = [
+    {'id': 1, 'title': 'Rust compiler performance', 'url': 'https://kobzol.github.io/rust', 'score': 184},
+    {'id': 2, 'title': 'Rendering crispy text on the GPU', 'url': 'https://osor.io/text', 'score': 73},
+    {'id': 3, 'title': 'A receipt printer cured my procrastination', 'url': 'https://example.com/a', 'score': 828},
+]
+
+
+class TestStoryIndex(unittest.TestCase):
+    def setUp(self):
+        self.index_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.index_dir)
+
+    def _index(self):
+        return StoryIndex(self.index_dir, embedder=HashingEmbedder())
+
+    def test_insert_is_incremental(self):
+        index = self._index()
+        self.assertEqual(index.insert(STORIES, '2025-06-13', '08'), 3)
+        self.assertEqual(index.insert(STORIES, '2025-06-13', '12'), 0)
+        self.assertEqual(len(index), 3)
+
+    def test_query_by_text_and_id_after_reload(self):
+        self._index().insert(STORIES, '2025-06-13', '08')
+        index = self._index()
+
+        results = index.query(text='GPU text rendering', k=1)
+        self.assertEqual(results[0]['id'], 2)
+        self.assertEqual(results[0]['first_seen'], '2025-06-13 08:00')
+
+        self.assertNotIn(1, [r['id'] for r in index.query(story_id=1, k=5)])
+
+    def test_find_duplicates_across_hours(self):
+        index = self._index()
+        index.insert(STORIES, '2025-06-13', '08')
+        resubmitted = {'id': 99, 'title': 'Rust compiler performance', 'url': 'https://kobzol.github.io/rust'}
+        duplicates = index.find_duplicates([resubmitted, STORIES[1]])
+        self.assertEqual(list(duplicates), [99])
+        self.assertEqual(duplicates[99]['id'], 1)
+
+    def test_ivf_index_persists(self):
+        index = self._index()
+        stories = [{'id': i, 'title': f'story number {i} about topic {i % 17}'} for i in range(300)]
+        index.insert(stories, '2025-06-13', '08')
+        self.assertFalse(index.index.is_flat)
+
+        reloaded = self._index()
+        self.assertFalse(reloaded.index.is_flat)
+        self.assertEqual(reloaded.query(text='story number 42 about topic 8', k=1)[0]['id'], 42)
+
+
+if __name__ == '__main__':
+    unittest.main()
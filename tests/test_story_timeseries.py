@@ -0,0 +1,71 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.story_timeseries import StoryTimeSeries, velocity_sort_key
+
+HOUR = 3600
+NOW = 1749808800.0  # 2025-06-13 中午前后
+
+
+class TestStoryTimeSeries(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.series = StoryTimeSeries(base_dir=self.base_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def test_record_and_window(self):
+        self.series.record([{'id': 1, 'score': 10}, {'id': 2, 'score': 5}], timestamp=NOW - 2 * HOUR)
+        self.series.record([{'id': 1, 'score': 30}], timestamp=NOW)
+        samples = self.series.window(NOW - 3 * HOUR, NOW)
+        self.assertEqual(list(samples['id']), [1, 2, 1])
+        self.assertEqual(list(samples['rank']), [1, 2, 1])
+        self.assertEqual(len(self.series.window(NOW - HOUR, NOW)), 1)
+
+    def test_rising_story_outranks_long_running_leader(self):
+        # 老故事分数高但增长缓慢，新故事分数低但增长很快
+        self.series.record([{'id': 1, 'score': 500, 'descendants': 200},
+                            {'id': 2, 'score': 20, 'descendants': 2}], timestamp=NOW - 2 * HOUR)
+        stories = [{'id': 1, 'score': 520, 'descendants': 210, 'time': NOW - 20 * HOUR},
+                   {'id': 2, 'score': 220, 'descendants': 42, 'time': NOW - 3 * HOUR}]
+        self.series.annotate(stories, now=NOW)
+
+        self.assertEqual(stories[0]['points_per_hour'], 10.0)
+        self.assertEqual(stories[1]['points_per_hour'], 100.0)
+        self.assertEqual(stories[1]['comments_per_hour'], 20.0)
+        self.assertEqual(sorted(stories, key=velocity_sort_key, reverse=True)[0]['id'], 2)
+        # annotate 同时记录了本次采样
+        self.assertEqual(len(self.series.window(NOW - 1, NOW)), 2)
+
+    def test_latest_earlier_sample_is_used(self):
+        self.series.record([{'id': 1, 'score': 100}], timestamp=NOW - 2 * HOUR)
+        self.series.record([{'id': 1, 'score': 250}], timestamp=NOW - HOUR)
+        velocity = self.series.velocities([{'id': 1, 'score': 300, 'time': NOW - 10 * HOUR}], now=NOW)
+        self.assertEqual(velocity[1]['points_per_hour'], 50.0)
+
+    def test_daemon_cadence_compares_with_previous_fetch(self):
+        # 守护进程每 4 小时抓取一次
+        series = StoryTimeSeries(base_dir=self.base_dir, sample_interval_hours=4)
+        self.assertEqual(series.lookback_hours, 6)
+        series.record([{'id': 1, 'score': 100}], timestamp=NOW - 4 * HOUR)
+        stories = [{'id': 1, 'score': 500, 'time': NOW - 24 * HOUR}]
+        series.annotate(stories, now=NOW)
+        self.assertEqual(stories[0]['points_per_hour'], 100.0)
+
+    def test_new_story_uses_average_since_posting(self):
+        velocity = self.series.velocities([{'id': 7, 'score': 90, 'time': NOW - 3 * HOUR}], now=NOW)
+        self.assertEqual(velocity[7]['points_per_hour'], 30.0)
+        # 发布不足1小时按1小时计
+        velocity = self.series.velocities([{'id': 8, 'score': 40, 'time': NOW - 600}], now=NOW)
+        self.assertEqual(velocity[8]['points_per_hour'], 40.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.subscription_store import SubscriptionStore, normalize_repo
+from subscription_manager import SubscriptionManager
+
+
+class TestNormalizeRepo(unittest.TestCase):
+    def test_supported_formats(self):
+        for item in ("octo/alpha", "https://github.com/octo/alpha", "github.com/octo/alpha.git/",
+                     {"repo_url": "octo/alpha"}, {"owner": "octo", "repo_name": "alpha"},
+                     {"owner": "octo", "repo": "alpha", "repo_url": "other/repo"}):
+            self.assertEqual(normalize_repo(item), "octo/alpha", item)
+        for item in ("alpha", "https://github.com/octo/alpha/tree/main", {"owner": "octo"}, None, 42):
+            self.assertIsNone(normalize_repo(item), item)
+
+
+class TestSubscriptionStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = SubscriptionStore(os.path.join(self.temp_dir, 'subscriptions.db'))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_add_remove_and_lookup_ignore_case_and_format(self):
+        self.assertTrue(self.store.add("Octo/Alpha"))
+        self.assertFalse(self.store.add("https://github.com/octo/alpha"))
+        self.assertIn("OCTO/ALPHA", self.store)
+        self.assertEqual(self.store.get("octo/alpha")['repo_url'], "Octo/Alpha")
+        self.assertIsNone(self.store.get("octo/missing"))
+        self.assertTrue(self.store.remove("octo/alpha"))
+        self.assertFalse(self.store.remove("octo/alpha"))
+        self.assertEqual(self.store.count(), 0)
+        with self.assertRaises(ValueError):
+            self.store.add("not a repo")
+
+    def test_order_metadata_and_fetch_records(self):
+        self.store.add("octo/alpha")
+        self.store.add("octo/beta", frequency_days=7)
+        self.store.add("octo/gamma", priority=5)
+        self.store.add("octo/delta", enabled=False)
+        self.assertEqual(self.store.repos(), ["octo/gamma", "octo/alpha", "octo/beta"])
+        self.assertEqual(len(self.store.list(include_disabled=True)), 4)
+
+        beta = self.store.get("octo/beta")
+        self.assertEqual((beta['owner'], beta['repo_name'], beta['frequency_days']), ("octo", "beta", 7))
+
+        self.assertTrue(self.store.record_fetch("octo/alpha", cursor="c1", etag='"e1"'))
+        self.assertTrue(self.store.record_fetch("octo/alpha", cursor="c2"))
+        alpha = self.store.get("octo/alpha")
+        self.assertEqual((alpha['cursor'], alpha['etag']), ("c2", '"e1"'))
+        self.assertIsNotNone(alpha['last_fetched_at'])
+        self.assertFalse(self.store.record_fetch("octo/missing"))
+
+        self.assertTrue(self.store.update("octo/alpha", priority=9, enabled=False))
+        self.assertNotIn("octo/alpha", self.store.repos())
+        with self.assertRaises(ValueError):
+            self.store.update("octo/alpha", position=1)
+
+    def test_migrates_legacy_file_once(self):
+        legacy = os.path.join(self.temp_dir, 'subscriptions.json')
+        with open(legacy, 'w', encoding='utf-8') as f:
+            json.dump({"github_subscriptions": [
+                "octo/alpha",
+                {"repo_url": "https://github.com/octo/beta", "custom_branch": "dev"},
+                {"owner": "octo", "repo_name": "alpha"},
+                {"unexpected": True},
+            ], "hacker_news_subscriptions": []}, f)
+
+        self.assertEqual(self.store.migrate_from_json(legacy), 2)
+        self.assertEqual(self.store.repos(), ["octo/alpha", "octo/beta"])
+        self.assertEqual(self.store.get("octo/beta")['custom_branch'], "dev")
+
+        self.store.remove("octo/alpha")
+        self.assertEqual(self.store.migrate_from_json(legacy), 0)
+        self.assertEqual(self.store.repos(), ["octo/beta"])
+
+        exported = os.path.join(self.temp_dir, 'export.json')
+        self.store.export_json(exported)
+        with open(exported, encoding='utf-8') as f:
+            self.assertEqual([sub['repo_url'] for sub in json.load(f)['github_subscriptions']], ["octo/beta"])
+
+    def test_subscription_manager_uses_store(self):
+        manager = SubscriptionManager(os.path.join(self.temp_dir, 'unused.json'), store=self.store)
+        manager.add_subscription("https://github.com/octo/alpha")
+        manager.add_subscription("octo/alpha")
+        manager.add_subscription("octo/beta")
+        manager.remove_subscription("OCTO/BETA")
+        self.assertEqual(manager.list_subscriptions(), ["octo/alpha"])
+        self.assertEqual(self.store.repos(), ["octo/alpha"])
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'unused.json')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.task_graph import FileTaskCache, TaskGraph, TASK_FAILED, TASK_SKIPPED, TASK_SUCCEEDED
+
+
+class TestTaskGraph(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_dependencies_receive_results_and_parallelism_is_bounded(self):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def work(n):
+            def func(inputs):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.03)
+                with lock:
+                    active[0] -= 1
+                return n
+            return func
+
+        graph = TaskGraph(max_workers=2)
+        names = [graph.add(f'part{n}', work(n)) for n in range(5)]
+        graph.add('total', lambda inputs: sum(inputs.values()), deps=names)
+        results = graph.run()
+
+        self.assertEqual(results['total'].value, 10)
+        self.assertEqual(peak[0], 2)
+
+    def test_timeout_then_retry(self):
+        calls = []
+
+        def slow_once(inputs):
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(1)
+            return 'done'
+
+        graph = TaskGraph()
+        graph.add('fetch', slow_once, timeout=0.1, retries=1, retry_delay=0.01)
+        started = time.monotonic()
+        result = graph.run()['fetch']
+
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertEqual((result.status, result.value, result.attempts), (TASK_SUCCEEDED, 'done', 2))
+
+    def test_failure_only_affects_dependents(self):
+        def boom(inputs):
+            raise ValueError('rate limited')
+
+        graph = TaskGraph()
+        graph.add('fetch:a', lambda inputs: 'a')
+        graph.add('fetch:b', boom, retries=1, retry_delay=0.01)
+        graph.add('summarize:a', lambda inputs: inputs['fetch:a'].upper(), deps=['fetch:a'])
+        graph.add('summarize:b', lambda inputs: inputs['fetch:b'].upper(), deps=['fetch:b'])
+        graph.add('combine', lambda inputs: sorted(inputs), deps=['summarize:a', 'summarize:b'],
+                  tolerate_failures=True)
+        results = graph.run()
+
+        self.assertEqual((results['fetch:b'].status, results['fetch:b'].attempts), (TASK_FAILED, 2))
+        self.assertIn('rate limited', results['fetch:b'].error)
+        self.assertEqual(results['summarize:b'].status, TASK_SKIPPED)
+        self.assertEqual(results['summarize:a'].value, 'A')
+        self.assertEqual(results['combine'].value, ['summarize:a'])
+    def test_timed_out_thread_keeps_its_slot(self):
+        active, peak, calls = [0], [0], []
+        lock = threading.Lock()
+
+        def slow_once(inputs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+                calls.append(1)
+                first = len(calls) == 1
+            time.sleep(0.3 if first else 0.01)
+            with lock:
+                active[0] -= 1
+            return 'done'
+
+        graph = TaskGraph(max_workers=1)
+        graph.add('fetch', slow_once, timeout=0.05, retries=1, retry_delay=0.01)
+        graph.add('other', lambda inputs: 'ok')
+        results = graph.run()
+
+        self.assertEqual(results['fetch'].value, 'done')
+        self.assertTrue(results['other'].ok)
+        # 重试要等超时的线程结束后才开始
+        self.assertEqual(peak[0], 1)
+
+    def test_cache_prunes_expired_files(self):
+        base_dir = os.path.join(self.temp_dir, 'tasks')
+        cache = FileTaskCache(base_dir, max_age=60)
+        cache.put('old', 1)
+        cache.put('new', 2)
+        old_path = cache._path('old')
+        os.utime(old_path, (time.time() - 120, time.time() - 120))
+
+        reopened = FileTaskCache(base_dir, max_age=60)
+        self.assertFalse(os.path.exists(old_path))
+        self.assertEqual(reopened.get('new'), (True, 2))
+        self.assertEqual(reopened.prune(max_age=0), 1)
+        self.assertEqual(os.listdir(base_dir), [])
+
+    def test_rerun_reuses_cached_results(self):
+        cache = FileTaskCache(os.path.join(self.temp_dir, 'tasks'))
+        calls = {'a': 0, 'b': 0}
+        fail_b = [True]
+
+        def fetch(name):
+            def func(inputs):
+                calls[name] += 1
+                if name == 'b' and fail_b[0]:
+                    raise RuntimeError('timeout')
+                return {'repo': name}
+            return func
+
+        def build():
+            graph = TaskGraph(cache=cache)
+            for name in ('a', 'b'):
+                graph.add(f'fetch:{name}', fetch(name), cache_key=f'2025-06-13:fetch:{name}')
+            return graph
+
+        self.assertFalse(build().run()['fetch:b'].ok)
+        fail_b[0] = False
+        results = build().run()
+
+        self.assertTrue(results['fetch:a'].cached)
+        self.assertEqual(results['fetch:b'].value, {'repo': 'b'})
+        self.assertEqual(calls, {'a': 1, 'b': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
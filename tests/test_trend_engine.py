@@ -0,0 +1,84 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# 添加 src 目录到模块搜索路径，以便可以导入 src 目录中的模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from analyzers.trend_engine import TopicTrendEngine, TIER_DAILY, TIER_HOURLY
+
+
+RUST = {'keywords': [('rust', 0.5), ('compiler', 0.3), ('performance', 0.2)]}
+GPU = {'keywords': [('gpu', 0.6), ('rendering', 0.3), ('text', 0.1)]}
+BRAIN = {'keywords': [('brain', 0.5), ('sound', 0.3), ('network', 0.2)]}
+
+
+class TestTopicTrendEngine(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.engine = TopicTrendEngine(cache_dir=self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_empty_history_marks_all_emerging(self):
+        trends = self.engine.analyze([RUST, GPU], '2025-06-13', '08')
+        self.assertEqual(trends['emerging'], [0, 1])
+        self.assertEqual(trends['continuing'], [])
+        self.assertEqual(set(trends['horizons']), {'1h', '24h', '7d', '30d'})
+
+    def test_topic_skipping_an_hour_is_continuing_in_24h(self):
+        """跳过一个小时的话题在 1h 窗口内是新兴的，在 24h 窗口内仍是持续的"""
+        self.engine.record([RUST, GPU], '2025-06-13', '08')
+        trends = self.engine.analyze([RUST, BRAIN], '2025-06-13', '12')
+
+        self.assertEqual(trends['horizons']['1h']['emerging'], [0, 1])
+        self.assertEqual(trends['emerging'], [1])
+        self.assertEqual([c['current_idx'] for c in trends['continuing']], [0])
+        self.assertEqual(trends['continuing'][0]['age_hours'], 4)
+        self.assertEqual([f['keywords'] for f in trends['fading']], ['gpu, rendering, text'])
+
+    def test_rerun_replaces_same_hour(self):
+        self.engine.record([RUST, GPU], '2025-06-13', '08')
+        self.engine.record([RUST], '2025-06-13', '08')
+        self.assertEqual(len(self.engine), 1)
+
+    def test_history_persists_across_instances(self):
+        self.engine.record([RUST], '2025-06-13', '08')
+        reloaded = TopicTrendEngine(cache_dir=self.cache_dir)
+        self.assertEqual(len(reloaded), 1)
+        trends = reloaded.analyze([RUST], '2025-06-14', '07')
+        self.assertEqual(trends['emerging'], [])
+
+    def test_compaction_to_daily_and_expiry(self):
+        self.engine.record([RUST], '2025-06-01', '08')
+        self.engine.record([RUST], '2025-06-01', '09')
+        self.engine.record([GPU], '2025-06-10', '08')
+
+        # 两条相同话题的小时记录合并为一条日记录
+        self.assertEqual(list(self.engine.tiers), [TIER_DAILY, TIER_HOURLY])
+        trends = self.engine.analyze([RUST], '2025-06-10', '09')
+        self.assertEqual(trends['horizons']['7d']['emerging'], [0])
+        # 30d 窗口读取日粒度记录
+        self.assertEqual(trends['horizons']['30d']['emerging'], [])
+        self.assertEqual(trends['horizons']['30d']['continuing'][0]['age_hours'], 9 * 24 + 9)
+
+        self.engine.record([GPU], '2025-09-30', '08')
+        self.assertEqual(len(self.engine), 1)
+
+    def test_legacy_import_saves_once(self):
+        for hour in ('08', '09', '10'):
+            open(os.path.join(self.cache_dir, f'2025-06-13_{hour}.json'), 'w').close()
+        saves = []
+        original_save = self.engine._save
+        self.engine._save = lambda: (saves.append(1), original_save())
+
+        self.assertEqual(self.engine.import_legacy_snapshots(lambda date, hour: [RUST]), 3)
+        self.assertEqual(len(saves), 1)
+        self.assertEqual(len(TopicTrendEngine(cache_dir=self.cache_dir)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()